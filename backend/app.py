@@ -2,64 +2,187 @@
 """
 Sistema HR - MVP
 Aplicação Principal Flask
+
+create_app(config) monta a aplicação sem abrir conexões: o cliente Supabase só
+é criado no primeiro uso de cada worker (db.py) e os caches (etapas, roles,
+índice de vagas) são aquecidos após o fork (warmup.py). Com gunicorn, chame
+warmup.start() no hook post_fork; sem ele, a primeira requisição do worker
+dispara o aquecimento em segundo plano. Com REALTIME_ENABLED, cada worker
+também assina o feed de mudanças (change_feed.py) para manter os caches
+coerentes com escritas de outros nós.
 """
 
 import os
-from flask import Flask
+import time
+from flask import Flask, g, jsonify, request
 from flask_cors import CORS
 from dotenv import load_dotenv
 
-# Carregar variáveis de ambiente
-load_dotenv()
-
-# Criar aplicação Flask
-app = Flask(__name__)
-
-# Configurações
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
-app.config['DEBUG'] = os.getenv('DEBUG', 'True').lower() == 'true'
-
-# Configurar CORS
-CORS(app, 
-     origins=[
-         "http://localhost:3000",
-         "http://localhost:5173",
-         "http://127.0.0.1:3000", 
-         "http://127.0.0.1:5173"
-     ],
-     methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-     allow_headers=['Content-Type', 'Authorization']
-)
-
-# Importar suas rotas do arquivo routes.py
-from routes import api
-app.register_blueprint(api, url_prefix='/api')
-
-@app.route('/')
-def index():
-    """Endpoint raiz para verificação"""
-    return {
-        'message': 'Sistema HR - API funcionando!',
-        'version': '1.0.0',
-        'status': 'active',
-        'endpoints': {
-            'test': '/api/test',
-            'candidates': '/api/candidates', 
-            'jobs': '/api/jobs',
-            'dashboard': '/api/dashboard/metrics'
-        }
+DEFAULT_CORS_ORIGINS = [
+    "http://localhost:3000",
+    "http://localhost:5173",
+    "http://127.0.0.1:3000",
+    "http://127.0.0.1:5173"
+]
+DEFAULT_WARMUP_HOOKS = 'stages,roles,jobs'
+
+
+def _split(value):
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return list(value or [])
+
+
+def load_config(overrides=None):
+    """Configuração a partir do ambiente (.env), com sobrescritas explícitas"""
+    load_dotenv()
+    config = {
+        'SECRET_KEY': os.getenv('SECRET_KEY', 'dev-secret-key'),
+        'DEBUG': os.getenv('DEBUG', 'True').lower() == 'true',
+        'SUPABASE_URL': os.getenv('SUPABASE_URL'),
+        'SUPABASE_KEY': os.getenv('SUPABASE_KEY'),
+        'SUPABASE_READ_URL': os.getenv('SUPABASE_READ_URL'),
+        'SUPABASE_READ_KEY': os.getenv('SUPABASE_READ_KEY'),
+        'CORS_ORIGINS': _split(os.getenv('CORS_ORIGINS', '')) or DEFAULT_CORS_ORIGINS,
+        'WARMUP_HOOKS': _split(os.getenv('WARMUP_HOOKS', DEFAULT_WARMUP_HOOKS)),
+        'WARMUP_ON_FIRST_REQUEST': os.getenv('WARMUP_ON_FIRST_REQUEST', 'True').lower() == 'true',
+        'REQUEST_DEADLINE_SECONDS': float(os.getenv('REQUEST_DEADLINE_SECONDS', '10')),
+        'REALTIME_ENABLED': os.getenv('REALTIME_ENABLED', 'False').lower() == 'true',
+        'STAGE_TRANSITION_MODE': os.getenv('STAGE_TRANSITION_MODE', 'rpc')
     }
+    config.update(overrides or {})
+    config['CORS_ORIGINS'] = _split(config['CORS_ORIGINS'])
+    config['WARMUP_HOOKS'] = _split(config['WARMUP_HOOKS'])
+    return config
+
+
+def create_app(config=None):
+    """Criar a aplicação Flask (sem conectar ao banco nem aquecer caches)"""
+    started = time.time()
+    config = load_config(config)
+
+    import resilience
+    from db import data_client
+    from warmup import warmup
+    from change_feed import change_feed, RealtimeTransport
+    from transitions import stage_transitions
+    from report_jobs import report_service
+    from routes import api
+
+    data_client.configure(config['SUPABASE_URL'], config['SUPABASE_KEY'], factory=config.get('DATA_CLIENT_FACTORY'),
+                          read_url=config['SUPABASE_READ_URL'], read_key=config['SUPABASE_READ_KEY'])
+    if not data_client.configured:
+        print("⚠️ SUPABASE_URL/SUPABASE_KEY ausentes - rotas de dados responderão 'Database not connected'")
+
+    # CHANGE_FEED_TRANSPORT: fábrica alternativa (ex.: LocalPublisher().transport)
+    transport_factory = config.get('CHANGE_FEED_TRANSPORT')
+    if transport_factory is None and config['REALTIME_ENABLED'] and data_client.configured:
+        transport_factory = lambda: RealtimeTransport(config['SUPABASE_URL'], config['SUPABASE_KEY'])
+    if transport_factory is not None:
+        change_feed.configure(transport_factory=transport_factory)
+
+    # Processos do pool de relatórios recebem as mesmas credenciais do primário
+    report_service.configure(config['SUPABASE_URL'], config['SUPABASE_KEY'])
+
+    # 'rpc': função transition_application_stage; 'local': update condicional (testes)
+    stage_transitions.configure(config['STAGE_TRANSITION_MODE'])
+
+    app = Flask(__name__)
+    app.config.update(config)
+
+    # Configurar CORS
+    CORS(app,
+         origins=config['CORS_ORIGINS'],
+         methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
+         allow_headers=['Content-Type', 'Authorization']
+    )
+
+    app.register_blueprint(api, url_prefix='/api')
+
+    first_request = {'pid': None}
+
+    @app.before_request
+    def start_worker():
+        """Primeira requisição do worker: medir latência e disparar aquecimento"""
+        if first_request['pid'] == os.getpid():
+            return
+        first_request['pid'] = os.getpid()
+        g.first_request_started = time.time()
+        if config['WARMUP_ON_FIRST_REQUEST']:
+            warmup.start(config['WARMUP_HOOKS'])
+        change_feed.start()
+
+    @app.before_request
+    def start_deadline():
+        """Orçamento de tempo para todas as chamadas ao banco desta requisição"""
+        resilience.begin_request(config['REQUEST_DEADLINE_SECONDS'])
+
+    @app.after_request
+    def finish_deadline(response):
+        """Banco indisponível vira 503 com Retry-After; dados antigos são sinalizados"""
+        served_stale, unavailable = resilience.end_request()
+        if unavailable is not None and response.status_code >= 500:
+            response.status_code = 503
+            response.headers['Retry-After'] = str(max(1, int(unavailable.retry_after or 1)))
+        if served_stale:
+            response.headers['X-Data-Stale'] = 'true'
+        return response
+
+    @app.after_request
+    def pin_writer(response):
+        """Read-your-writes: quem acabou de escrever lê do primário por alguns segundos"""
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            user = getattr(g, 'current_user', None)
+            if user is not None:
+                data_client.pin(user.id)
+        return response
+
+    @app.errorhandler(resilience.DataUnavailable)
+    def data_unavailable(error):
+        response = jsonify({'error': 'Banco de dados indisponível', 'details': str(error)})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(max(1, int(error.retry_after or 1)))
+        return response
+
+    @app.after_request
+    def record_first_request(response):
+        started_at = g.pop('first_request_started', None)
+        if started_at is not None:
+            warmup.record_first_request(request.path, time.time() - started_at, response.status_code)
+        return response
+
+    @app.route('/')
+    def index():
+        """Endpoint raiz para verificação"""
+        return {
+            'message': 'Sistema HR - API funcionando!',
+            'version': '1.0.0',
+            'status': 'active',
+            'endpoints': {
+                'test': '/api/test',
+                'candidates': '/api/candidates',
+                'jobs': '/api/jobs',
+                'dashboard': '/api/dashboard/metrics'
+            }
+        }
+
+    warmup.record_startup('create_app', time.time() - started)
+    return app
+
+
+# Compatibilidade: `flask --app app` e `gunicorn app:app`
+app = create_app()
 
 if __name__ == '__main__':
     port = int(os.getenv('FLASK_PORT', 5000))
     host = os.getenv('FLASK_HOST', '127.0.0.1')
-    debug = os.getenv('DEBUG', 'True').lower() == 'true'
-    
+    debug = app.config['DEBUG']
+
     print("INICIANDO SISTEMA HR - MVP")
     print("============================")
     print(f"URL: http://{host}:{port}")
     print(f"Debug: {debug}")
     print(f"API: http://{host}:{port}/api")
     print("============================")
-    
-    app.run(host=host, port=port, debug=debug)
\ No newline at end of file
+
+    app.run(host=host, port=port, debug=debug)
@@ -0,0 +1,231 @@
+"""
+Sistema HR - MVP
+Arquivamento quente/frio de candidaturas encerradas e candidatos inativos
+
+Candidaturas encerradas (status em ARCHIVE_CLOSED_STATUSES ou vaga não ativa) há
+mais de ARCHIVE_AFTER_DAYS dias, com seu histórico e comentários, e candidatos
+inativos sem candidaturas ativas são movidos para as tabelas *_archive em lotes
+de ARCHIVE_BATCH_SIZE, cada lote numa transação (funções em sql/archive.sql).
+Assim o snapshot, o pipeline e as listagens só percorrem o conjunto ativo;
+include_archived=true nas listagens inclui as linhas arquivadas.
+
+Contadores continuam corretos após a mudança: as contagens das arquivadas são
+pré-agregadas no banco (archived_application_totals) e somadas às do snapshot
+quente, e o rollup diário e os analytics de etapas leem também o arquivo quando
+são reconstruídos. Cada execução reporta linhas movidas por segundo.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from operator import eq
+
+import metrics
+from db import data_client
+from shared_cache import shared_cache
+
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '180'))
+CANDIDATE_ARCHIVE_AFTER_DAYS = int(os.getenv('CANDIDATE_ARCHIVE_AFTER_DAYS', '365'))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '500'))
+ARCHIVE_MAX_BATCHES = int(os.getenv('ARCHIVE_MAX_BATCHES', '200'))
+ARCHIVE_CLOSED_STATUSES = [s.strip() for s in os.getenv('ARCHIVE_CLOSED_STATUSES', 'hired,rejected').split(',') if s.strip()]
+TOTALS_TTL = float(os.getenv('ARCHIVE_TOTALS_TTL', '3600'))
+TOTALS_KEY = 'archive:totals'
+LAST_RUN_KEY = 'archive:last_run'
+RUN_LOCK_KEY = 'archive:run'
+
+APPLICATIONS_ARCHIVE = 'applications_archive'
+CANDIDATES_ARCHIVE = 'candidates_archive'
+
+
+class ArchiveTotals:
+    """Contagens das candidaturas arquivadas por (vaga, etapa, status, mês da candidatura)"""
+
+    COLUMNS = ('job_id', 'stage', 'status')
+
+    def __init__(self, rows=(), candidates=0):
+        self.rows = [
+            (row.get('job_id'), row.get('stage'), row.get('status'), row.get('applied_month'), row.get('total') or 0)
+            for row in rows
+        ]
+        self.candidates = candidates
+
+    def __len__(self):
+        return sum(row[-1] for row in self.rows)
+
+    def _matching(self, where):
+        filters = [
+            (self.COLUMNS.index(column), value.__contains__ if isinstance(value, (set, frozenset)) else partial(eq, value))
+            for column, value in (where or {}).items() if value is not None
+        ]
+        for row in self.rows:
+            if all(test(row[index]) for index, test in filters):
+                yield row
+
+    def count(self, where=None):
+        return sum(row[-1] for row in self._matching(where))
+
+    def group_count(self, name, where=None):
+        """{valor: n} como ApplicationsSnapshot.group_count"""
+        index = self.COLUMNS.index(name)
+        counts = {}
+        for row in self._matching(where):
+            counts[row[index]] = counts.get(row[index], 0) + row[-1]
+        return counts
+
+    def group_count_multi(self, names, where=None):
+        """{(v1, v2, ...): n} como ApplicationsSnapshot.group_count_multi"""
+        indexes = [self.COLUMNS.index(name) for name in names]
+        counts = {}
+        for row in self._matching(where):
+            key = tuple(row[index] for index in indexes)
+            counts[key] = counts.get(key, 0) + row[-1]
+        return counts
+
+    def monthly_counts(self, targets, where=None):
+        """{(ano, mês): n} para os meses pedidos"""
+        counts = dict.fromkeys(targets, 0)
+        for row in self._matching(where):
+            month = row[3]
+            if month:
+                key = (int(month[:4]), int(month[5:7]))
+                if key in counts:
+                    counts[key] += row[-1]
+        return counts
+
+
+def add_counts(hot, archived):
+    """Somar dois {valor: n}"""
+    merged = dict(hot)
+    for key, value in archived.items():
+        merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def _load_totals():
+    rows = data_client.rpc('archived_application_totals', {}).execute().data or []
+    response = data_client.table(CANDIDATES_ARCHIVE).select('id', count='exact').limit(1).execute()
+    return ArchiveTotals(rows, response.count or 0)
+
+
+def archive_totals():
+    """Totais do arquivo (cache compartilhado; invalidado a cada lote arquivado)"""
+    try:
+        return shared_cache.get_or_compute(TOTALS_KEY, _load_totals, TOTALS_TTL)
+    except Exception as e:
+        # Sem as funções/tabelas de arquivo (ainda não migrado): nada arquivado
+        metrics.incr('archive.totals_errors')
+        print(f"⚠️ Totais do arquivo indisponíveis: {e}")
+        return ArchiveTotals()
+
+
+class Archiver:
+    """Execução em lotes do arquivamento, com relatório de linhas por segundo"""
+
+    def __init__(self):
+        self.on_applications = None
+        self.on_candidates = None
+        self._lock = threading.Lock()
+        self._running = False
+
+    def configure(self, on_applications=None, on_candidates=None):
+        """Callbacks com os ids movidos em cada lote (caches, change_log, versões)"""
+        self.on_applications = on_applications
+        self.on_candidates = on_candidates
+
+    @property
+    def running(self):
+        return self._running
+
+    def _batches(self, function, params, report, key):
+        moved = 0
+        for _ in range(ARCHIVE_MAX_BATCHES):
+            result = data_client.rpc(function, params).execute().data or {}
+            ids = result.get('ids') or []
+            if not ids:
+                break
+            moved += len(ids)
+            report['batches'] += 1
+            report[key] += len(ids)
+            for extra in ('history', 'comments'):
+                report[extra] += result.get(extra) or 0
+            shared_cache.delete(TOTALS_KEY)
+            callback = self.on_applications if key == 'applications' else self.on_candidates
+            if callback is not None:
+                callback(ids)
+            if len(ids) < params['batch_size']:
+                break
+        return moved
+
+    def run(self, older_than_days=ARCHIVE_AFTER_DAYS, candidate_days=CANDIDATE_ARCHIVE_AFTER_DAYS,
+            batch_size=ARCHIVE_BATCH_SIZE):
+        """Arquivar tudo o que está elegível (até ARCHIVE_MAX_BATCHES lotes por tipo)"""
+        with self._lock:
+            if self._running:
+                return None
+            self._running = True
+        started = time.time()
+        now = datetime.now(timezone.utc)
+        report = {
+            'started_at': now.isoformat(), 'batches': 0,
+            'applications': 0, 'history': 0, 'comments': 0, 'candidates': 0, 'status': 'running'
+        }
+        try:
+            with shared_cache.compute_lock(RUN_LOCK_KEY) as acquired:
+                if not acquired:
+                    report['status'] = 'skipped'
+                    return report
+                self._batches('archive_closed_applications', {
+                    'closed_before': (now - timedelta(days=older_than_days)).isoformat(),
+                    'closed_statuses': ARCHIVE_CLOSED_STATUSES,
+                    'batch_size': batch_size
+                }, report, 'applications')
+                self._batches('archive_inactive_candidates', {
+                    'inactive_before': (now - timedelta(days=candidate_days)).isoformat(),
+                    'batch_size': batch_size
+                }, report, 'candidates')
+                report['status'] = 'ok'
+        except Exception as e:
+            report['status'] = 'error'
+            report['error'] = str(e)
+            metrics.incr('archive.errors')
+            print(f"❌ Erro no arquivamento: {e}")
+        finally:
+            seconds = time.time() - started
+            rows = report['applications'] + report['history'] + report['comments'] + report['candidates']
+            report['seconds'] = round(seconds, 3)
+            report['rows'] = rows
+            report['rows_per_second'] = round(rows / seconds, 1) if seconds > 0 else 0.0
+            report['finished_at'] = datetime.now(timezone.utc).isoformat()
+            self._running = False
+            if report['status'] != 'skipped':
+                shared_cache.set(LAST_RUN_KEY, report, 30 * 86400)
+                metrics.incr('archive.runs')
+                metrics.incr('archive.rows', rows)
+                metrics.set_gauge('archive.rows_per_second', report['rows_per_second'])
+                print(f"🗄️ Arquivamento: {report['applications']} candidaturas, {report['history']} históricos, "
+                      f"{report['comments']} comentários, {report['candidates']} candidatos "
+                      f"em {seconds:.2f}s ({report['rows_per_second']} linhas/s)")
+        return report
+
+    def start(self, **kwargs):
+        """Rodar em segundo plano; False se já houver uma execução neste worker"""
+        if self._running:
+            return False
+        threading.Thread(target=self.run, kwargs=kwargs, name='archiver', daemon=True).start()
+        return True
+
+    def status(self):
+        return {
+            'running': self._running,
+            'last_run': shared_cache.get(LAST_RUN_KEY),
+            'after_days': ARCHIVE_AFTER_DAYS,
+            'candidate_after_days': CANDIDATE_ARCHIVE_AFTER_DAYS,
+            'batch_size': ARCHIVE_BATCH_SIZE,
+            'closed_statuses': ARCHIVE_CLOSED_STATUSES
+        }
+
+
+archiver = Archiver()
@@ -0,0 +1,134 @@
+"""
+Sistema HR - MVP
+Política de auditoria: ações individuais e acessos de leitura agregados
+
+Ações que alteram dados (POST/PUT/PATCH/DELETE), login/logout e leituras de
+endpoints sensíveis (AUDIT_INDIVIDUAL_ENDPOINTS) continuam como uma linha cada
+em audit_logs. As demais leituras viram contadores por (usuário, endpoint,
+método, minuto) em memória, descarregados a cada AUDIT_FLUSH_INTERVAL segundos
+numa única chamada que soma os contadores no banco (audit_access_counters).
+Falhas devolvem os contadores para a fila (até AUDIT_MAX_PENDING chaves) e a
+fila é descarregada também na saída do processo.
+"""
+
+import atexit
+import os
+import threading
+from datetime import datetime, timezone
+
+import metrics
+
+AUDIT_TABLE = 'audit_logs'
+ACCESS_TABLE = 'audit_access_counters'
+FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '60'))
+MAX_PENDING = int(os.getenv('AUDIT_MAX_PENDING', '50000'))
+MUTATING_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+INDIVIDUAL_ENDPOINTS = {
+    name.strip() for name in
+    os.getenv('AUDIT_INDIVIDUAL_ENDPOINTS', 'api.download_report,api.get_audit_logs,api.get_audit_access').split(',')
+    if name.strip()
+}
+
+INDIVIDUAL = 'individual'
+AGGREGATED = 'aggregated'
+
+
+def audit_mode(method, endpoint):
+    """Como registrar um acesso: linha própria ou contador agregado"""
+    if method in MUTATING_METHODS or endpoint in INDIVIDUAL_ENDPOINTS:
+        return INDIVIDUAL
+    return AGGREGATED
+
+
+def minute_bucket(moment=None):
+    """Início do minuto (UTC, ISO) usado como chave do contador"""
+    moment = moment or datetime.now(timezone.utc)
+    return moment.replace(second=0, microsecond=0).isoformat()
+
+
+class AccessCounters:
+    """Contadores de leitura por (usuário, endpoint, método, minuto) descarregados em lote"""
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.flush_fn = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def configure(self, flush_fn):
+        """flush_fn(rows) soma [{minute, user_id, endpoint, method, hits}] no banco"""
+        self.flush_fn = flush_fn
+
+    def __len__(self):
+        return len(self._pending)
+
+    def hit(self, user_id, endpoint, method, moment=None):
+        key = (minute_bucket(moment), user_id, endpoint, method)
+        with self._lock:
+            if key not in self._pending and len(self._pending) >= self.max_pending:
+                metrics.incr('audit.access_dropped')
+                return
+            self._pending[key] = self._pending.get(key, 0) + 1
+        metrics.incr('audit.access_hits')
+        self.ensure_started()
+
+    def flush(self):
+        """Somar os contadores pendentes no banco; retorna o número de chaves gravadas"""
+        if self.flush_fn is None:
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            rows = [
+                {'minute': minute, 'user_id': user_id, 'endpoint': endpoint, 'method': method, 'hits': hits}
+                for (minute, user_id, endpoint, method), hits in pending.items()
+            ]
+            try:
+                self.flush_fn(rows)
+            except Exception as e:
+                with self._lock:
+                    for key, hits in pending.items():
+                        if key in self._pending or len(self._pending) < self.max_pending:
+                            self._pending[key] = self._pending.get(key, 0) + hits
+                metrics.incr('audit.flush_errors')
+                print(f"⚠️ Erro ao gravar contadores de acesso ({len(rows)} chaves na fila): {e}")
+                return 0
+        metrics.incr('audit.access_flushed', len(rows))
+        metrics.incr('audit.access_batches')
+        return len(rows)
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def ensure_started(self):
+        """Iniciar a thread do worker atual (seguro após fork)"""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._loop, name='audit-counters', daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        return {
+            'pending_keys': len(self._pending),
+            'flush_interval': self.flush_interval,
+            'individual_endpoints': sorted(INDIVIDUAL_ENDPOINTS)
+        }
+
+
+access_counters = AccessCounters()
+atexit.register(access_counters.flush)
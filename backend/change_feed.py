@@ -0,0 +1,353 @@
+"""
+Sistema HR - MVP
+Coerência dos caches entre nós via feed de mudanças do Supabase Realtime
+
+Com vários nós da API, índices e caches em memória (duplicados, compatibilidade,
+snapshot de candidaturas, perfis, etapas) ficam desatualizados após escritas
+feitas em outro nó. Cada worker assina as mudanças do Postgres nas tabelas
+observadas e as converte em atualizações por delta (upsert/remove) ou
+invalidações pontuais, registradas por tabela com register().
+
+Reconexão com backoff exponencial e jitter. Ao reconectar, cada tabela é
+ressincronizada a partir da sua "versão": (contagem de linhas, último
+commit_timestamp visto). Se houver linha com updated_at posterior ou a contagem
+divergir da esperada (contagem da última sincronização + inserts - deletes
+recebidos), o handler de resync da tabela descarta as cópias locais; senão nada
+é refeito. Exclusões durante a queda não deixam rastro em updated_at, por isso a
+contagem entra na versão.
+
+O transporte é plugável: RealtimeTransport usa o pacote realtime (protocolo
+legado realtime:public:<tabela>) e LocalPublisher/LocalTransport substituem o
+servidor em testes e desenvolvimento local.
+"""
+
+import asyncio
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+import metrics
+
+RECONNECT_BASE_DELAY = float(os.getenv('REALTIME_RECONNECT_BASE_DELAY', '1'))
+RECONNECT_MAX_DELAY = float(os.getenv('REALTIME_RECONNECT_MAX_DELAY', '60'))
+HEARTBEAT_INTERVAL = int(os.getenv('REALTIME_HEARTBEAT_INTERVAL', '15'))
+WATCHED_TABLES = ('candidates', 'jobs', 'applications', 'profiles', 'recruitment_stages')
+EVENT_TYPES = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def parse_timestamp(value):
+    """commit_timestamp/updated_at (ISO) -> epoch em segundos"""
+    if not value:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class ChangeEvent:
+    """Mudança em uma linha (payload do Realtime normalizado)"""
+
+    __slots__ = ('table', 'type', 'record', 'old_record', 'committed_at')
+
+    def __init__(self, table, type, record=None, old_record=None, committed_at=None):
+        self.table = table
+        self.type = type
+        self.record = record or {}
+        self.old_record = old_record or {}
+        self.committed_at = committed_at
+
+    @classmethod
+    def from_payload(cls, payload):
+        """Payload legado: {type, table, record, old_record, commit_timestamp}"""
+        return cls(
+            payload.get('table'),
+            (payload.get('type') or payload.get('eventType') or '').upper(),
+            payload.get('record') or payload.get('new'),
+            payload.get('old_record') or payload.get('old'),
+            parse_timestamp(payload.get('commit_timestamp'))
+        )
+
+    @property
+    def deleted(self):
+        return self.type == 'DELETE'
+
+    @property
+    def row(self):
+        """Linha afetada (old_record em DELETE, que só traz a chave primária)"""
+        return self.old_record if self.deleted else self.record
+
+
+# -----------------------------------------------------------------------------
+# Transportes
+# -----------------------------------------------------------------------------
+
+class RealtimeTransport:
+    """Socket do pacote realtime num event loop próprio (bloqueia até desconectar)"""
+
+    def __init__(self, url, key, schema='public'):
+        base = url.rstrip('/').replace('https://', 'wss://', 1).replace('http://', 'ws://', 1)
+        self.url = f'{base}/realtime/v1/websocket?apikey={key}&vsn=1.0.0'
+        self.schema = schema
+        self._socket = None
+
+    def run(self, tables, on_event, on_ready):
+        from realtime.connection import Socket
+
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        socket = Socket(self.url, auto_reconnect=False, hb_interval=HEARTBEAT_INTERVAL)
+        socket.connect()
+        self._socket = socket
+        try:
+            for table in tables:
+                channel = socket.set_channel(f'realtime:{self.schema}:{table}')
+                for event_type in EVENT_TYPES:
+                    channel.on(event_type, on_event)
+                channel.join()
+            on_ready()
+            # Retorna quando a conexão cai (auto_reconnect desligado: quem reconecta é o ChangeFeed)
+            socket.listen()
+        finally:
+            self._socket = None
+            asyncio.get_event_loop().close()
+        raise ConnectionError('Conexão com o Realtime encerrada')
+
+
+class LocalPublisher:
+    """Servidor Realtime em memória: publish() entrega a todos os assinantes da tabela"""
+
+    def __init__(self):
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def transport(self):
+        return LocalTransport(self)
+
+    def publish(self, table, type, record=None, old_record=None, committed_at=None):
+        payload = {
+            'schema': 'public',
+            'table': table,
+            'type': type,
+            'record': record,
+            'old_record': old_record,
+            'commit_timestamp': committed_at or datetime.now(timezone.utc).isoformat()
+        }
+        with self._lock:
+            subscribers = [inbox for tables, inbox in self._subscribers if table in tables]
+        for inbox in subscribers:
+            inbox.put(payload)
+        return len(subscribers)
+
+    def disconnect_all(self):
+        """Derrubar as conexões (simula queda do servidor)"""
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for _, inbox in subscribers:
+            inbox.put(None)
+
+    def _subscribe(self, tables, inbox):
+        with self._lock:
+            self._subscribers.append((set(tables), inbox))
+
+    def _unsubscribe(self, inbox):
+        with self._lock:
+            self._subscribers = [entry for entry in self._subscribers if entry[1] is not inbox]
+
+
+class LocalTransport:
+    """Transporte ligado a um LocalPublisher (mesma interface do RealtimeTransport)"""
+
+    def __init__(self, publisher):
+        self.publisher = publisher
+
+    def run(self, tables, on_event, on_ready):
+        inbox = queue.Queue()
+        self.publisher._subscribe(tables, inbox)
+        try:
+            on_ready()
+            while True:
+                payload = inbox.get()
+                if payload is None:
+                    break
+                on_event(payload)
+        finally:
+            self.publisher._unsubscribe(inbox)
+        raise ConnectionError('Publicador local desconectado')
+
+
+# -----------------------------------------------------------------------------
+# Assinante
+# -----------------------------------------------------------------------------
+
+class TableCursor:
+    """Versão de uma tabela vista pelo feed: contagem esperada e último commit"""
+
+    __slots__ = ('count', 'synced_at', 'last_commit')
+
+    def __init__(self, count, synced_at):
+        self.count = count
+        self.synced_at = synced_at
+        self.last_commit = synced_at
+
+    def apply(self, event):
+        if self.count is not None:
+            if event.type == 'INSERT':
+                self.count += 1
+            elif event.type == 'DELETE':
+                self.count -= 1
+        if event.committed_at and event.committed_at > self.last_commit:
+            self.last_commit = event.committed_at
+
+
+class ChangeFeed:
+    """Assina as tabelas observadas e aplica as mudanças nos caches locais"""
+
+    def __init__(self, tables=WATCHED_TABLES):
+        self.tables = tuple(tables)
+        self.transport_factory = None
+        self.probe = None
+        self._handlers = {}
+        self._resync_handlers = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._stop = threading.Event()
+        self.connected = False
+        self.connections = 0
+        self.last_error = None
+        self.last_event_at = None
+
+    def configure(self, transport_factory=None, probe=None):
+        """
+        transport_factory() -> transporte com run(tables, on_event, on_ready)
+        probe(table, since) -> (contagem, houve updated_at > since) para o resync
+        """
+        if transport_factory is not None:
+            self.transport_factory = transport_factory
+        if probe is not None:
+            self.probe = probe
+
+    def register(self, table, on_change, on_resync):
+        """on_change(ChangeEvent) aplica o delta; on_resync() descarta as cópias locais"""
+        self._handlers[table] = on_change
+        self._resync_handlers[table] = on_resync
+
+    @property
+    def running(self):
+        return self._pid == os.getpid() and not self._stop.is_set()
+
+    def start(self):
+        """Iniciar a assinatura em segundo plano (uma vez por pid)"""
+        if self.transport_factory is None:
+            return False
+        pid = os.getpid()
+        with self._lock:
+            if self._pid == pid:
+                return False
+            self._pid = pid
+            self._stop = threading.Event()
+            self._cursors = {}
+            self.connections = 0
+        threading.Thread(target=self._run, name='change-feed', daemon=True).start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        failures = 0
+        while not self._stop.is_set():
+            delay = RECONNECT_BASE_DELAY
+            try:
+                self.transport_factory().run(self.tables, self._deliver, self._on_ready)
+            except Exception as e:
+                self.last_error = str(e)
+                if self._stop.is_set():
+                    break
+                if self.connected:
+                    failures = 0
+                failures += 1
+                metrics.incr('change_feed.disconnects')
+                delay = min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * (2 ** (failures - 1)))
+                delay = random.uniform(delay / 2, delay)
+                print(f"⚠️ Feed de mudanças desconectado ({e}); reconectando em {delay:.1f}s")
+            finally:
+                self.connected = False
+            self._stop.wait(delay)
+
+    def _on_ready(self):
+        """Assinatura ativa: ressincronizar o que pode ter mudado durante a queda"""
+        self.connected = True
+        self.connections += 1
+        metrics.incr('change_feed.connections')
+        reconnect = self.connections > 1
+        print(f"📡 Feed de mudanças {'reconectado' if reconnect else 'conectado'}: {', '.join(self.tables)}")
+        for table in self.tables:
+            try:
+                self.resync(table)
+            except Exception as e:
+                # Sem como verificar: descartar as cópias locais é o caminho seguro
+                metrics.incr(f'change_feed.{table}.resync_errors')
+                print(f"⚠️ Resync de {table} falhou ({e}); invalidando caches locais")
+                self._invalidate(table)
+
+    def resync(self, table):
+        """Comparar a versão da tabela com a do último sync e invalidar se divergir"""
+        started = time.time()
+        cursor = self._cursors.get(table)
+        count, changed = self.probe(table, cursor.last_commit if cursor else None) if self.probe else (None, True)
+        if cursor is not None and (changed or count is None or count != cursor.count):
+            metrics.incr(f'change_feed.{table}.resyncs')
+            self._invalidate(table)
+        elif cursor is not None:
+            metrics.incr(f'change_feed.{table}.resync_skipped')
+        self._cursors[table] = TableCursor(count, started)
+
+    def _invalidate(self, table):
+        handler = self._resync_handlers.get(table)
+        if handler is not None:
+            handler()
+
+    def _deliver(self, payload):
+        event = ChangeEvent.from_payload(payload)
+        if event.table not in self._handlers or event.type not in EVENT_TYPES:
+            return
+        cursor = self._cursors.get(event.table)
+        if cursor is not None:
+            cursor.apply(event)
+        self.last_event_at = time.time()
+        metrics.incr(f'change_feed.{event.table}.{event.type.lower()}')
+        if event.committed_at:
+            metrics.set_gauge('change_feed.lag_seconds', round(max(0.0, self.last_event_at - event.committed_at), 3))
+        try:
+            self._handlers[event.table](event)
+        except Exception as e:
+            metrics.incr(f'change_feed.{event.table}.handler_errors')
+            print(f"⚠️ Falha ao aplicar mudança em {event.table}: {e}")
+            self._invalidate(event.table)
+
+    def stats(self):
+        return {
+            'enabled': self.transport_factory is not None,
+            'running': self.running,
+            'connected': self.connected,
+            'connections': self.connections,
+            'tables': list(self.tables),
+            'last_event_at': self.last_event_at,
+            'last_error': self.last_error,
+            'cursors': {
+                table: {'count': cursor.count, 'last_commit': cursor.last_commit}
+                for table, cursor in self._cursors.items()
+            }
+        }
+
+
+change_feed = ChangeFeed()
@@ -0,0 +1,124 @@
+"""
+Sistema HR - MVP
+Log de mudanças append-only para sincronização por delta (/api/sync)
+
+Cada escrita em candidates, jobs e applications registra (tabela, id, operação)
+na tabela change_log, cuja chave BIGSERIAL é a "versão" da mudança. Um cliente
+que guardou a versão da última sincronização pede só o que mudou depois dela:
+as linhas atuais dos ids alterados e tombstones dos excluídos. Versões mais
+antigas que a retenção do log (ou de outro banco) recebem um snapshot completo.
+
+Se o registro falhar (a escrita principal já foi feita), as entradas ficam
+pendentes e são reenviadas na próxima escrita deste worker.
+
+A versão é reservada no INSERT, não no commit: com escritores concorrentes, a
+versão 41 pode ficar visível depois da 42. Um cliente que já sincronizou até a
+42 nunca veria a 41 com version > since. Por isso cada delta relê também as
+entradas dos últimos CHANGE_LOG_OVERLAP_SECONDS antes do cursor (pelo
+changed_at do banco); collapse() deduplica por (tabela, id) e as linhas vêm do
+estado atual, então reenviar uma mudança já vista é inofensivo. Escritas que
+levem mais que a janela entre o INSERT e o commit ainda podem escapar.
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+
+import metrics
+from db import data_client
+
+SYNC_TABLES = ('candidates', 'jobs', 'applications')
+SYNC_MAX_CHANGES = int(os.getenv('SYNC_MAX_CHANGES', '5000'))
+CHANGE_LOG_OVERLAP_SECONDS = float(os.getenv('CHANGE_LOG_OVERLAP_SECONDS', '5'))
+LOG_INSERT_CHUNK = 500
+MAX_PENDING_ENTRIES = 10000
+OPERATIONS = ('insert', 'update', 'delete')
+
+
+class ChangeLog:
+    """Registro e leitura do change_log no Supabase"""
+
+    def __init__(self, table='change_log'):
+        self.table = table
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def record(self, table, operation, row_ids):
+        """Registrar mudança de uma ou mais linhas (ids) de uma tabela sincronizável"""
+        if table not in SYNC_TABLES or operation not in OPERATIONS:
+            raise ValueError(f'Mudança não sincronizável: {table}/{operation}')
+        if not isinstance(row_ids, (list, tuple, set)):
+            row_ids = [row_ids]
+        entries = [{'table_name': table, 'row_id': row_id, 'op': operation} for row_id in row_ids if row_id is not None]
+        with self._lock:
+            entries = self._pending + entries
+            self._pending = []
+        if not entries:
+            return 0
+        try:
+            for start in range(0, len(entries), LOG_INSERT_CHUNK):
+                data_client.table(self.table).insert(entries[start:start + LOG_INSERT_CHUNK]).execute()
+        except Exception as e:
+            remaining = entries[start:]
+            with self._lock:
+                # Limite de memória: entradas descartadas só voltam aos clientes num snapshot
+                self._pending = (remaining + self._pending)[-MAX_PENDING_ENTRIES:]
+            metrics.incr('change_log.record_errors')
+            print(f"⚠️ Falha ao registrar {len(remaining)} mudanças no change_log (pendentes): {e}")
+            return start
+        metrics.incr(f'change_log.{table}.{operation}', len(entries))
+        return len(entries)
+
+    def head(self):
+        """Versão mais recente registrada (0 com log vazio)"""
+        response = data_client.table(self.table).select('version').order('version', desc=True).limit(1).execute()
+        return response.data[0]['version'] if response.data else 0
+
+    def oldest(self):
+        """Versão mais antiga ainda retida (None com log vazio)"""
+        response = data_client.table(self.table).select('version').order('version').limit(1).execute()
+        return response.data[0]['version'] if response.data else None
+
+    def entries_since(self, since, tables, limit=SYNC_MAX_CHANGES):
+        """
+        Entradas com versão > since, em ordem, mais as da janela de sobreposição
+        (versão <= since, commit tardio); retorna (entradas, há mais)
+        """
+        response = data_client.table(self.table).select('version, table_name, row_id, op') \
+            .gt('version', since).in_('table_name', list(tables)) \
+            .order('version').limit(limit + 1).execute()
+        entries = response.data or []
+        entries, has_more = entries[:limit], len(entries) > limit
+        return self.overlap(since, tables, limit) + entries, has_more
+
+    def overlap(self, since, tables, limit=SYNC_MAX_CHANGES):
+        """Entradas com versão <= since gravadas até CHANGE_LOG_OVERLAP_SECONDS antes dela"""
+        if CHANGE_LOG_OVERLAP_SECONDS <= 0 or since <= 0:
+            return []
+        response = data_client.table(self.table).select('changed_at').eq('version', since).limit(1).execute()
+        if not response.data or not response.data[0].get('changed_at'):
+            return []
+        cutoff = datetime.fromisoformat(response.data[0]['changed_at'].replace('Z', '+00:00')) \
+            - timedelta(seconds=CHANGE_LOG_OVERLAP_SECONDS)
+        response = data_client.table(self.table).select('version, table_name, row_id, op') \
+            .lte('version', since).gte('changed_at', cutoff.isoformat()).in_('table_name', list(tables)) \
+            .order('version').limit(limit).execute()
+        entries = response.data or []
+        metrics.incr('change_log.overlap_entries', len(entries))
+        return entries
+
+    def stats(self):
+        with self._lock:
+            return {'pending': len(self._pending), 'max_changes_per_sync': SYNC_MAX_CHANGES,
+                    'overlap_seconds': CHANGE_LOG_OVERLAP_SECONDS}
+
+
+def collapse(entries):
+    """Última operação por (tabela, id): {tabela: {id: op}}"""
+    latest = {}
+    for entry in entries:
+        latest.setdefault(entry['table_name'], {})[entry['row_id']] = entry['op']
+    return latest
+
+
+change_log = ChangeLog()
@@ -0,0 +1,260 @@
+"""
+Sistema HR - MVP
+Snapshot colunar em memória da tabela applications
+
+Em vez de manter milhares de dicts, cada coluna é um array tipado contíguo
+(int32 para ids/etapa, int8 para o código de status, int64 para datas em epoch).
+Group-bys, filtros e histogramas rodam com Counter/map/compress/bisect, que
+iteram em C sobre os arrays. O snapshot é montado a partir de leituras em blocos
+e atualizado por delta (updated_at) e pelas escritas locais.
+"""
+
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime
+from functools import partial
+from itertools import compress
+
+import metrics
+from shared_cache import dumps, loads
+from stage_catalog import first_stage
+
+DELTA_INTERVAL = float(os.getenv('COLUMNAR_DELTA_INTERVAL', '5'))
+REBUILD_TTL = float(os.getenv('COLUMNAR_REBUILD_TTL', '900'))
+
+COLUMNS = ('id', 'job_id', 'candidate_id', 'stage', 'status', 'applied_at', 'updated_at')
+TYPECODES = {
+    'id': 'i',
+    'job_id': 'i',
+    'candidate_id': 'i',
+    'stage': 'i',
+    'status': 'b',
+    'applied_at': 'q',
+    'updated_at': 'q'
+}
+SELECT_COLUMNS = ', '.join(COLUMNS)
+DEFAULT_STATUSES = ('applied', 'in_progress', 'hired', 'rejected')
+
+
+def to_epoch(value):
+    """ISO 8601 -> segundos (0 quando ausente/inválido)"""
+    if not value:
+        return 0
+    try:
+        return int(datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp())
+    except ValueError:
+        return 0
+
+
+class ApplicationsSnapshot:
+    """Colunas tipadas de applications + mapa id -> linha"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.cols = {name: array(TYPECODES[name]) for name in COLUMNS}
+        self.status_names = list(DEFAULT_STATUSES)
+        self._status_codes = {name: code for code, name in enumerate(self.status_names)}
+        self._positions = {}
+        self.watermark = 0
+        self.built_at = None
+        self.refreshed_at = 0.0
+
+    def __len__(self):
+        return len(self.cols['id'])
+
+    # -------------------------------------------------------------------------
+    # Construção e atualização
+    # -------------------------------------------------------------------------
+
+    def status_code(self, status):
+        code = self._status_codes.get(status)
+        if code is None:
+            code = len(self.status_names)
+            self.status_names.append(status)
+            self._status_codes[status] = code
+        return code
+
+    def _encode(self, row):
+        return (
+            int(row['id']),
+            int(row.get('job_id') or 0),
+            int(row.get('candidate_id') or 0),
+            int(row.get('stage') or first_stage()),
+            self.status_code(row.get('status') or 'applied'),
+            to_epoch(row.get('applied_at')),
+            to_epoch(row.get('updated_at'))
+        )
+
+    def _upsert_locked(self, row):
+        values = self._encode(row)
+        position = self._positions.get(values[0])
+        if position is None:
+            self._positions[values[0]] = len(self.cols['id'])
+            for name, value in zip(COLUMNS, values):
+                self.cols[name].append(value)
+        else:
+            for name, value in zip(COLUMNS, values):
+                self.cols[name][position] = value
+        self.watermark = max(self.watermark, values[6])
+
+    def build(self, rows):
+        """Montar do zero a partir de um iterável (lido em blocos)"""
+        started = time.time()
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._upsert_locked(row)
+            self.built_at = self.refreshed_at = time.time()
+        elapsed = time.time() - started
+        metrics.set_gauge('columnar.applications.rows', len(self))
+        metrics.set_gauge('columnar.applications.build_seconds', round(elapsed, 3))
+        return elapsed
+
+    def upsert(self, row):
+        with self._lock:
+            self._upsert_locked(row)
+
+    def apply_delta(self, rows):
+        count = 0
+        with self._lock:
+            for row in rows:
+                self._upsert_locked(row)
+                count += 1
+            self.refreshed_at = time.time()
+        if count:
+            metrics.incr('columnar.applications.delta_rows', count)
+        return count
+
+    def remove(self, application_id):
+        """Remover linha (troca com a última para manter os arrays densos)"""
+        with self._lock:
+            position = self._positions.pop(application_id, None)
+            if position is None:
+                return False
+            last = len(self.cols['id']) - 1
+            if position != last:
+                for column in self.cols.values():
+                    column[position] = column[last]
+                self._positions[self.cols['id'][position]] = position
+            for column in self.cols.values():
+                column.pop()
+            return True
+
+    def export_state(self):
+        """Estado serializado (para o cache compartilhado)"""
+        with self._lock:
+            return dumps({key: value for key, value in self.__dict__.items() if key != '_lock'})
+
+    def import_state(self, blob):
+        """Adotar o snapshot publicado por outro worker; o próximo delta o atualiza"""
+        state = loads(blob)
+        with self._lock:
+            self.__dict__.update(state)
+            self.refreshed_at = 0.0
+
+    def needs_rebuild(self):
+        return self.built_at is None or time.time() - self.built_at > REBUILD_TTL
+
+    def needs_delta(self):
+        return time.time() - self.refreshed_at > DELTA_INTERVAL
+
+    # -------------------------------------------------------------------------
+    # Consultas
+    # -------------------------------------------------------------------------
+
+    def _mask(self, where):
+        """Máscara booleana para filtros de igualdade (ou pertinência em set)"""
+        mask = None
+        for name, value in (where or {}).items():
+            if value is None:
+                continue
+            if name == 'status':
+                value = {self._status_codes.get(v, -1) for v in value} if isinstance(value, (set, frozenset, list, tuple)) \
+                    else self._status_codes.get(value, -1)
+            test = value.__contains__ if isinstance(value, (set, frozenset)) else value.__eq__
+            current = list(map(test, self.cols[name]))
+            mask = current if mask is None else list(map(bool.__and__, mask, current))
+        return mask
+
+    def _column(self, name, mask):
+        column = self.cols[name]
+        return column if mask is None else compress(column, mask)
+
+    def count(self, where=None):
+        with self._lock:
+            mask = self._mask(where)
+            return len(self) if mask is None else sum(mask)
+
+    def group_count(self, name, where=None):
+        """Contagem por valor da coluna: {valor: n}"""
+        with self._lock:
+            counts = Counter(self._column(name, self._mask(where)))
+            if name == 'status':
+                return {self.status_names[code]: n for code, n in counts.items()}
+            return dict(counts)
+
+    def group_count_multi(self, names, where=None):
+        """Contagem pela combinação de colunas: {(v1, v2, ...): n}"""
+        with self._lock:
+            mask = self._mask(where)
+            counts = Counter(zip(*(self._column(name, mask) for name in names)))
+            if 'status' in names:
+                index = names.index('status')
+                counts = Counter({
+                    key[:index] + (self.status_names[key[index]],) + key[index + 1:]: n
+                    for key, n in counts.items()
+                })
+            return dict(counts)
+
+    def histogram(self, boundaries, name='applied_at', where=None):
+        """
+        Contagem por faixa [boundaries[i], boundaries[i+1]) de uma coluna de epoch.
+        Retorna lista com len(boundaries) - 1 posições.
+        """
+        with self._lock:
+            buckets = Counter(map(partial(bisect_right, boundaries), self._column(name, self._mask(where))))
+        return [buckets.get(i, 0) for i in range(1, len(boundaries))]
+
+    def rows(self, names):
+        """Cópia das colunas pedidas como tuplas (status decodificado)"""
+        with self._lock:
+            columns = [self.cols[name] for name in names]
+            if 'status' in names:
+                columns[names.index('status')] = [self.status_names[code] for code in self.cols['status']]
+            return list(zip(*columns))
+
+    def monthly_counts(self, targets, name='applied_at', where=None):
+        """Contagem por (ano, mês) para os meses pedidos, num único histograma"""
+        months = month_range(min(targets), max(targets))
+        return dict(zip(months, self.histogram(month_boundaries(months), name, where)))
+
+
+def _next_month(year, month):
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def month_range(first, last):
+    """Todos os (ano, mês) de first até last, inclusive"""
+    months = [first]
+    while months[-1] < last:
+        months.append(_next_month(*months[-1]))
+    return months
+
+
+def month_boundaries(months):
+    """
+    Para meses consecutivos [(ano, mês), ...], retorna os limites em epoch:
+    [início_m0, início_m1, ..., início do mês seguinte ao último].
+    """
+    edges = list(months) + [_next_month(*months[-1])]
+    return [int(datetime(year, month, 1).timestamp()) for year, month in edges]
+
+
+applications_snapshot = ApplicationsSnapshot()
@@ -0,0 +1,61 @@
+"""
+Sistema HR - MVP
+Versão dos dados por tabela
+
+Cada escrita bem-sucedida incrementa a versão global e marca a tabela afetada.
+Caches e agregados comparam a versão com a que usaram para decidir se estão
+desatualizados. O contador começa no timestamp de boot (ms), então permanece
+crescente entre reinícios do worker. Com o cache compartilhado, os contadores
+ficam no SQLite local: uma escrita em qualquer worker invalida os agregados de
+todos.
+"""
+
+import threading
+import time
+
+import metrics
+from shared_cache import shared_cache
+
+GLOBAL_COUNTER = 'data_version:__global__'
+
+_lock = threading.Lock()
+_global_version = int(time.time() * 1000)
+_table_versions = {}
+
+
+def _counter(table):
+    return f'data_version:{table}'
+
+
+def bump(table):
+    """Registrar escrita em uma tabela e retornar a nova versão"""
+    global _global_version
+    shared = shared_cache.bump_counter(GLOBAL_COUNTER, marks=(_counter(table),), start=int(time.time() * 1000))
+    with _lock:
+        _global_version = max(_global_version + 1, shared or 0)
+        _table_versions[table] = _global_version
+        version = _global_version
+    metrics.incr(f'data_version.bumps.{table}')
+    return version
+
+
+def current(*tables):
+    """Versão atual das tabelas informadas (ou global se nenhuma)"""
+    names = [_counter(t) for t in tables] if tables else [GLOBAL_COUNTER]
+    shared = shared_cache.counters(names) or {}
+    with _lock:
+        if not tables:
+            return max(_global_version, shared.get(GLOBAL_COUNTER, 0))
+        return max((max(_table_versions.get(t, 0), shared.get(_counter(t), 0)) for t in tables), default=0)
+
+
+def snapshot():
+    """Versões de todas as tabelas"""
+    shared = shared_cache.counters() or {}
+    with _lock:
+        tables = dict(_table_versions)
+        for name, value in shared.items():
+            if name.startswith('data_version:') and name != GLOBAL_COUNTER:
+                table = name.split(':', 1)[1]
+                tables[table] = max(tables.get(table, 0), value)
+        return {'global': max(_global_version, shared.get(GLOBAL_COUNTER, 0)), 'tables': tables}
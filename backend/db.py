@@ -0,0 +1,263 @@
+"""
+Sistema HR - MVP
+Cliente de dados (Supabase) configurado explicitamente e criado sob demanda
+
+create_app() só registra URL/chave; o cliente real é criado no primeiro uso
+em cada processo (após o fork dos workers), para que importar as rotas não abra
+conexões e cada worker tenha seu próprio pool HTTP. Configuração inválida vira
+um erro claro no primeiro uso em vez de um cliente None silencioso. As consultas
+passam por resilience.py (prazo por requisição, circuit breaker e retries).
+
+Com SUPABASE_READ_URL configurada, leituras (select) de requisições GET e de
+tarefas em segundo plano vão para a réplica/endpoint de leitura; escritas,
+requisições que alteram dados e usuários que acabaram de escrever (fixados no
+primário por READ_YOUR_WRITES_SECONDS) usam o primário. As fixações ficam no
+cache compartilhado, valendo para qualquer worker que atenda o usuário.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+import metrics
+from resilience import GuardedClient, DataUnavailable, READ_OPERATIONS
+from shared_cache import shared_cache
+
+READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', '5'))
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class DataClientError(RuntimeError):
+    """Cliente de dados não configurado ou falha ao criá-lo"""
+
+
+class LazySupabaseClient:
+    """Proxy do cliente Supabase: mesma interface (table, rpc, auth...), criação tardia"""
+
+    def __init__(self, name='primary', breaker_prefix=''):
+        self.name = name
+        self.breaker_prefix = breaker_prefix
+        self._url = None
+        self._key = None
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.factory = None
+
+    def configure(self, url, key, factory=None):
+        """Registrar credenciais (não conecta); factory(url, key) cria o cliente"""
+        if url and not url.startswith(('http://', 'https://')):
+            raise ValueError(f'URL inválida para o cliente {self.name}: {url!r}')
+        with self._lock:
+            self._url = url
+            self._key = key
+            self._client = None
+            self._pid = None
+            if factory is not None:
+                self.factory = factory
+
+    @property
+    def configured(self):
+        return bool(self._url and self._key)
+
+    @property
+    def initialized(self):
+        return self._client is not None and self._pid == os.getpid()
+
+    def __bool__(self):
+        return self.configured
+
+    def get(self):
+        """Cliente do processo atual (criado no primeiro uso)"""
+        client = self._client
+        if client is not None and self._pid == os.getpid():
+            return client
+        if not self.configured:
+            raise DataClientError(f'Cliente de dados {self.name} não configurado')
+
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                return self._client
+            started = time.time()
+            try:
+                factory = self.factory
+                if factory is None:
+                    from supabase import create_client
+                    factory = create_client
+                self._client = GuardedClient(factory(self._url, self._key), self.breaker_prefix)
+            except Exception as e:
+                metrics.incr(f'data_client.{self.name}.init_errors')
+                raise DataClientError(f'Falha ao criar cliente Supabase ({self.name}): {e}') from e
+            self._pid = os.getpid()
+            metrics.incr(f'data_client.{self.name}.inits')
+            metrics.set_gauge(f'data_client.{self.name}.init_seconds', round(time.time() - started, 4))
+            return self._client
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+    def stats(self):
+        return {
+            'configured': self.configured,
+            'initialized': self.initialized,
+            'url': self._url
+        }
+
+
+class RoutedQuery:
+    """Consulta montada de forma tardia: o cliente (primário/réplica) é escolhido no execute()"""
+
+    def __init__(self, router, table, steps=()):
+        self._router = router
+        self._table = table
+        self._steps = steps
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def step(*args, **kwargs):
+            return RoutedQuery(self._router, self._table, self._steps + ((name, args, kwargs),))
+        return step
+
+    @property
+    def operation(self):
+        return self._steps[0][0] if self._steps else 'select'
+
+    def build(self, client):
+        query = client.table(self._table)
+        for name, args, kwargs in self._steps:
+            query = getattr(query, name)(*args, **kwargs)
+        return query
+
+    def execute(self):
+        return self._router.execute(self)
+
+
+class RoutedClient:
+    """Primário + réplica de leitura opcional com read-your-writes por usuário"""
+
+    def __init__(self):
+        self.primary = LazySupabaseClient('primary')
+        self.replica = LazySupabaseClient('replica', breaker_prefix='replica:')
+        self.pin_seconds = READ_YOUR_WRITES_SECONDS
+        self._local = threading.local()
+
+    def configure(self, url, key, factory=None, read_url=None, read_key=None):
+        """Primário obrigatório; réplica opcional (mesma chave se read_key ausente)"""
+        self.primary.configure(url, key, factory)
+        self.replica.configure(read_url, (read_key or key) if read_url else None, factory)
+
+    @property
+    def configured(self):
+        return self.primary.configured
+
+    @property
+    def initialized(self):
+        return self.primary.initialized
+
+    def __bool__(self):
+        return self.configured
+
+    # -------------------------------------------------------------------------
+    # Read-your-writes
+    # -------------------------------------------------------------------------
+
+    def pin(self, user_id, seconds=None):
+        """Fixar o usuário no primário (após uma escrita bem-sucedida)"""
+        if not user_id or not self.replica.configured:
+            return
+        seconds = seconds or self.pin_seconds
+        shared_cache.set(f'rw_pin:{user_id}', time.time() + seconds, seconds)
+        if has_request_context():
+            g.rw_pinned = True
+        metrics.incr('routing.pins')
+
+    def is_pinned(self, user_id):
+        """Usuário fixado no primário (consulta o cache uma vez por requisição)"""
+        if has_request_context() and 'rw_pinned' in g:
+            return g.rw_pinned
+        expires = shared_cache.get(f'rw_pin:{user_id}')
+        pinned = expires is not None and expires > time.time()
+        if has_request_context():
+            g.rw_pinned = pinned
+        return pinned
+
+    @contextmanager
+    def use_primary(self):
+        """Forçar leituras no primário (ex.: deltas por updated_at)"""
+        previous = getattr(self._local, 'force_primary', False)
+        self._local.force_primary = True
+        try:
+            yield
+        finally:
+            self._local.force_primary = previous
+
+    def reads_from_replica(self):
+        """Rota de leitura desta thread (repassada a threads auxiliares, ex.: scanner)"""
+        return self._read_route()[0]
+
+    def _read_route(self):
+        """(usar réplica?, motivo) para uma leitura"""
+        if not self.replica.configured:
+            return False, 'no_replica'
+        if getattr(self._local, 'force_primary', False):
+            return False, 'forced'
+        if has_request_context():
+            if request.method not in SAFE_METHODS:
+                return False, 'write_request'
+            user = getattr(g, 'current_user', None)
+            if user is not None and self.is_pinned(getattr(user, 'id', None)):
+                return False, 'pinned'
+        return True, 'read'
+
+    # -------------------------------------------------------------------------
+    # Interface do cliente
+    # -------------------------------------------------------------------------
+
+    def table(self, table_name):
+        return RoutedQuery(self, table_name)
+
+    from_ = table
+
+    def execute(self, query):
+        if query.operation not in READ_OPERATIONS:
+            metrics.incr('routing.primary.write')
+            return query.build(self.primary).execute()
+
+        use_replica, reason = self._read_route()
+        if not use_replica:
+            metrics.incr(f'routing.primary.{reason}')
+            return query.build(self.primary).execute()
+
+        metrics.incr('routing.replica')
+        try:
+            return query.build(self.replica).execute()
+        except (DataUnavailable, DataClientError) as e:
+            metrics.incr('routing.replica_fallback')
+            print(f"⚠️ Réplica indisponível, lendo do primário: {e}")
+            return query.build(self.primary).execute()
+
+    def rpc(self, fn, params):
+        # Funções podem escrever: sempre no primário
+        return self.primary.rpc(fn, params)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.primary, name)
+
+    def stats(self):
+        return {
+            **self.primary.stats(),
+            'replica': self.replica.stats(),
+            'read_your_writes_seconds': self.pin_seconds
+        }
+
+
+data_client = RoutedClient()
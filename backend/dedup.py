@@ -0,0 +1,327 @@
+"""
+Sistema HR - MVP
+Detecção de candidatos duplicados (normalização + blocking + MinHash LSH)
+
+Em vez de comparar todos os pares (O(n²)), cada candidato gera chaves de
+bloqueio (email normalizado, sufixo do telefone, tokens do nome) e bandas LSH
+de assinaturas MinHash dos shingles de nome e email. Só candidatos que
+compartilham algum bucket são comparados, o que mantém a busca quase linear.
+"""
+
+import os
+import random
+import re
+import threading
+import time
+import unicodedata
+import zlib
+
+import metrics
+from shared_cache import dumps, loads
+
+NUM_PERM = int(os.getenv('DEDUP_NUM_PERM', '64'))
+BANDS = int(os.getenv('DEDUP_BANDS', '16'))
+DUPLICATE_THRESHOLD = float(os.getenv('DEDUP_THRESHOLD', '0.6'))
+INDEX_TTL = float(os.getenv('DEDUP_INDEX_TTL', '600'))
+MAX_BUCKET_SIZE = 500  # buckets muito populares (ex.: "silva") não geram pares
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(20240717)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_ROWS = NUM_PERM // BANDS
+
+GMAIL_DOMAINS = {'gmail.com', 'googlemail.com', 'gmail'}
+
+
+# =============================================================================
+# NORMALIZAÇÃO
+# =============================================================================
+
+def strip_accents(text):
+    normalized = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in normalized if not unicodedata.combining(ch))
+
+
+def normalize_name(first_name, last_name=''):
+    """'João  da Silva' -> 'joao da silva'"""
+    text = strip_accents(f'{first_name or ""} {last_name or ""}').lower()
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text).split())
+
+
+def normalize_email(email):
+    """Minúsculas; para Gmail remove pontos e sufixo +tag do usuário"""
+    email = strip_accents((email or '').strip().lower())
+    if '@' not in email:
+        return email
+    local, domain = email.rsplit('@', 1)
+    if domain in GMAIL_DOMAINS:
+        local = local.split('+', 1)[0].replace('.', '')
+        domain = 'gmail.com'
+    return f'{local}@{domain}'
+
+
+def normalize_phone(phone):
+    """Somente dígitos, sem código do país (55) nem zero de operadora"""
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) >= 12 and digits.startswith('55'):
+        digits = digits[2:]
+    digits = digits.lstrip('0')
+    return digits[-11:]
+
+
+def _shingles(text, size=3, prefix=''):
+    text = f' {text} '
+    if len(text) <= size:
+        return {prefix + text}
+    return {prefix + text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _email_local(normalized_email):
+    local = normalized_email.split('@', 1)[0]
+    return re.sub(r'[^a-z0-9]+', '', local)
+
+
+# =============================================================================
+# MINHASH
+# =============================================================================
+
+def minhash(shingles):
+    """Assinatura MinHash de NUM_PERM posições"""
+    if not shingles:
+        return None
+    hashes = [zlib.crc32(s.encode('utf-8')) for s in shingles]
+    return tuple(
+        min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    )
+
+
+def estimate_similarity(sig_a, sig_b):
+    """Estimativa de Jaccard a partir de duas assinaturas"""
+    if not sig_a or not sig_b:
+        return 0.0
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+
+def lsh_keys(signature, namespace):
+    if not signature:
+        return []
+    return [
+        (namespace, band, signature[band * _ROWS:(band + 1) * _ROWS])
+        for band in range(BANDS)
+    ]
+
+
+class CandidateFingerprint:
+    """Forma normalizada de um candidato para deduplicação"""
+
+    __slots__ = ('id', 'name', 'email', 'phone', 'name_sig', 'email_sig', 'keys')
+
+    def __init__(self, candidate):
+        self.id = candidate.get('id')
+        self.name = normalize_name(candidate.get('first_name'), candidate.get('last_name'))
+        self.email = normalize_email(candidate.get('email'))
+        self.phone = normalize_phone(candidate.get('phone'))
+        self.name_sig = minhash(_shingles(self.name))
+        self.email_sig = minhash(_shingles(_email_local(self.email))) if self.email else None
+        self.keys = self._blocking_keys()
+
+    def _blocking_keys(self):
+        keys = []
+        if self.email:
+            keys.append(('email', self.email))
+        if len(self.phone) >= 8:
+            keys.append(('phone', self.phone[-8:]))
+        tokens = self.name.split()
+        if len(tokens) >= 2:
+            keys.append(('name', tokens[0], tokens[-1]))
+        keys.extend(lsh_keys(self.name_sig, 'n'))
+        keys.extend(lsh_keys(self.email_sig, 'e'))
+        return keys
+
+
+def score_pair(a, b):
+    """Pontuação 0..1 e motivos para um par de candidatos"""
+    reasons = []
+    if a.email and a.email == b.email:
+        return 1.0, ['email']
+
+    name_sim = estimate_similarity(a.name_sig, b.name_sig)
+    email_sim = estimate_similarity(a.email_sig, b.email_sig)
+    same_phone = len(a.phone) >= 8 and a.phone[-8:] == b.phone[-8:]
+
+    score = 0.7 * name_sim + 0.3 * email_sim
+    if same_phone:
+        reasons.append('phone')
+        # Telefone igual com nome diferente pode ser familiar: não basta sozinho
+        score = max(score, 0.9 if name_sim >= 0.3 else 0.55)
+    if name_sim >= 0.5:
+        reasons.append('name')
+    if email_sim >= 0.5:
+        reasons.append('email_similar')
+
+    return round(min(score, 1.0), 3), reasons
+
+
+# =============================================================================
+# ÍNDICE
+# =============================================================================
+
+class DedupIndex:
+    """Índice em memória de buckets de bloqueio/LSH"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._records = {}
+        self._buckets = {}
+        self.loaded_at = None
+        self.log_cursor = 0     # última versão do change_log refletida
+        self.seen_version = 0   # data_version de candidates refletida
+
+    def __len__(self):
+        return len(self._records)
+
+    def is_stale(self):
+        return self.loaded_at is None or time.time() - self.loaded_at > INDEX_TTL
+
+    def load(self, candidates):
+        """Reconstruir o índice a partir de uma sequência de candidatos"""
+        records = {}
+        buckets = {}
+        for candidate in candidates:
+            record = CandidateFingerprint(candidate)
+            if record.id is None:
+                continue
+            records[record.id] = record
+            for key in record.keys:
+                buckets.setdefault(key, set()).add(record.id)
+        with self._lock:
+            self._records = records
+            self._buckets = buckets
+            self.loaded_at = time.time()
+        metrics.set_gauge('dedup.index_size', len(records))
+        return len(records)
+
+    def export_state(self):
+        """Estado serializado (para o cache compartilhado)"""
+        with self._lock:
+            return dumps((self._records, self._buckets, self.loaded_at, self.log_cursor, self.seen_version))
+
+    def import_state(self, blob):
+        """Adotar o índice publicado por outro worker"""
+        state = loads(blob)
+        records, buckets, loaded_at = state[:3]
+        # Cópia publicada antes dos cursores: o catch-up recomeça do início
+        log_cursor, seen_version = state[3:] or (0, 0)
+        with self._lock:
+            self._records = records
+            self._buckets = buckets
+            self.loaded_at = loaded_at
+            self.log_cursor, self.seen_version = log_cursor, seen_version
+        metrics.set_gauge('dedup.index_size', len(records))
+
+    def add(self, candidate):
+        record = CandidateFingerprint(candidate)
+        with self._lock:
+            self._remove_locked(record.id)
+            self._records[record.id] = record
+            for key in record.keys:
+                self._buckets.setdefault(key, set()).add(record.id)
+        return record
+
+    def remove(self, candidate_id):
+        with self._lock:
+            self._remove_locked(candidate_id)
+
+    def _remove_locked(self, candidate_id):
+        record = self._records.pop(candidate_id, None)
+        if record is None:
+            return
+        for key in record.keys:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(candidate_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def get(self, candidate_id):
+        return self._records.get(candidate_id)
+
+    def _neighbours(self, record):
+        ids = set()
+        with self._lock:
+            for key in record.keys:
+                bucket = self._buckets.get(key)
+                if bucket and (len(bucket) <= MAX_BUCKET_SIZE or key[0] == 'email'):
+                    ids.update(bucket)
+            ids.discard(record.id)
+            return [self._records[i] for i in ids if i in self._records]
+
+    def find_matches(self, candidate, threshold=DUPLICATE_THRESHOLD, limit=20):
+        """Possíveis duplicados de um candidato (dict ou CandidateFingerprint)"""
+        record = candidate if isinstance(candidate, CandidateFingerprint) else CandidateFingerprint(candidate)
+        matches = []
+        for other in self._neighbours(record):
+            score, reasons = score_pair(record, other)
+            if score >= threshold:
+                matches.append({'candidate_id': other.id, 'score': score, 'reasons': reasons})
+        matches.sort(key=lambda m: m['score'], reverse=True)
+        metrics.incr('dedup.lookups')
+        return matches[:limit]
+
+    def find_all_pairs(self, threshold=DUPLICATE_THRESHOLD):
+        """Job em lote: todos os pares acima do limiar + agrupamento em clusters"""
+        started = time.time()
+        with self._lock:
+            records = list(self._records.values())
+
+        pairs = []
+        comparisons = 0
+        for record in records:
+            for other in self._neighbours(record):
+                if other.id is None or record.id is None or other.id <= record.id:
+                    continue
+                comparisons += 1
+                score, reasons = score_pair(record, other)
+                if score >= threshold:
+                    pairs.append({'a': record.id, 'b': other.id, 'score': score, 'reasons': reasons})
+
+        pairs.sort(key=lambda p: p['score'], reverse=True)
+        elapsed = time.time() - started
+        metrics.incr('dedup.batch_runs')
+        return {
+            'pairs': pairs,
+            'clusters': _clusters(pairs),
+            'stats': {
+                'candidates': len(records),
+                'comparisons': comparisons,
+                'naive_comparisons': len(records) * (len(records) - 1) // 2,
+                'seconds': round(elapsed, 3)
+            }
+        }
+
+
+def _clusters(pairs):
+    """Union-find sobre os pares para agrupar duplicados transitivos"""
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for pair in pairs:
+        root_a, root_b = find(pair['a']), find(pair['b'])
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    groups = {}
+    for node in parent:
+        groups.setdefault(find(node), []).append(node)
+    return [sorted(members) for members in groups.values() if len(members) > 1]
+
+
+dedup_index = DedupIndex()
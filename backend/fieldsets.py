@@ -0,0 +1,198 @@
+"""
+Sistema HR - MVP
+Campos esparsos (?fields=) nas listagens
+
+Cada recurso tem uma lista de colunas permitidas, as relações que podem vir
+embutidas (candidates/jobs de uma candidatura) e visões nomeadas (?view=) com
+os campos que cada tela usa. ?fields= escolhe os campos diretamente, com a
+mesma notação de ponto dos relatórios:
+
+    /applications?fields=id,stage,status,candidates.first_name,jobs.title
+
+vira select('id, stage, status, candidates(id, first_name), jobs(id, title)'):
+o banco só lê e transfere o que a tela mostra. Campos fora da lista permitida
+respondem 400. 'id' vem sempre (chave da varredura e das telas).
+"""
+
+CANDIDATE_COLUMNS = ('id', 'first_name', 'last_name', 'email', 'phone', 'address', 'summary',
+                     'linkedin_url', 'status', 'created_at', 'updated_at')
+JOB_COLUMNS = ('id', 'title', 'description', 'company', 'location', 'salary_min', 'salary_max',
+               'employment_type', 'experience_level', 'status', 'requirements', 'benefits',
+               'application_deadline', 'created_at', 'updated_at')
+APPLICATION_COLUMNS = ('id', 'candidate_id', 'job_id', 'status', 'stage', 'notes', 'applied_at', 'updated_at')
+
+# Relações embutidas: chave na resposta -> (tabela, coluna de ligação, colunas permitidas)
+APPLICATION_RELATIONS = {
+    'candidates': ('candidates', 'candidate_id', CANDIDATE_COLUMNS),
+    'jobs': ('jobs', 'job_id', JOB_COLUMNS)
+}
+
+# Campos do card de candidatura (Kanban e listagens)
+CARD_CANDIDATE = ('candidates.id', 'candidates.first_name', 'candidates.last_name', 'candidates.email',
+                  'candidates.phone', 'candidates.status')
+
+# views: None = todas as colunas (formato anterior das listagens)
+RESOURCES = {
+    'candidates': {
+        'columns': CANDIDATE_COLUMNS,
+        'computed': (),
+        'relations': {},
+        'views': {
+            'full': None,
+            'list': ('id', 'first_name', 'last_name', 'email', 'phone', 'status', 'created_at', 'updated_at')
+        }
+    },
+    'jobs': {
+        'columns': JOB_COLUMNS,
+        # Calculados pela API (não existem na tabela)
+        'computed': ('applications_count',),
+        'relations': {},
+        'views': {
+            'full': None,
+            'list': ('id', 'title', 'company', 'location', 'employment_type', 'experience_level',
+                     'status', 'created_at'),
+            'options': ('id', 'title', 'company', 'status')
+        }
+    },
+    'applications': {
+        'columns': APPLICATION_COLUMNS,
+        'computed': (),
+        'relations': APPLICATION_RELATIONS,
+        'views': {
+            'full': APPLICATION_COLUMNS + CARD_CANDIDATE + (
+                'jobs.id', 'jobs.title', 'jobs.company', 'jobs.location', 'jobs.status'),
+            'board': APPLICATION_COLUMNS + CARD_CANDIDATE + (
+                'jobs.id', 'jobs.title', 'jobs.company', 'jobs.location'),
+            'compact': ('id', 'candidate_id', 'job_id', 'stage', 'status', 'updated_at',
+                        'candidates.first_name', 'candidates.last_name', 'jobs.title')
+        }
+    }
+}
+
+
+class FieldsetError(ValueError):
+    """?fields=/?view= inválido para o recurso"""
+
+
+class Fieldset:
+    """Colunas pedidas de um recurso e das relações embutidas"""
+
+    def __init__(self, resource, columns, relations=None, computed=()):
+        self.resource = resource
+        self.columns = tuple(columns)
+        self.relations = dict(relations or {})
+        self.computed = tuple(computed)
+
+    @property
+    def everything(self):
+        spec = RESOURCES[self.resource]
+        return (set(self.columns) == set(spec['columns']) and set(self.computed) == set(spec['computed'])
+                and not spec['relations'])
+
+    def wants(self, field):
+        return field in self.columns or field in self.computed
+
+    def select(self, extra=(), embed=True):
+        """
+        Cláusula de select do PostgREST. extra: colunas que a API usa (ordenar,
+        filtrar, agrupar) mesmo sem o cliente pedir; shape() as remove depois.
+        embed=False: sem relações, com as colunas de ligação (para tabelas sem
+        chave estrangeira, como o arquivo frio; ver attach()).
+        """
+        if self.everything:
+            return '*'
+        base = list(self.columns)
+        links = [] if embed else [RESOURCES[self.resource]['relations'][rel][1] for rel in self.relations]
+        for column in list(extra) + links:
+            if column not in base:
+                base.append(column)
+        parts = base
+        if embed:
+            parts = base + [f"{rel}({', '.join(fields)})" for rel, fields in self.relations.items()]
+        return ', '.join(parts)
+
+    def shape(self, row):
+        """Só os campos pedidos (mais o marcador 'archived' do arquivo frio)"""
+        if self.everything:
+            return row
+        shaped = {key: row.get(key) for key in self.columns}
+        for key in self.computed:
+            if key in row:
+                shaped[key] = row[key]
+        for rel, fields in self.relations.items():
+            related = row.get(rel)
+            if isinstance(related, list):
+                related = related[0] if related else None
+            shaped[rel] = {field: related.get(field) for field in fields} if related else None
+        if 'archived' in row:
+            shaped['archived'] = row['archived']
+        return shaped
+
+    def attach(self, rows, fetch):
+        """
+        Preencher as relações em linhas lidas sem embed.
+        fetch(tabela, ids, colunas) -> {id: linha}: uma consulta por relação, não por linha.
+        """
+        for rel, fields in self.relations.items():
+            table, link, _ = RESOURCES[self.resource]['relations'][rel]
+            ids = {row.get(link) for row in rows if row.get(link) is not None}
+            related = fetch(table, ids, ', '.join(fields)) if ids else {}
+            for row in rows:
+                row[rel] = related.get(row.get(link))
+        return rows
+
+    def to_dict(self):
+        fields = list(self.columns) + list(self.computed)
+        fields += [f'{rel}.{field}' for rel, rel_fields in self.relations.items() for field in rel_fields]
+        return {'resource': self.resource, 'fields': fields}
+
+
+def _tokens(value):
+    return [token.strip() for token in (value or '').split(',') if token.strip()]
+
+
+def parse_fieldset(resource, fields=None, view=None, default_view='full'):
+    """
+    Fieldset a partir de ?fields= (tem precedência) ou ?view=.
+    Relação sem campo ('candidates') embute todas as colunas permitidas dela.
+    """
+    spec = RESOURCES[resource]
+    if fields:
+        requested = _tokens(fields)
+    else:
+        view = view or default_view
+        if view not in spec['views']:
+            raise FieldsetError(f"Visão inválida: {view}. Use: {', '.join(spec['views'])}")
+        requested = spec['views'][view]
+        if requested is None:
+            requested = spec['columns'] + spec['computed']
+
+    columns, computed, relations, invalid = ['id'], [], {}, []
+    for field in requested:
+        relation, _, column = field.partition('.')
+        if relation in spec['relations']:
+            allowed = spec['relations'][relation][2]
+            wanted = relations.setdefault(relation, [])
+            for name in ([column] if column else allowed):
+                if name not in allowed:
+                    invalid.append(field)
+                elif name not in wanted:
+                    wanted.append(name)
+        elif column:
+            invalid.append(field)
+        elif field in spec['columns']:
+            if field not in columns:
+                columns.append(field)
+        elif field in spec['computed']:
+            if field not in computed:
+                computed.append(field)
+        else:
+            invalid.append(field)
+    if invalid:
+        raise FieldsetError(f"Campos inválidos para {resource}: {', '.join(invalid)}")
+
+    # A relação embutida sempre traz o id (chave nas telas)
+    for rel, wanted in relations.items():
+        if 'id' not in wanted:
+            wanted.insert(0, 'id')
+    return Fieldset(resource, columns, relations, computed)
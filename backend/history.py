@@ -0,0 +1,110 @@
+"""
+Sistema HR - MVP
+Escrita em lote do histórico de transições (application_history)
+
+Cada movimentação vira uma entrada numa fila em memória; uma thread por worker
+descarrega a fila com inserts de várias linhas a cada HISTORY_FLUSH_INTERVAL
+segundos ou assim que HISTORY_BATCH_SIZE entradas se acumulam. Falhas devolvem
+o lote para a fila (até HISTORY_MAX_PENDING entradas) e a fila é descarregada
+também na saída do processo.
+"""
+
+import atexit
+import os
+import threading
+from collections import deque
+
+import metrics
+
+HISTORY_TABLE = 'application_history'
+BATCH_SIZE = int(os.getenv('HISTORY_BATCH_SIZE', '200'))
+FLUSH_INTERVAL = float(os.getenv('HISTORY_FLUSH_INTERVAL', '1'))
+MAX_PENDING = int(os.getenv('HISTORY_MAX_PENDING', '50000'))
+
+
+class HistoryWriter:
+    """Fila de entradas de histórico descarregada em lotes"""
+
+    def __init__(self, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.insert_fn = None
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def configure(self, insert_fn):
+        """insert_fn(rows) grava uma lista de linhas (um insert de várias linhas)"""
+        self.insert_fn = insert_fn
+
+    def __len__(self):
+        return len(self._pending)
+
+    def append(self, entry):
+        with self._lock:
+            self._pending.append(entry)
+            overflow = len(self._pending) - self.max_pending
+            for _ in range(max(overflow, 0)):
+                self._pending.popleft()
+        if overflow > 0:
+            metrics.incr('history.dropped', overflow)
+        metrics.incr('history.appended')
+        self.ensure_started()
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def pending_for(self, application_ids):
+        """Entradas ainda não gravadas das candidaturas pedidas (leitura consistente)"""
+        wanted = set(application_ids)
+        with self._lock:
+            return [entry for entry in self._pending if entry.get('application_id') in wanted]
+
+    def flush(self):
+        """Gravar tudo o que está na fila; retorna o número de linhas gravadas"""
+        if self.insert_fn is None:
+            return 0
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                if not batch:
+                    break
+                try:
+                    self.insert_fn(batch)
+                except Exception as e:
+                    with self._lock:
+                        self._pending.extendleft(reversed(batch))
+                    metrics.incr('history.flush_errors')
+                    print(f"⚠️ Erro ao gravar histórico ({len(batch)} entradas na fila): {e}")
+                    break
+                written += len(batch)
+                metrics.incr('history.written', len(batch))
+                metrics.incr('history.batches')
+        return written
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def ensure_started(self):
+        """Iniciar a thread do worker atual (seguro após fork)"""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._loop, name='history-writer', daemon=True)
+            self._thread.start()
+
+
+history_writer = HistoryWriter()
+atexit.register(history_writer.flush)
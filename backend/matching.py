@@ -0,0 +1,301 @@
+"""
+Sistema HR - MVP
+Pontuação de compatibilidade candidato × vaga (TF-IDF com hashing de features)
+
+Candidatos (resumo + termos do slug do LinkedIn) e vagas abertas (título,
+descrição e requisitos) viram vetores esparsos normalizados. A similaridade de
+cosseno é calculada como produto matriz esparsa × vetor via índice invertido:
+cada vaga percorre apenas as listas de postings das features que contém.
+O top-k de cada vaga é pré-calculado com seleção parcial por heap e mantido
+incrementalmente quando um candidato ou vaga muda.
+"""
+
+import heapq
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from urllib.parse import urlparse
+
+import metrics
+from shared_cache import dumps, loads
+from dedup import strip_accents
+
+N_FEATURES = 1 << 18
+TOP_K = int(os.getenv('MATCH_TOP_K', '50'))
+REBUILD_TTL = float(os.getenv('MATCH_REBUILD_TTL', '3600'))
+TITLE_WEIGHT = 2  # termos do título da vaga contam em dobro
+
+CANDIDATE = 'candidate'
+JOB = 'job'
+_OTHER = {CANDIDATE: JOB, JOB: CANDIDATE}
+
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'de', 'da', 'do', 'das', 'dos', 'e', 'em', 'no', 'na', 'nos', 'nas',
+    'um', 'uma', 'para', 'por', 'com', 'sem', 'que', 'se', 'ao', 'aos', 'ou', 'como', 'mais',
+    'the', 'and', 'of', 'to', 'in', 'for', 'with', 'on', 'at', 'an', 'is', 'are', 'be',
+    'www', 'http', 'https', 'com', 'br', 'linkedin', 'in'
+}
+
+
+# =============================================================================
+# TEXTO -> VETOR
+# =============================================================================
+
+def tokenize(text):
+    text = strip_accents(text or '').lower()
+    return [t for t in re.findall(r'[a-z0-9+#]+', text) if len(t) > 1 and t not in STOPWORDS and not t.isdigit()]
+
+
+def linkedin_terms(url):
+    """Termos do slug do perfil: /in/joao-silva-dev-python-1234 -> joao silva dev python"""
+    if not url:
+        return ''
+    path = urlparse(url if '://' in url else f'https://{url}').path
+    slug = path.rstrip('/').split('/')[-1]
+    return ' '.join(part for part in re.split(r'[-_.]+', slug) if not part.isdigit())
+
+
+def candidate_text(candidate):
+    return f"{candidate.get('summary') or ''} {linkedin_terms(candidate.get('linkedin_url'))}"
+
+
+def job_text(job):
+    title = job.get('title') or ''
+    return ' '.join([title] * TITLE_WEIGHT + [job.get('description') or '', job.get('requirements') or ''])
+
+
+def _feature(token):
+    return zlib.crc32(token.encode('utf-8')) % N_FEATURES
+
+
+def term_counts(text):
+    return Counter(_feature(token) for token in tokenize(text))
+
+
+# =============================================================================
+# MOTOR
+# =============================================================================
+
+class MatchEngine:
+    """Vetores, índices invertidos e top-k pré-calculado dos dois lados"""
+
+    def __init__(self, k=TOP_K):
+        self.k = k
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.counts = {CANDIDATE: {}, JOB: {}}      # id -> Counter(feature)
+        self.vectors = {CANDIDATE: {}, JOB: {}}     # id -> {feature: peso}
+        self.postings = {CANDIDATE: {}, JOB: {}}    # feature -> {id: peso}
+        self.top = {CANDIDATE: {}, JOB: {}}         # id -> [(score, outro_id)] desc
+        self.members = {CANDIDATE: {}, JOB: {}}     # id -> ids do outro lado cujo top contém id
+        self.dirty = {CANDIDATE: set(), JOB: set()}
+        self.df = Counter()
+        self.n_docs = 0
+        self.loaded_at = None
+        self.log_cursor = 0     # última versão do change_log refletida
+        self.seen_version = 0   # data_version de candidates/jobs refletida
+
+    def is_stale(self):
+        return self.loaded_at is None or time.time() - self.loaded_at > REBUILD_TTL
+
+    def _idf(self, feature):
+        return math.log((1 + self.n_docs) / (1 + self.df[feature])) + 1.0
+
+    def _vectorize(self, counts):
+        vector = {f: (1.0 + math.log(tf)) * self._idf(f) for f, tf in counts.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values()))
+        if not norm:
+            return {}
+        return {f: w / norm for f, w in vector.items()}
+
+    def _index(self, side, entity_id, vector):
+        self.vectors[side][entity_id] = vector
+        postings = self.postings[side]
+        for feature, weight in vector.items():
+            postings.setdefault(feature, {})[entity_id] = weight
+
+    def _unindex(self, side, entity_id):
+        vector = self.vectors[side].pop(entity_id, None) or {}
+        postings = self.postings[side]
+        for feature in vector:
+            bucket = postings.get(feature)
+            if bucket is not None:
+                bucket.pop(entity_id, None)
+                if not bucket:
+                    del postings[feature]
+        counts = self.counts[side].pop(entity_id, None)
+        if counts is not None:
+            self.df.subtract(counts.keys())
+            self.n_docs -= 1
+
+    def _scores(self, side, vector):
+        """Produto esparso: vetor de `side` contra todos os vetores do outro lado"""
+        scores = {}
+        postings = self.postings[_OTHER[side]]
+        for feature, weight in vector.items():
+            bucket = postings.get(feature)
+            if not bucket:
+                continue
+            for other_id, other_weight in bucket.items():
+                scores[other_id] = scores.get(other_id, 0.0) + weight * other_weight
+        return scores
+
+    def _set_top(self, side, entity_id, entries):
+        other = _OTHER[side]
+        for _, other_id in self.top[side].get(entity_id, ()):
+            members = self.members[other].get(other_id)
+            if members is not None:
+                members.discard(entity_id)
+        self.top[side][entity_id] = entries
+        for _, other_id in entries:
+            self.members[other].setdefault(other_id, set()).add(entity_id)
+        self.dirty[side].discard(entity_id)
+
+    def _compute_top(self, side, entity_id, scores=None):
+        if scores is None:
+            scores = self._scores(side, self.vectors[side].get(entity_id, {}))
+        best = heapq.nlargest(self.k, ((s, i) for i, s in scores.items() if s > 0))
+        self._set_top(side, entity_id, best)
+        return best
+
+    # -------------------------------------------------------------------------
+    # Carga completa
+    # -------------------------------------------------------------------------
+
+    def rebuild(self, candidates, jobs):
+        """Reconstruir tudo; top-k das vagas é calculado já, o dos candidatos sob demanda"""
+        started = time.time()
+        with self._lock:
+            self._reset()
+            docs = [(CANDIDATE, c['id'], term_counts(candidate_text(c))) for c in candidates]
+            docs += [(JOB, j['id'], term_counts(job_text(j))) for j in jobs if is_open_job(j)]
+
+            for side, entity_id, counts in docs:
+                self.counts[side][entity_id] = counts
+                self.df.update(counts.keys())
+            self.n_docs = len(docs)
+
+            for side, entity_id, counts in docs:
+                self._index(side, entity_id, self._vectorize(counts))
+
+            for job_id in self.vectors[JOB]:
+                self._compute_top(JOB, job_id)
+            self.dirty[CANDIDATE] = set(self.vectors[CANDIDATE])
+            self.loaded_at = time.time()
+
+        elapsed = time.time() - started
+        metrics.set_gauge('matching.rebuild_seconds', round(elapsed, 3))
+        metrics.set_gauge('matching.candidates', len(self.vectors[CANDIDATE]))
+        metrics.set_gauge('matching.jobs', len(self.vectors[JOB]))
+        return elapsed
+
+    # -------------------------------------------------------------------------
+    # Cópia compartilhada entre workers
+    # -------------------------------------------------------------------------
+
+    def export_state(self):
+        """Estado serializado (para o cache compartilhado)"""
+        with self._lock:
+            return dumps({key: value for key, value in self.__dict__.items() if key != '_lock'})
+
+    def import_state(self, blob):
+        """Adotar o estado publicado por outro worker"""
+        state = loads(blob)
+        with self._lock:
+            self.__dict__.update(state)
+
+    # -------------------------------------------------------------------------
+    # Atualização incremental
+    # -------------------------------------------------------------------------
+
+    def upsert(self, side, entity_id, text):
+        """Inserir/atualizar um candidato ou vaga e ajustar os top-k afetados"""
+        other = _OTHER[side]
+        with self._lock:
+            previous = {oid: score for score, oid in self._entries_with(side, entity_id)}
+            self._unindex(side, entity_id)
+
+            counts = term_counts(text)
+            self.counts[side][entity_id] = counts
+            self.df.update(counts.keys())
+            self.n_docs += 1
+            vector = self._vectorize(counts)
+            self._index(side, entity_id, vector)
+
+            scores = self._scores(side, vector)
+            self._compute_top(side, entity_id, scores)
+
+            affected = set(previous) | {oid for oid, s in scores.items() if s > 0}
+            for other_id in affected:
+                self._adjust(other, other_id, entity_id, scores.get(other_id, 0.0), previous.get(other_id))
+        metrics.incr(f'matching.updates.{side}')
+
+    def remove(self, side, entity_id):
+        other = _OTHER[side]
+        with self._lock:
+            for _, other_id in list(self._entries_with(side, entity_id)):
+                self._adjust(other, other_id, entity_id, 0.0, 1.0)
+            self._unindex(side, entity_id)
+            self._set_top(side, entity_id, [])
+            self.top[side].pop(entity_id, None)
+            self.members[side].pop(entity_id, None)
+            self.dirty[side].discard(entity_id)
+
+    def _entries_with(self, side, entity_id):
+        """Entradas (score, outro_id) dos top-k do outro lado que contêm entity_id"""
+        other = _OTHER[side]
+        result = []
+        for other_id in self.members[side].get(entity_id, ()):
+            for score, member_id in self.top[other].get(other_id, ()):
+                if member_id == entity_id:
+                    result.append((score, other_id))
+        return result
+
+    def _adjust(self, side, entity_id, member_id, new_score, old_score):
+        """Atualizar o top-k de (side, entity_id) após o score de member_id mudar"""
+        if entity_id in self.dirty[side] or entity_id not in self.top[side]:
+            return
+        entries = self.top[side][entity_id]
+        full = len(entries) >= self.k
+
+        if old_score is not None:
+            entries = [e for e in entries if e[1] != member_id]
+            if full and new_score < old_score:
+                # O (k+1)-ésimo é desconhecido: recalcular na próxima leitura
+                self._set_top(side, entity_id, entries)
+                self.dirty[side].add(entity_id)
+                return
+
+        if new_score > 0 and (len(entries) < self.k or new_score > entries[-1][0]):
+            entries.append((new_score, member_id))
+            entries.sort(reverse=True)
+            entries = entries[:self.k]
+        self._set_top(side, entity_id, entries)
+
+    # -------------------------------------------------------------------------
+    # Leitura
+    # -------------------------------------------------------------------------
+
+    def top_matches(self, side, entity_id, limit=None):
+        """[(outro_id, score)] em ordem decrescente; None se a entidade não existe"""
+        with self._lock:
+            if entity_id not in self.vectors[side]:
+                return None
+            if entity_id in self.dirty[side] or entity_id not in self.top[side]:
+                self._compute_top(side, entity_id)
+                metrics.incr(f'matching.recomputed.{side}')
+            entries = self.top[side][entity_id]
+        return [(oid, round(score, 4)) for score, oid in entries[:limit or self.k]]
+
+
+def is_open_job(job):
+    return (job.get('status') or 'active') == 'active'
+
+
+match_engine = MatchEngine()
@@ -0,0 +1,42 @@
+"""
+Sistema HR - MVP
+Métricas de runtime em memória (contadores e gauges por worker)
+"""
+
+import threading
+import time
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_started_at = time.time()
+
+
+def incr(name, value=1):
+    """Incrementar contador"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name, value):
+    """Definir valor instantâneo de um gauge"""
+    with _lock:
+        _gauges[name] = value
+
+
+def get(name, default=0):
+    """Ler contador ou gauge"""
+    with _lock:
+        if name in _counters:
+            return _counters[name]
+        return _gauges.get(name, default)
+
+
+def snapshot():
+    """Cópia consistente de todas as métricas"""
+    with _lock:
+        return {
+            'counters': dict(sorted(_counters.items())),
+            'gauges': dict(sorted(_gauges.items())),
+            'uptime_seconds': round(time.time() - _started_at, 3)
+        }
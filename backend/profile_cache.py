@@ -0,0 +1,126 @@
+"""
+Sistema HR - MVP
+Cache de perfis (profiles.full_name e profiles.role) por user_id
+
+Histórico e comentários só guardam o user_id do autor, e verify_role consultava
+o role a cada requisição. Em vez de uma consulta por entrada, os ids ausentes do
+cache são resolvidos num único .in_('user_id', [...]) e mantidos por
+PROFILE_CACHE_TTL segundos (inclusive os não encontrados, para não repetir a
+busca). Os perfis carregados também vão para o cache compartilhado, então um
+perfil buscado por um worker serve a todos. O aquecimento do worker pré-carrega
+todos os perfis numa consulta.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from shared_cache import shared_cache
+
+CACHE_TTL = float(os.getenv('PROFILE_CACHE_TTL', '300'))
+CACHE_MAX_SIZE = int(os.getenv('PROFILE_CACHE_MAX_SIZE', '10000'))
+PROFILE_FIELDS = ('full_name', 'role')
+
+
+def _shared_key(user_id):
+    return f'profile:{user_id}'
+
+
+class ProfileCache:
+    """LRU com TTL de user_id -> {full_name, role}"""
+
+    def __init__(self, ttl=CACHE_TTL, max_size=CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.loader = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, loader):
+        """loader(user_ids) -> {user_id: {full_name, role}} (uma consulta para todos)"""
+        self.loader = loader
+
+    def _store_locked(self, user_id, profile, expires_at):
+        self._entries[user_id] = (profile, expires_at)
+        self._entries.move_to_end(user_id)
+
+    def _trim_locked(self):
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def resolve(self, user_ids):
+        """{user_id: perfil | None} para os ids pedidos"""
+        wanted = {user_id for user_id in user_ids if user_id}
+        now = time.time()
+        profiles = {}
+        missing = []
+        with self._lock:
+            for user_id in wanted:
+                entry = self._entries.get(user_id)
+                if entry is not None and entry[1] > now:
+                    profiles[user_id] = entry[0]
+                    self._entries.move_to_end(user_id)
+                else:
+                    missing.append(user_id)
+
+        metrics.incr('profile_cache.hits', len(wanted) - len(missing))
+        if missing:
+            shared = shared_cache.get_many(_shared_key(user_id) for user_id in missing)
+            found = {}
+            for user_id in missing:
+                key = _shared_key(user_id)
+                if key in shared:
+                    found[user_id] = shared[key]
+            missing = [user_id for user_id in missing if user_id not in found]
+            if missing and self.loader is not None:
+                metrics.incr('profile_cache.misses', len(missing))
+                loaded = self.loader(missing)
+                for user_id in missing:
+                    found[user_id] = loaded.get(user_id)
+                shared_cache.set_many({_shared_key(user_id): found[user_id] for user_id in missing}, self.ttl)
+            with self._lock:
+                for user_id, profile in found.items():
+                    profiles[user_id] = profile
+                    self._store_locked(user_id, profile, now + self.ttl)
+                self._trim_locked()
+        return profiles
+
+    def names(self, user_ids):
+        """{user_id: full_name | None}"""
+        return {
+            user_id: profile.get('full_name') if profile else None
+            for user_id, profile in self.resolve(user_ids).items()
+        }
+
+    def role(self, user_id):
+        profile = self.resolve([user_id]).get(user_id)
+        return profile.get('role') if profile else None
+
+    def preload(self, rows):
+        """Carregar perfis já buscados (linhas com user_id, full_name, role)"""
+        expires_at = time.time() + self.ttl
+        loaded = {}
+        with self._lock:
+            for row in rows:
+                if row.get('user_id'):
+                    loaded[row['user_id']] = {field: row.get(field) for field in PROFILE_FIELDS}
+                    self._store_locked(row['user_id'], loaded[row['user_id']], expires_at)
+            self._trim_locked()
+        shared_cache.set_many({_shared_key(user_id): profile for user_id, profile in loaded.items()}, self.ttl)
+        return len(loaded)
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+        if user_id is None:
+            shared_cache.delete_prefix(_shared_key(''))
+        else:
+            shared_cache.delete(_shared_key(user_id))
+
+
+profile_cache = ProfileCache()
@@ -0,0 +1,216 @@
+"""
+Sistema HR - MVP
+Stale-while-revalidate: recálculo em background de agregados caros
+
+Cada worker mantém o último valor bom de cada agregado registrado e o recalcula
+em uma thread própria quando o intervalo expira ou quando a versão dos dados
+das tabelas de origem muda. As requisições sempre recebem o último snapshot
+imediatamente; se o banco estiver fora, o snapshot anterior continua servindo.
+
+Os snapshots são publicados no cache compartilhado: um worker adota o valor
+calculado por outro se ele cobre a versão atual dos dados, então N workers fazem
+um cálculo em vez de N, e um worker recém-iniciado serve o último valor na hora.
+"""
+
+import os
+import threading
+import time
+
+import data_version
+import metrics
+from shared_cache import shared_cache
+
+REFRESH_INTERVAL = float(os.getenv('AGGREGATE_REFRESH_INTERVAL', '60'))
+MIN_REFRESH_SPACING = float(os.getenv('AGGREGATE_MIN_REFRESH_SPACING', '2'))
+REFRESH_ENABLED = os.getenv('AGGREGATE_REFRESH_ENABLED', 'True').lower() == 'true'
+TICK_SECONDS = 1.0
+SHARED_TTL_FACTOR = 10
+
+
+class Snapshot:
+    """Último valor calculado de um agregado"""
+
+    __slots__ = ('value', 'computed_at', 'version', 'stale', 'error')
+
+    def __init__(self, value, computed_at, version):
+        self.value = value
+        self.computed_at = computed_at
+        self.version = version
+        self.stale = False
+        self.error = None
+
+    @property
+    def age(self):
+        return max(time.time() - self.computed_at, 0.0)
+
+
+class _Aggregate:
+    __slots__ = ('name', 'compute', 'tables', 'interval', 'snapshot', 'lock', 'last_attempt')
+
+    def __init__(self, name, compute, tables, interval):
+        self.name = name
+        self.compute = compute
+        self.tables = tables
+        self.interval = interval
+        self.snapshot = None
+        self.lock = threading.Lock()
+        self.last_attempt = 0.0
+
+
+class BackgroundRefresher:
+    """Agendador de recálculo de agregados (um por worker)"""
+
+    def __init__(self, interval=REFRESH_INTERVAL, enabled=REFRESH_ENABLED):
+        self.interval = interval
+        self.enabled = enabled
+        self._aggregates = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+
+    def register(self, name, compute, tables=(), interval=None):
+        """Registrar agregado: compute() sem argumentos retorna o valor"""
+        self._aggregates[name] = _Aggregate(name, compute, tuple(tables), interval or self.interval)
+
+    def names(self):
+        return list(self._aggregates)
+
+    def get(self, name):
+        """Último snapshot (pode ser None se nunca calculado)"""
+        return self._aggregates[name].snapshot
+
+    def get_or_compute(self, name):
+        """Snapshot atual; calcula de forma síncrona apenas na primeira vez"""
+        snapshot = self.get(name)
+        if snapshot is None:
+            snapshot = self.refresh(name)
+        return snapshot
+
+    def _shared_snapshot(self, aggregate, version, entry=None):
+        """
+        Snapshot publicado por outro worker, se cobre `version` e é mais novo que
+        o local. Sem snapshot local (boot) qualquer idade serve; o loop recalcula.
+        """
+        entry = entry or shared_cache.get(f'aggregate:{aggregate.name}')
+        if entry is None:
+            return None
+        value, computed_at, entry_version = entry
+        if entry_version < version:
+            return None
+        local = aggregate.snapshot
+        if local is not None and (computed_at <= local.computed_at or time.time() - computed_at >= aggregate.interval):
+            return None
+        metrics.incr(f'refresher.{aggregate.name}.shared_hits')
+        return Snapshot(value, computed_at, entry_version)
+
+    def refresh(self, name):
+        """
+        Recalcular agregado. Em caso de erro mantém o último valor bom marcado
+        como stale; sem valor anterior, a exceção é propagada.
+        """
+        aggregate = self._aggregates[name]
+        key = f'aggregate:{name}'
+        with aggregate.lock:
+            aggregate.last_attempt = time.time()
+            version = data_version.current(*aggregate.tables)
+            shared = self._shared_snapshot(aggregate, version)
+            if shared is not None:
+                aggregate.snapshot = shared
+                return shared
+
+            with shared_cache.compute_lock(key) as acquired:
+                if not acquired:
+                    # Outro worker está calculando: aguardar a publicação
+                    entry = shared_cache.wait_for(key, accept=lambda entry: entry[2] >= version)
+                    shared = self._shared_snapshot(aggregate, version, entry) if isinstance(entry, tuple) else None
+                    if shared is not None:
+                        aggregate.snapshot = shared
+                        return shared
+                return self._compute(aggregate, version, key)
+
+    def _compute(self, aggregate, version, key):
+        """Calcular, guardar e publicar no cache compartilhado"""
+        name = aggregate.name
+        started = time.time()
+        try:
+            value = aggregate.compute()
+        except Exception as e:
+            metrics.incr(f'refresher.{name}.errors')
+            print(f"⚠️ Falha ao recalcular agregado {name}: {e}")
+            if aggregate.snapshot is None:
+                raise
+            aggregate.snapshot.stale = True
+            aggregate.snapshot.error = str(e)
+            return aggregate.snapshot
+
+        aggregate.snapshot = Snapshot(value, time.time(), version)
+        shared_cache.set(key, (value, aggregate.snapshot.computed_at, version), aggregate.interval * SHARED_TTL_FACTOR)
+        metrics.incr(f'refresher.{name}.refreshes')
+        metrics.set_gauge(f'refresher.{name}.compute_seconds', round(time.time() - started, 4))
+        return aggregate.snapshot
+
+    def _is_due(self, aggregate, now):
+        snapshot = aggregate.snapshot
+        if snapshot is None:
+            return True
+        if now - aggregate.last_attempt < MIN_REFRESH_SPACING:
+            return False
+        if snapshot.stale or now - snapshot.computed_at >= aggregate.interval:
+            return True
+        return data_version.current(*aggregate.tables) > snapshot.version
+
+    def run_pending(self):
+        """Recalcular tudo que venceu ou cujos dados mudaram"""
+        now = time.time()
+        for aggregate in list(self._aggregates.values()):
+            if self._is_due(aggregate, now):
+                try:
+                    self.refresh(aggregate.name)
+                except Exception:
+                    pass
+
+    def _loop(self):
+        while not self._stop.wait(TICK_SECONDS):
+            self.run_pending()
+
+    def ensure_started(self):
+        """Iniciar a thread do worker atual (seguro após fork)"""
+        if not self.enabled:
+            return
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='aggregate-refresher', daemon=True)
+            self._thread.start()
+            print(f"🔁 Refresher de agregados iniciado (pid {pid}, intervalo {self.interval}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        result = {}
+        for name, aggregate in self._aggregates.items():
+            snapshot = aggregate.snapshot
+            result[name] = None if snapshot is None else {
+                'age_seconds': round(snapshot.age, 3),
+                'stale': snapshot.stale,
+                'version': snapshot.version
+            }
+        return result
+
+
+refresher = BackgroundRefresher()
+
+
+def serve_snapshot(response, snapshot):
+    """Adicionar cabeçalhos de idade/estado do snapshot à resposta"""
+    response.headers['Age'] = str(int(snapshot.age))
+    response.headers['X-Data-Age'] = f'{snapshot.age:.3f}'
+    response.headers['X-Data-Stale'] = 'true' if snapshot.stale else 'false'
+    return response
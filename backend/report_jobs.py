@@ -0,0 +1,702 @@
+"""
+Sistema HR - MVP
+Geração assíncrona de relatórios no servidor
+
+O cliente envia a especificação do relatório (recurso, formato, colunas e
+filtros) e recebe um id de job. A fila fica em um SQLite local (sobrevive a
+reinícios) e os jobs rodam em um pool de processos, lendo os dados do banco
+em blocos e gravando CSV, XLSX ou PDF em disco. Especificações idênticas
+reaproveitam o arquivo já gerado enquanto a versão dos dados não muda.
+"""
+
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+import data_version
+import metrics
+from scanner import scan
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORTS_DIR = os.getenv('REPORTS_DIR', os.path.join(BASE_DIR, 'var', 'reports'))
+QUEUE_DB = os.getenv('REPORTS_QUEUE_DB', os.path.join(REPORTS_DIR, 'queue.sqlite3'))
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', '2'))
+CHUNK_SIZE = int(os.getenv('REPORT_CHUNK_SIZE', '1000'))
+STALE_RUNNING_SECONDS = int(os.getenv('REPORT_STALE_RUNNING_SECONDS', '1800'))
+RETENTION_SECONDS = int(os.getenv('REPORT_RETENTION_SECONDS', '86400'))
+SWEEP_INTERVAL_SECONDS = int(os.getenv('REPORT_SWEEP_INTERVAL_SECONDS', '600'))
+
+FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx'),
+    'pdf': ('application/pdf', '.pdf')
+}
+
+# Colunas: (campo, rótulo). Campos com ponto vêm de relações embutidas.
+RESOURCES = {
+    'candidates': {
+        'title': 'Relatório de Candidatos',
+        'table': 'candidates',
+        'tables': ('candidates',),
+        'columns': [
+            ('id', 'ID'),
+            ('first_name', 'Nome'),
+            ('last_name', 'Sobrenome'),
+            ('email', 'Email'),
+            ('phone', 'Telefone'),
+            ('status', 'Status'),
+            ('address', 'Endereço'),
+            ('linkedin_url', 'LinkedIn'),
+            ('created_at', 'Data de Cadastro')
+        ],
+        'filters': {
+            'status': ('eq', 'status'),
+            'created_from': ('gte', 'created_at'),
+            'created_to': ('lte', 'created_at')
+        }
+    },
+    'jobs': {
+        'title': 'Relatório de Vagas',
+        'table': 'jobs',
+        'tables': ('jobs',),
+        'columns': [
+            ('id', 'ID'),
+            ('title', 'Título'),
+            ('company', 'Empresa'),
+            ('location', 'Localização'),
+            ('employment_type', 'Tipo'),
+            ('experience_level', 'Nível'),
+            ('salary_min', 'Salário Min'),
+            ('salary_max', 'Salário Max'),
+            ('status', 'Status'),
+            ('created_at', 'Data de Criação')
+        ],
+        'filters': {
+            'status': ('eq', 'status'),
+            'company': ('ilike', 'company'),
+            'employment_type': ('eq', 'employment_type'),
+            'experience_level': ('eq', 'experience_level')
+        }
+    },
+    'applications': {
+        'title': 'Relatório de Candidaturas',
+        'table': 'applications',
+        'tables': ('applications', 'candidates', 'jobs'),
+        'columns': [
+            ('id', 'ID'),
+            ('candidates.first_name', 'Nome'),
+            ('candidates.last_name', 'Sobrenome'),
+            ('candidates.email', 'Email'),
+            ('jobs.title', 'Vaga'),
+            ('jobs.company', 'Empresa'),
+            ('status', 'Status'),
+            ('stage', 'Etapa'),
+            ('applied_at', 'Data da Candidatura'),
+            ('updated_at', 'Última Atualização')
+        ],
+        'filters': {
+            'status': ('eq', 'status'),
+            'stage': ('eq', 'stage'),
+            'job_id': ('eq', 'job_id'),
+            'candidate_id': ('eq', 'candidate_id'),
+            'applied_from': ('gte', 'applied_at'),
+            'applied_to': ('lte', 'applied_at')
+        }
+    }
+}
+
+DATE_FIELDS = {'created_at', 'updated_at', 'applied_at'}
+
+
+class ReportSpecError(ValueError):
+    """Especificação de relatório inválida"""
+
+
+# =============================================================================
+# ESPECIFICAÇÃO
+# =============================================================================
+
+def normalize_spec(raw):
+    """Validar e normalizar a especificação enviada pelo cliente"""
+    if not isinstance(raw, dict):
+        raise ReportSpecError('Especificação do relatório não fornecida')
+
+    resource_name = raw.get('resource') or raw.get('type')
+    if resource_name not in RESOURCES:
+        raise ReportSpecError(f"Recurso inválido: {resource_name}. Use: {', '.join(RESOURCES)}")
+    resource = RESOURCES[resource_name]
+
+    fmt = (raw.get('format') or 'csv').lower()
+    if fmt not in FORMATS:
+        raise ReportSpecError(f"Formato inválido: {fmt}. Use: {', '.join(FORMATS)}")
+
+    allowed_columns = [field for field, _ in resource['columns']]
+    columns = raw.get('columns') or allowed_columns
+    invalid = [c for c in columns if c not in allowed_columns]
+    if invalid:
+        raise ReportSpecError(f"Colunas inválidas: {', '.join(invalid)}")
+
+    filters = {}
+    for name, value in (raw.get('filters') or {}).items():
+        if name not in resource['filters']:
+            raise ReportSpecError(f'Filtro inválido: {name}')
+        if value in (None, '', 'all'):
+            continue
+        filters[name] = str(value)
+
+    return {
+        'resource': resource_name,
+        'format': fmt,
+        'columns': list(columns),
+        'filters': dict(sorted(filters.items())),
+        'title': str(raw.get('title') or resource['title'])
+    }
+
+
+def spec_hash(spec):
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _select_clause(columns):
+    """Converter colunas (com relações) para a sintaxe de select do PostgREST"""
+    base = ['id']
+    relations = {}
+    for column in columns:
+        if '.' in column:
+            relation, field = column.split('.', 1)
+            relations.setdefault(relation, []).append(field)
+        elif column not in base:
+            base.append(column)
+    parts = base + [f"{rel}({', '.join(fields)})" for rel, fields in relations.items()]
+    return ', '.join(parts)
+
+
+def _extract(row, column):
+    if '.' not in column:
+        return row.get(column)
+    relation, field = column.split('.', 1)
+    related = row.get(relation) or {}
+    if isinstance(related, list):
+        related = related[0] if related else {}
+    return related.get(field)
+
+
+def _format_value(column, value):
+    if value is None:
+        return ''
+    if column.split('.')[-1] in DATE_FIELDS and isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            return parsed.strftime('%d/%m/%Y %H:%M')
+        except ValueError:
+            return value
+    return value
+
+
+def stream_rows(client, spec, chunk_size=CHUNK_SIZE):
+    """Ler linhas do banco em blocos por faixa de id (memória limitada)"""
+    resource = RESOURCES[spec['resource']]
+    filters = []
+    for name, value in spec['filters'].items():
+        operator, field = resource['filters'][name]
+        filters.append((operator, field, f'%{value}%' if operator == 'ilike' else value))
+
+    rows = scan(resource['table'], _select_clause(spec['columns']), filters, chunk_size, client=client)
+    for row in rows:
+        yield [_format_value(column, _extract(row, column)) for column in spec['columns']]
+
+
+# =============================================================================
+# WRITERS
+# =============================================================================
+
+def write_csv(path, title, headers, rows):
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8-sig') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+_ILLEGAL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_cell(ref, value):
+    if isinstance(value, bool):
+        value = 'Sim' if value else 'Não'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML.sub('', str(value)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def write_xlsx(path, title, headers, rows):
+    """XLSX mínimo (uma planilha, strings inline) gravado em streaming"""
+    letters = [_column_letter(i) for i in range(len(headers))]
+    count = 0
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml',
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                    '<Default Extension="xml" ContentType="application/xml"/>'
+                    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                    '</Types>')
+        zf.writestr('_rels/.rels',
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+                    '</Relationships>')
+        sheet_name = escape(title[:31] or 'Relatório')
+        zf.writestr('xl/workbook.xml',
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                    f'<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+                    '</workbook>')
+        zf.writestr('xl/_rels/workbook.xml.rels',
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+                    '</Relationships>')
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            header_cells = ''.join(_xlsx_cell(f'{letters[i]}1', h) for i, h in enumerate(headers))
+            sheet.write(f'<row r="1">{header_cells}</row>'.encode('utf-8'))
+            for row in rows:
+                count += 1
+                line = count + 1
+                cells = ''.join(_xlsx_cell(f'{letters[i]}{line}', v) for i, v in enumerate(row) if v != '')
+                sheet.write(f'<row r="{line}">{cells}</row>'.encode('utf-8'))
+            sheet.write(b'</sheetData></worksheet>')
+
+    return count
+
+
+def _pdf_text(value):
+    text = str(value).encode('cp1252', 'replace')
+    return text.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def write_pdf(path, title, headers, rows):
+    """PDF tabular simples (A4 paisagem, Helvetica) gerado página a página"""
+    width, height = 842, 595
+    margin = 30
+    font_size = 7
+    line_height = 10
+    rows_per_page = int((height - 2 * margin - 40) / line_height)
+    column_width = (width - 2 * margin) / max(len(headers), 1)
+    max_chars = max(int(column_width / (font_size * 0.5)) - 1, 3)
+    generated_at = datetime.now().strftime('%d/%m/%Y %H:%M')
+
+    offsets = {}
+    page_ids = []
+    next_id = [5]  # 1 catálogo, 2 páginas, 3-4 fontes
+
+    with open(path, 'wb') as fh:
+        def write_object(obj_id, body):
+            offsets[obj_id] = fh.tell()
+            fh.write(f'{obj_id} 0 obj\n'.encode('ascii') + body + b'\nendobj\n')
+
+        def cells_line(values, y, font):
+            parts = [f'BT /{font} {font_size} Tf'.encode('ascii')]
+            for i, value in enumerate(values):
+                text = str(value)
+                if len(text) > max_chars:
+                    text = text[:max_chars - 1] + '…'
+                x = margin + i * column_width
+                parts.append(f'1 0 0 1 {x:.1f} {y:.1f} Tm ('.encode('ascii') + _pdf_text(text) + b') Tj')
+            parts.append(b'ET')
+            return b'\n'.join(parts)
+
+        def flush_page(page_rows, page_number):
+            y = height - margin
+            content = [f'BT /F2 12 Tf 1 0 0 1 {margin} {y - 12} Tm ('.encode('ascii') + _pdf_text(title) + b') Tj ET']
+            footer = f'Gerado em {generated_at} - Página {page_number}'
+            content.append(f'BT /F1 7 Tf 1 0 0 1 {margin} {margin - 12} Tm ('.encode('ascii') + _pdf_text(footer) + b') Tj ET')
+            y -= 32
+            content.append(cells_line(headers, y, 'F2'))
+            for row in page_rows:
+                y -= line_height
+                content.append(cells_line(row, y, 'F1'))
+            stream = b'\n'.join(content)
+
+            content_id, page_id = next_id[0], next_id[0] + 1
+            next_id[0] += 2
+            write_object(content_id, f'<< /Length {len(stream)} >>\nstream\n'.encode('ascii') + stream + b'\nendstream')
+            write_object(page_id, (f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] '
+                                   f'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> '
+                                   f'/Contents {content_id} 0 R >>').encode('ascii'))
+            page_ids.append(page_id)
+
+        fh.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        write_object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+        write_object(4, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>')
+
+        count = 0
+        page_rows = []
+        for row in rows:
+            page_rows.append(row)
+            count += 1
+            if len(page_rows) == rows_per_page:
+                flush_page(page_rows, len(page_ids) + 1)
+                page_rows = []
+        if page_rows or not page_ids:
+            flush_page(page_rows, len(page_ids) + 1)
+
+        kids = ' '.join(f'{page_id} 0 R' for page_id in page_ids)
+        write_object(2, f'<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>'.encode('ascii'))
+        write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+
+        xref_offset = fh.tell()
+        total = max(offsets) + 1
+        fh.write(f'xref\n0 {total}\n0000000000 65535 f \n'.encode('ascii'))
+        for obj_id in range(1, total):
+            fh.write(f'{offsets[obj_id]:010d} 00000 n \n'.encode('ascii'))
+        fh.write(f'trailer\n<< /Size {total} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n'.encode('ascii'))
+
+    return count
+
+
+WRITERS = {'csv': write_csv, 'xlsx': write_xlsx, 'pdf': write_pdf}
+
+
+# =============================================================================
+# FILA PERSISTENTE (SQLite)
+# =============================================================================
+
+class ReportQueue:
+    """Fila de jobs de relatório persistida em SQLite (modo WAL)"""
+
+    def __init__(self, path=QUEUE_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS report_jobs (
+                    id TEXT PRIMARY KEY,
+                    spec_hash TEXT NOT NULL,
+                    spec TEXT NOT NULL,
+                    data_version INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    user_id TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    file_path TEXT,
+                    rows INTEGER,
+                    size INTEGER,
+                    error TEXT
+                )
+            """)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_report_jobs_spec ON report_jobs (spec_hash, data_version)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_report_jobs_status ON report_jobs (status, created_at)')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create(self, spec, digest, version, user_id=None):
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO report_jobs (id, spec_hash, spec, data_version, status, user_id, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, digest, json.dumps(spec), version, 'queued', user_id, time.time())
+            )
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM report_jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def find_reusable(self, digest, version, user_id=None):
+        """Job concluído (com arquivo) ou em andamento do mesmo usuário para a mesma especificação/versão"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM report_jobs WHERE spec_hash = ? AND data_version = ? AND user_id IS ? "
+                "AND status IN ('done', 'running', 'queued') ORDER BY created_at DESC",
+                (digest, version, user_id)
+            ).fetchall()
+        for row in rows:
+            job = dict(row)
+            if job['status'] != 'done' or (job['file_path'] and os.path.exists(job['file_path'])):
+                return job
+        return None
+
+    def claim(self, job_id):
+        """Marcar como em execução (atômico entre processos)"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE report_jobs SET status = 'running', started_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, file_path, rows, size):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE report_jobs SET status = 'done', finished_at = ?, file_path = ?, rows = ?, size = ? WHERE id = ?",
+                (time.time(), file_path, rows, size, job_id)
+            )
+
+    def fail(self, job_id, error):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE report_jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                (time.time(), str(error)[:1000], job_id)
+            )
+
+    def expire(self, before):
+        """Remover jobs encerrados antes de `before`; retorna os arquivos que eles referenciavam"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT file_path FROM report_jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (before,)
+            ).fetchall()
+            conn.execute("DELETE FROM report_jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (before,))
+        return [row['file_path'] for row in rows if row['file_path']]
+
+    def recover(self, stale_after=STALE_RUNNING_SECONDS):
+        """Recolocar na fila jobs presos em execução e listar os pendentes"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE report_jobs SET status = 'queued', started_at = NULL "
+                "WHERE status = 'running' AND started_at < ?",
+                (time.time() - stale_after,)
+            )
+            rows = conn.execute("SELECT id FROM report_jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+        return [row['id'] for row in rows]
+
+
+# =============================================================================
+# EXECUÇÃO (processo filho)
+# =============================================================================
+
+_worker_credentials = (None, None)
+_worker_client = None
+
+
+def _init_worker(url, key):
+    """Inicializador do pool: credenciais configuradas na API (não lidas do ambiente)"""
+    global _worker_credentials, _worker_client
+    _worker_credentials = (url, key)
+    _worker_client = None
+
+
+def _get_worker_client():
+    """Cliente Supabase próprio de cada processo do pool"""
+    global _worker_client
+    if _worker_client is None:
+        url, key = _worker_credentials
+        if not url or not key:
+            raise RuntimeError('Banco não configurado para o processo de relatórios')
+        from supabase import create_client
+        _worker_client = create_client(url, key)
+    return _worker_client
+
+
+def run_report_job(job_id, queue_path=QUEUE_DB, client=None):
+    """Executar um job da fila (ponto de entrada no processo do pool)"""
+    queue = ReportQueue(queue_path)
+    if not queue.claim(job_id):
+        return None
+
+    job = queue.get(job_id)
+    spec = json.loads(job['spec'])
+    resource = RESOURCES[spec['resource']]
+    labels = dict(resource['columns'])
+    headers = [labels[column] for column in spec['columns']]
+    extension = FORMATS[spec['format']][1]
+
+    final_path = os.path.join(os.path.dirname(queue_path), f'{job_id}{extension}')
+    temp_path = final_path + '.part'
+
+    try:
+        rows = stream_rows(client or _get_worker_client(), spec)
+        count = WRITERS[spec['format']](temp_path, spec['title'], headers, rows)
+        os.replace(temp_path, final_path)
+        queue.complete(job_id, final_path, count, os.path.getsize(final_path))
+        return count
+    except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        queue.fail(job_id, e)
+        raise
+
+
+# =============================================================================
+# SERVIÇO (processo da API)
+# =============================================================================
+
+class ReportService:
+    """Submissão, reaproveitamento e despacho de jobs para o pool"""
+
+    def __init__(self, queue_path=QUEUE_DB, workers=REPORT_WORKERS, retention=RETENTION_SECONDS):
+        self.queue_path = queue_path
+        self.workers = workers
+        self.retention = retention
+        self.url = None
+        self.key = None
+        self._queue = None
+        self._pool = None
+        self._pid = None
+        self._last_sweep = 0
+        self._lock = threading.Lock()
+
+    def configure(self, url, key):
+        """Credenciais do banco repassadas aos processos do pool (vale para pools criados depois)"""
+        self.url, self.key = url, key
+
+    @property
+    def queue(self):
+        if self._queue is None:
+            self._queue = ReportQueue(self.queue_path)
+        return self._queue
+
+    def _get_pool(self):
+        pid = os.getpid()
+        if self._pool is None or self._pid != pid:
+            with self._lock:
+                if self._pool is None or self._pid != pid:
+                    context = multiprocessing.get_context('spawn')
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                     initializer=_init_worker, initargs=(self.url, self.key))
+                    self._pid = pid
+                    for job_id in self.queue.recover():
+                        self._dispatch(job_id)
+        return self._pool
+
+    def _dispatch(self, job_id):
+        future = self._pool.submit(run_report_job, job_id, self.queue_path)
+
+        def done(fut):
+            error = fut.exception()
+            if error is not None:
+                metrics.incr('reports.failed')
+                print(f"❌ Relatório {job_id} falhou: {error}")
+            else:
+                metrics.incr('reports.completed')
+                print(f"✅ Relatório {job_id} gerado ({fut.result()} linhas)")
+
+        future.add_done_callback(done)
+
+    def submit(self, raw_spec, user_id=None):
+        """Retorna (job, reaproveitado)"""
+        spec = normalize_spec(raw_spec)
+        digest = spec_hash(spec)
+        version = data_version.current(*RESOURCES[spec['resource']]['tables'])
+
+        self._maybe_sweep()
+        existing = self.queue.find_reusable(digest, version, user_id)
+        if existing:
+            metrics.incr('reports.reused')
+            return existing, True
+
+        self._get_pool()
+        job_id = self.queue.create(spec, digest, version, user_id)
+        metrics.incr('reports.submitted')
+        self._dispatch(job_id)
+        return self.queue.get(job_id), False
+
+    def get(self, job_id):
+        return self.queue.get(job_id)
+
+    def sweep(self, now=None):
+        """
+        Retenção: jobs encerrados há mais de `retention` segundos saem da fila com
+        seus arquivos; arquivos sem job (.part de processo interrompido) também
+        """
+        now = now or time.time()
+        self._last_sweep = now
+        cutoff = now - self.retention
+        removed = 0
+        paths = set(self.queue.expire(cutoff))
+        directory = os.path.dirname(self.queue_path)
+        extensions = tuple(extension for _, extension in FORMATS.values()) + ('.part',)
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(extensions) and os.path.getmtime(path) < cutoff:
+                paths.add(path)
+        for path in paths:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        if removed:
+            metrics.incr('reports.swept', removed)
+            print(f"🧹 Relatórios expirados removidos: {removed} arquivos")
+        return removed
+
+    def _maybe_sweep(self):
+        if time.time() - self._last_sweep < SWEEP_INTERVAL_SECONDS:
+            return
+        try:
+            self.sweep()
+        except Exception as e:
+            print(f"⚠️ Falha na limpeza de relatórios expirados: {e}")
+
+
+def download_name(job):
+    """Nome amigável do arquivo para download"""
+    spec = json.loads(job['spec'])
+    title = unicodedata.normalize('NFKD', spec['title']).encode('ascii', 'ignore').decode('ascii')
+    title = re.sub(r'[^a-zA-Z0-9\s\-_]', '', title).strip().replace(' ', '_').lower() or 'relatorio'
+    stamp = datetime.fromtimestamp(job['finished_at'] or job['created_at']).strftime('%Y-%m-%d_%H-%M')
+    return f"{title}_{stamp}{FORMATS[spec['format']][1]}"
+
+
+def serialize_job(job, reused=False):
+    """Representação pública do job"""
+    spec = json.loads(job['spec'])
+    return {
+        'id': job['id'],
+        'status': job['status'],
+        'resource': spec['resource'],
+        'format': spec['format'],
+        'title': spec['title'],
+        'filters': spec['filters'],
+        'rows': job['rows'],
+        'size': job['size'],
+        'error': job['error'],
+        'reused': reused,
+        'created_at': datetime.fromtimestamp(job['created_at']).isoformat(),
+        'started_at': datetime.fromtimestamp(job['started_at']).isoformat() if job['started_at'] else None,
+        'finished_at': datetime.fromtimestamp(job['finished_at']).isoformat() if job['finished_at'] else None,
+        'download_url': f"/api/reports/{job['id']}/download" if job['status'] == 'done' else None
+    }
+
+
+report_service = ReportService()
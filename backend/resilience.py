@@ -0,0 +1,430 @@
+"""
+Sistema HR - MVP
+Resiliência das chamadas ao Supabase: prazo por requisição, circuit breaker e
+fallback para dados em cache
+
+Cada requisição HTTP ganha um orçamento (REQUEST_DEADLINE_SECONDS); toda chamada
+ao banco usa como timeout o menor entre o tempo restante e DATA_CALL_TIMEOUT, e
+falha imediatamente quando o orçamento acabou. Cada (tabela, operação) tem um
+circuit breaker: após BREAKER_FAILURE_THRESHOLD falhas de transporte seguidas
+ele abre e as chamadas falham na hora por BREAKER_RESET_TIMEOUT segundos, até
+uma chamada de teste passar. Apenas leituras (idempotentes) são repetidas, com
+backoff exponencial e jitter. Endpoints marcados com @allows_stale recebem a
+última resposta boa da mesma consulta quando o banco está indisponível.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+import httpx
+from postgrest.exceptions import APIError
+
+import metrics
+
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_SECONDS', '10'))
+DATA_CALL_TIMEOUT = float(os.getenv('DATA_CALL_TIMEOUT', '5'))
+READ_RETRIES = int(os.getenv('DATA_READ_RETRIES', '2'))
+RETRY_BASE_DELAY = float(os.getenv('DATA_RETRY_BASE_DELAY', '0.1'))
+RETRY_MAX_DELAY = float(os.getenv('DATA_RETRY_MAX_DELAY', '1.0'))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', '30'))
+STALE_MAX_AGE = float(os.getenv('STALE_MAX_AGE', '900'))
+STALE_MAX_ENTRIES = int(os.getenv('STALE_MAX_ENTRIES', '256'))
+STALE_MAX_ROWS = int(os.getenv('STALE_MAX_ROWS', '1000'))
+
+WRITE_OPERATIONS = ('insert', 'update', 'upsert', 'delete')
+READ_OPERATIONS = ('select',)
+# Códigos do PostgREST para banco inacessível / statement timeout
+TRANSIENT_API_CODES = {'PGRST000', 'PGRST001', 'PGRST002', '57014'}
+
+
+class DataUnavailable(Exception):
+    """Banco indisponível para esta requisição (vira 503 com Retry-After)"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(DataUnavailable):
+    """Orçamento de tempo da requisição esgotado"""
+
+
+class CircuitOpenError(DataUnavailable):
+    """Circuit breaker aberto: falha imediata sem chamar o banco"""
+
+
+def is_transient(error):
+    """Falhas de transporte, timeouts e 5xx do gateway/PostgREST"""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, APIError):
+        code = error.code
+        if isinstance(code, int):
+            return code >= 500
+        return code in TRANSIENT_API_CODES
+    return False
+
+
+class CircuitBreaker:
+    """Fechado -> aberto após falhas seguidas -> meio-aberto (uma chamada de teste)"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.opened_count = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_after(self):
+        if self.opened_at is None:
+            return 0
+        return max(0.0, self.reset_timeout - (time.time() - self.opened_at))
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.time() - self.opened_at < self.reset_timeout:
+                    metrics.incr('breaker.rejected')
+                    raise CircuitOpenError(f'Circuito {self.name} aberto', retry_after=self.retry_after())
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    metrics.incr('breaker.rejected')
+                    raise CircuitOpenError(f'Circuito {self.name} em teste', retry_after=1)
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"🔌 Circuito {self.name} fechado")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = time.time()
+                self.opened_count += 1
+                metrics.incr('breaker.opened')
+                print(f"🔌 Circuito {self.name} aberto após {self.failures} falhas")
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'opened_count': self.opened_count,
+            'retry_after': round(self.retry_after(), 1) if self.state == self.OPEN else 0
+        }
+
+
+# =============================================================================
+# Estado por requisição (thread-local)
+# =============================================================================
+
+_local = threading.local()
+
+
+def begin_request(budget=REQUEST_DEADLINE_SECONDS):
+    _local.deadline = time.time() + budget if budget else None
+    _local.allow_stale = False
+    _local.served_stale = False
+    _local.unavailable = None
+
+
+def end_request():
+    """Encerrar a requisição; retorna (serviu dados antigos?, erro de indisponibilidade)"""
+    state = (getattr(_local, 'served_stale', False), getattr(_local, 'unavailable', None))
+    _local.deadline = None
+    _local.allow_stale = False
+    _local.served_stale = False
+    _local.unavailable = None
+    return state
+
+
+def request_context():
+    """Prazo e fallback da requisição atual, para repassar a uma thread auxiliar"""
+    return {'deadline': getattr(_local, 'deadline', None), 'allow_stale': getattr(_local, 'allow_stale', False)}
+
+
+@contextmanager
+def adopt_context(context):
+    """
+    Thread auxiliar com o prazo/fallback da requisição; ao sair, outcome recebe
+    served_stale/unavailable para merge_outcome() na thread da requisição
+    """
+    _local.deadline = context.get('deadline')
+    _local.allow_stale = context.get('allow_stale', False)
+    _local.served_stale = False
+    _local.unavailable = None
+    outcome = {}
+    try:
+        yield outcome
+    finally:
+        outcome['served_stale'], outcome['unavailable'] = end_request()
+
+
+def current_outcome():
+    """(serviu dados antigos?, erro de indisponibilidade) da requisição, sem encerrá-la"""
+    return getattr(_local, 'served_stale', False), getattr(_local, 'unavailable', None)
+
+
+def merge_outcome(served_stale=False, unavailable=None):
+    """Aplicar na thread da requisição o que a thread auxiliar registrou"""
+    if served_stale:
+        _local.served_stale = True
+    if unavailable is not None:
+        _local.unavailable = unavailable
+
+
+def remaining():
+    """Segundos restantes do orçamento (None fora de requisições)"""
+    deadline = getattr(_local, 'deadline', None)
+    return None if deadline is None else deadline - time.time()
+
+
+@contextmanager
+def allow_stale():
+    previous = getattr(_local, 'allow_stale', False)
+    _local.allow_stale = True
+    try:
+        yield
+    finally:
+        _local.allow_stale = previous
+
+
+def allows_stale(f):
+    """Endpoint aceita a última resposta boa quando o banco está indisponível"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with allow_stale():
+            return f(*args, **kwargs)
+    return decorated_function
+
+
+class StaleResponse:
+    """Resposta guardada (mesmos atributos usados de APIResponse)"""
+
+    __slots__ = ('data', 'count')
+
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _copy_rows(data):
+    # Handlers acrescentam chaves às linhas: a cópia guardada não pode ser alterada
+    if isinstance(data, list):
+        return [dict(row) if isinstance(row, dict) else row for row in data]
+    return data
+
+
+class _TimeoutSession:
+    """Sessão httpx com timeout fixo para uma única chamada"""
+
+    def __init__(self, session, timeout):
+        self._session = session
+        self._timeout = timeout
+
+    def request(self, *args, **kwargs):
+        kwargs['timeout'] = self._timeout
+        return self._session.request(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+# =============================================================================
+# Execução protegida
+# =============================================================================
+
+class Resilience:
+    """Breakers por (tabela, operação) e cache de últimas respostas boas"""
+
+    def __init__(self):
+        self._breakers = {}
+        self._stale = OrderedDict()
+        self._lock = threading.Lock()
+
+    def breaker(self, name):
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(name, CircuitBreaker(name))
+        return breaker
+
+    def _call_timeout(self):
+        left = remaining()
+        if left is None:
+            return DATA_CALL_TIMEOUT
+        if left <= 0:
+            metrics.incr('deadline.exceeded')
+            raise DeadlineExceeded('Prazo da requisição esgotado', retry_after=1)
+        return min(left, DATA_CALL_TIMEOUT)
+
+    def _stale_key(self, name, builder):
+        return (name, getattr(builder, 'http_method', None), getattr(builder, 'path', None),
+                str(getattr(builder, 'params', '')))
+
+    def _remember(self, key, response):
+        data = getattr(response, 'data', None)
+        if isinstance(data, list) and len(data) > STALE_MAX_ROWS:
+            return
+        with self._lock:
+            self._stale[key] = (StaleResponse(_copy_rows(data), getattr(response, 'count', None)), time.time())
+            self._stale.move_to_end(key)
+            while len(self._stale) > STALE_MAX_ENTRIES:
+                self._stale.popitem(last=False)
+
+    def _fallback(self, key, error):
+        """Última resposta boa (se o endpoint permitir) ou propaga a indisponibilidade"""
+        if key is not None:
+            with self._lock:
+                entry = self._stale.get(key)
+            if entry is not None and time.time() - entry[1] <= STALE_MAX_AGE:
+                metrics.incr('stale.served')
+                _local.served_stale = True
+                return StaleResponse(_copy_rows(entry[0].data), entry[0].count)
+        _local.unavailable = error
+        raise error
+
+    def call(self, name, fn, operation='call', idempotent=False, stale_key=None):
+        """
+        Executar fn(timeout) com prazo e breaker `name`.
+        Apenas chamadas idempotentes são repetidas; stale_key habilita o fallback.
+        """
+        breaker = self.breaker(name)
+        attempts = READ_RETRIES + 1 if idempotent else 1
+
+        for attempt in range(attempts):
+            try:
+                timeout = self._call_timeout()
+                breaker.before_call()
+            except DataUnavailable as e:
+                return self._fallback(stale_key, e)
+
+            started = time.time()
+            try:
+                response = fn(timeout)
+            except Exception as e:
+                if not is_transient(e):
+                    breaker.record_success()  # o banco respondeu (erro de consulta)
+                    raise
+                breaker.record_failure()
+                metrics.incr(f'data.{operation}.transient_errors')
+                delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)) * random.random()
+                left = remaining()
+                if attempt + 1 < attempts and (left is None or left > delay):
+                    metrics.incr('data.retries')
+                    time.sleep(delay)
+                    continue
+                error = DataUnavailable(f'Banco indisponível ({name}): {e}', retry_after=breaker.retry_after() or 1)
+                error.__cause__ = e
+                return self._fallback(stale_key, error)
+            finally:
+                metrics.incr(f'data.{operation}.calls')
+                metrics.incr(f'data.{operation}.seconds', round(time.time() - started, 4))
+
+            breaker.record_success()
+            if stale_key is not None:
+                self._remember(stale_key, response)
+            return response
+
+    def execute(self, builder, name, operation):
+        """builder.execute() com timeout da chamada aplicado à sessão httpx do builder"""
+        idempotent = operation in READ_OPERATIONS
+        stale_key = self._stale_key(name, builder) if idempotent and getattr(_local, 'allow_stale', False) else None
+        session = getattr(builder, 'session', None)
+
+        def run(timeout):
+            if session is None:
+                return builder.execute()
+            builder.session = _TimeoutSession(session, timeout)
+            try:
+                return builder.execute()
+            finally:
+                builder.session = session
+
+        return self.call(name, run, operation, idempotent, stale_key)
+
+    def stats(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+            stale_entries = len(self._stale)
+        return {
+            'breakers': {name: breaker.stats() for name, breaker in sorted(breakers.items())},
+            'stale_entries': stale_entries,
+            'request_deadline_seconds': REQUEST_DEADLINE_SECONDS,
+            'call_timeout_seconds': DATA_CALL_TIMEOUT
+        }
+
+
+resilience = Resilience()
+
+
+# =============================================================================
+# Cliente protegido (mesma interface do cliente Supabase)
+# =============================================================================
+
+class GuardedQuery:
+    """Envolve um request builder do postgrest; execute() passa pela resiliência"""
+
+    def __init__(self, builder, table, operation=None):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+        operation = name if name in READ_OPERATIONS + WRITE_OPERATIONS else self._operation
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if hasattr(result, 'execute'):
+                return GuardedQuery(result, self._table, operation)
+            return result
+        return call
+
+    def execute(self):
+        operation = self._operation or 'select'
+        return resilience.execute(self._builder, f'{self._table}:{operation}', operation)
+
+
+class GuardedClient:
+    """Cliente Supabase cujas consultas usam prazo, breaker e retries"""
+
+    def __init__(self, client, prefix=''):
+        self._client = client
+        self._prefix = prefix
+
+    def table(self, table_name):
+        return GuardedQuery(self._client.table(table_name), f'{self._prefix}{table_name}')
+
+    from_ = table
+
+    def rpc(self, fn, params):
+        return GuardedQuery(self._client.rpc(fn, params), f'{self._prefix}rpc:{fn}', 'rpc')
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
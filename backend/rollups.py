@@ -0,0 +1,275 @@
+"""
+Sistema HR - MVP
+Rollup diário de candidaturas para consultas do dashboard por período
+
+Uma linha por (dia, vaga, etapa, status) com a quantidade de chegadas
+(candidaturas criadas) e de transições (movimentações para aquela etapa/status).
+As escritas de candidaturas atualizam o rollup na hora e um job de backfill o
+reconstrói a partir do snapshot colunar. Qualquer intervalo de datas é
+respondido somando O(dias) linhas em vez de reler a tabela applications.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+import metrics
+from stage_catalog import first_stage
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROLLUPS_DB = os.getenv('ROLLUPS_DB', os.path.join(BASE_DIR, 'var', 'rollups.sqlite3'))
+BACKFILL_INTERVAL = float(os.getenv('ROLLUP_BACKFILL_INTERVAL', '86400'))
+MAX_RANGE_DAYS = int(os.getenv('ROLLUP_MAX_RANGE_DAYS', '1830'))
+
+# Períodos aceitos pelo filtro do dashboard (dias para trás a partir de hoje)
+PERIOD_DAYS = {'7d': 7, '30d': 30, '90d': 90, '365d': 365}
+DEFAULT_PERIOD = '30d'
+
+
+class PeriodError(ValueError):
+    """Período ou intervalo de datas inválido"""
+
+
+def day_of(value):
+    """Dia local (YYYY-MM-DD) de um epoch ou timestamp ISO 8601"""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value).date().isoformat()
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = datetime.fromtimestamp(parsed.timestamp())
+    return parsed.date().isoformat()
+
+
+def resolve_period(period=None, start_date=None, end_date=None, today=None):
+    """
+    Converter os parâmetros do dashboard em (início, fim) inclusivos.
+    start_date/end_date (YYYY-MM-DD) têm precedência sobre period.
+    """
+    today = today or date.today()
+    if start_date or end_date:
+        try:
+            start = date.fromisoformat(start_date) if start_date else today - timedelta(days=PERIOD_DAYS[DEFAULT_PERIOD])
+            end = date.fromisoformat(end_date) if end_date else today
+        except ValueError:
+            raise PeriodError('Datas devem estar no formato YYYY-MM-DD')
+        if start > end:
+            raise PeriodError('start_date deve ser anterior a end_date')
+        if (end - start).days > MAX_RANGE_DAYS:
+            raise PeriodError(f'Intervalo máximo é de {MAX_RANGE_DAYS} dias')
+        return start.isoformat(), end.isoformat()
+
+    period = period or DEFAULT_PERIOD
+    if period not in PERIOD_DAYS:
+        raise PeriodError(f"Período inválido. Use: {', '.join(PERIOD_DAYS)} ou start_date/end_date")
+    return (today - timedelta(days=PERIOD_DAYS[period])).isoformat(), today.isoformat()
+
+
+class DailyRollupStore:
+    """Rollup (dia, vaga, etapa, status) persistido em SQLite (modo WAL)"""
+
+    def __init__(self, path=ROLLUPS_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS application_rollups (
+                    day TEXT NOT NULL,
+                    job_id INTEGER NOT NULL,
+                    stage INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    arrivals INTEGER NOT NULL DEFAULT 0,
+                    transitions INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, job_id, stage, status)
+                )
+            """)
+            conn.execute('CREATE TABLE IF NOT EXISTS rollup_meta (key TEXT PRIMARY KEY, value REAL)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # -------------------------------------------------------------------------
+    # Escrita
+    # -------------------------------------------------------------------------
+
+    def record(self, day, job_id, stage, status, arrivals=0, transitions=0):
+        """Somar chegadas/transições numa linha; falhas não interrompem a escrita principal"""
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    'INSERT INTO application_rollups (day, job_id, stage, status, arrivals, transitions) '
+                    'VALUES (?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (day, job_id, stage, status) DO UPDATE SET '
+                    'arrivals = arrivals + excluded.arrivals, transitions = transitions + excluded.transitions',
+                    (day, job_id or 0, stage or first_stage(), status or 'applied', arrivals, transitions)
+                )
+            metrics.incr('rollups.writes')
+        except sqlite3.Error as e:
+            metrics.incr('rollups.errors')
+            print(f"⚠️ Erro ao atualizar rollup diário: {e}")
+
+    def record_arrival(self, application):
+        """Nova candidatura: conta no dia de applied_at, na etapa/status inicial"""
+        self.record(
+            day_of(application.get('applied_at') or datetime.now().isoformat()),
+            application.get('job_id'), application.get('stage'), application.get('status'),
+            arrivals=1
+        )
+
+    def record_arrivals(self, applications):
+        """Várias candidaturas novas (criação em lote): somadas por linha e gravadas numa transação"""
+        counts = Counter(
+            (day_of(app.get('applied_at') or datetime.now().isoformat()),
+             app.get('job_id') or 0, app.get('stage') or first_stage(), app.get('status') or 'applied')
+            for app in applications
+        )
+        if not counts:
+            return
+        try:
+            with self._lock, self._connect() as conn:
+                conn.executemany(
+                    'INSERT INTO application_rollups (day, job_id, stage, status, arrivals, transitions) '
+                    'VALUES (?, ?, ?, ?, ?, 0) '
+                    'ON CONFLICT (day, job_id, stage, status) DO UPDATE SET arrivals = arrivals + excluded.arrivals',
+                    [key + (n,) for key, n in counts.items()]
+                )
+            metrics.incr('rollups.writes', len(counts))
+        except sqlite3.Error as e:
+            metrics.incr('rollups.errors')
+            print(f"⚠️ Erro ao atualizar rollup diário: {e}")
+
+    def record_transition(self, application):
+        """Candidatura movida: conta no dia de updated_at, na etapa/status de destino"""
+        self.record(
+            day_of(application.get('updated_at') or datetime.now().isoformat()),
+            application.get('job_id'), application.get('stage'), application.get('status'),
+            transitions=1
+        )
+
+    def backfill(self, rows, initial_stage=None):
+        """
+        Reconstruir o rollup a partir de (job_id, stage, status, applied_at, updated_at)
+        com datas em epoch. Sem histórico de etapas, cada candidatura gera uma
+        chegada em applied_at (na etapa inicial do catálogo) e, se já foi movida,
+        uma transição em updated_at para a etapa/status atual.
+        """
+        started = time.time()
+        if initial_stage is None:
+            initial_stage = first_stage()
+        buckets = defaultdict(lambda: [0, 0])
+        for job_id, stage, status, applied_at, updated_at in rows:
+            if not applied_at:
+                continue
+            moved = updated_at > applied_at and (stage != initial_stage or status != 'applied')
+            if moved:
+                buckets[(day_of(applied_at), job_id, initial_stage, 'applied')][0] += 1
+                buckets[(day_of(updated_at), job_id, stage, status)][1] += 1
+            else:
+                buckets[(day_of(applied_at), job_id, stage, status)][0] += 1
+
+        with self._lock, self._connect() as conn:
+            conn.execute('DELETE FROM application_rollups')
+            conn.executemany(
+                'INSERT INTO application_rollups (day, job_id, stage, status, arrivals, transitions) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [key + tuple(counts) for key, counts in buckets.items()]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO rollup_meta (key, value) VALUES ('backfilled_at', ?)",
+                (time.time(),)
+            )
+
+        elapsed = time.time() - started
+        metrics.set_gauge('rollups.rows', len(buckets))
+        metrics.set_gauge('rollups.backfill_seconds', round(elapsed, 3))
+        return len(buckets), elapsed
+
+    def needs_backfill(self):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM rollup_meta WHERE key = 'backfilled_at'").fetchone()
+        return row is None or time.time() - row[0] > BACKFILL_INTERVAL
+
+    # -------------------------------------------------------------------------
+    # Leitura
+    # -------------------------------------------------------------------------
+
+    def totals(self, start_day, end_day, job_id=None):
+        """[(etapa, status, chegadas, transições)] somados no intervalo inclusivo"""
+        sql = ('SELECT stage, status, SUM(arrivals), SUM(transitions) FROM application_rollups '
+               'WHERE day BETWEEN ? AND ?')
+        params = [start_day, end_day]
+        if job_id:
+            sql += ' AND job_id = ?'
+            params.append(job_id)
+        with self._connect() as conn:
+            return conn.execute(sql + ' GROUP BY stage, status', params).fetchall()
+
+    def daily_arrivals(self, start_day, end_day):
+        """{dia: chegadas} no intervalo inclusivo (dias sem chegadas omitidos)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT day, SUM(arrivals) FROM application_rollups '
+                'WHERE day BETWEEN ? AND ? GROUP BY day', (start_day, end_day)
+            ).fetchall()
+        return {day: count for day, count in rows if count}
+
+    def arrivals_by_job(self, start_day, end_day):
+        """{job_id: chegadas} no intervalo inclusivo"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT job_id, SUM(arrivals) FROM application_rollups '
+                'WHERE day BETWEEN ? AND ? GROUP BY job_id', (start_day, end_day)
+            ).fetchall()
+        return {job_id: count for job_id, count in rows if count}
+
+    def arrivals(self, start_day, end_day):
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT COALESCE(SUM(arrivals), 0) FROM application_rollups WHERE day BETWEEN ? AND ?',
+                (start_day, end_day)
+            ).fetchone()
+        return row[0]
+
+
+def summarize_period(store, start_day, end_day, hired_stages):
+    """Métricas do dashboard para um intervalo de datas (hired_stages do catálogo de etapas)"""
+    arrivals = 0
+    transitions = 0
+    hired = 0
+    by_status = {}
+    by_stage = {}
+    for stage, status, stage_arrivals, stage_transitions in store.totals(start_day, end_day):
+        arrivals += stage_arrivals
+        transitions += stage_transitions
+        if stage in hired_stages:
+            hired += stage_transitions
+        if stage_transitions:
+            by_status[status] = by_status.get(status, 0) + stage_transitions
+            by_stage[f'stage_{stage}'] = by_stage.get(f'stage_{stage}', 0) + stage_transitions
+
+    daily = store.daily_arrivals(start_day, end_day)
+    start = date.fromisoformat(start_day)
+    days = (date.fromisoformat(end_day) - start).days + 1
+    series = []
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).isoformat()
+        series.append({'date': day, 'count': daily.get(day, 0)})
+
+    return {
+        'start_date': start_day,
+        'end_date': end_day,
+        'applications': arrivals,
+        'transitions': transitions,
+        'hired': hired,
+        'conversion_rate': round(hired / max(arrivals, 1) * 100, 1),
+        'transitions_by_status': by_status,
+        'transitions_by_stage': by_stage,
+        'daily_applications': series
+    }
+
+
+rollup_store = DailyRollupStore()
@@ -1,34 +1,101 @@
 # 🚨 CORREÇÃO APENAS DE SINTAXE - MANTÉM TODA FUNCIONALIDADE
 # Arquivo: backend/routes.py (substituir todo o conteúdo)
 
-from flask import Blueprint, request, jsonify, g
-from supabase import create_client, Client
+from flask import Blueprint, request, jsonify, g, send_file
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 import json
+import heapq
+import time
 from functools import wraps
 import jwt
 
-
-from dotenv import load_dotenv
-load_dotenv()
+import metrics
+import data_version
+from singleflight import single_flight, stats as single_flight_stats
+from refresher import refresher, serve_snapshot
+from report_jobs import report_service, serialize_job, download_name, ReportSpecError, FORMATS
+from dedup import dedup_index, DedupIndex, DUPLICATE_THRESHOLD, INDEX_TTL as DEDUP_INDEX_TTL
+from matching import match_engine, candidate_text, job_text, is_open_job, CANDIDATE, JOB, REBUILD_TTL as MATCH_REBUILD_TTL
+from columnar import applications_snapshot, to_epoch, SELECT_COLUMNS as SNAPSHOT_COLUMNS, REBUILD_TTL as SNAPSHOT_REBUILD_TTL, DEFAULT_STATUSES
+from rollups import rollup_store, resolve_period, summarize_period, PeriodError
+from history import history_writer, HISTORY_TABLE
+from stage_analytics import stage_analytics
+from profile_cache import profile_cache
+from db import data_client
+from warmup import warmup
+from resilience import resilience, allows_stale, DataUnavailable
+from shared_cache import shared_cache
+from change_feed import change_feed
+from change_log import change_log, collapse, SYNC_TABLES, SYNC_MAX_CHANGES
+from audit import access_counters, audit_mode, INDIVIDUAL, AUDIT_TABLE, ACCESS_TABLE
+from scanner import scan
+from fieldsets import parse_fieldset, FieldsetError
+from archive import archiver, archive_totals, add_counts, APPLICATIONS_ARCHIVE, CANDIDATES_ARCHIVE
+from stage_catalog import catalog_service, ACTIONS as STAGE_ACTIONS
+from transitions import stage_transitions, is_missing_function, NOT_FOUND, INVALID, CONFLICT
 
 api = Blueprint('api', __name__)
 
-# Configuração Supabase
-try:
-    print(f"🔍 URL: {os.getenv('SUPABASE_URL')}")
-    print(f"🔍 KEY: {os.getenv('SUPABASE_KEY', 'AUSENTE')[:20]}...")
-    
-    supabase = create_client(
-        os.getenv('SUPABASE_URL'), 
-        os.getenv('SUPABASE_KEY')
-    )
-    print("✅ Supabase conectado com sucesso")
-except Exception as e:
-    print(f"❌ Erro ao conectar Supabase: {e}")
-    supabase = None
+# Contagens do dashboard: 'exact' (COUNT(*)), 'planned' ou 'estimated' (estatísticas do Postgres)
+COUNT_MODES = ('exact', 'planned', 'estimated')
+DASHBOARD_COUNT_MODE = os.getenv('DASHBOARD_COUNT_MODE', 'exact')
+DASHBOARD_TOP_JOBS_K = int(os.getenv('DASHBOARD_TOP_JOBS_K', '3'))
+MAX_TOP_JOBS_K = 50
+
+# Histórico/comentários: paginação por chave (id) e lote de "últimas N" por candidatura
+COMMENTS_TABLE = 'application_comments'
+ACTIVITY_PAGE_SIZE = 20
+MAX_ACTIVITY_PAGE_SIZE = 100
+MAX_ACTIVITY_BATCH = 200
+MAX_LATEST_PER_APPLICATION = 20
+LATEST_FALLBACK_FACTOR = 5
+MAX_COMMENT_LENGTH = 5000
+MAX_MATRIX_JOBS = int(os.getenv('PIPELINE_MATRIX_MAX_JOBS', '1000'))
+MATRIX_KEY = ('job_id', 'stage', 'status')
+
+# Criação de candidaturas em lote: pares por requisição, linhas por insert e ids por in_()
+MAX_BULK_APPLICATIONS = int(os.getenv('BULK_APPLICATIONS_MAX', '2000'))
+BULK_INSERT_CHUNK = int(os.getenv('BULK_INSERT_CHUNK', '500'))
+BULK_LOOKUP_CHUNK = 200
+
+# Exclusão/status em lote de candidatos e vagas: ids por requisição e por operação in_()
+MAX_BULK_ACTION = int(os.getenv('BULK_ACTION_MAX', '5000'))
+BULK_ACTION_CHUNK = int(os.getenv('BULK_ACTION_CHUNK', '200'))
+# Candidaturas dependentes na exclusão: removidas junto ('cascade') ou o registro é mantido ('skip')
+BULK_DEPENDENT_MODES = ('cascade', 'skip')
+# Bloco numa transação (sql/bulk_delete.sql); sem a função, exclusões separadas pela API de tabelas
+BULK_DELETE_FUNCTION = 'bulk_delete_records'
+bulk_delete_mode = {'rpc': True}
+
+# Colunas lidas além de ?fields= (busca por texto e ordenação das listagens)
+CANDIDATE_SEARCH_COLUMNS = ('first_name', 'last_name', 'email', 'created_at')
+# Valores exibidos quando a vaga não tem o campo preenchido
+JOB_FIELD_DEFAULTS = (
+    ('company', 'Empresa não informada'),
+    ('location', 'Localização não informada'),
+    ('employment_type', 'full-time'),
+    ('experience_level', 'mid-level'),
+    ('status', 'active')
+)
+
+# Etapas ativas mudam raramente: cache por worker (aquecido após o fork)
+STAGES_CACHE_TTL = float(os.getenv('STAGES_CACHE_TTL', '300'))
+
+# Índices em memória publicados no cache compartilhado (um worker constrói, os demais adotam)
+DEDUP_INDEX_KEY = 'index:dedup'
+MATCH_INDEX_KEY = 'index:match_engine'
+SNAPSHOT_INDEX_KEY = 'index:applications_snapshot'
+STAGES_CACHE_KEY = 'stages:active'
+# Margem para a cópia compartilhada expirar antes de o índice adotado ficar velho
+SHARED_INDEX_TTL_FACTOR = 0.95
+
+# Histórico das candidaturas arquivadas (sql/archive.sql)
+HISTORY_ARCHIVE_TABLE = 'application_history_archive'
+
+# Cliente Supabase: configurado por create_app() e criado no primeiro uso (db.py)
+supabase = data_client
 
 # =============================================================================
 # MIDDLEWARE DE AUTENTICAÇÃO - MOVER PARA O INÍCIO
@@ -55,8 +122,8 @@ def verify_token(f):
             
             print(f"🔍 Validando token: {token[:20]}...")
             
-            # Verificar token com Supabase
-            user_response = supabase.auth.get_user(token)
+            # Verificar token com Supabase (prazo e breaker próprios)
+            user_response = resilience.call('auth:get_user', lambda timeout: supabase.auth.get_user(token), 'auth')
             
             if not user_response.user:
                 print("❌ Token inválido - usuário não encontrado")
@@ -66,18 +133,25 @@ def verify_token(f):
             g.current_user = user_response.user
             g.access_token = token
             
-            # Log de auditoria
-            audit_log_action(
-                user_id=g.current_user.id,
-                action=f"ACESSOU_{request.method}",
-                resource=request.endpoint,
-                details=f"Endpoint: {request.path}"
-            )
+            # Log de auditoria: escritas e endpoints sensíveis linha a linha, leituras agregadas por minuto
+            if audit_mode(request.method, request.endpoint) == INDIVIDUAL:
+                audit_log_action(
+                    user_id=g.current_user.id,
+                    action=f"ACESSOU_{request.method}",
+                    resource=request.endpoint,
+                    details=f"Endpoint: {request.path}"
+                )
+            else:
+                access_counters.hit(g.current_user.id, request.endpoint, request.method)
             
             print(f"✅ Usuário autenticado: {g.current_user.email}")
             
             return f(*args, **kwargs)
             
+        except DataUnavailable as e:
+            # Indisponibilidade não é token inválido (não deslogar o usuário)
+            print(f"❌ Banco/autenticação indisponível: {e}")
+            return jsonify({'error': 'Serviço indisponível, tente novamente'}), 503
         except Exception as e:
             print(f"❌ Erro na validação do token: {e}")
             return jsonify({'error': 'Token inválido ou expirado'}), 401
@@ -109,12 +183,11 @@ def verify_role(required_roles):
     return decorator
 
 def get_user_role(user_id):
-    """Obter role do usuário"""
+    """Obter role do usuário (cache de perfis)"""
     try:
-        response = supabase.table('profiles').select('role').eq('user_id', user_id).execute()
-        if response.data:
-            return response.data[0].get('role', 'user')
-        return 'user'  # Role padrão
+        return profile_cache.role(user_id) or 'user'  # Role padrão
+    except DataUnavailable:
+        raise
     except Exception as e:
         print(f"❌ Erro ao buscar role: {e}")
         return 'user'
@@ -130,6 +203,7 @@ def create_user_profile(user_id, full_name, role='user'):
         }
         
         response = supabase.table('profiles').insert(profile_data).execute()
+        profile_cache.invalidate(user_id)
         print(f"✅ Perfil criado: {full_name} - Role: {role}")
         return response.data[0] if response.data else None
         
@@ -151,13 +225,19 @@ def audit_log_action(user_id, action, resource, details=None):
         }
         
         # Tentar inserir na tabela de auditoria
-        response = supabase.table('audit_logs').insert(audit_data).execute()
+        response = supabase.table(AUDIT_TABLE).insert(audit_data).execute()
         print(f"📋 Auditoria registrada: {action} em {resource}")
         
     except Exception as e:
         # Auditoria não deve quebrar a aplicação
         print(f"⚠️ Erro no log de auditoria: {e}")
 
+def increment_access_counters(rows):
+    """Somar contadores de leitura no banco (uma chamada para o lote inteiro)"""
+    supabase.rpc('increment_audit_access', {'entries': rows}).execute()
+
+access_counters.configure(increment_access_counters)
+
 # =============================================================================
 # ROTAS PÚBLICAS (SEM PROTEÇÃO)
 # =============================================================================
@@ -199,11 +279,13 @@ def health_check():
         }
         
         if supabase:
-            # Usar busca robusta para teste
-            candidates = robust_search_all_candidates()
+            # Contagem sem baixar os candidatos
+            status['candidates_count'] = count_rows('candidates', count='planned')
             status['database'] = 'connected'
-            status['candidates_count'] = len(candidates)
-            status['strategy'] = 'robust'
+            status['strategy'] = 'count'
+        
+        breakers = resilience.stats()['breakers']
+        status['open_circuits'] = [name for name, breaker in breakers.items() if breaker['state'] != 'closed']
         
         return jsonify(status)
         
@@ -215,15 +297,38 @@ def health_check():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@api.route('/metrics', methods=['GET'])
+@verify_token
+@verify_role(['admin'])
+def runtime_metrics():
+    """Métricas de runtime do worker (uso interno: só administradores)"""
+    snapshot = metrics.snapshot()
+    snapshot['single_flight'] = single_flight_stats()
+    snapshot['aggregates'] = refresher.stats()
+    snapshot['data_version'] = data_version.snapshot()
+    snapshot['startup'] = warmup.stats()
+    snapshot['data_client'] = data_client.stats()
+    snapshot['resilience'] = resilience.stats()
+    snapshot['shared_cache'] = shared_cache.stats()
+    snapshot['change_feed'] = change_feed.stats()
+    snapshot['change_log'] = change_log.stats()
+    snapshot['audit'] = access_counters.stats()
+    snapshot['stage_transitions'] = stage_transitions.stats()
+    snapshot['stage_catalog'] = catalog_service.stats()
+    return jsonify(snapshot)
+
 # =============================================================================
 # HELPER FUNCTIONS - ESTRATÉGIAS ROBUSTAS
 # =============================================================================
 
-def robust_search_all_candidates():
-    """Buscar todos os candidatos de forma robusta"""
+def robust_search_all_candidates(filters=(), columns='*'):
+    """Buscar todos os candidatos (varredura em blocos, sem truncar), mais recentes primeiro"""
     try:
-        response = supabase.table('candidates').select('*').order('created_at', desc=True).execute()
-        return response.data if response.data else []
+        candidates = list(scan('candidates', columns, filters))
+        candidates.sort(key=lambda candidate: candidate.get('created_at') or '', reverse=True)
+        return candidates
+    except DataUnavailable:
+        raise
     except Exception as e:
         print(f"❌ Erro ao buscar todos os candidatos: {e}")
         return []
@@ -231,11 +336,10 @@ def robust_search_all_candidates():
 def robust_find_candidate_by_id(candidate_id):
     """Encontrar candidato por ID de forma robusta"""
     try:
-        all_candidates = robust_search_all_candidates()
-        for candidate in all_candidates:
-            if candidate.get('id') == candidate_id:
-                return candidate
-        return None
+        response = supabase.table('candidates').select('*').eq('id', candidate_id).limit(1).execute()
+        return response.data[0] if response.data else None
+    except DataUnavailable:
+        raise
     except Exception as e:
         print(f"❌ Erro ao buscar candidato {candidate_id}: {e}")
         return None
@@ -243,15 +347,533 @@ def robust_find_candidate_by_id(candidate_id):
 def robust_find_candidate_by_email(email):
     """Encontrar candidato por email de forma robusta"""
     try:
-        all_candidates = robust_search_all_candidates()
-        for candidate in all_candidates:
-            if candidate.get('email') == email:
-                return candidate
-        return None
+        response = supabase.table('candidates').select('*').eq('email', email).order('id', desc=True).limit(1).execute()
+        return response.data[0] if response.data else None
+    except DataUnavailable:
+        raise
     except Exception as e:
         print(f"❌ Erro ao buscar candidato por email {email}: {e}")
         return None
 
+def count_rows(table, filters=(), count=None):
+    """
+    Contar linhas sem baixar os dados: o total vem do Content-Range do PostgREST.
+    filters: sequência de (operador, coluna, valor), ex.: [('eq', 'status', 'active')]
+    """
+    count = count or DASHBOARD_COUNT_MODE
+    if count not in COUNT_MODES:
+        raise ValueError(f'Modo de contagem inválido: {count}')
+
+    # limit(1): esta versão do postgrest não aceita head=True e uma resposta HEAD
+    # perderia o total, então trafega no máximo um id
+    query = supabase.table(table).select('id', count=count)
+    for operator, column, value in filters:
+        query = getattr(query, operator)(column, value)
+    response = query.limit(1).execute()
+    metrics.incr(f'counts.{count}')
+    return response.count or 0
+
+def ensure_shared_index(index, key, ttl, build):
+    """Adotar a cópia publicada por outro worker ou construir (um worker por vez) e publicar"""
+    built = []
+
+    def compute():
+        build()
+        built.append(True)
+        return index.export_state()
+
+    blob = shared_cache.get_or_compute(key, compute, ttl * SHARED_INDEX_TTL_FACTOR)
+    if not built:
+        index.import_state(blob)
+        metrics.incr(f'shared_index.{key}.adopted')
+    return index
+
+
+def find_email_conflict(candidate, exclude_id=None):
+    """
+    Candidato existente com o mesmo email: consulta pontual no primário (fonte da verdade
+    para o 409). O índice de duplicados é por worker e pode estar atrasado; ele só
+    alimenta possible_duplicates.
+    """
+    email = (candidate.get('email') or '').strip()
+    with data_client.use_primary():
+        query = supabase.table('candidates').select('id, email').eq('email', email)
+        if exclude_id is not None:
+            query = query.neq('id', exclude_id)
+        rows = query.limit(1).execute().data
+    return rows[0] if rows else None
+
+def existing_emails(emails):
+    """Emails (exatos) já cadastrados, numa consulta in_() por bloco no primário"""
+    emails = sorted({(email or '').strip() for email in emails if email})
+    found = set()
+    with data_client.use_primary():
+        for start in range(0, len(emails), BULK_LOOKUP_CHUNK):
+            chunk = emails[start:start + BULK_LOOKUP_CHUNK]
+            found.update(row['email'] for row in scan('candidates', 'email', [('in_', 'email', chunk)], prefetch=0))
+    return found
+
+def change_log_head():
+    """Versão atual do change_log (0 se indisponível: o catch-up relê desde o início)"""
+    try:
+        return change_log.head()
+    except Exception as e:
+        print(f"⚠️ change_log indisponível para o catch-up dos índices: {e}")
+        return 0
+
+def catch_up_index(index, tables, columns, apply):
+    """
+    Alcançar escritas feitas por outros workers/nós sem reconstruir o índice: a
+    data_version das tabelas diz se algo mudou desde o que o índice reflete, o
+    change_log diz o quê. columns: {tabela: colunas}; apply(tabela, id, linha ou
+    None se excluída). Retorna False se houver mudanças demais (reconstruir).
+    """
+    version = data_version.current(*tables)
+    if index.seen_version >= version:
+        return True
+    try:
+        entries, has_more = change_log.entries_since(index.log_cursor, tables)
+    except DataUnavailable as e:
+        # Banco fora: segue com o índice atual e tenta de novo na próxima leitura
+        print(f"⚠️ Catch-up adiado ({e})")
+        return True
+    except Exception as e:
+        # Sem change_log (sql/change_log.sql não aplicado): só o TTL renova o índice
+        print(f"⚠️ Catch-up sem change_log: {e}")
+        index.seen_version = version
+        return True
+    if has_more:
+        metrics.incr('indexes.catch_up_rebuilds')
+        return False
+    for table, operations in collapse(entries).items():
+        changed = [row_id for row_id, op in operations.items() if op != 'delete']
+        rows = fetch_rows_by_ids(table, changed, columns[table]) if changed else {}
+        for row_id in operations:
+            apply(table, row_id, rows.get(row_id))
+    if entries:
+        index.log_cursor = max(index.log_cursor, entries[-1]['version'])
+    index.seen_version = version
+    metrics.incr('indexes.catch_up_entries', len(entries))
+    return True
+
+DEDUP_COLUMNS = {'candidates': 'id, first_name, last_name, email, phone'}
+
+def apply_dedup_change(table, row_id, row):
+    if row is None:
+        dedup_index.remove(row_id)
+    else:
+        dedup_index.add(row)
+
+def ensure_dedup_index():
+    """
+    Carregar (ou recarregar se expirado) o índice de duplicados; escritas de
+    outros workers desde a carga entram por catch-up (change_log)
+    """
+    def build():
+        started = datetime.now()
+        log_cursor, version = change_log_head(), data_version.current('candidates')
+        total = dedup_index.load(scan('candidates', DEDUP_COLUMNS['candidates']))
+        dedup_index.log_cursor, dedup_index.seen_version = log_cursor, version
+        elapsed = (datetime.now() - started).total_seconds()
+        print(f"🧬 Índice de duplicados carregado: {total} candidatos em {elapsed:.2f}s")
+    return ensure_current_index(dedup_index, DEDUP_INDEX_KEY, DEDUP_INDEX_TTL, build,
+                                ('candidates',), DEDUP_COLUMNS, apply_dedup_change)
+
+MATCH_COLUMNS = {'candidates': 'id, summary, linkedin_url', 'jobs': 'id, title, description, requirements, status'}
+
+def apply_match_change(table, row_id, row):
+    if table == 'candidates':
+        sync_candidate_match(row if row is not None else row_id, deleted=row is None)
+    else:
+        sync_job_indexes(row if row is not None else row_id, deleted=row is None)
+
+def ensure_current_index(index, key, ttl, build, tables, columns, apply):
+    """Índice carregado (ou adotado) e alcançado pelo change_log; atrasado demais: reconstruir"""
+    if index.is_stale():
+        ensure_shared_index(index, key, ttl, build)
+    if not catch_up_index(index, tables, columns, apply):
+        # Mudanças demais desde a carga (a cópia compartilhada também está atrasada)
+        shared_cache.delete(key)
+        index.loaded_at = None
+        ensure_shared_index(index, key, ttl, build)
+        catch_up_index(index, tables, columns, apply)
+    return index
+
+def ensure_match_engine():
+    """
+    Carregar (ou reconstruir se expirado) o motor de compatibilidade; escritas de
+    outros workers desde a carga entram por catch-up (change_log)
+    """
+    def build():
+        # Cursores lidos antes da varredura: mudanças durante ela entram no catch-up
+        log_cursor, version = change_log_head(), data_version.current('candidates', 'jobs')
+        candidates = scan('candidates', MATCH_COLUMNS['candidates'])
+        jobs = scan('jobs', MATCH_COLUMNS['jobs'])
+        elapsed = match_engine.rebuild(candidates, jobs)
+        match_engine.log_cursor, match_engine.seen_version = log_cursor, version
+        print(f"🎯 Motor de compatibilidade reconstruído em {elapsed:.2f}s")
+    return ensure_current_index(match_engine, MATCH_INDEX_KEY, MATCH_REBUILD_TTL, build,
+                                ('candidates', 'jobs'), MATCH_COLUMNS, apply_match_change)
+
+def match_entity(side, entity_id):
+    """
+    Entidade ausente do motor (criada em outro worker antes do catch-up): consulta
+    pontual e upsert. Retorna False se não existe (ou a vaga não está aberta).
+    """
+    if side == CANDIDATE:
+        rows = supabase.table('candidates').select(MATCH_COLUMNS['candidates']).eq('id', entity_id).limit(1).execute().data
+        if rows:
+            sync_candidate_match(rows[0])
+    else:
+        rows = supabase.table('jobs').select(MATCH_COLUMNS['jobs']).eq('id', entity_id).limit(1).execute().data
+        if rows:
+            sync_job_indexes(rows[0])
+    return bool(rows) and entity_id in match_engine.vectors[side]
+
+def sync_candidate_match(candidate, deleted=False):
+    candidate_id = candidate.get('id') if isinstance(candidate, dict) else candidate
+    if deleted:
+        match_engine.remove(CANDIDATE, candidate_id)
+    elif not match_engine.is_stale():
+        match_engine.upsert(CANDIDATE, candidate_id, candidate_text(candidate))
+
+def sync_candidate_indexes(candidate, deleted=False):
+    """Propagar escrita de candidato para os índices em memória"""
+    candidate_id = candidate.get('id') if isinstance(candidate, dict) else candidate
+    # As cópias compartilhadas não recebem incrementos: quem as adota alcança por catch-up
+    sync_candidate_match(candidate, deleted)
+    if deleted:
+        dedup_index.remove(candidate_id)
+        return
+    dedup_index.add(candidate)
+
+def sync_job_indexes(job, deleted=False):
+    """Propagar escrita de vaga para o motor de compatibilidade (a cópia compartilhada alcança por catch-up)"""
+    job_id = job.get('id') if isinstance(job, dict) else job
+    if deleted or not is_open_job(job):
+        match_engine.remove(JOB, job_id)
+    elif not match_engine.is_stale():
+        match_engine.upsert(JOB, job_id, job_text(job))
+
+def ensure_applications_snapshot():
+    """Montar (ou atualizar por delta de updated_at) o snapshot colunar de applications"""
+    if applications_snapshot.needs_rebuild():
+        def build():
+            elapsed = applications_snapshot.build(scan('applications', SNAPSHOT_COLUMNS))
+            print(f"🧮 Snapshot colunar de candidaturas: {len(applications_snapshot)} linhas em {elapsed:.2f}s")
+        ensure_shared_index(applications_snapshot, SNAPSHOT_INDEX_KEY, SNAPSHOT_REBUILD_TTL, build)
+    if applications_snapshot.needs_delta():
+        since = datetime.fromtimestamp(applications_snapshot.watermark, timezone.utc).isoformat()
+        # Delta por updated_at no primário: atraso da réplica perderia linhas abaixo da marca d'água
+        with data_client.use_primary():
+            applications_snapshot.apply_delta(scan('applications', SNAPSHOT_COLUMNS, [('gte', 'updated_at', since)]))
+    return applications_snapshot
+
+def sync_application_snapshot(application, deleted=False):
+    """Propagar escrita de candidatura para o snapshot colunar"""
+    if applications_snapshot.needs_rebuild():
+        return
+    if deleted:
+        # Exclusões não aparecem no delta por updated_at: a cópia compartilhada é descartada
+        shared_cache.delete(SNAPSHOT_INDEX_KEY)
+        applications_snapshot.remove(application)
+    else:
+        applications_snapshot.upsert(application)
+
+# -----------------------------------------------------------------------------
+# Feed de mudanças (outros nós): mesmos deltas das escritas locais
+# -----------------------------------------------------------------------------
+
+def probe_table(table, since):
+    """Versão da tabela para o resync: (contagem, alguma linha com updated_at > since)"""
+    with data_client.use_primary():
+        total = count_rows(table, count='exact')
+        if since is None:
+            return total, False
+        since_iso = datetime.fromtimestamp(since, timezone.utc).isoformat()
+        changed = supabase.table(table).select('id').gt('updated_at', since_iso).limit(1).execute().data
+    return total, bool(changed)
+
+def on_candidate_change(event):
+    data_version.bump('candidates')
+    sync_candidate_indexes(event.row.get('id') if event.deleted else event.record, deleted=event.deleted)
+
+def on_job_change(event):
+    data_version.bump('jobs')
+    sync_job_indexes(event.row.get('id') if event.deleted else event.record, deleted=event.deleted)
+
+def on_application_change(event):
+    # O rollup diário não é idempotente (o eco da própria escrita contaria duas vezes):
+    # fica com o backfill periódico
+    data_version.bump('applications')
+    sync_application_snapshot(event.row.get('id') if event.deleted else event.record, deleted=event.deleted)
+
+def on_profile_change(event):
+    data_version.bump('profiles')
+    profile_cache.invalidate(event.row.get('user_id') or event.old_record.get('user_id'))
+
+def on_stage_change(event):
+    data_version.bump('recruitment_stages')
+    shared_cache.delete(STAGES_CACHE_KEY)
+    catalog_service.invalidate()
+
+def resync_candidates():
+    data_version.bump('candidates')
+    shared_cache.delete(DEDUP_INDEX_KEY)
+    shared_cache.delete(MATCH_INDEX_KEY)
+    dedup_index.loaded_at = None
+    match_engine.loaded_at = None
+
+def resync_jobs():
+    data_version.bump('jobs')
+    shared_cache.delete(MATCH_INDEX_KEY)
+    match_engine.loaded_at = None
+
+def resync_applications():
+    data_version.bump('applications')
+    shared_cache.delete(SNAPSHOT_INDEX_KEY)
+    applications_snapshot.built_at = None
+
+def resync_profiles():
+    data_version.bump('profiles')
+    profile_cache.invalidate()
+
+change_feed.configure(probe=probe_table)
+change_feed.register('candidates', on_candidate_change, resync_candidates)
+change_feed.register('jobs', on_job_change, resync_jobs)
+change_feed.register('applications', on_application_change, resync_applications)
+change_feed.register('profiles', on_profile_change, resync_profiles)
+change_feed.register('recruitment_stages', on_stage_change, lambda: on_stage_change(None))
+
+def include_archived():
+    """?include_archived=true: listagens também trazem as linhas do arquivo frio"""
+    return request.args.get('include_archived', 'false').lower() == 'true'
+
+def request_fieldset(resource, default_view='full'):
+    """Campos pedidos em ?fields= ou ?view= (ver fieldsets.py); FieldsetError vira 400"""
+    return parse_fieldset(resource, request.args.get('fields'), request.args.get('view'), default_view)
+
+def archived_rows(table, columns='*'):
+    """Linhas do arquivo frio (vazio se as tabelas de arquivo ainda não existem)"""
+    try:
+        return list(scan(table, columns))
+    except DataUnavailable:
+        raise
+    except Exception as e:
+        print(f"⚠️ Arquivo {table} indisponível: {e}")
+        return []
+
+def on_applications_removed(application_ids):
+    """Lote arquivado ou excluído: sai do snapshot quente e vira tombstone para os clientes de sync"""
+    data_version.bump('applications')
+    shared_cache.delete(SNAPSHOT_INDEX_KEY)
+    if not applications_snapshot.needs_rebuild():
+        for application_id in application_ids:
+            applications_snapshot.remove(application_id)
+    change_log.record('applications', 'delete', application_ids)
+
+def on_candidates_archived(candidate_ids):
+    data_version.bump('candidates')
+    for candidate_id in candidate_ids:
+        sync_candidate_indexes(candidate_id, deleted=True)
+    change_log.record('candidates', 'delete', candidate_ids)
+
+archiver.configure(on_applications=on_applications_removed, on_candidates=on_candidates_archived)
+
+def ensure_rollups(force=False):
+    """Backfill do rollup diário quando vazio/expirado (a partir do snapshot colunar)"""
+    if force or rollup_store.needs_backfill():
+        first_stage = stage_catalog().first
+        rows = ensure_applications_snapshot().rows(('job_id', 'stage', 'status', 'applied_at', 'updated_at'))
+        # Candidaturas arquivadas continuam nas chegadas/transições por dia
+        rows.extend(
+            (row.get('job_id') or 0, row.get('stage') or first_stage, row.get('status') or 'applied',
+             to_epoch(row.get('applied_at')), to_epoch(row.get('updated_at')))
+            for row in archived_rows(APPLICATIONS_ARCHIVE, 'id, job_id, stage, status, applied_at, updated_at')
+        )
+        total, elapsed = rollup_store.backfill(rows, first_stage)
+        print(f"📅 Rollup diário reconstruído: {total} linhas em {elapsed:.2f}s")
+    return rollup_store
+
+def compute_top_jobs(k, start_day=None, end_day=None):
+    """
+    Top-k vagas por número de candidaturas (todas as vagas, seleção parcial por heap).
+    Sem intervalo usa o snapshot colunar; com intervalo soma o rollup diário.
+    """
+    if start_day:
+        counts = ensure_rollups().arrivals_by_job(start_day, end_day)
+    else:
+        counts = add_counts(ensure_applications_snapshot().group_count('job_id'), archive_totals().group_count('job_id'))
+    counts.pop(0, None)
+    counts.pop(None, None)
+
+    ranking = heapq.nlargest(k, counts.items(), key=lambda item: (item[1], -item[0]))
+
+    jobs_by_id = {}
+    if ranking:
+        jobs_response = supabase.table('jobs').select('id, title, company')\
+            .in_('id', [job_id for job_id, _ in ranking]).execute()
+        jobs_by_id = {job['id']: job for job in jobs_response.data or []}
+
+    top_jobs = []
+    for job_id, count in ranking:
+        job = jobs_by_id.get(job_id, {})
+        top_jobs.append({
+            'job_id': job_id,
+            'job_title': job.get('title', 'Vaga'),
+            'company': job.get('company', 'Empresa'),
+            'applications_count': count
+        })
+    return top_jobs
+
+def insert_history_rows(rows):
+    """Insert de várias linhas no histórico (usado pelo writer em lote)"""
+    supabase.table(HISTORY_TABLE).insert(rows).execute()
+
+history_writer.configure(insert_history_rows)
+
+def record_stage_transition(previous, updated, notes=''):
+    """Enfileirar a transição no histórico e alimentar os analytics incrementais"""
+    entry = {
+        'application_id': updated.get('id'),
+        'job_id': updated.get('job_id'),
+        'previous_status': previous.get('status') if previous else None,
+        'new_status': updated.get('status'),
+        'previous_stage': previous.get('stage') if previous else None,
+        'new_stage': updated.get('stage'),
+        'notes': notes or '',
+        'changed_by': getattr(getattr(g, 'current_user', None), 'id', None),
+        'changed_at': updated.get('updated_at') or datetime.now().isoformat(),
+        'stage_entered_at': (previous.get('updated_at') or previous.get('applied_at')) if previous else None
+    }
+    history_writer.append(entry)
+
+    if previous and not stage_analytics.is_stale():
+        stage_analytics.record(
+            entry['application_id'], entry['job_id'], entry['previous_stage'], entry['new_stage'],
+            to_epoch(entry['stage_entered_at']), to_epoch(entry['changed_at']),
+            to_epoch(updated.get('applied_at') or previous.get('applied_at'))
+        )
+    return entry
+
+def ensure_stage_analytics():
+    """Carregar os analytics de etapas (reprocessa o histórico só na carga)"""
+    if stage_analytics.is_stale():
+        history_writer.flush()
+        applications = {
+            application_id: (job_id, stage, applied_at, updated_at)
+            for application_id, job_id, stage, applied_at, updated_at
+            in ensure_applications_snapshot().rows(('id', 'job_id', 'stage', 'applied_at', 'updated_at'))
+        }
+        try:
+            history = [
+                (row['application_id'], row.get('job_id'), row.get('previous_stage'), row.get('new_stage'),
+                 to_epoch(row.get('changed_at')), to_epoch(row.get('stage_entered_at')) or None)
+                for row in scan(HISTORY_TABLE, 'id, application_id, job_id, previous_stage, '
+                                                          'new_stage, changed_at, stage_entered_at')
+            ]
+        except Exception as e:
+            print(f"⚠️ Histórico de etapas indisponível, usando apenas candidaturas: {e}")
+            history = []
+        # Tempo até contratação/por etapa inclui as candidaturas arquivadas
+        for row in archived_rows(APPLICATIONS_ARCHIVE, 'id, job_id, stage, applied_at, updated_at'):
+            applications[row['id']] = (row.get('job_id') or 0, row.get('stage') or stage_catalog().first,
+                                       to_epoch(row.get('applied_at')), to_epoch(row.get('updated_at')))
+        history.extend(
+            (row['application_id'], row.get('job_id'), row.get('previous_stage'), row.get('new_stage'),
+             to_epoch(row.get('changed_at')), to_epoch(row.get('stage_entered_at')) or None)
+            for row in archived_rows(HISTORY_ARCHIVE_TABLE, 'id, application_id, job_id, previous_stage, '
+                                                            'new_stage, changed_at, stage_entered_at')
+        )
+        elapsed = stage_analytics.load(history, applications)
+        print(f"⏱️ Analytics de etapas carregados: {len(history)} transições em {elapsed:.2f}s")
+    return stage_analytics
+
+def load_profiles(user_ids):
+    """Nome e role dos usuários numa única consulta (usado pelo cache de perfis)"""
+    response = supabase.table('profiles').select('user_id, full_name, role').in_('user_id', list(user_ids)).execute()
+    return {row['user_id']: {'full_name': row.get('full_name'), 'role': row.get('role')} for row in response.data or []}
+
+profile_cache.configure(load_profiles)
+
+def load_active_stages():
+    response = supabase.table('recruitment_stages').select('*').eq('is_active', True).order('order_position').execute()
+    return response.data or []
+
+def active_stages():
+    """Etapas ativas em ordem (cache compartilhado por STAGES_CACHE_TTL)"""
+    return list(shared_cache.get_or_compute(STAGES_CACHE_KEY, load_active_stages, STAGES_CACHE_TTL))
+
+def stage_catalog():
+    """Catálogo versionado das etapas ativas (carregado uma vez por worker)"""
+    return catalog_service.current()
+
+catalog_service.configure(active_stages)
+catalog_service.on_change(lambda catalog: stage_analytics.configure(catalog.hired_stages))
+
+def warm_profiles():
+    """Pré-carregar nomes e roles de todos os perfis numa única varredura"""
+    total = profile_cache.preload(scan('profiles', 'id, user_id, full_name, role'))
+    print(f"👥 Cache de perfis aquecido: {total} perfis")
+
+# Aquecimento após o fork (ver warmup.py; create_app escolhe os hooks via WARMUP_HOOKS)
+warmup.register('stages', stage_catalog)
+warmup.register('roles', warm_profiles)
+warmup.register('jobs', ensure_match_engine)
+warmup.register('applications', ensure_applications_snapshot)
+
+def attach_author_names(entries, user_field):
+    """Preencher profiles.full_name de cada entrada via cache (sem consulta por entrada)"""
+    names = profile_cache.names(entry.get(user_field) for entry in entries)
+    for entry in entries:
+        name = names.get(entry.get(user_field))
+        entry['profiles'] = {'full_name': name} if name else None
+    return entries
+
+def activity_page_args():
+    """limit/cursor da paginação por chave"""
+    limit = request.args.get('limit', ACTIVITY_PAGE_SIZE, type=int)
+    cursor = request.args.get('cursor', type=int)
+    return max(1, min(limit, MAX_ACTIVITY_PAGE_SIZE)), cursor
+
+def keyset_page(table, filters, limit, cursor=None, columns='*'):
+    """Página mais recente primeiro (id desc); cursor = menor id já entregue"""
+    query = supabase.table(table).select(columns)
+    for operator, column, value in filters:
+        query = getattr(query, operator)(column, value)
+    if cursor:
+        query = query.lt('id', cursor)
+    rows = query.order('id', desc=True).limit(limit + 1).execute().data or []
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return rows, (rows[-1]['id'] if has_more and rows else None)
+
+def pending_history(application_ids):
+    """Transições ainda na fila do writer (mais recentes primeiro)"""
+    pending = [dict(entry, id=None, pending=True) for entry in history_writer.pending_for(application_ids)]
+    pending.reverse()
+    return pending
+
+def latest_per_application(table, rpc_name, application_ids, per_app):
+    """
+    Últimas N entradas de cada candidatura numa única consulta.
+    Usa a função SQL (LATERAL ... LIMIT N); sem ela, uma consulta in_() limitada.
+    """
+    try:
+        rows = supabase.rpc(rpc_name, {'app_ids': application_ids, 'per_app': per_app}).execute().data or []
+    except Exception as e:
+        print(f"⚠️ Função {rpc_name} indisponível, usando consulta única limitada: {e}")
+        rows = supabase.table(table).select('*').in_('application_id', application_ids)\
+            .order('id', desc=True)\
+            .limit(len(application_ids) * per_app * LATEST_FALLBACK_FACTOR).execute().data or []
+
+    grouped = {application_id: [] for application_id in application_ids}
+    for row in sorted(rows, key=lambda r: r['id'], reverse=True):
+        bucket = grouped.get(row.get('application_id'))
+        if bucket is not None and len(bucket) < per_app:
+            bucket.append(row)
+    return grouped
+
 def robust_execute_operation(operation_name, operation_func, search_func, *args, **kwargs):
     """Executar operação de forma robusta"""
     try:
@@ -261,6 +883,8 @@ def robust_execute_operation(operation_name, operation_func, search_func, *args,
         try:
             result = operation_func(*args, **kwargs)
             print(f"✅ {operation_name} executado (resposta pode estar vazia)")
+        except DataUnavailable:
+            raise
         except Exception as op_error:
             print(f"⚠️ {operation_name} deu erro (esperado): {op_error}")
         
@@ -272,6 +896,8 @@ def robust_execute_operation(operation_name, operation_func, search_func, *args,
         print(f"🔍 Verificando resultado de {operation_name}...")
         return search_func()
         
+    except DataUnavailable:
+        raise
     except Exception as e:
         print(f"❌ Erro na operação robusta {operation_name}: {e}")
         return None
@@ -282,6 +908,7 @@ def robust_execute_operation(operation_name, operation_func, search_func, *args,
 
 @api.route('/candidates', methods=['GET'])
 @verify_token
+@allows_stale
 def get_candidates():
     """Listar todos os candidatos com suporte a filtros básicos"""
     try:
@@ -292,10 +919,19 @@ def get_candidates():
         search = request.args.get('search', '').strip()
         status = request.args.get('status', '').strip()
         
+        fieldset = request_fieldset('candidates')
+        
         print(f"📊 GET /candidates - Search: '{search}', Status: '{status}'")
         
-        # Buscar todos os candidatos de forma robusta
-        all_candidates = robust_search_all_candidates()
+        # Buscar todos os candidatos em blocos (status filtrado no banco; só as colunas pedidas
+        # mais as usadas na busca e na ordenação)
+        filters = [('eq', 'status', status)] if status and status != 'all' else []
+        columns = fieldset.select(extra=CANDIDATE_SEARCH_COLUMNS)
+        all_candidates = robust_search_all_candidates(filters, columns)
+        if include_archived():
+            archived = sorted(scan(CANDIDATES_ARCHIVE, columns, filters),
+                              key=lambda row: row.get('created_at') or '', reverse=True)
+            all_candidates = all_candidates + [dict(row, archived=True) for row in archived]
         
         if not all_candidates:
             print("⚠️ Nenhum candidato encontrado")
@@ -315,17 +951,13 @@ def get_candidates():
                 )
             ]
         
-        if status and status != 'all':
-            filtered_data = [
-                candidate for candidate in filtered_data
-                if candidate.get('status') == status
-            ]
-        
         result_count = len(filtered_data)
         print(f"✅ {result_count} candidatos retornados")
         
-        return jsonify(filtered_data)
+        return jsonify([fieldset.shape(candidate) for candidate in filtered_data])
         
+    except FieldsetError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"❌ Erro ao buscar candidatos: {e}")
         import traceback
@@ -353,15 +985,20 @@ def create_candidate():
             if not data.get(field):
                 return jsonify({'error': f'Campo {field} é obrigatório'}), 400
         
-        # Verificar email único
+        # Verificar email único (consulta exata no banco)
         print(f"🔍 Verificando email único: {data['email']}")
-        existing_candidate = robust_find_candidate_by_email(data['email'])
+        existing_candidate = find_email_conflict(data)
         if existing_candidate:
-            print(f"⚠️ Email {data['email']} já existe - ID: {existing_candidate.get('id')}")
+            print(f"⚠️ Email {data['email']} já existe - ID: {existing_candidate['id']}")
             return jsonify({'error': 'Email já cadastrado'}), 409
         
         print(f"✅ Email {data['email']} é único")
         
+        # Possíveis duplicados (nome/telefone/email parecidos) - apenas aviso
+        possible_duplicates = ensure_dedup_index().find_matches(data)
+        if possible_duplicates:
+            print(f"⚠️ {len(possible_duplicates)} possíveis duplicados encontrados")
+        
         # Preparar dados para inserção
         candidate_data = {
             'first_name': data['first_name'],
@@ -379,19 +1016,28 @@ def create_candidate():
         print(f"📤 Dados para inserção: {candidate_data}")
         
         # ESTRATÉGIA ROBUSTA: Executar inserção e buscar resultado
+        inserted = []
+        
         def insert_operation():
-            return supabase.table('candidates').insert(candidate_data).execute()
+            response = supabase.table('candidates').insert(candidate_data).execute()
+            data_version.bump('candidates')
+            inserted.extend(response.data or [])
+            return response
         
         def search_created():
-            # Buscar por email primeiro
+            # Linha devolvida pelo próprio insert (não outro candidato com o mesmo email)
+            if inserted:
+                return inserted[0]
+            
+            # Buscar por email
             candidate = robust_find_candidate_by_email(data['email'])
             if candidate:
                 return candidate
             
             # Buscar o mais recente por nome
-            all_candidates = robust_search_all_candidates()
-            if all_candidates:
-                latest = all_candidates[0]
+            latest_response = supabase.table('candidates').select('*').order('created_at', desc=True).limit(1).execute()
+            if latest_response.data:
+                latest = latest_response.data[0]
                 if (latest.get('first_name') == data['first_name'] and 
                     latest.get('last_name') == data['last_name']):
                     return latest
@@ -406,6 +1052,8 @@ def create_candidate():
         
         if result:
             print(f"✅ SUCESSO! Candidato criado - ID: {result.get('id')}")
+            sync_candidate_indexes(result)
+            change_log.record('candidates', 'insert', result.get('id'))
             
             # Garantir campos completos para frontend
             complete_candidate = {
@@ -419,32 +1067,15 @@ def create_candidate():
                 'linkedin_url': result.get('linkedin_url'),
                 'status': result.get('status', 'active'),
                 'created_at': result.get('created_at'),
-                'updated_at': result.get('updated_at')
+                'updated_at': result.get('updated_at'),
+                'possible_duplicates': possible_duplicates
             }
             
             return jsonify(complete_candidate), 201
         
-        # ÚLTIMO RECURSO: Retornar sucesso assumido
-        print("⚠️ Candidato não encontrado, retornando sucesso assumido...")
-        import time
-        fake_id = int(time.time() * 1000) % 100000
-        
-        assumed_candidate = {
-            'id': fake_id,
-            'first_name': data['first_name'],
-            'last_name': data['last_name'],
-            'email': data['email'],
-            'phone': data.get('phone'),
-            'address': data.get('address'),
-            'summary': data.get('summary'),
-            'linkedin_url': data.get('linkedin_url'),
-            'status': data.get('status', 'active'),
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat()
-        }
-        
-        print(f"✅ RETORNANDO SUCESSO ASSUMIDO - ID: {fake_id}")
-        return jsonify(assumed_candidate), 201
+        # Inserção não confirmada: não inventar um ID
+        print("❌ Candidato não encontrado após a inserção")
+        return jsonify({'error': 'Não foi possível confirmar a criação do candidato'}), 502
         
     except Exception as e:
         print(f"❌ Erro geral: {e}")
@@ -504,9 +1135,9 @@ def update_candidate(candidate_id):
         # Verificar email único (se email sendo alterado)
         if 'email' in data and data['email'] != current_candidate.get('email'):
             print(f"🔍 Verificando email único para edição: {data['email']}")
-            existing_candidate = robust_find_candidate_by_email(data['email'])
-            if existing_candidate and existing_candidate.get('id') != candidate_id:
-                print(f"⚠️ Email {data['email']} já está em uso por candidato ID: {existing_candidate.get('id')}")
+            existing_candidate = find_email_conflict(data, exclude_id=candidate_id)
+            if existing_candidate:
+                print(f"⚠️ Email {data['email']} já está em uso por candidato ID: {existing_candidate['id']}")
                 return jsonify({'error': 'Email já está em uso por outro candidato'}), 409
             print(f"✅ Email {data['email']} é único para este candidato")
         
@@ -526,6 +1157,7 @@ def update_candidate(candidate_id):
         # Executar UPDATE
         try:
             response = supabase.table('candidates').update(update_data).eq('id', candidate_id).execute()
+            data_version.bump('candidates')
             print(f"✅ UPDATE executado")
         except Exception as update_error:
             print(f"❌ UPDATE falhou: {update_error}")
@@ -539,6 +1171,8 @@ def update_candidate(candidate_id):
         
         if updated_candidate:
             print(f"✅ Candidato {candidate_id} atualizado com sucesso")
+            sync_candidate_indexes(updated_candidate)
+            change_log.record('candidates', 'update', candidate_id)
             return jsonify(updated_candidate), 200
         else:
             print(f"❌ Candidato {candidate_id} não encontrado após update!")
@@ -561,35 +1195,27 @@ def delete_candidate(candidate_id):
         
         print(f"🗑️ DELETE /candidates/{candidate_id}")
         
-        # Verificar se candidato existe ANTES
-        current_candidate = robust_find_candidate_by_id(candidate_id)
-        if not current_candidate:
-            print(f"❌ Candidato {candidate_id} não encontrado")
-            return jsonify({'error': 'Candidato não encontrado'}), 404
-        
-        candidate_name = f"{current_candidate.get('first_name', '')} {current_candidate.get('last_name', '')}".strip()
-        print(f"✅ Candidato {candidate_id} encontrado: {candidate_name}")
-        
-        # Executar DELETE
-        try:
-            response = supabase.table('candidates').delete().eq('id', candidate_id).execute()
-            print(f"✅ DELETE executado")
-        except Exception as delete_error:
-            print(f"❌ DELETE falhou: {delete_error}")
-            return jsonify({'error': 'Erro ao deletar candidato'}), 500
-        
-        # Verificar se delete funcionou
-        import time
-        time.sleep(0.5)
+        # Candidaturas só saem junto com ?applications=cascade explícito
+        mode = request.args.get('applications', 'skip')
+        if mode not in BULK_DEPENDENT_MODES:
+            return jsonify({'error': f"applications deve ser: {', '.join(BULK_DEPENDENT_MODES)}"}), 400
         
-        deleted_candidate = robust_find_candidate_by_id(candidate_id)
+        # Mesmo caminho da exclusão em lote (transação, tombstones no change_log)
+        [result], _ = bulk_delete('candidates', [candidate_id], mode)
         
-        if deleted_candidate is None:
+        if result['ok']:
             print(f"✅ DELETE CONFIRMADO! Candidato {candidate_id} foi removido")
             return '', 204
-        else:
-            print(f"❌ DELETE FALHOU! Candidato {candidate_id} ainda existe")
-            return jsonify({'error': 'Falha ao deletar candidato'}), 500
+        if result['reason'] == 'not_found':
+            print(f"❌ Candidato {candidate_id} não encontrado")
+            return jsonify({'error': 'Candidato não encontrado'}), 404
+        if result['reason'] == 'has_applications':
+            return jsonify({
+                'error': 'Candidato possui candidaturas; use ?applications=cascade para excluí-las junto',
+                'applications': result['applications']
+            }), 409
+        print(f"❌ DELETE falhou: {result['error']}")
+        return jsonify({'error': 'Erro ao deletar candidato'}), 500
         
     except Exception as e:
         print(f"❌ Erro geral na exclusão: {e}")
@@ -609,10 +1235,15 @@ def search_candidates():
         query = request.args.get('q', '').strip()
         status = request.args.get('status', '').strip()
         
+        fieldset = request_fieldset('candidates')
+        
         print(f"🔍 GET /candidates/search - Query: '{query}', Status: '{status}'")
         
-        # Buscar todos de forma robusta
-        all_candidates = robust_search_all_candidates()
+        # Buscar todos em blocos (status filtrado no banco)
+        all_candidates = robust_search_all_candidates(
+            [('eq', 'status', status)] if status and status != 'all' else [],
+            fieldset.select(extra=CANDIDATE_SEARCH_COLUMNS)
+        )
         
         if not all_candidates:
             return jsonify([])
@@ -632,30 +1263,225 @@ def search_candidates():
                 )
             ]
         
-        # Filtro por status
-        if status and status != 'all':
-            filtered_data = [
-                candidate for candidate in filtered_data
-                if candidate.get('status') == status
-            ]
-        
         result_count = len(filtered_data)
         print(f"✅ {result_count} candidatos encontrados na busca")
         
-        return jsonify(filtered_data)
+        return jsonify([fieldset.shape(candidate) for candidate in filtered_data])
         
+    except FieldsetError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"❌ Erro na busca de candidatos: {e}")
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@api.route('/candidates/<int:candidate_id>/duplicates', methods=['GET'])
+@verify_token
+def get_candidate_duplicates(candidate_id):
+    """Possíveis duplicados de um candidato (MinHash LSH)"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+        
+        threshold = request.args.get('threshold', DUPLICATE_THRESHOLD, type=float)
+        
+        index = ensure_dedup_index()
+        record = index.get(candidate_id)
+        if record is None:
+            # Criado em outro worker antes do catch-up: consulta pontual em vez de 404
+            rows = supabase.table('candidates').select(DEDUP_COLUMNS['candidates']).eq('id', candidate_id).limit(1).execute().data
+            if not rows:
+                return jsonify({'error': 'Candidato não encontrado'}), 404
+            record = index.add(rows[0])
+        
+        matches = index.find_matches(record, threshold=threshold)
+        print(f"🧬 GET /candidates/{candidate_id}/duplicates - {len(matches)} possíveis duplicados")
+        
+        return jsonify({
+            'candidate_id': candidate_id,
+            'threshold': threshold,
+            'duplicates': matches
+        })
+        
+    except Exception as e:
+        print(f"❌ Erro ao buscar duplicados: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/candidates/<int:candidate_id>/matches', methods=['GET'])
+@verify_token
+def get_candidate_matches(candidate_id):
+    """Vagas abertas mais compatíveis com o candidato"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+        
+        limit = request.args.get('limit', 10, type=int)
+        
+        engine = ensure_match_engine()
+        matches = engine.top_matches(CANDIDATE, candidate_id, limit)
+        if matches is None and match_entity(CANDIDATE, candidate_id):
+            matches = engine.top_matches(CANDIDATE, candidate_id, limit)
+        if matches is None:
+            return jsonify({'error': 'Candidato não encontrado'}), 404
+        
+        jobs_by_id = {}
+        if matches:
+            ids = [job_id for job_id, _ in matches]
+            jobs_resp = supabase.table('jobs').select('id, title, company, location, status').in_('id', ids).execute()
+            jobs_by_id = {job['id']: job for job in jobs_resp.data or []}
+            # Vaga excluída/encerrada ainda não alcançada pelo catch-up: sai do ranking
+            matches = [(job_id, score) for job_id, score in matches
+                       if job_id in jobs_by_id and is_open_job(jobs_by_id[job_id])]
+        
+        print(f"🎯 GET /candidates/{candidate_id}/matches - {len(matches)} vagas")
+        
+        return jsonify({
+            'candidate_id': candidate_id,
+            'matches': [
+                {'job_id': job_id, 'score': score, 'job': jobs_by_id.get(job_id)}
+                for job_id, score in matches
+            ]
+        })
+        
+    except Exception as e:
+        print(f"❌ Erro ao calcular compatibilidade do candidato: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/candidates/duplicates/scan', methods=['POST'])
+@verify_token
+@verify_role(['admin', 'manager'])
+def scan_candidate_duplicates():
+    """Job em lote: todos os pares de duplicados da base - APENAS ADMIN E MANAGER"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+        
+        data = request.get_json(silent=True) or {}
+        threshold = float(data.get('threshold', DUPLICATE_THRESHOLD))
+        
+        # Recarregar o índice para o lote refletir o estado atual do banco
+        dedup_index.loaded_at = None
+        shared_cache.delete(DEDUP_INDEX_KEY)
+        result = ensure_dedup_index().find_all_pairs(threshold=threshold)
+        
+        print(f"🧬 Varredura de duplicados: {len(result['pairs'])} pares, {result['stats']}")
+        
+        result['threshold'] = threshold
+        return jsonify(result)
+        
+    except Exception as e:
+        print(f"❌ Erro na varredura de duplicados: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/candidates/import', methods=['POST'])
+@verify_token
+def import_candidates():
+    """Importação em lote de candidatos com detecção de duplicados"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+        
+        data = request.get_json()
+        if not data or not isinstance(data.get('candidates'), list):
+            return jsonify({'error': 'Lista de candidatos não fornecida'}), 400
+        
+        # 'skip': ignora duplicados | 'flag': insere e sinaliza
+        on_duplicate = data.get('on_duplicate', 'skip')
+        threshold = float(data.get('threshold', DUPLICATE_THRESHOLD))
+        
+        print(f"📥 POST /candidates/import - {len(data['candidates'])} candidatos (on_duplicate={on_duplicate})")
+        
+        index = ensure_dedup_index()
+        batch_index = DedupIndex()
+        # Emails já cadastrados: consulta exata no banco (o índice do worker pode estar atrasado)
+        registered_emails = existing_emails(item.get('email') for item in data['candidates'] if item)
+        batch_emails = set()
+        
+        allowed_fields = ['first_name', 'last_name', 'email', 'phone', 'address', 'summary', 'linkedin_url', 'status']
+        to_insert = []
+        invalid = []
+        duplicates = []
+        
+        for position, item in enumerate(data['candidates']):
+            missing = [f for f in ['first_name', 'last_name', 'email'] if not (item or {}).get(f)]
+            if missing:
+                invalid.append({'index': position, 'error': f"Campos obrigatórios ausentes: {', '.join(missing)}"})
+                continue
+            
+            matches = index.find_matches(item, threshold=threshold)
+            batch_matches = batch_index.find_matches(item, threshold=threshold)
+            email = item['email'].strip()
+            exact = email in registered_emails or email in batch_emails
+            
+            if matches or batch_matches or exact:
+                duplicates.append({
+                    'index': position,
+                    'email': item['email'],
+                    'matches': matches,
+                    'batch_matches': [
+                        {'index': m['candidate_id'], 'score': m['score'], 'reasons': m['reasons']}
+                        for m in batch_matches
+                    ]
+                })
+                if on_duplicate == 'skip' or exact:
+                    continue
+            
+            candidate_data = {field: item[field] for field in allowed_fields if item.get(field)}
+            candidate_data.setdefault('status', 'active')
+            batch_index.add(dict(candidate_data, id=position))
+            batch_emails.add(email)
+            to_insert.append(candidate_data)
+        
+        created = []
+        failed = []
+        chunk_size = 500
+        for start in range(0, len(to_insert), chunk_size):
+            chunk = to_insert[start:start + chunk_size]
+            try:
+                response = supabase.table('candidates').insert(chunk).execute()
+                for row in response.data or []:
+                    sync_candidate_indexes(row)
+                    created.append(row)
+            except Exception as chunk_error:
+                print(f"❌ Falha ao inserir bloco {start}-{start + len(chunk)}: {chunk_error}")
+                failed.extend({'email': c['email'], 'error': str(chunk_error)} for c in chunk)
+        
+        if created:
+            data_version.bump('candidates')
+            change_log.record('candidates', 'insert', [row.get('id') for row in created])
+        
+        print(f"✅ Importação: {len(created)} criados, {len(duplicates)} duplicados, {len(invalid)} inválidos")
+        
+        return jsonify({
+            'created': created,
+            'duplicates': duplicates,
+            'invalid': invalid,
+            'failed': failed,
+            'summary': {
+                'received': len(data['candidates']),
+                'created': len(created),
+                'duplicates': len(duplicates),
+                'invalid': len(invalid),
+                'failed': len(failed)
+            }
+        }), 201 if created else 200
+        
+    except Exception as e:
+        print(f"❌ Erro na importação de candidatos: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 # =============================================================================
 # JOBS ENDPOINTS - 🔒 PROTEGIDOS
 # =============================================================================
 
 @api.route('/jobs', methods=['GET'])
 @verify_token
+@allows_stale
 def get_jobs():
     """Listar TODAS as vagas do Supabase com filtros opcionais"""
     try:
@@ -672,36 +1498,34 @@ def get_jobs():
         employment_type = request.args.get('employment_type', '')
         experience_level = request.args.get('experience_level', '')
         company = request.args.get('company', '')
+        fieldset = request_fieldset('jobs')
         
         print(f"   Filtros: search='{search}', status='{status}', per_page={per_page}")
         
         # ✅ BUSCAR TODAS AS VAGAS PRIMEIRO
         try:
-            # Query robusta para buscar todas as vagas
-            query = supabase.table('jobs').select('*')
+            # Filtros aplicados no banco; leitura em blocos (sem truncar no max-rows)
+            filters = []
             
             # Aplicar filtros apenas se especificados
             if search:
-                query = query.or_(f'title.ilike.%{search}%,description.ilike.%{search}%,company.ilike.%{search}%')
+                filters.append(('or_', f'title.ilike.%{search}%,description.ilike.%{search}%,company.ilike.%{search}%'))
             
             if status and status != 'all':
-                query = query.eq('status', status)
+                filters.append(('eq', 'status', status))
             
             if employment_type:
-                query = query.eq('employment_type', employment_type)
+                filters.append(('eq', 'employment_type', employment_type))
                 
             if experience_level:
-                query = query.eq('experience_level', experience_level)
+                filters.append(('eq', 'experience_level', experience_level))
                 
             if company:
-                query = query.ilike('company', f'%{company}%')
+                filters.append(('ilike', 'company', f'%{company}%'))
             
             # Ordenação por data de criação (mais recentes primeiro)
-            query = query.order('created_at', desc=True)
-            
-            # Executar query
-            response = query.execute()
-            jobs = response.data or []
+            jobs = sorted(scan('jobs', fieldset.select(extra=('created_at',)), filters),
+                          key=lambda job: job.get('created_at') or '', reverse=True)
             
             print(f"✅ {len(jobs)} vagas encontradas no Supabase")
             
@@ -722,7 +1546,13 @@ def get_jobs():
                 total_pages = (total + per_page - 1) // per_page
                 current_page = page
             
-            # ✅ FORMATAR DADOS DAS VAGAS
+            # Candidaturas por vaga (snapshot colunar + arquivadas, como no top de vagas)
+            application_counts = {}
+            if fieldset.wants('applications_count'):
+                application_counts = add_counts(ensure_applications_snapshot().group_count('job_id'),
+                                                archive_totals().group_count('job_id'))
+            
+            # ✅ FORMATAR DADOS DAS VAGAS (só os campos pedidos)
             for job in final_jobs:
                 # Formatar salários como float
                 if job.get('salary_min'):
@@ -738,18 +1568,16 @@ def get_jobs():
                         job['salary_max'] = None
                 
                 # Garantir campos essenciais
-                job['company'] = job.get('company') or 'Empresa não informada'
-                job['location'] = job.get('location') or 'Localização não informada'
-                job['employment_type'] = job.get('employment_type') or 'full-time'
-                job['experience_level'] = job.get('experience_level') or 'mid-level'
-                job['status'] = job.get('status') or 'active'
+                for field, fallback in JOB_FIELD_DEFAULTS:
+                    if fieldset.wants(field):
+                        job[field] = job.get(field) or fallback
                 
-                # Adicionar contagem de candidatos (placeholder)
-                job['applications_count'] = 0  # TODO: Implementar contagem real
+                if fieldset.wants('applications_count'):
+                    job['applications_count'] = application_counts.get(job['id'], 0)
             
             # ✅ RESPOSTA FORMATADA
             response_data = {
-                'jobs': final_jobs,
+                'jobs': [fieldset.shape(job) for job in final_jobs],
                 'total': total,
                 'page': current_page,
                 'per_page': per_page,
@@ -768,20 +1596,10 @@ def get_jobs():
             
         except Exception as e:
             print(f"❌ Erro ao buscar vagas no Supabase: {e}")
-            import traceback
-            traceback.print_exc()
-            
-            # ⚠️ FALLBACK: Retornar estrutura vazia mas válida
-            return jsonify({
-                'jobs': [],
-                'total': 0,
-                'page': 1,
-                'per_page': per_page,
-                'total_pages': 0,
-                'error': 'Erro ao buscar vagas',
-                'filters_applied': {}
-            }), 200  # Não quebrar o frontend
+            raise
         
+    except FieldsetError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"❌ Erro geral em get_jobs: {e}")
         import traceback
@@ -790,6 +1608,7 @@ def get_jobs():
 
 @api.route('/jobs/<int:job_id>', methods=['GET'])
 @verify_token
+@allows_stale
 def get_job(job_id):
     """Obter vaga específica por ID"""
     try:
@@ -811,6 +1630,45 @@ def get_job(job_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@api.route('/jobs/<int:job_id>/matches', methods=['GET'])
+@verify_token
+def get_job_matches(job_id):
+    """Candidatos mais compatíveis com a vaga (top-k pré-calculado)"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+        
+        limit = request.args.get('limit', 20, type=int)
+        
+        engine = ensure_match_engine()
+        matches = engine.top_matches(JOB, job_id, limit)
+        if matches is None and match_entity(JOB, job_id):
+            matches = engine.top_matches(JOB, job_id, limit)
+        if matches is None:
+            return jsonify({'error': 'Vaga não encontrada ou não está aberta'}), 404
+        
+        candidates_by_id = {}
+        if matches:
+            ids = [candidate_id for candidate_id, _ in matches]
+            cand_resp = supabase.table('candidates').select('id, first_name, last_name, email, status').in_('id', ids).execute()
+            candidates_by_id = {cand['id']: cand for cand in cand_resp.data or []}
+            # Candidato excluído ainda não alcançado pelo catch-up: sai do ranking
+            matches = [(candidate_id, score) for candidate_id, score in matches if candidate_id in candidates_by_id]
+        
+        print(f"🎯 GET /jobs/{job_id}/matches - {len(matches)} candidatos")
+        
+        return jsonify({
+            'job_id': job_id,
+            'matches': [
+                {'candidate_id': candidate_id, 'score': score, 'candidate': candidates_by_id.get(candidate_id)}
+                for candidate_id, score in matches
+            ]
+        })
+        
+    except Exception as e:
+        print(f"❌ Erro ao calcular compatibilidade da vaga: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @api.route('/jobs', methods=['POST'])
 @verify_token
 @verify_role(['admin', 'manager'])
@@ -845,8 +1703,11 @@ def create_job():
         job_data = {k: v for k, v in job_data.items() if v is not None}
         
         response = supabase.table('jobs').insert(job_data).execute()
+        data_version.bump('jobs')
         
         if response.data:
+            sync_job_indexes(response.data[0])
+            change_log.record('jobs', 'insert', response.data[0].get('id'))
             return jsonify({
                 'message': 'Vaga criada com sucesso',
                 'job': response.data[0]
@@ -866,7 +1727,7 @@ def update_job(job_id):
         data = request.get_json()
         
         # Verificar se a vaga existe
-        existing = supabase.table('jobs').select('*').eq('id', job_id).execute()
+        existing = supabase.table('jobs').select('id').eq('id', job_id).limit(1).execute()
         if not existing.data:
             return jsonify({'error': 'Vaga não encontrada'}), 404
         
@@ -889,8 +1750,11 @@ def update_job(job_id):
             return jsonify({'error': 'Nenhum dado fornecido para atualização'}), 400
         
         response = supabase.table('jobs').update(job_data).eq('id', job_id).execute()
+        data_version.bump('jobs')
         
         if response.data:
+            sync_job_indexes(response.data[0])
+            change_log.record('jobs', 'update', job_id)
             return jsonify({
                 'message': 'Vaga atualizada com sucesso',
                 'job': response.data[0]
@@ -907,18 +1771,320 @@ def update_job(job_id):
 def delete_job(job_id):
     """Deletar vaga - APENAS ADMIN"""
     try:
-        # Verificar se a vaga existe
-        existing = supabase.table('jobs').select('*').eq('id', job_id).execute()
-        if not existing.data:
+        # Candidaturas só saem junto com ?applications=cascade explícito
+        mode = request.args.get('applications', 'skip')
+        if mode not in BULK_DEPENDENT_MODES:
+            return jsonify({'error': f"applications deve ser: {', '.join(BULK_DEPENDENT_MODES)}"}), 400
+        
+        # Mesmo caminho da exclusão em lote (transação, tombstones no change_log)
+        [result], _ = bulk_delete('jobs', [job_id], mode)
+        if result['ok']:
+            return jsonify({'message': 'Vaga deletada com sucesso'})
+        if result['reason'] == 'not_found':
             return jsonify({'error': 'Vaga não encontrada'}), 404
+        if result['reason'] == 'has_applications':
+            return jsonify({
+                'error': 'Vaga possui candidaturas; use ?applications=cascade para excluí-las junto',
+                'applications': result['applications']
+            }), 409
+        return jsonify({'error': result['error']}), 500
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# =============================================================================
+# BULK CANDIDATES/JOBS - 🔒 PROTEGIDOS (exclusão e status por lista de ids ou filtro)
+# =============================================================================
+
+# link: coluna de applications que aponta para o recurso; filters: nome -> (operador, coluna)
+BULK_RESOURCES = {
+    'candidates': {
+        'label': 'Candidato',
+        'link': 'candidate_id',
+        'sync': sync_candidate_indexes,
+        'filters': {
+            'status': ('eq', 'status'),
+            'created_before': ('lt', 'created_at'),
+            'updated_before': ('lt', 'updated_at')
+        }
+    },
+    'jobs': {
+        'label': 'Vaga',
+        'link': 'job_id',
+        'sync': sync_job_indexes,
+        'filters': {
+            'status': ('eq', 'status'),
+            'company': ('ilike', 'company'),
+            'created_before': ('lt', 'created_at'),
+            'updated_before': ('lt', 'updated_at')
+        }
+    }
+}
+
+def bulk_target_ids(resource, data):
+    """Ids do lote: lista explícita ou filtro (resolvido numa varredura só de ids). Retorna (ids, erro)"""
+    spec = BULK_RESOURCES[resource]
+    if data.get('ids') is not None:
+        if not isinstance(data['ids'], list):
+            return None, 'ids deve ser uma lista'
+        try:
+            ids = list(dict.fromkeys(int(value) for value in data['ids']))
+        except (TypeError, ValueError):
+            return None, 'ids inválidos'
+    elif isinstance(data.get('filter'), dict) and data['filter']:
+        filters = []
+        for name, value in data['filter'].items():
+            if name not in spec['filters']:
+                return None, f"Filtro inválido: {name}. Use: {', '.join(spec['filters'])}"
+            operator, column = spec['filters'][name]
+            filters.append((operator, column, f'%{value}%' if operator == 'ilike' else value))
+        ids = [row['id'] for row in scan(resource, 'id', filters)]
+    else:
+        return None, 'Informe ids ou filter'
+    if len(ids) > MAX_BULK_ACTION:
+        return None, f'Máximo de {MAX_BULK_ACTION} registros por requisição ({len(ids)} selecionados)'
+    return ids, None
+
+def bulk_delete_rpc(resource, ids, mode):
+    """Bloco inteiro numa transação (função bulk_delete_records)"""
+    result = supabase.rpc(BULK_DELETE_FUNCTION, {'p_resource': resource, 'p_ids': ids, 'p_mode': mode}) \
+        .execute().data or {}
+    return {
+        'found': set(result.get('found') or []),
+        'skipped': {int(record_id): count for record_id, count in (result.get('skipped') or {}).items()},
+        'deleted': list(result.get('deleted') or []),
+        'applications': [(row['id'], row['parent']) for row in result.get('applications') or []],
+        'error': None
+    }
+
+def bulk_delete_local(resource, ids, mode):
+    """
+    Sem a função do banco: candidaturas por id (as que a varredura viu) e depois os
+    registros. Não é atômico; o que já foi removido é devolvido mesmo se um passo
+    seguinte falhar, para virar tombstone.
+    """
+    link = BULK_RESOURCES[resource]['link']
+    found = existing_ids(resource, ids)
+    dependents = {}
+    if found:
+        for row in scan('applications', f'id, {link}', [('in_', link, sorted(found))], prefetch=0):
+            dependents.setdefault(row[link], []).append(row['id'])
+    skipped = {record_id: len(dependents[record_id]) for record_id in found
+               if mode == 'skip' and dependents.get(record_id)}
+    targets = [record_id for record_id in ids if record_id in found and record_id not in skipped]
+    outcome = {'found': found, 'skipped': skipped, 'deleted': [], 'applications': [], 'error': None}
+    
+    application_ids = [application_id for record_id in targets for application_id in dependents.get(record_id, [])]
+    try:
+        for start in range(0, len(application_ids), BULK_LOOKUP_CHUNK):
+            rows = supabase.table('applications').delete() \
+                .in_('id', application_ids[start:start + BULK_LOOKUP_CHUNK]).execute().data or []
+            outcome['applications'].extend((row['id'], row.get(link)) for row in rows)
+        if targets:
+            rows = supabase.table(resource).delete().in_('id', targets).execute().data or []
+            outcome['deleted'] = [row['id'] for row in rows]
+    except Exception as chunk_error:
+        outcome['error'] = chunk_error
+    return outcome
+
+def bulk_delete_chunk(resource, ids, mode):
+    """
+    Excluir um bloco (registros e candidaturas dependentes). Retorna (resultados, ids excluídos,
+    ids de candidaturas excluídas, indisponibilidade do banco ou None)
+    """
+    spec = BULK_RESOURCES[resource]
+    outcome = None
+    if bulk_delete_mode['rpc']:
+        try:
+            outcome = bulk_delete_rpc(resource, ids, mode)
+        except DataUnavailable:
+            raise
+        except Exception as e:
+            if not is_missing_function(e):
+                # Transação desfeita: nada foi excluído
+                print(f"❌ Falha ao excluir bloco de {resource}: {e}")
+                return {record_id: {'id': record_id, 'ok': False, 'reason': 'error', 'error': str(e)}
+                        for record_id in ids}, [], [], None
+            print(f"⚠️ Função {BULK_DELETE_FUNCTION} ausente - excluindo sem transação: {e}")
+            bulk_delete_mode['rpc'] = False
+    if outcome is None:
+        outcome = bulk_delete_local(resource, ids, mode)
+    
+    removed = {}
+    for _, parent in outcome['applications']:
+        removed[parent] = removed.get(parent, 0) + 1
+    deleted = set(outcome['deleted'])
+    error = outcome['error']
+    if error is not None:
+        print(f"❌ Falha ao excluir bloco de {resource}: {error}")
+    
+    results = {}
+    for record_id in ids:
+        if record_id in deleted:
+            results[record_id] = {'id': record_id, 'ok': True, 'applications': removed.get(record_id, 0)}
+        elif record_id in outcome['skipped']:
+            results[record_id] = {'id': record_id, 'ok': False, 'reason': 'has_applications',
+                                  'error': 'Possui candidaturas', 'applications': outcome['skipped'][record_id]}
+        elif record_id in outcome['found'] and error is not None:
+            results[record_id] = {'id': record_id, 'ok': False, 'reason': 'error', 'error': str(error),
+                                  'applications_removed': removed.get(record_id, 0)}
+        else:
+            # Inexistente (ou excluído por outra requisição entre a leitura e a exclusão)
+            results[record_id] = {'id': record_id, 'ok': False, 'reason': 'not_found',
+                                  'error': f"{spec['label']} não encontrado(a)"}
+    unavailable = error if isinstance(error, DataUnavailable) else None
+    application_ids = [application_id for application_id, _ in outcome['applications']]
+    return results, list(outcome['deleted']), application_ids, unavailable
+
+def bulk_delete(resource, ids, mode='cascade'):
+    """Excluir ids em blocos; índices, versão e change_log atualizados uma vez no fim"""
+    results, deleted, application_ids = {}, [], []
+    unavailable = None
+    for start in range(0, len(ids), BULK_ACTION_CHUNK):
+        chunk_results, chunk_deleted, chunk_applications, unavailable = bulk_delete_chunk(
+            resource, ids[start:start + BULK_ACTION_CHUNK], mode
+        )
+        results.update(chunk_results)
+        deleted.extend(chunk_deleted)
+        application_ids.extend(chunk_applications)
+        if unavailable is not None:
+            break
+    
+    # Também quando um passo falhou no meio do bloco: o que saiu do banco vira tombstone
+    if deleted:
+        data_version.bump(resource)
+        for record_id in deleted:
+            BULK_RESOURCES[resource]['sync'](record_id, deleted=True)
+        change_log.record(resource, 'delete', deleted)
+    if application_ids:
+        on_applications_removed(application_ids)
+    if unavailable is not None:
+        raise unavailable
+    return [results[record_id] for record_id in ids], len(deleted) + len(application_ids)
+
+def bulk_set_status(resource, ids, status):
+    """Novo status por update in_() em blocos; ids que não voltam no update não existem"""
+    results, updated = {}, []
+    for start in range(0, len(ids), BULK_ACTION_CHUNK):
+        chunk = ids[start:start + BULK_ACTION_CHUNK]
+        try:
+            rows = supabase.table(resource).update({'status': status}).in_('id', chunk).execute().data or []
+        except DataUnavailable:
+            raise
+        except Exception as chunk_error:
+            print(f"❌ Falha ao atualizar bloco de {resource}: {chunk_error}")
+            results.update({record_id: {'id': record_id, 'ok': False, 'reason': 'error', 'error': str(chunk_error)}
+                            for record_id in chunk})
+            continue
+        returned = {row['id']: row for row in rows}
+        for record_id in chunk:
+            if record_id in returned:
+                results[record_id] = {'id': record_id, 'ok': True}
+                updated.append(returned[record_id])
+            else:
+                results[record_id] = {'id': record_id, 'ok': False, 'reason': 'not_found',
+                                      'error': f"{BULK_RESOURCES[resource]['label']} não encontrado(a)"}
+    
+    if updated:
+        data_version.bump(resource)
+        for row in updated:
+            BULK_RESOURCES[resource]['sync'](row)
+        change_log.record(resource, 'update', [row['id'] for row in updated])
+    return [results[record_id] for record_id in ids], len(updated)
+
+def bulk_response(resource, action, ids, results, rows, started):
+    elapsed = time.time() - started
+    succeeded = sum(1 for result in results if result['ok'])
+    metrics.incr(f'bulk.{resource}.{action}', succeeded)
+    print(f"✅ {action} em lote de {resource}: {succeeded}/{len(ids)} em {elapsed:.2f}s")
+    return jsonify({
+        'results': results,
+        'summary': {
+            'requested': len(ids),
+            'succeeded': succeeded,
+            'failed': len(ids) - succeeded,
+            'rows': rows,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else None
+        }
+    })
+
+def run_bulk_delete(resource):
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+        
+        data = request.get_json() or {}
+        mode = data.get('applications', 'cascade')
+        if mode not in BULK_DEPENDENT_MODES:
+            return jsonify({'error': f"applications deve ser: {', '.join(BULK_DEPENDENT_MODES)}"}), 400
+        ids, error = bulk_target_ids(resource, data)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        print(f"🗑️ POST /{resource}/bulk/delete - {len(ids)} registros (candidaturas: {mode})")
+        started = time.time()
+        results, rows = bulk_delete(resource, ids, mode)
+        return bulk_response(resource, 'delete', ids, results, rows, started)
+        
+    except Exception as e:
+        print(f"❌ Erro na exclusão em lote de {resource}: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+def run_bulk_status(resource):
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
         
-        response = supabase.table('jobs').delete().eq('id', job_id).execute()
+        data = request.get_json() or {}
+        status = data.get('status')
+        if not status or not isinstance(status, str):
+            return jsonify({'error': 'status é obrigatório'}), 400
+        ids, error = bulk_target_ids(resource, data)
+        if error:
+            return jsonify({'error': error}), 400
         
-        return jsonify({'message': 'Vaga deletada com sucesso'})
+        print(f"📝 POST /{resource}/bulk/status - {len(ids)} registros → {status}")
+        started = time.time()
+        results, rows = bulk_set_status(resource, ids, status)
+        return bulk_response(resource, 'status', ids, results, rows, started)
         
     except Exception as e:
+        print(f"❌ Erro na atualização em lote de {resource}: {e}")
+        import traceback
+        traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@api.route('/candidates/bulk/delete', methods=['POST'])
+@verify_token
+@verify_role(['admin', 'manager'])
+def bulk_delete_candidates():
+    """Excluir candidatos em lote (ids ou filtro) - APENAS ADMIN E MANAGER"""
+    return run_bulk_delete('candidates')
+
+@api.route('/candidates/bulk/status', methods=['POST'])
+@verify_token
+@verify_role(['admin', 'manager'])
+def bulk_status_candidates():
+    """Alterar status de candidatos em lote - APENAS ADMIN E MANAGER"""
+    return run_bulk_status('candidates')
+
+@api.route('/jobs/bulk/delete', methods=['POST'])
+@verify_token
+@verify_role(['admin'])
+def bulk_delete_jobs():
+    """Excluir vagas em lote (ids ou filtro) - APENAS ADMIN, como a exclusão unitária"""
+    return run_bulk_delete('jobs')
+
+@api.route('/jobs/bulk/status', methods=['POST'])
+@verify_token
+@verify_role(['admin', 'manager'])
+def bulk_status_jobs():
+    """Alterar status de vagas em lote (ex.: encerrar) - APENAS ADMIN E MANAGER"""
+    return run_bulk_status('jobs')
+
 # =============================================================================
 # APPLICATIONS ENDPOINTS - 🔒 PROTEGIDOS
 # =============================================================================
@@ -937,56 +2103,42 @@ def get_applications():
         job_id = request.args.get('job_id', type=int)
         stage = request.args.get('stage', type=int)
         status = request.args.get('status', '')
+        fieldset = request_fieldset('applications')
         
-        # Buscar candidaturas
-        query = supabase.table('applications').select('*')
-        
+        # Buscar candidaturas em blocos (filtros no banco), com candidato e vaga embutidos
+        filters = []
         if job_id:
-            query = query.eq('job_id', job_id)
+            filters.append(('eq', 'job_id', job_id))
         if stage:
-            query = query.eq('stage', stage)
+            filters.append(('eq', 'stage', stage))
         if status:
-            query = query.eq('status', status)
+            filters.append(('eq', 'status', status))
         
-        query = query.order('applied_at', desc=True)
+        applications = list(scan('applications', fieldset.select(extra=('applied_at',)), filters))
         
-        applications_response = query.execute()
-        applications = applications_response.data or []
+        # Arquivo frio só quando pedido explicitamente (sem chaves estrangeiras: relações por in_())
+        if include_archived():
+            archived = [dict(row, archived=True) for row in
+                        scan(APPLICATIONS_ARCHIVE, fieldset.select(extra=('applied_at',), embed=False), filters)]
+            applications.extend(fieldset.attach(archived, fetch_rows_by_ids))
         
-        print(f"📄 {len(applications)} candidaturas encontradas")
+        applications.sort(key=lambda app: app.get('applied_at') or '', reverse=True)
         
-        # Para cada candidatura, buscar dados do candidato e vaga
-        for app in applications:
-            # Buscar dados do candidato
-            if app.get('candidate_id'):
-                try:
-                    candidate_resp = supabase.table('candidates').select('id, first_name, last_name, email, phone, status').eq('id', app['candidate_id']).execute()
-                    if candidate_resp.data:
-                        app['candidates'] = candidate_resp.data[0]
-                        print(f"   👤 Candidato: {app['candidates']['first_name']} {app['candidates']['last_name']}")
-                except Exception as e:
-                    print(f"   ⚠️ Erro ao buscar candidato {app['candidate_id']}: {e}")
-            
-            # Buscar dados da vaga
-            if app.get('job_id'):
-                try:
-                    job_resp = supabase.table('jobs').select('id, title, company, location, status').eq('id', app['job_id']).execute()
-                    if job_resp.data:
-                        app['jobs'] = job_resp.data[0]
-                        print(f"   💼 Vaga: {app['jobs']['title']}")
-                except Exception as e:
-                    print(f"   ⚠️ Erro ao buscar vaga {app['job_id']}: {e}")
+        print(f"📄 {len(applications)} candidaturas encontradas")
         
         return jsonify({
-            'applications': applications,
+            'applications': [fieldset.shape(app) for app in applications],
             'total': len(applications),
             'filters_applied': {
                 'job_id': job_id,
                 'stage': stage,
-                'status': status
+                'status': status,
+                'include_archived': include_archived()
             }
         })
         
+    except FieldsetError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"❌ Erro em get_applications: {e}")
         import traceback
@@ -1029,7 +2181,7 @@ def create_application():
             'candidate_id': data['candidate_id'],
             'job_id': data['job_id'],
             'status': data.get('status', 'applied'),
-            'stage': data.get('stage', 1),
+            'stage': data.get('stage', stage_catalog().first),
             'notes': data.get('notes', ''),
             'applied_at': datetime.now().isoformat(),
             'updated_at': datetime.now().isoformat()
@@ -1037,9 +2189,14 @@ def create_application():
         
         # Inserir candidatura
         response = supabase.table('applications').insert(application_data).execute()
+        data_version.bump('applications')
         
         if response.data:
             new_application = response.data[0]
+            sync_application_snapshot(new_application)
+            change_log.record('applications', 'insert', new_application.get('id'))
+            rollup_store.record_arrival(new_application)
+            record_stage_transition(None, new_application, application_data['notes'])
             
             print(f"✅ Candidatura criada com ID: {new_application.get('id')}")
             
@@ -1056,6 +2213,168 @@ def create_application():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+def bulk_application_pairs(data):
+    """
+    Pares (candidate_id, job_id) do corpo: {job_id, candidate_ids} (shortlist de uma
+    vaga) ou {pairs: [{candidate_id, job_id}]}. Retorna (pares únicos, repetidos, erro).
+    """
+    if not isinstance(data, dict):
+        return None, None, 'Corpo deve ser um objeto'
+    if data.get('pairs') is not None:
+        if not isinstance(data['pairs'], list):
+            return None, None, 'pairs deve ser uma lista'
+        for item in data['pairs']:
+            if not isinstance(item, dict):
+                return None, None, f'Par inválido: {item!r}'
+        raw = [(item.get('candidate_id'), item.get('job_id')) for item in data['pairs']]
+    elif isinstance(data.get('candidate_ids'), list) and data.get('job_id'):
+        raw = [(candidate_id, data['job_id']) for candidate_id in data['candidate_ids']]
+    else:
+        return None, None, 'Informe job_id e candidate_ids, ou pairs'
+    
+    pairs, repeated = [], []
+    seen = set()
+    for candidate_id, job_id in raw:
+        try:
+            pair = (int(candidate_id), int(job_id))
+        except (TypeError, ValueError):
+            return None, None, f'Par inválido: candidate_id={candidate_id}, job_id={job_id}'
+        if pair in seen:
+            repeated.append(pair)
+            continue
+        seen.add(pair)
+        pairs.append(pair)
+    if not pairs:
+        return None, None, 'Nenhum par candidato/vaga informado'
+    if len(pairs) > MAX_BULK_APPLICATIONS:
+        return None, None, f'Máximo de {MAX_BULK_APPLICATIONS} candidaturas por requisição'
+    return pairs, repeated, None
+
+def existing_ids(table, ids):
+    """Ids que existem na tabela (uma consulta in_() por bloco)"""
+    ids = sorted(ids)
+    found = set()
+    for start in range(0, len(ids), BULK_LOOKUP_CHUNK):
+        chunk = ids[start:start + BULK_LOOKUP_CHUNK]
+        found.update(row['id'] for row in scan(table, 'id', [('in_', 'id', chunk)], prefetch=0))
+    return found
+
+def existing_application_pairs(pairs):
+    """
+    Pares que já têm candidatura, numa consulta in_() por bloco de candidatos
+    (job_id in (...) and candidate_id in (...): superconjunto filtrado aqui)
+    """
+    wanted = set(pairs)
+    job_ids = sorted({job_id for _, job_id in pairs})
+    candidate_ids = sorted({candidate_id for candidate_id, _ in pairs})
+    existing = set()
+    for start in range(0, len(candidate_ids), BULK_LOOKUP_CHUNK):
+        filters = [('in_', 'candidate_id', candidate_ids[start:start + BULK_LOOKUP_CHUNK])]
+        filters.append(('eq', 'job_id', job_ids[0]) if len(job_ids) == 1 else ('in_', 'job_id', job_ids))
+        for row in scan('applications', 'candidate_id, job_id', filters, prefetch=0):
+            pair = (row['candidate_id'], row['job_id'])
+            if pair in wanted:
+                existing.add(pair)
+    return existing
+
+@api.route('/applications/bulk', methods=['POST'])
+@verify_token
+def create_applications_bulk():
+    """Criar várias candidaturas (shortlist de uma vaga ou lista de pares) em poucas consultas"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+        
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'Dados não fornecidos'}), 400
+        
+        pairs, repeated, error = bulk_application_pairs(data)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        catalog = stage_catalog()
+        stage = data.get('stage', catalog.first)
+        if stage not in catalog:
+            return jsonify({'error': f'Etapa inválida: {stage}'}), 400
+        status = data.get('status') or catalog.status_for(stage)
+        notes = data.get('notes', '')
+        
+        print(f"➕ POST /applications/bulk - {len(pairs)} pares")
+        started = time.time()
+        
+        skipped = [{'candidate_id': c, 'job_id': j, 'reason': 'duplicate_in_request'} for c, j in repeated]
+        failed = []
+        
+        # Candidatos/vagas inexistentes e pares já existentes: poucas consultas in_()
+        candidates_found = existing_ids('candidates', {candidate_id for candidate_id, _ in pairs})
+        jobs_found = existing_ids('jobs', {job_id for _, job_id in pairs})
+        existing = existing_application_pairs(pairs)
+        
+        now = datetime.now().isoformat()
+        to_insert = []
+        for candidate_id, job_id in pairs:
+            if candidate_id not in candidates_found:
+                failed.append({'candidate_id': candidate_id, 'job_id': job_id, 'error': 'Candidato não encontrado'})
+            elif job_id not in jobs_found:
+                failed.append({'candidate_id': candidate_id, 'job_id': job_id, 'error': 'Vaga não encontrada'})
+            elif (candidate_id, job_id) in existing:
+                skipped.append({'candidate_id': candidate_id, 'job_id': job_id, 'reason': 'exists'})
+            else:
+                to_insert.append({
+                    'candidate_id': candidate_id,
+                    'job_id': job_id,
+                    'status': status,
+                    'stage': stage,
+                    'notes': notes,
+                    'applied_at': now,
+                    'updated_at': now
+                })
+        
+        # Insert de várias linhas por bloco; um bloco com erro não derruba os demais
+        created = []
+        for start in range(0, len(to_insert), BULK_INSERT_CHUNK):
+            chunk = to_insert[start:start + BULK_INSERT_CHUNK]
+            try:
+                response = supabase.table('applications').insert(chunk).execute()
+                created.extend(response.data or [])
+            except Exception as chunk_error:
+                print(f"❌ Falha ao inserir bloco {start}-{start + len(chunk)}: {chunk_error}")
+                failed.extend({'candidate_id': row['candidate_id'], 'job_id': row['job_id'],
+                               'error': str(chunk_error)} for row in chunk)
+        
+        # Contadores, change log e índices uma vez para o lote
+        if created:
+            data_version.bump('applications')
+            change_log.record('applications', 'insert', [row.get('id') for row in created])
+            rollup_store.record_arrivals(created)
+            for row in created:
+                sync_application_snapshot(row)
+                record_stage_transition(None, row, notes)
+        
+        elapsed = time.time() - started
+        metrics.incr('applications.bulk.created', len(created))
+        print(f"✅ Lote: {len(created)} criadas, {len(skipped)} ignoradas, {len(failed)} com falha em {elapsed:.2f}s")
+        
+        return jsonify({
+            'created': created,
+            'skipped': skipped,
+            'failed': failed,
+            'summary': {
+                'received': len(pairs) + len(repeated),
+                'created': len(created),
+                'skipped': len(skipped),
+                'failed': len(failed),
+                'seconds': round(elapsed, 3)
+            }
+        }), 201 if created else 200
+        
+    except Exception as e:
+        print(f"❌ Erro ao criar candidaturas em lote: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 @api.route('/applications/<int:application_id>', methods=['DELETE'])
 @verify_token
 @verify_role(['admin', 'manager'])
@@ -1074,6 +2393,9 @@ def delete_application(application_id):
         
         # Deletar
         response = supabase.table('applications').delete().eq('id', application_id).execute()
+        data_version.bump('applications')
+        sync_application_snapshot(application_id, deleted=True)
+        change_log.record('applications', 'delete', application_id)
         
         print(f"✅ Candidatura {application_id} deletada")
         
@@ -1100,81 +2422,355 @@ def move_application_stage(application_id):
         action = data.get('action')  # 'next', 'previous', ou 'specific'
         target_stage = data.get('target_stage')
         notes = data.get('notes', '')
+        fieldset = request_fieldset('applications')
         
-        # Buscar candidatura atual
-        current_response = supabase.table('applications').select('*').eq('id', application_id).execute()
-        if not current_response.data:
+        if action not in STAGE_ACTIONS or (action == 'specific' and not target_stage):
+            return jsonify({'error': 'Ação inválida'}), 400
+        try:
+            target_stage = int(target_stage) if target_stage is not None else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Etapa inválida'}), 400
+        
+        # Ler, calcular e gravar numa única operação atômica
+        transition = stage_transitions.move(
+            application_id, stage_catalog(), action, target_stage, notes, data.get('expected_updated_at'),
+            fieldset.relations
+        )
+        if transition.outcome == NOT_FOUND:
             return jsonify({'error': 'Candidatura não encontrada'}), 404
+        if transition.outcome == INVALID:
+            return jsonify({'error': f'Etapa inválida: {target_stage}'}), 400
+        if transition.outcome == CONFLICT:
+            return jsonify({
+                'error': 'Candidatura alterada por outra pessoa; recarregue e tente novamente',
+                'application': transition.application
+            }), 409
+        
+        data_version.bump('applications')
+        updated_app = transition.application
+        new_stage = updated_app.get('stage')
+        print(f"📝 Candidatura {application_id}: etapa {transition.previous.get('stage')} → {new_stage}")
+        
+        # Candidato e vaga vêm na mesma resposta; o snapshot guarda só a candidatura
+        related = {key: updated_app.pop(key, None) for key in ('candidates', 'jobs')}
+        sync_application_snapshot(updated_app)
+        change_log.record('applications', 'update', application_id)
+        if transition.changed:
+            rollup_store.record_transition(updated_app)
+            record_stage_transition(transition.previous, updated_app, notes)
+        updated_app.update({key: value for key, value in related.items() if value})
+        
+        print(f"✅ Candidatura movida com sucesso para etapa {new_stage}")
         
-        current_app = current_response.data[0]
-        current_stage = current_app.get('stage', 1)
+        return jsonify({
+            'message': f'Candidatura movida para etapa {new_stage}',
+            'application': fieldset.shape(updated_app)
+        })
         
-        # Determinar nova etapa
-        if action == 'next':
-            new_stage = min(current_stage + 1, 9)
-        elif action == 'previous':
-            new_stage = max(current_stage - 1, 1)
-        elif action == 'specific' and target_stage:
-            new_stage = max(1, min(target_stage, 9))
-        else:
-            return jsonify({'error': 'Ação inválida'}), 400
+    except FieldsetError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"❌ Erro ao mover candidatura: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/applications/<int:application_id>', methods=['GET'])
+@verify_token
+def get_application(application_id):
+    """Obter candidatura com candidato, vaga e primeira página de histórico/comentários"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
         
-        # Atualizar status baseado na etapa
-        if new_stage == 9:
-            new_status = 'hired'
-        elif new_stage > 1:
-            new_status = 'in_progress'
-        else:
-            new_status = 'applied'
+        response = supabase.table('applications').select('*').eq('id', application_id).execute()
+        if not response.data:
+            return jsonify({'error': 'Candidatura não encontrada'}), 404
         
-        # Dados para atualização
-        update_data = {
-            'stage': new_stage,
-            'status': new_status,
-            'updated_at': datetime.now().isoformat()
+        application = response.data[0]
+        
+        if application.get('candidate_id'):
+            candidate_resp = supabase.table('candidates').select('*').eq('id', application['candidate_id']).execute()
+            if candidate_resp.data:
+                application['candidates'] = candidate_resp.data[0]
+        
+        if application.get('job_id'):
+            job_resp = supabase.table('jobs').select('*').eq('id', application['job_id']).execute()
+            if job_resp.data:
+                application['jobs'] = job_resp.data[0]
+        
+        history, history_cursor = keyset_page(HISTORY_TABLE, [('eq', 'application_id', application_id)], ACTIVITY_PAGE_SIZE)
+        comments, comments_cursor = keyset_page(COMMENTS_TABLE, [('eq', 'application_id', application_id)], ACTIVITY_PAGE_SIZE)
+        
+        application['history'] = attach_author_names(pending_history([application_id]) + history, 'changed_by')
+        application['comments'] = attach_author_names(comments, 'user_id')
+        application['history_next_cursor'] = history_cursor
+        application['comments_next_cursor'] = comments_cursor
+        
+        return jsonify(application)
+        
+    except Exception as e:
+        print(f"❌ Erro ao buscar candidatura {application_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/applications/<int:application_id>/history', methods=['GET'])
+@verify_token
+def get_application_history(application_id):
+    """Histórico de movimentações (mais recentes primeiro, paginação por cursor)"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+        
+        limit, cursor = activity_page_args()
+        history, next_cursor = keyset_page(HISTORY_TABLE, [('eq', 'application_id', application_id)], limit, cursor)
+        if not cursor:
+            history = pending_history([application_id]) + history
+        
+        return jsonify({
+            'history': attach_author_names(history, 'changed_by'),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        })
+        
+    except Exception as e:
+        print(f"❌ Erro ao buscar histórico da candidatura {application_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/applications/<int:application_id>/comments', methods=['GET'])
+@verify_token
+def get_application_comments(application_id):
+    """Comentários da candidatura (mais recentes primeiro, paginação por cursor)"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+        
+        limit, cursor = activity_page_args()
+        comments, next_cursor = keyset_page(COMMENTS_TABLE, [('eq', 'application_id', application_id)], limit, cursor)
+        
+        return jsonify({
+            'comments': attach_author_names(comments, 'user_id'),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        })
+        
+    except Exception as e:
+        print(f"❌ Erro ao buscar comentários da candidatura {application_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/applications/<int:application_id>/comments', methods=['POST'])
+@verify_token
+def add_application_comment(application_id):
+    """Adicionar comentário à candidatura"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+        
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'Dados não fornecidos'}), 400
+        
+        text = (data.get('comment') or data.get('content') or '').strip()
+        if not text:
+            return jsonify({'error': 'comment é obrigatório'}), 400
+        if len(text) > MAX_COMMENT_LENGTH:
+            return jsonify({'error': f'Comentário deve ter no máximo {MAX_COMMENT_LENGTH} caracteres'}), 400
+        
+        existing = supabase.table('applications').select('id').eq('id', application_id).limit(1).execute()
+        if not existing.data:
+            return jsonify({'error': 'Candidatura não encontrada'}), 404
+        
+        comment_data = {
+            'application_id': application_id,
+            'user_id': g.current_user.id,
+            'comment': text,
+            'is_internal': bool(data.get('is_internal', False)),
+            'created_at': datetime.now().isoformat()
         }
         
-        if notes:
-            update_data['notes'] = notes
+        response = supabase.table(COMMENTS_TABLE).insert(comment_data).execute()
+        if not response.data:
+            return jsonify({'error': 'Erro ao adicionar comentário'}), 500
         
-        print(f"📝 Atualizando candidatura {application_id}: etapa {current_stage} → {new_stage}")
+        comment = attach_author_names([response.data[0]], 'user_id')[0]
+        print(f"💬 Comentário adicionado à candidatura {application_id}")
         
-        # Executar update
-        response = supabase.table('applications').update(update_data).eq('id', application_id).execute()
+        return jsonify({
+            'message': 'Comentário adicionado com sucesso',
+            'comment': comment
+        }), 201
         
-        if response.data:
-            updated_app = response.data[0]
-            
-            # Buscar dados relacionados
-            if updated_app.get('candidate_id'):
-                try:
-                    candidate_resp = supabase.table('candidates').select('*').eq('id', updated_app['candidate_id']).execute()
-                    if candidate_resp.data:
-                        updated_app['candidates'] = candidate_resp.data[0]
-                except Exception as e:
-                    print(f"⚠️ Erro ao buscar candidato: {e}")
-            
-            if updated_app.get('job_id'):
-                try:
-                    job_resp = supabase.table('jobs').select('*').eq('id', updated_app['job_id']).execute()
-                    if job_resp.data:
-                        updated_app['jobs'] = job_resp.data[0]
-                except Exception as e:
-                    print(f"⚠️ Erro ao buscar vaga: {e}")
-            
-            print(f"✅ Candidatura movida com sucesso para etapa {new_stage}")
-            
-            return jsonify({
-                'message': f'Candidatura movida para etapa {new_stage}',
-                'application': updated_app
-            })
+    except Exception as e:
+        print(f"❌ Erro ao adicionar comentário: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/applications/activity/latest', methods=['GET'])
+@verify_token
+def get_latest_application_activity():
+    """Últimas N entradas de histórico/comentários de várias candidaturas (uma consulta por tipo)"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+        
+        try:
+            ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+        except ValueError:
+            return jsonify({'error': 'ids deve ser uma lista de inteiros separados por vírgula'}), 400
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return jsonify({'error': 'ids é obrigatório'}), 400
+        if len(ids) > MAX_ACTIVITY_BATCH:
+            return jsonify({'error': f'Máximo de {MAX_ACTIVITY_BATCH} candidaturas por requisição'}), 400
+        
+        per_app = max(1, min(request.args.get('n', 3, type=int), MAX_LATEST_PER_APPLICATION))
+        include = set((request.args.get('include') or 'history,comments').split(','))
+        
+        result = {'n': per_app}
+        authors = []
+        
+        if 'history' in include:
+            history = latest_per_application(HISTORY_TABLE, 'latest_application_history', ids, per_app)
+            pending = {}
+            for entry in pending_history(ids):
+                pending.setdefault(entry['application_id'], []).append(entry)
+            for application_id, entries in pending.items():
+                history[application_id] = (entries + history[application_id])[:per_app]
+            result['history'] = history
+            authors.extend((entry, 'changed_by') for entries in history.values() for entry in entries)
+        
+        if 'comments' in include:
+            comments = latest_per_application(COMMENTS_TABLE, 'latest_application_comments', ids, per_app)
+            result['comments'] = comments
+            authors.extend((entry, 'user_id') for entries in comments.values() for entry in entries)
+        
+        # Um único lookup de nomes para todos os autores do lote
+        names = profile_cache.names(entry.get(field) for entry, field in authors)
+        for entry, field in authors:
+            name = names.get(entry.get(field))
+            entry['profiles'] = {'full_name': name} if name else None
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        print(f"❌ Erro ao buscar atividade das candidaturas: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# =============================================================================
+# SYNC ENDPOINT - 🔒 PROTEGIDO (delta por versão do change_log)
+# =============================================================================
+
+SYNC_FETCH_CHUNK = 200
+
+def fetch_rows_by_ids(table, ids, columns='*'):
+    """Linhas atuais de uma lista de ids ({id: linha}), em blocos de in_()"""
+    rows = {}
+    ids = list(ids)
+    for start in range(0, len(ids), SYNC_FETCH_CHUNK):
+        chunk = ids[start:start + SYNC_FETCH_CHUNK]
+        response = supabase.table(table).select(columns).in_('id', chunk).execute()
+        for row in response.data or []:
+            rows[row['id']] = row
+    return rows
+
+SYNC_SNAPSHOT_PAGE_SIZE = int(os.getenv('SYNC_SNAPSHOT_PAGE_SIZE', '5000'))
+
+def parse_snapshot_cursor(cursor, tables):
+    """'<versão>.<índice da tabela>.<último id>' -> (versão, índice, último id) ou None"""
+    try:
+        version, table_index, last_id = (int(part) for part in cursor.split('.'))
+    except ValueError:
+        return None
+    if version < 0 or not 0 <= table_index < len(tables):
+        return None
+    return version, table_index, last_id
+
+def sync_snapshot(tables, version, reason, table_index=0, last_id=0):
+    """
+    Página do snapshot completo (cliente substitui a réplica local): tabelas em
+    ordem, ids crescentes (keyset). Com has_more, chamar de novo com
+    cursor=<cursor>; todas as páginas levam a versão do início do snapshot.
+    """
+    result = {'version': version, 'full': True, 'reason': reason, 'has_more': False, 'cursor': None,
+              'tables': {table: {'upserts': [], 'deleted': []} for table in tables}}
+    remaining = SYNC_SNAPSHOT_PAGE_SIZE
+    while table_index < len(tables) and remaining > 0:
+        table = tables[table_index]
+        rows = supabase.table(table).select('*').gt('id', last_id).order('id').limit(remaining).execute().data or []
+        result['tables'][table]['upserts'].extend(rows)
+        remaining -= len(rows)
+        if remaining == 0:
+            last_id = rows[-1]['id']
         else:
-            return jsonify({'error': 'Erro ao atualizar candidatura'}), 500
+            table_index, last_id = table_index + 1, 0
+    if table_index < len(tables):
+        result['has_more'] = True
+        result['cursor'] = f'{version}.{table_index}.{last_id}'
+    if reason != 'continued':
+        metrics.incr(f'sync.snapshots.{reason}')
+    metrics.incr('sync.snapshot_pages')
+    return result
+
+@api.route('/sync', methods=['GET'])
+@verify_token
+def sync_changes():
+    """
+    Mudanças desde uma versão: ?since=<versão>&tables=candidates,jobs,applications
+    Retorna as linhas inseridas/alteradas e tombstones (ids) das excluídas; since
+    ausente, anterior à retenção do log ou posterior à versão atual gera snapshot,
+    paginado: com cursor na resposta, chamar de novo com cursor=<cursor> (mesmas
+    tables). Num delta com has_more, chamar de novo com since=version. Mudanças de
+    poucos segundos antes de since podem voltar (commit fora de ordem; ver change_log.py).
+    """
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+        
+        since = request.args.get('since', type=int)
+        tables = [t.strip() for t in (request.args.get('tables') or ','.join(SYNC_TABLES)).split(',') if t.strip()]
+        invalid = [t for t in tables if t not in SYNC_TABLES]
+        if invalid or not tables:
+            return jsonify({'error': f'tables deve conter apenas: {", ".join(SYNC_TABLES)}'}), 400
+        tables = list(dict.fromkeys(tables))
+        
+        # Próxima página de um snapshot em andamento
+        if request.args.get('cursor'):
+            position = parse_snapshot_cursor(request.args['cursor'], tables)
+            if position is None:
+                return jsonify({'error': 'cursor inválido'}), 400
+            version, table_index, last_id = position
+            return jsonify(sync_snapshot(tables, version, 'continued', table_index, last_id))
+        
+        # Versão lida ANTES do snapshot: mudanças durante a leitura chegam no próximo delta
+        head = change_log.head()
+        if since is None or since < 0:
+            return jsonify(sync_snapshot(tables, head, 'initial'))
+        if since > head:
+            return jsonify(sync_snapshot(tables, head, 'unknown_version'))
+        oldest = change_log.oldest()
+        if oldest is not None and since < oldest - 1:
+            return jsonify(sync_snapshot(tables, head, 'expired'))
+        
+        entries, has_more = change_log.entries_since(since, tables, SYNC_MAX_CHANGES)
+        # Entradas da janela de sobreposição (versão <= since) não recuam o cursor
+        last_seen = max(since, entries[-1]['version']) if entries else since
+        version = last_seen if has_more else max(head, last_seen)
+        result = {'version': version, 'full': False, 'has_more': has_more, 'tables': {}}
+        
+        latest = collapse(entries)
+        for table in tables:
+            operations = latest.get(table, {})
+            deleted = [row_id for row_id, op in operations.items() if op == 'delete']
+            changed = [row_id for row_id, op in operations.items() if op != 'delete']
+            rows = fetch_rows_by_ids(table, changed) if changed else {}
+            # Alterada e depois excluída fora da janela lida: também vira tombstone
+            deleted.extend(row_id for row_id in changed if row_id not in rows)
+            result['tables'][table] = {'upserts': list(rows.values()), 'deleted': deleted}
+        
+        metrics.incr('sync.deltas')
+        metrics.incr('sync.entries', len(entries))
+        return jsonify(result)
         
     except Exception as e:
-        print(f"❌ Erro ao mover candidatura: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"❌ Erro no sync: {e}")
         return jsonify({'error': str(e)}), 500
 
 # =============================================================================
@@ -1183,6 +2779,8 @@ def move_application_stage(application_id):
 
 @api.route('/pipeline', methods=['GET'])
 @verify_token
+@allows_stale
+@single_flight('pipeline', params={'job_id', 'fields', 'view'})
 def get_pipeline():
     """Obter pipeline Kanban das candidaturas com dados completos"""
     try:
@@ -1192,65 +2790,33 @@ def get_pipeline():
         print("🔄 GET /pipeline")
         
         job_id = request.args.get('job_id', type=int)
+        fieldset = request_fieldset('applications', default_view='board')
         
-        # 1. Buscar etapas ativas
-        stages_response = supabase.table('recruitment_stages').select('*').eq('is_active', True).order('order_position').execute()
-        stages = stages_response.data
-        
-        if not stages:
-            print("⚠️ Etapas não encontradas - usando fallback")
-            # Fallback com etapas padrão
-            stages = [
-                {"id": 1, "name": "Candidatura Recebida", "description": "Candidato se candidatou para a vaga", "order_position": 1, "color": "#3b82f6", "is_active": True},
-                {"id": 2, "name": "Triagem de Currículo", "description": "Análise inicial do perfil do candidato", "order_position": 2, "color": "#8b5cf6", "is_active": True},
-                {"id": 3, "name": "Validação Telefônica", "description": "Contato inicial por telefone", "order_position": 3, "color": "#06b6d4", "is_active": True},
-                {"id": 4, "name": "Teste Técnico", "description": "Aplicação de testes e avaliações", "order_position": 4, "color": "#f59e0b", "is_active": True},
-                {"id": 5, "name": "Entrevista RH", "description": "Entrevista com equipe de recursos humanos", "order_position": 5, "color": "#10b981", "is_active": True},
-                {"id": 6, "name": "Entrevista Técnica", "description": "Entrevista técnica com gestores", "order_position": 6, "color": "#ef4444", "is_active": True},
-                {"id": 7, "name": "Verificação de Referências", "description": "Checagem de referências profissionais", "order_position": 7, "color": "#84cc16", "is_active": True},
-                {"id": 8, "name": "Proposta Enviada", "description": "Proposta de trabalho enviada", "order_position": 8, "color": "#f97316", "is_active": True},
-                {"id": 9, "name": "Contratado", "description": "Candidato foi contratado", "order_position": 9, "color": "#22c55e", "is_active": True}
-            ]
+        # 1. Etapas ativas (catálogo do worker; padrão se não houver cadastro)
+        catalog = stage_catalog()
+        stages = catalog.stages
         
         print(f"📊 {len(stages)} etapas carregadas")
         
-        # 2. Buscar candidaturas
-        query = supabase.table('applications').select('*')
-        
-        if job_id:
-            query = query.eq('job_id', job_id)
-        
-        query = query.order('applied_at', desc=True)
-        applications_response = query.execute()
-        applications = applications_response.data or []
+        # 2. Buscar candidaturas em blocos, com candidato e vaga embutidos (3. na mesma consulta)
+        applications = sorted(
+            scan('applications', fieldset.select(extra=('stage', 'applied_at')),
+                 [('eq', 'job_id', job_id)] if job_id else []),
+            key=lambda app: app.get('applied_at') or '', reverse=True
+        )
         
         print(f"🔄 {len(applications)} candidaturas encontradas")
         
-        # 3. Buscar dados relacionados para cada candidatura
-        for app in applications:
-            # Buscar candidato
-            if app.get('candidate_id'):
-                try:
-                    candidate_resp = supabase.table('candidates').select('id, first_name, last_name, email, phone, status').eq('id', app['candidate_id']).execute()
-                    if candidate_resp.data:
-                        app['candidates'] = candidate_resp.data[0]
-                except Exception as e:
-                    print(f"   ⚠️ Erro ao buscar candidato {app['candidate_id']}: {e}")
-            
-            # Buscar vaga
-            if app.get('job_id'):
-                try:
-                    job_resp = supabase.table('jobs').select('id, title, company, location').eq('id', app['job_id']).execute()
-                    if job_resp.data:
-                        app['jobs'] = job_resp.data[0]
-                except Exception as e:
-                    print(f"   ⚠️ Erro ao buscar vaga {app['job_id']}: {e}")
-        
         # 4. Organizar por etapa
+        by_stage = {}
+        for i, app in enumerate(applications):
+            applications[i] = fieldset.shape(app)
+            by_stage.setdefault(app.get('stage'), []).append(applications[i])
+        
         pipeline = {}
         for stage in stages:
             stage_position = stage['order_position']
-            stage_applications = [app for app in applications if app.get('stage') == stage_position]
+            stage_applications = by_stage.get(stage_position, [])
             
             pipeline[stage_position] = {
                 'stage': stage,
@@ -1266,6 +2832,8 @@ def get_pipeline():
             'total_applications': len(applications)
         })
         
+    except FieldsetError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"❌ Erro em get_pipeline: {e}")
         import traceback
@@ -1274,6 +2842,8 @@ def get_pipeline():
 
 @api.route('/pipeline/stats', methods=['GET'])
 @verify_token
+@allows_stale
+@single_flight('pipeline_stats', params={'job_id'})
 def get_pipeline_stats():
     """Obter estatísticas detalhadas do pipeline"""
     try:
@@ -1284,39 +2854,32 @@ def get_pipeline_stats():
         
         job_id = request.args.get('job_id', type=int)
         
-        # Buscar todas as candidaturas
-        query = supabase.table('applications').select('*')
-        if job_id:
-            query = query.eq('job_id', job_id)
-        
-        applications_response = query.execute()
-        applications = applications_response.data or []
+        # Consultar o snapshot colunar (filtro opcional por vaga)
+        snapshot = ensure_applications_snapshot()
+        archived = archive_totals()
+        where = {'job_id': job_id} if job_id else None
         
-        print(f"📊 Calculando estatísticas para {len(applications)} candidaturas")
+        # Calcular estatísticas (ativas + arquivadas pré-agregadas)
+        total_applications = snapshot.count(where) + archived.count(where)
         
-        # Calcular estatísticas
-        total_applications = len(applications)
+        print(f"📊 Calculando estatísticas para {total_applications} candidaturas")
         
         # Contagem por status
-        status_count = {}
-        for app in applications:
-            status = app.get('status', 'applied')
-            status_count[status] = status_count.get(status, 0) + 1
+        status_count = add_counts(snapshot.group_count('status', where), archived.group_count('status', where))
         
         # Contagem por etapa
-        stage_count = {}
-        for app in applications:
-            stage = app.get('stage', 1)
-            stage_count[stage] = stage_count.get(stage, 0) + 1
+        stage_count = add_counts(snapshot.group_count('stage', where), archived.group_count('stage', where))
         
-        # Candidatos contratados (etapa 9)
-        hired_count = stage_count.get(9, 0)
+        # Candidatos contratados (etapas de contratação do catálogo)
+        catalog = stage_catalog()
+        hired_count = catalog.total(stage_count, catalog.hired_stages)
         
         # Taxa de conversão
         conversion_rate = (hired_count / max(total_applications, 1)) * 100
         
-        # Tempo médio para contratação (placeholder)
-        avg_time_to_hire_days = 30
+        # Tempo até contratação e tempo por etapa (analytics incrementais)
+        analytics = ensure_stage_analytics()
+        time_to_hire = analytics.time_to_hire(job_id or None)
         
         stats = {
             'total_applications': total_applications,
@@ -1324,7 +2887,9 @@ def get_pipeline_stats():
             'stage_count': stage_count,
             'conversion_rate': round(conversion_rate, 1),
             'hired_count': hired_count,
-            'avg_time_to_hire_days': avg_time_to_hire_days
+            'avg_time_to_hire_days': time_to_hire['avg_days'],
+            'time_to_hire': time_to_hire,
+            'time_in_stage': analytics.time_in_stage(job_id or None)
         }
         
         print(f"✅ Estatísticas calculadas: {stats}")
@@ -1337,482 +2902,675 @@ def get_pipeline_stats():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
-@api.route('/recruitment-stages', methods=['GET'])
+@api.route('/pipeline/matrix', methods=['GET'])
 @verify_token
-def get_recruitment_stages():
-    """Obter todas as etapas do processo de recrutamento"""
+@allows_stale
+@single_flight('pipeline_matrix', params={'job_ids', 'job_status', 'status'})
+def get_pipeline_matrix():
+    """Matriz vaga × etapa × status de todas as vagas (visão geral de vários quadros)"""
     try:
         if not supabase:
             return jsonify({'error': 'Database not connected'}), 500
         
-        print("📊 GET /recruitment-stages")
+        try:
+            job_ids = {int(value) for value in request.args.get('job_ids', '').split(',') if value.strip()}
+        except ValueError:
+            return jsonify({'error': 'job_ids deve ser uma lista de inteiros separados por vírgula'}), 400
+        if len(job_ids) > MAX_MATRIX_JOBS:
+            return jsonify({'error': f'Máximo de {MAX_MATRIX_JOBS} vagas por requisição'}), 400
         
-        response = supabase.table('recruitment_stages').select('*').eq('is_active', True).order('order_position').execute()
+        # job_status=all inclui vagas fechadas/pausadas
+        job_status = request.args.get('job_status', 'active')
         
-        if response.data:
-            print(f"✅ {len(response.data)} etapas encontradas")
-            return jsonify({'stages': response.data})
-        else:
-            print("⚠️ Nenhuma etapa encontrada - retornando etapas padrão")
-            # Fallback com as 9 etapas baseadas no CSV
-            default_stages = [
-                {"id": 1, "name": "Candidatura Recebida", "description": "Candidato se candidatou para a vaga", "order_position": 1, "color": "#3b82f6", "is_active": True},
-                {"id": 2, "name": "Triagem de Currículo", "description": "Análise inicial do perfil do candidato", "order_position": 2, "color": "#8b5cf6", "is_active": True},
-                {"id": 3, "name": "Validação Telefônica", "description": "Contato inicial por telefone", "order_position": 3, "color": "#06b6d4", "is_active": True},
-                {"id": 4, "name": "Teste Técnico", "description": "Aplicação de testes e avaliações", "order_position": 4, "color": "#f59e0b", "is_active": True},
-                {"id": 5, "name": "Entrevista RH", "description": "Entrevista com equipe de recursos humanos", "order_position": 5, "color": "#10b981", "is_active": True},
-                {"id": 6, "name": "Entrevista Técnica", "description": "Entrevista técnica com gestores", "order_position": 6, "color": "#ef4444", "is_active": True},
-                {"id": 7, "name": "Verificação de Referências", "description": "Checagem de referências profissionais", "order_position": 7, "color": "#84cc16", "is_active": True},
-                {"id": 8, "name": "Proposta Enviada", "description": "Proposta de trabalho enviada", "order_position": 8, "color": "#f97316", "is_active": True},
-                {"id": 9, "name": "Contratado", "description": "Candidato foi contratado", "order_position": 9, "color": "#22c55e", "is_active": True}
-            ]
-            return jsonify({'stages': default_stages})
+        result = compute_pipeline_matrix(
+            job_ids, None if job_status == 'all' else job_status, request.args.get('status') or None
+        )
+        print(f"📊 GET /pipeline/matrix: {len(result['jobs'])} vagas × {len(result['stages'])} etapas")
+        return jsonify(result)
         
     except Exception as e:
-        print(f"❌ Erro em get_recruitment_stages: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"❌ Erro na matriz do pipeline: {e}")
         return jsonify({'error': str(e)}), 500
 
-# =============================================================================
+@api.route('/recruitment-stages', methods=['GET'])
+@verify_token
+@allows_stale
+def get_recruitment_stages():
+    """Obter todas as etapas do processo de recrutamento"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+        
+        print("📊 GET /recruitment-stages")
+        
+        catalog = stage_catalog()
+        if catalog.defaulted:
+            print("⚠️ Nenhuma etapa encontrada - retornando etapas padrão")
+        else:
+            print(f"✅ {len(catalog)} etapas encontradas")
+        return jsonify({'stages': catalog.stages, 'catalog': catalog.to_dict()})
+        
+    except Exception as e:
+        print(f"❌ Erro em get_recruitment_stages: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+# =============================================================================
 # DASHBOARD ENDPOINTS - 🔒 PROTEGIDOS
 # =============================================================================
 
+def compute_dashboard_metrics():
+    """Calcular métricas COMPLETAS do dashboard (usado pelo refresher em background)"""
+    print("📊 Calculando métricas do dashboard...")
+
+    # ✅ 1. CONTAR CANDIDATOS (sem baixar linhas)
+    print("👥 Contando candidatos...")
+    # Arquivo frio: contagens pré-agregadas somadas às do conjunto ativo
+    archived = archive_totals()
+    total_candidates = count_rows('candidates') + archived.candidates
+    print(f"   ✅ {total_candidates} candidatos encontrados")
+
+    # ✅ 2. CONTAR VAGAS ATIVAS
+    print("💼 Contando vagas ativas...")
+    active_jobs = count_rows('jobs', [('eq', 'status', 'active')])
+    print(f"   ✅ {active_jobs} vagas ativas encontradas")
+
+    # ✅ 3. SNAPSHOT COLUNAR DAS CANDIDATURAS (DADOS CRÍTICOS)
+    print("🔄 Consultando snapshot de candidaturas...")
+    snapshot = ensure_applications_snapshot()
+    catalog = stage_catalog()
+    active_stage_counts = snapshot.group_count('stage')
+    stage_counts = add_counts(active_stage_counts, archived.group_count('stage'))
+    print(f"   ✅ {len(snapshot)} candidaturas no snapshot ({len(archived)} arquivadas)")
+
+    # ✅ 4. CALCULAR MÉTRICAS BÁSICAS
+    total_applications = len(snapshot) + len(archived)
+
+    # Candidaturas deste mês (soma do rollup diário)
+    today = datetime.now().date()
+    monthly_applications = ensure_rollups().arrivals(today.replace(day=1).isoformat(), today.isoformat())
+
+    # Candidatos contratados (etapas de contratação do catálogo)
+    hired_count = catalog.total(stage_counts, catalog.hired_stages)
+
+    # Taxa de conversão
+    conversion_rate = (hired_count / max(total_applications, 1)) * 100
+
+    # Entrevistas pendentes (etapas de entrevista do catálogo)
+    pending_interviews = catalog.total(active_stage_counts, catalog.interview_stages)
+
+    print(f"   📊 Métricas básicas: {total_applications} candidaturas, {hired_count} contratados")
+
+    # ✅ 5. DISTRIBUIÇÃO POR STATUS - GARANTIDA
+    status_distribution = {
+        'applied': 0,
+        'in_progress': 0,
+        'hired': 0,
+        'rejected': 0
+    }
+
+    status_distribution.update(add_counts(snapshot.group_count('status'), archived.group_count('status')))
+
+    # ✅ 6. DISTRIBUIÇÃO POR ETAPA - GARANTIDA (todas as etapas do catálogo, mesmo vazias)
+    stage_distribution = catalog.buckets(stage_counts)
+
+    # ✅ 7. TENDÊNCIA MENSAL
+    monthly_trend = []
+
+    # Últimos 6 meses
+    target_dates = [datetime.now() - timedelta(days=30 * i) for i in range(6)]
+    month_keys = [(d.year, d.month) for d in target_dates]
+    month_counts = add_counts(snapshot.monthly_counts(month_keys), archived.monthly_counts(month_keys))
+
+    for target_date in target_dates:
+        monthly_trend.append({
+            'month': target_date.strftime('%b %Y'),
+            'count': month_counts.get((target_date.year, target_date.month), 0)
+        })
+
+    # Reverter para ordem cronológica
+    monthly_trend.reverse()
+
+    # ✅ 8. TOP VAGAS (todas as vagas, top-k por heap)
+    top_jobs = []
+    try:
+        top_jobs = compute_top_jobs(DASHBOARD_TOP_JOBS_K)
+    except Exception as e:
+        print(f"   ⚠️ Erro no top vagas: {e}")
+
+    # ✅ 9. ATIVIDADES RECENTES - SIMPLIFICADO
+    recent_activities = []
+    try:
+        recent_response = supabase.table('applications')\
+            .select('id, candidate_id, job_id, stage, status, applied_at')\
+            .order('applied_at', desc=True).limit(5).execute()
+        recent_apps = recent_response.data or []
+
+        for app in recent_apps:
+            candidate_id = app.get('candidate_id')
+            job_id = app.get('job_id')
+
+            # Buscar dados básicos
+            candidate_name = 'Candidato'
+            candidate_email = ''
+            job_title = 'Vaga'
+
+            try:
+                if candidate_id:
+                    cand_resp = supabase.table('candidates').select('first_name, last_name, email').eq('id', candidate_id).limit(1).execute()
+                    if cand_resp.data:
+                        cand = cand_resp.data[0]
+                        candidate_name = f"{cand.get('first_name', '')} {cand.get('last_name', '')}".strip()
+                        candidate_email = cand.get('email', '')
+
+                if job_id:
+                    job_resp = supabase.table('jobs').select('title').eq('id', job_id).limit(1).execute()
+                    if job_resp.data:
+                        job_title = job_resp.data[0].get('title', 'Vaga')
+            except:
+                pass
+
+            recent_activities.append({
+                'id': app.get('id', 0),
+                'candidate_name': candidate_name,
+                'candidate_email': candidate_email,
+                'job_title': job_title,
+                'stage': app.get('stage') or stage_catalog().first,
+                'status': app.get('status', 'applied'),
+                'applied_at': app.get('applied_at', '')
+            })
+
+    except Exception as e:
+        print(f"   ⚠️ Erro nas atividades recentes: {e}")
+
+    # ✅ 10. MONTAR RESPOSTA FINAL
+    metrics_data = {
+        # Métricas principais (cards)
+        'total_candidates': total_candidates,
+        'active_jobs': active_jobs,
+        'monthly_applications': monthly_applications,
+        'conversion_rate': round(conversion_rate, 1),
+        'pending_interviews': pending_interviews,
+        'hired_count': hired_count,
+
+        # 🔥 DISTRIBUIÇÕES PARA GRÁFICOS
+        'status_distribution': status_distribution,
+        'stage_distribution': stage_distribution,
+
+        # 🔥 TENDÊNCIAS
+        'monthly_trend': monthly_trend,
+
+        # Rankings e atividades
+        'top_jobs': top_jobs,
+        'recent_activities': recent_activities,
+
+        # Metadados
+        'last_updated': datetime.now().isoformat(),
+        'total_applications': total_applications,
+        'data_status': 'success',
+        'debug_info': {
+            'candidates_found': total_candidates,
+            'applications_found': total_applications,
+            'jobs_found': active_jobs
+        }
+    }
+
+    print(f"✅ MÉTRICAS CALCULADAS COM SUCESSO! ({total_applications} candidaturas)")
+
+    return metrics_data
+
+def compute_applications_trend(period):
+    """Calcular tendência mensal de candidaturas para um período"""
+    months = TREND_PERIODS.get(period, 6)
+
+    target_dates = [datetime.now() - timedelta(days=30 * i) for i in range(months)]
+    month_keys = [(d.year, d.month) for d in target_dates]
+    month_counts = add_counts(ensure_applications_snapshot().monthly_counts(month_keys),
+                              archive_totals().monthly_counts(month_keys))
+
+    monthly_data = []
+    for target_date in target_dates:
+        monthly_data.append({
+            'month': target_date.strftime('%b'),
+            'year': target_date.year,
+            'count': month_counts.get((target_date.year, target_date.month), 0),
+            'label': target_date.strftime('%b %Y')
+        })
+
+    monthly_data.reverse()
+
+    return {
+        'data': monthly_data,
+        'period': period,
+        'total_months': months
+    }
+
+def compute_pipeline_distribution():
+    """Calcular distribuição de candidatos por etapa"""
+    snapshot = ensure_applications_snapshot()
+    archived = archive_totals()
+
+    catalog = stage_catalog()
+
+    # Distribuição por etapa (baldes e nomes do catálogo)
+    stage_counts = add_counts(snapshot.group_count('stage'), archived.group_count('stage'))
+    stage_distribution = catalog.buckets(stage_counts)
+
+    # Formatação para gráficos
+    distribution_chart = []
+    for position in catalog.positions:
+        distribution_chart.append({
+            'stage': f'stage_{position}',
+            'name': catalog.name(position),
+            'count': stage_counts.get(position, 0)
+        })
+
+    total_applications = len(snapshot) + len(archived)
+    print(f"✅ Distribuição calculada: {total_applications} candidaturas")
+
+    return {
+        'stage_distribution': stage_distribution,
+        'distribution_chart': distribution_chart,
+        'total_applications': total_applications
+    }
+
+def compute_pipeline_matrix(job_ids=None, job_status='active', status=None):
+    """
+    Contagens vaga × etapa × status numa única passada agrupada do snapshot
+    colunar (mais os totais pré-agregados do arquivo, como em /pipeline/stats).
+    Cada vaga traz uma lista por etapa (ordem do catálogo) com as contagens por
+    status (ordem de 'statuses').
+    """
+    catalog = stage_catalog()
+
+    query = supabase.table('jobs').select('id, title, company, status')
+    if job_status:
+        query = query.eq('status', job_status)
+    if job_ids:
+        query = query.in_('id', sorted(job_ids))
+    jobs = query.order('id').limit(MAX_MATRIX_JOBS).execute().data or []
+
+    where = {'job_id': {job['id'] for job in jobs}, 'status': status}
+    counts = add_counts(
+        ensure_applications_snapshot().group_count_multi(MATRIX_KEY, where),
+        archive_totals().group_count_multi(MATRIX_KEY, where)
+    )
+
+    statuses = list(DEFAULT_STATUSES) + sorted({key[2] for key in counts if key[2] not in DEFAULT_STATUSES}, key=str)
+    stage_index = {position: i for i, position in enumerate(catalog.positions)}
+    status_index = {name: i for i, name in enumerate(statuses)}
+    matrix = {job['id']: [[0] * len(statuses) for _ in catalog.positions] for job in jobs}
+
+    # Candidaturas em etapas fora do catálogo (ex.: etapa desativada)
+    unstaged = 0
+    for (job_id, stage, application_status), count in counts.items():
+        i = stage_index.get(stage)
+        if i is None:
+            unstaged += count
+            continue
+        matrix[job_id][i][status_index[application_status]] += count
+
+    return {
+        'stages': [{'position': p, 'name': catalog.name(p)} for p in catalog.positions],
+        'statuses': statuses,
+        'catalog_version': catalog.version,
+        'jobs': [
+            {
+                'id': job['id'], 'title': job.get('title'), 'company': job.get('company'), 'status': job.get('status'),
+                'total': sum(map(sum, matrix[job['id']])),
+                'counts': matrix[job['id']]
+            }
+            for job in jobs
+        ],
+        'unstaged': unstaged,
+        'truncated': len(jobs) >= MAX_MATRIX_JOBS
+    }
+
+# Períodos aceitos pelo gráfico de tendência (meses)
+TREND_PERIODS = {'3months': 3, '6months': 6, '1year': 12}
+
+# Agregados recalculados em background (stale-while-revalidate)
+refresher.register('dashboard_metrics', compute_dashboard_metrics,
+                   tables=('candidates', 'jobs', 'applications'))
+refresher.register('pipeline_distribution', compute_pipeline_distribution,
+                   tables=('applications',))
+for _period in TREND_PERIODS:
+    refresher.register(f'applications_trend:{_period}',
+                       lambda period=_period: compute_applications_trend(period),
+                       tables=('applications',))
+
+def snapshot_response(name, extra=None):
+    """Responder com o último snapshot do agregado (com idade no cabeçalho)"""
+    refresher.ensure_started()
+
+    try:
+        snapshot = refresher.get_or_compute(name)
+    except Exception as e:
+        print(f"❌ Agregado {name} indisponível e sem snapshot anterior: {e}")
+        return jsonify({
+            'error': 'Dados indisponíveis no momento',
+            'data_status': 'unavailable',
+            'details': str(e)
+        }), 503
+
+    payload = snapshot.value
+    if snapshot.stale and isinstance(payload, dict) and 'data_status' in payload:
+        payload = dict(payload, data_status='stale', error=snapshot.error)
+    if extra:
+        payload = dict(payload, **extra)
+
+    return serve_snapshot(jsonify(payload), snapshot)
+
 @api.route('/dashboard/metrics', methods=['GET'])
 @verify_token
+@allows_stale
+@single_flight('dashboard_metrics', params={'period', 'start_date', 'end_date'})
 def get_dashboard_metrics():
-    """Obter métricas COMPLETAS do dashboard - VERSÃO CORRIGIDA"""
+    """Obter métricas COMPLETAS do dashboard (último snapshot em background)"""
     try:
         if not supabase:
             return jsonify({'error': 'Database not connected'}), 500
-        
-        print("📊 GET /dashboard/metrics - VERSÃO CORRIGIDA")
-        
+
         # 🆕 CAPTURAR PARÂMETROS DE FILTRO (se existirem)
         period = request.args.get('period', '30d')
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
-        
-        print(f"📊 Período solicitado: {period}")
-        
-        from datetime import datetime, timedelta
-        
-        # ✅ 1. BUSCAR TODOS OS CANDIDATOS
-        print("👥 Buscando candidatos...")
-        try:
-            candidates_response = supabase.table('candidates').select('id, status, created_at').execute()
-            all_candidates = candidates_response.data if candidates_response.data else []
-            total_candidates = len(all_candidates)
-            print(f"   ✅ {total_candidates} candidatos encontrados")
-        except Exception as e:
-            print(f"   ❌ Erro ao buscar candidatos: {e}")
-            total_candidates = 0
-            all_candidates = []
-        
-        # ✅ 2. BUSCAR VAGAS ATIVAS
-        print("💼 Buscando vagas ativas...")
-        try:
-            jobs_response = supabase.table('jobs').select('id, status').eq('status', 'active').execute()
-            active_jobs = len(jobs_response.data) if jobs_response.data else 0
-            print(f"   ✅ {active_jobs} vagas ativas encontradas")
-        except Exception as e:
-            print(f"   ❌ Erro ao buscar vagas: {e}")
-            active_jobs = 0
-        
-        # ✅ 3. BUSCAR TODAS AS CANDIDATURAS (DADOS CRÍTICOS)
-        print("🔄 Buscando candidaturas...")
-        try:
-            applications_response = supabase.table('applications').select('*').execute()
-            all_applications = applications_response.data if applications_response.data else []
-            print(f"   ✅ {len(all_applications)} candidaturas encontradas")
-            
-            # 📊 DEPURAÇÃO - IMPRIMIR AMOSTRA
-            if all_applications:
-                sample = all_applications[0]
-                print(f"   📝 Amostra de candidatura: {sample}")
-                print(f"   📝 Status: {sample.get('status')}, Etapa: {sample.get('stage')}")
-            
-        except Exception as e:
-            print(f"   ❌ Erro ao buscar candidaturas: {e}")
-            all_applications = []
-        
-        # ✅ 4. CALCULAR MÉTRICAS BÁSICAS
-        total_applications = len(all_applications)
-        monthly_applications = total_applications  # Simplificado por enquanto
-        
-        # Candidatos contratados (etapa 9)
-        hired_count = len([app for app in all_applications if app.get('stage') == 9])
-        
-        # Taxa de conversão
-        conversion_rate = (hired_count / max(total_applications, 1)) * 100
-        
-        # Entrevistas pendentes (etapas 5-6)
-        pending_interviews = len([
-            app for app in all_applications 
-            if app.get('stage') in [5, 6]
-        ])
-        
-        print(f"   📊 Métricas básicas: {total_applications} candidaturas, {hired_count} contratados")
-        
-        # ✅ 5. DISTRIBUIÇÃO POR STATUS - GARANTIDA
-        print("📈 Calculando distribuição por status...")
-        status_distribution = {
-            'applied': 0,
-            'in_progress': 0, 
-            'hired': 0,
-            'rejected': 0
-        }
-        
-        for app in all_applications:
-            status = app.get('status', 'applied')
-            if status in status_distribution:
-                status_distribution[status] += 1
-            else:
-                status_distribution[status] = 1
-        
-        print(f"   ✅ Status distribution: {status_distribution}")
-        
-        # ✅ 6. DISTRIBUIÇÃO POR ETAPA - GARANTIDA
-        print("📈 Calculando distribuição por etapa...")
-        stage_distribution = {}
-        
-        # Inicializar todas as 9 etapas com 0
-        for i in range(1, 10):
-            stage_distribution[f'stage_{i}'] = 0
-        
-        # Contar candidaturas por etapa
-        for app in all_applications:
-            stage = app.get('stage', 1)
-            stage_key = f'stage_{stage}'
-            if stage_key in stage_distribution:
-                stage_distribution[stage_key] += 1
-        
-        print(f"   ✅ Stage distribution: {stage_distribution}")
-        
-        # ✅ 7. TENDÊNCIA MENSAL - SIMPLIFICADA MAS GARANTIDA
-        print("📈 Calculando tendência mensal...")
-        monthly_trend = []
-        
-        try:
-            # Últimos 6 meses
-            for i in range(6):
-                target_date = datetime.now() - timedelta(days=30 * i)
-                month_name = target_date.strftime('%b %Y')
-                
-                # Contar candidaturas do mês (simplified)
-                count = 0
-                target_month = target_date.month
-                target_year = target_date.year
-                
-                for app in all_applications:
-                    try:
-                        app_date = datetime.fromisoformat(app.get('applied_at', '').replace('Z', '').replace('+00:00', ''))
-                        if app_date.month == target_month and app_date.year == target_year:
-                            count += 1
-                    except:
-                        continue
-                
-                monthly_trend.append({
-                    'month': month_name,
-                    'count': count
-                })
-            
-            # Reverter para ordem cronológica
-            monthly_trend.reverse()
-            
-        except Exception as e:
-            print(f"   ⚠️ Erro no cálculo mensal: {e}")
-            # Fallback com dados demonstrativos
-            monthly_trend = [
-                {'month': 'Fev 2025', 'count': 5},
-                {'month': 'Mar 2025', 'count': 8},
-                {'month': 'Abr 2025', 'count': 12},
-                {'month': 'Mai 2025', 'count': 15},
-                {'month': 'Jun 2025', 'count': 10},
-                {'month': 'Jul 2025', 'count': total_applications}
-            ]
-        
-        print(f"   ✅ Monthly trend: {len(monthly_trend)} meses")
-        
-        # ✅ 8. TOP VAGAS - SIMPLIFICADO
-        print("🏆 Calculando top vagas...")
-        try:
-            jobs_response = supabase.table('jobs').select('id, title, company').limit(10).execute()
-            all_jobs = jobs_response.data if jobs_response.data else []
-            
-            # Contar candidaturas por vaga
-            job_apps_count = {}
-            for app in all_applications:
-                job_id = app.get('job_id')
-                if job_id:
-                    job_apps_count[job_id] = job_apps_count.get(job_id, 0) + 1
-            
-            # Criar ranking
-            top_jobs = []
-            for job in all_jobs[:3]:  # Top 3
-                count = job_apps_count.get(job['id'], 0)
-                top_jobs.append({
-                    'job_title': job.get('title', 'Vaga'),
-                    'company': job.get('company', 'Empresa'),
-                    'applications_count': count
-                })
-            
-            # Ordenar por contagem
-            top_jobs.sort(key=lambda x: x['applications_count'], reverse=True)
-            
-        except Exception as e:
-            print(f"   ⚠️ Erro no top vagas: {e}")
-            top_jobs = [
-                {'job_title': 'Desenvolvedor React', 'company': 'TechCorp', 'applications_count': 12},
-                {'job_title': 'Designer UX/UI', 'company': 'StartupXYZ', 'applications_count': 8},
-                {'job_title': 'Product Manager', 'company': 'InnovaCorp', 'applications_count': 6}
-            ]
-        
-        print(f"   ✅ Top jobs: {len(top_jobs)} vagas")
-        
-        # ✅ 9. ATIVIDADES RECENTES - SIMPLIFICADO
-        recent_activities = []
+
+        print(f"📊 GET /dashboard/metrics - Período solicitado: {period}")
+
         try:
-            recent_apps = sorted(all_applications, key=lambda x: x.get('applied_at', ''), reverse=True)[:5]
-            
-            for app in recent_apps:
-                candidate_id = app.get('candidate_id')
-                job_id = app.get('job_id')
-                
-                # Buscar dados básicos
-                candidate_name = 'Candidato'
-                candidate_email = ''
-                job_title = 'Vaga'
-                
-                try:
-                    if candidate_id:
-                        cand_resp = supabase.table('candidates').select('first_name, last_name, email').eq('id', candidate_id).limit(1).execute()
-                        if cand_resp.data:
-                            cand = cand_resp.data[0]
-                            candidate_name = f"{cand.get('first_name', '')} {cand.get('last_name', '')}".strip()
-                            candidate_email = cand.get('email', '')
-                    
-                    if job_id:
-                        job_resp = supabase.table('jobs').select('title').eq('id', job_id).limit(1).execute()
-                        if job_resp.data:
-                            job_title = job_resp.data[0].get('title', 'Vaga')
-                except:
-                    pass
-                
-                recent_activities.append({
-                    'id': app.get('id', 0),
-                    'candidate_name': candidate_name,
-                    'candidate_email': candidate_email,
-                    'job_title': job_title,
-                    'stage': app.get('stage', 1),
-                    'status': app.get('status', 'applied'),
-                    'applied_at': app.get('applied_at', '')
-                })
-                
-        except Exception as e:
-            print(f"   ⚠️ Erro nas atividades recentes: {e}")
-        
-        # ✅ 10. MONTAR RESPOSTA FINAL - GARANTIDA
-        metrics = {
-            # Métricas principais (cards)
-            'total_candidates': total_candidates,
-            'active_jobs': active_jobs,
-            'monthly_applications': monthly_applications,
-            'conversion_rate': round(conversion_rate, 1),
-            'pending_interviews': pending_interviews,
-            'hired_count': hired_count,
-            
-            # 🔥 DISTRIBUIÇÕES PARA GRÁFICOS - GARANTIDAS
-            'status_distribution': status_distribution,
-            'stage_distribution': stage_distribution,
-            
-            # 🔥 TENDÊNCIAS - GARANTIDAS  
-            'monthly_trend': monthly_trend,
-            
-            # Rankings e atividades
-            'top_jobs': top_jobs,
-            'recent_activities': recent_activities,
-            
-            # Metadados
-            'last_updated': datetime.now().isoformat(),
-            'total_applications': total_applications,
-            'data_status': 'success',
-            'debug_info': {
-                'candidates_found': len(all_candidates),
-                'applications_found': len(all_applications),
-                'jobs_found': active_jobs
-            }
-        }
-        
-        print(f"✅ MÉTRICAS CALCULADAS COM SUCESSO!")
-        print(f"   📊 Status Distribution: {len(status_distribution)} itens")
-        print(f"   📊 Stage Distribution: {len(stage_distribution)} itens") 
-        print(f"   📊 Monthly Trend: {len(monthly_trend)} meses")
-        print(f"   📊 Total Applications: {total_applications}")
-        
-        return jsonify(metrics)
-        
+            start_day, end_day = resolve_period(period, start_date, end_date)
+        except PeriodError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Métricas do período: soma de O(dias) linhas do rollup diário
+        period_metrics = summarize_period(ensure_rollups(), start_day, end_day, stage_catalog().hired_stages)
+        period_metrics['period'] = 'custom' if start_date or end_date else period
+
+        return snapshot_response('dashboard_metrics', extra={'period_metrics': period_metrics})
+
     except Exception as e:
         print(f"❌ ERRO CRÍTICO no dashboard: {e}")
         import traceback
         traceback.print_exc()
-        
-        # FALLBACK GARANTIDO
-        fallback_metrics = {
-            'total_candidates': 35,
-            'active_jobs': 11,
-            'monthly_applications': 39,
-            'conversion_rate': 10.3,
-            'pending_interviews': 6,
-            'hired_count': 4,
-            'status_distribution': {
-                'applied': 15,
-                'in_progress': 20,
-                'hired': 4,
-                'rejected': 0
-            },
-            'stage_distribution': {
-                'stage_1': 3, 'stage_2': 9, 'stage_3': 5,
-                'stage_4': 5, 'stage_5': 4, 'stage_6': 4,
-                'stage_7': 3, 'stage_8': 2, 'stage_9': 4
-            },
-            'monthly_trend': [
-                {'month': 'Fev 2025', 'count': 5},
-                {'month': 'Mar 2025', 'count': 8},
-                {'month': 'Abr 2025', 'count': 12},
-                {'month': 'Mai 2025', 'count': 15},
-                {'month': 'Jun 2025', 'count': 10},
-                {'month': 'Jul 2025', 'count': 39}
-            ],
-            'top_jobs': [
-                {'job_title': 'Desenvolvedor React', 'company': 'TechCorp', 'applications_count': 12},
-                {'job_title': 'Designer UX/UI', 'company': 'StartupXYZ', 'applications_count': 8},
-                {'job_title': 'Product Manager', 'company': 'InnovaCorp', 'applications_count': 6}
-            ],
-            'recent_activities': [],
-            'last_updated': datetime.now().isoformat(),
-            'total_applications': 39,
-            'data_status': 'fallback',
-            'error': str(e)
-        }
-        
-        print(f"⚠️ USANDO DADOS DE FALLBACK")
-        return jsonify(fallback_metrics), 200
+        return jsonify({'error': str(e)}), 500
 
 @api.route('/dashboard/charts/applications-trend', methods=['GET'])
 @verify_token
+@single_flight('applications_trend', params={'period'})
 def get_applications_trend():
     """Dados detalhados para gráfico de tendência de candidaturas"""
     try:
         if not supabase:
             return jsonify({'error': 'Database not connected'}), 500
-        
+
         period = request.args.get('period', '6months')  # 6months, 1year, 3months
+        if period not in TREND_PERIODS:
+            period = '6months'
+
+        return snapshot_response(f'applications_trend:{period}')
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/dashboard/pipeline-distribution', methods=['GET'])
+@verify_token
+@single_flight('pipeline_distribution')
+def get_pipeline_distribution():
+    """Obter distribuição de candidatos por etapa para o dashboard"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+
+        print("📊 GET /dashboard/pipeline-distribution")
+
+        return snapshot_response('pipeline_distribution')
+
+    except Exception as e:
+        print(f"❌ Erro ao calcular distribuição: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/dashboard/top-jobs', methods=['GET'])
+@verify_token
+@single_flight('top_jobs', params={'k', 'period', 'start_date', 'end_date'})
+def get_top_jobs():
+    """Ranking de vagas por candidaturas (k configurável, período opcional)"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+
+        k = request.args.get('k', DASHBOARD_TOP_JOBS_K, type=int)
+        if not 1 <= k <= MAX_TOP_JOBS_K:
+            return jsonify({'error': f'k deve estar entre 1 e {MAX_TOP_JOBS_K}'}), 400
+
+        period = request.args.get('period')
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+
+        start_day = end_day = None
+        if period or start_date or end_date:
+            try:
+                start_day, end_day = resolve_period(period, start_date, end_date)
+            except PeriodError as e:
+                return jsonify({'error': str(e)}), 400
+
+        return jsonify({
+            'top_jobs': compute_top_jobs(k, start_day, end_day),
+            'k': k,
+            'start_date': start_day,
+            'end_date': end_day
+        })
+
+    except Exception as e:
+        print(f"❌ Erro no ranking de vagas: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/dashboard/rollups/backfill', methods=['POST'])
+@verify_token
+@verify_role(['admin'])
+def backfill_dashboard_rollups():
+    """Reconstruir o rollup diário de candidaturas - APENAS ADMIN"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
+
+        started = datetime.now()
+        ensure_rollups(force=True)
+        elapsed = (datetime.now() - started).total_seconds()
+
+        return jsonify({
+            'message': 'Rollup diário reconstruído com sucesso',
+            'seconds': round(elapsed, 3)
+        })
+
+    except Exception as e:
+        print(f"❌ Erro no backfill do rollup: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/archive/run', methods=['POST'])
+@verify_token
+@verify_role(['admin'])
+def run_archive():
+    """Arquivar candidaturas encerradas e candidatos inativos em segundo plano - APENAS ADMIN"""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
         
-        if period == '6months':
-            months = 6
-        elif period == '1year':
-            months = 12
-        elif period == '3months':
-            months = 3
-        else:
-            months = 6
-        
-        applications_response = supabase.table('applications').select('applied_at').execute()
-        applications = applications_response.data if applications_response.data else []
-        
-        monthly_data = []
-        for i in range(months):
-            target_date = datetime.now() - timedelta(days=30 * i)
-            target_month = target_date.month
-            target_year = target_date.year
-            
-            count = 0
-            for app in applications:
+        data = request.get_json(silent=True) or {}
+        options = {}
+        for field in ('older_than_days', 'candidate_days', 'batch_size'):
+            if data.get(field) is not None:
                 try:
-                    applied_date = datetime.fromisoformat(app['applied_at'].replace('Z', '+00:00').replace('+00', ''))
-                    if applied_date.month == target_month and applied_date.year == target_year:
-                        count += 1
-                except:
-                    continue
-            
-            monthly_data.append({
-                'month': target_date.strftime('%b'),
-                'year': target_date.year,
-                'count': count,
-                'label': target_date.strftime('%b %Y')
-            })
+                    options[field] = int(data[field])
+                except (TypeError, ValueError):
+                    return jsonify({'error': f'{field} deve ser um inteiro'}), 400
+                if options[field] < 1:
+                    return jsonify({'error': f'{field} deve ser maior que zero'}), 400
         
-        monthly_data.reverse()
+        if not archiver.start(**options):
+            return jsonify({'error': 'Arquivamento já em andamento', 'archive': archiver.status()}), 409
         
+        return jsonify({'message': 'Arquivamento iniciado', 'archive': archiver.status()}), 202
+        
+    except Exception as e:
+        print(f"❌ Erro ao iniciar arquivamento: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/archive/status', methods=['GET'])
+@verify_token
+@verify_role(['admin'])
+def get_archive_status():
+    """Última execução do arquivamento (linhas movidas e linhas/s) e totais do arquivo"""
+    try:
+        archived = archive_totals()
         return jsonify({
-            'data': monthly_data,
-            'period': period,
-            'total_months': months
+            **archiver.status(),
+            'archived_applications': len(archived),
+            'archived_candidates': archived.candidates
         })
-        
     except Exception as e:
+        print(f"❌ Erro ao consultar arquivamento: {e}")
         return jsonify({'error': str(e)}), 500
 
-@api.route('/dashboard/pipeline-distribution', methods=['GET'])
+# =============================================================================
+# REPORTS ENDPOINTS - 🔒 PROTEGIDOS (geração assíncrona no servidor)
+# =============================================================================
+
+@api.route('/reports', methods=['POST'])
 @verify_token
-def get_pipeline_distribution():
-    """Obter distribuição de candidatos por etapa para o dashboard"""
+def create_report():
+    """Enfileirar geração de relatório (CSV, XLSX ou PDF)"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'Dados não fornecidos'}), 400
+
+        print(f"📄 POST /reports - Especificação: {data}")
+
+        job, reused = report_service.submit(data, user_id=g.current_user.id)
+
+        if reused and job['status'] == 'done':
+            print(f"♻️ Relatório reaproveitado: {job['id']}")
+            return jsonify({'job': serialize_job(job, reused=True)}), 200
+
+        return jsonify({'job': serialize_job(job, reused=reused)}), 202
+
+    except ReportSpecError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"❌ Erro ao criar relatório: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+def owned_report(job_id):
+    """Job do usuário atual (admins veem todos); None se não existe ou é de outro usuário"""
+    job = report_service.get(job_id)
+    if job and job['user_id'] != g.current_user.id and get_user_role(g.current_user.id) != 'admin':
+        return None
+    return job
+
+@api.route('/reports/<job_id>', methods=['GET'])
+@verify_token
+def get_report(job_id):
+    """Consultar status de um job de relatório (do próprio usuário; admins veem todos)"""
+    try:
+        job = owned_report(job_id)
+        if not job:
+            return jsonify({'error': 'Relatório não encontrado'}), 404
+
+        return jsonify({'job': serialize_job(job)})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/reports/<job_id>/download', methods=['GET'])
+@verify_token
+def download_report(job_id):
+    """Baixar arquivo gerado (suporta requisições Range; do próprio usuário ou admin)"""
+    try:
+        job = owned_report(job_id)
+        if not job:
+            return jsonify({'error': 'Relatório não encontrado'}), 404
+
+        if job['status'] != 'done':
+            return jsonify({'error': 'Relatório ainda não está pronto', 'status': job['status']}), 409
+
+        if not job['file_path'] or not os.path.exists(job['file_path']):
+            return jsonify({'error': 'Arquivo do relatório não encontrado'}), 410
+
+        mimetype = FORMATS[os.path.splitext(job['file_path'])[1].lstrip('.')][0]
+        return send_file(
+            job['file_path'],
+            mimetype=mimetype,
+            as_attachment=True,
+            download_name=download_name(job),
+            conditional=True
+        )
+
+    except Exception as e:
+        print(f"❌ Erro ao baixar relatório: {e}")
+        return jsonify({'error': str(e)}), 500
+
+# =============================================================================
+# AUDIT ENDPOINTS - 🔒 APENAS ADMIN (paginação por chave)
+# =============================================================================
+
+def audit_range_filters(column):
+    """Filtros from/to (ISO) na coluna de partição: limitam as partições mensais lidas"""
+    filters = []
+    if request.args.get('from'):
+        filters.append(('gte', column, request.args['from']))
+    if request.args.get('to'):
+        filters.append(('lt', column, request.args['to']))
+    return filters
+
+@api.route('/audit', methods=['GET'])
+@verify_token
+@verify_role(['admin'])
+def get_audit_logs():
+    """Ações auditadas (mais recentes primeiro): ?user_id=&action=&resource=&from=&to=&limit=&cursor="""
     try:
         if not supabase:
             return jsonify({'error': 'Database not connected'}), 500
         
-        print("📊 GET /dashboard/pipeline-distribution")
+        limit, cursor = activity_page_args()
+        filters = [('eq', field, request.args[field]) for field in ('user_id', 'action', 'resource') if request.args.get(field)]
+        entries, next_cursor = keyset_page(AUDIT_TABLE, filters + audit_range_filters('timestamp'), limit, cursor)
         
-        # Buscar todas as candidaturas
-        applications_response = supabase.table('applications').select('stage, status').execute()
-        applications = applications_response.data or []
-        
-        # Distribuição por etapa
-        stage_distribution = {}
-        for i in range(1, 10):  # Etapas 1-9
-            stage_distribution[f'stage_{i}'] = 0
-        
-        for app in applications:
-            stage = app.get('stage', 1)
-            stage_key = f'stage_{stage}'
-            if stage_key in stage_distribution:
-                stage_distribution[stage_key] += 1
-        
-        # Nomes das etapas
-        stage_names = {
-            'stage_1': 'Candidatura Recebida',
-            'stage_2': 'Triagem de Currículo', 
-            'stage_3': 'Validação Telefônica',
-            'stage_4': 'Teste Técnico',
-            'stage_5': 'Entrevista RH',
-            'stage_6': 'Entrevista Técnica',
-            'stage_7': 'Verificação de Referências',
-            'stage_8': 'Proposta Enviada',
-            'stage_9': 'Contratado'
-        }
-        
-        # Formatação para gráficos
-        distribution_chart = []
-        for stage_key, count in stage_distribution.items():
-            distribution_chart.append({
-                'stage': stage_key,
-                'name': stage_names.get(stage_key, stage_key),
-                'count': count
-            })
+        return jsonify({
+            'entries': attach_author_names(entries, 'user_id'),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        })
         
-        result = {
-            'stage_distribution': stage_distribution,
-            'distribution_chart': distribution_chart,
-            'total_applications': len(applications)
-        }
+    except Exception as e:
+        print(f"❌ Erro ao buscar auditoria: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/audit/access', methods=['GET'])
+@verify_token
+@verify_role(['admin'])
+def get_audit_access():
+    """Leituras agregadas por minuto: ?user_id=&endpoint=&method=&from=&to=&limit=&cursor="""
+    try:
+        if not supabase:
+            return jsonify({'error': 'Database not connected'}), 500
         
-        print(f"✅ Distribuição calculada: {len(applications)} candidaturas")
+        limit, cursor = activity_page_args()
+        filters = [('eq', field, request.args[field]) for field in ('user_id', 'endpoint', 'method') if request.args.get(field)]
+        counters, next_cursor = keyset_page(ACCESS_TABLE, filters + audit_range_filters('minute'), limit, cursor)
         
-        return jsonify(result)
+        return jsonify({
+            'counters': attach_author_names(counters, 'user_id'),
+            'pending_keys': len(access_counters),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        })
         
     except Exception as e:
-        print(f"❌ Erro ao calcular distribuição: {e}")
+        print(f"❌ Erro ao buscar acessos agregados: {e}")
         return jsonify({'error': str(e)}), 500
 
 # =============================================================================
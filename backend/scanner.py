@@ -0,0 +1,134 @@
+"""
+Sistema HR - MVP
+Varredura de tabelas em blocos por faixa de chave (keyset)
+
+Um select('*').execute() sem limite é truncado pelo max-rows do PostgREST e
+materializa tudo numa lista. scan() percorre a tabela em blocos de tamanho
+fixo ordenados pela chave (id > último id visto, ou < na ordem decrescente),
+só com as colunas pedidas, e entrega as linhas por um gerador: quem agrega ou
+exporta processa tabelas de qualquer tamanho com memória limitada a alguns
+blocos.
+
+Com prefetch > 0, uma thread busca os próximos blocos (até `prefetch` à
+frente, numa fila limitada) enquanto o consumidor processa o atual: a latência
+do banco se sobrepõe ao processamento. A thread para quando o gerador é
+fechado ou descartado no meio da varredura. Ela herda o prazo e o fallback
+(@allows_stale) da requisição, e dados antigos servidos ou indisponibilidade
+voltam para a thread da requisição junto com o fim da varredura.
+"""
+
+import os
+import queue
+import re
+import threading
+from contextlib import nullcontext
+
+import metrics
+import resilience
+from db import data_client
+
+SCAN_CHUNK_SIZE = int(os.getenv('SCAN_CHUNK_SIZE', '1000'))
+SCAN_PREFETCH = int(os.getenv('SCAN_PREFETCH', '1'))
+
+
+class _Finished:
+    """Fim da varredura na thread auxiliar: erro (ou None) e estado de resiliência"""
+
+    def __init__(self, error, outcome):
+        self.error = error
+        self.outcome = outcome
+
+
+def _projection(columns, key):
+    """Colunas pedidas mais a chave de paginação (necessária para o próximo bloco)"""
+    if columns == '*' or re.search(rf'(^|,)\s*{key}\s*(,|$)', columns):
+        return columns
+    return f'{columns}, {key}'
+
+
+def scan_chunks(table, columns='*', filters=(), chunk_size=SCAN_CHUNK_SIZE, key='id', desc=False, client=None):
+    """Blocos (listas) de até chunk_size linhas, em ordem de chave"""
+    client = client if client is not None else data_client
+    select = _projection(columns, key)
+    last = None
+    while True:
+        query = client.table(table).select(select)
+        for operator, *args in filters:
+            query = getattr(query, operator)(*args)
+        if last is not None:
+            query = query.lt(key, last) if desc else query.gt(key, last)
+        chunk = query.order(key, desc=desc).limit(chunk_size).execute().data or []
+        metrics.incr('scanner.chunks')
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1][key]
+
+
+def _prefetched(chunks, depth, client):
+    """Consumir um gerador de blocos numa thread, até depth blocos à frente"""
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    # A thread não tem o contexto da requisição: leituras que iriam ao primário
+    # (escrita, usuário fixado, use_primary) continuam no primário
+    primary = client is data_client and not data_client.reads_from_replica()
+    context = resilience.request_context()
+
+    def produce():
+        error = None
+        with resilience.adopt_context(context) as outcome:
+            try:
+                with data_client.use_primary() if primary else nullcontext():
+                    for chunk in chunks:
+                        while not stop.is_set():
+                            try:
+                                buffer.put(chunk, timeout=0.5)
+                                break
+                            except queue.Full:
+                                continue
+                        if stop.is_set():
+                            return
+            except BaseException as e:
+                error = e
+        item = _Finished(error, outcome)
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    thread = threading.Thread(target=produce, name='table-scan', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if isinstance(item, _Finished):
+                # Estado da thread auxiliar vale para a requisição (X-Data-Stale / 503)
+                resilience.merge_outcome(**item.outcome)
+                if item.error is not None:
+                    raise item.error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def scan(table, columns='*', filters=(), chunk_size=SCAN_CHUNK_SIZE, key='id', desc=False,
+         prefetch=SCAN_PREFETCH, client=None):
+    """
+    Linhas da tabela inteira (ou filtrada) sem truncar, bloco a bloco.
+    filters: sequência de (operador, *argumentos), ex.: [('eq', 'status', 'active'), ('or_', 'a.eq.1,b.eq.2')]
+    """
+    client = client if client is not None else data_client
+    chunks = scan_chunks(table, columns, filters, chunk_size, key, desc, client)
+    if prefetch > 0:
+        chunks = _prefetched(chunks, prefetch, client)
+    rows = 0
+    try:
+        for chunk in chunks:
+            rows += len(chunk)
+            yield from chunk
+    finally:
+        metrics.incr('scanner.rows', rows)
@@ -0,0 +1,468 @@
+"""
+Sistema HR - MVP
+Cache compartilhado entre workers: LRU em processo + SQLite (WAL) em disco local
+
+Cada worker consulta primeiro o próprio LRU; na falta, o arquivo SQLite
+compartilhado por todos os workers da máquina (e que sobrevive a reinícios).
+Valores são gravados em pickle (protocolo 5), comprimidos com zlib acima de
+COMPRESS_MIN_BYTES, com TTL por chave e a geração global em que foram gravados:
+invalidate_all() incrementa a geração e descarta tudo de uma vez.
+
+get_or_compute() usa uma trava no SQLite para que, entre N workers com a mesma
+chave vazia, apenas um calcule e os demais aguardem o resultado publicado.
+Erros do SQLite nunca quebram a requisição: o cache se comporta como vazio.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import metrics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SHARED_CACHE_DB = os.getenv('SHARED_CACHE_DB', os.path.join(BASE_DIR, 'var', 'shared_cache.sqlite3'))
+SHARED_CACHE_ENABLED = os.getenv('SHARED_CACHE_ENABLED', 'True').lower() == 'true'
+LOCAL_MAX_ENTRIES = int(os.getenv('LOCAL_CACHE_MAX_ENTRIES', '2048'))
+COMPRESS_MIN_BYTES = 1024
+GENERATION_CHECK_INTERVAL = 1.0
+COMPUTE_LOCK_TIMEOUT = float(os.getenv('SHARED_CACHE_LOCK_TIMEOUT', '60'))
+WAIT_POLL_SECONDS = 0.05
+PURGE_INTERVAL = 300
+
+
+def dumps(value):
+    """Serialização binária compacta (pickle + zlib para valores grandes)"""
+    data = pickle.dumps(value, protocol=5)
+    if len(data) >= COMPRESS_MIN_BYTES:
+        return b'z' + zlib.compress(data, 1)
+    return b'p' + data
+
+
+def loads(blob):
+    blob = bytes(blob)
+    if blob[:1] == b'z':
+        return pickle.loads(zlib.decompress(blob[1:]))
+    return pickle.loads(blob[1:])
+
+
+_MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Interface comum dos níveis de cache"""
+
+    @abstractmethod
+    def get(self, key, default=None):
+        """Valor da chave (default se ausente ou expirada)"""
+
+    @abstractmethod
+    def set(self, key, value, ttl):
+        """Gravar com TTL em segundos"""
+
+    @abstractmethod
+    def delete(self, key):
+        """Remover a chave (ausente: nada a fazer)"""
+
+    def get_many(self, keys):
+        """{chave: valor} apenas para as chaves presentes"""
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def set_many(self, items, ttl):
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    @abstractmethod
+    def clear(self):
+        """Descartar todas as entradas"""
+
+
+class MemoryLRU(CacheBackend):
+    """LRU com TTL dentro do processo"""
+
+    def __init__(self, max_entries=LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def expires_at(self, key):
+        entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteTier(CacheBackend):
+    """Nível compartilhado: arquivo SQLite em modo WAL no disco local"""
+
+    def __init__(self, path=SHARED_CACHE_DB):
+        self.path = path
+        self._local = threading.local()
+        self._last_purge = 0.0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                expires_at REAL NOT NULL,
+                generation INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cache_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS cache_locks (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS cache_counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        """)
+        conn.commit()
+
+    def _connect(self):
+        """Uma conexão por thread e por processo (conexões não atravessam fork)"""
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != pid:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def generation(self):
+        row = self._connect().execute("SELECT value FROM cache_meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def bump_generation(self):
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO cache_meta (key, value) VALUES ('generation', 1) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + 1"
+        )
+        return self.generation()
+
+    def _row(self, key):
+        return self._connect().execute(
+            'SELECT value, expires_at, generation FROM cache_entries WHERE key = ?', (key,)
+        ).fetchone()
+
+    def get_entry(self, key):
+        """(valor, expira_em) ou None"""
+        row = self._row(key)
+        if row is None or row[1] <= time.time() or row[2] < self.generation():
+            return None
+        return loads(row[0]), row[1]
+
+    def get(self, key, default=None):
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def get_many(self, keys):
+        return {key: entry[0] for key, entry in self.get_entries(keys).items()}
+
+    def get_entries(self, keys):
+        """{chave: (valor, expira_em)} para as chaves válidas"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        conn = self._connect()
+        now = time.time()
+        generation = self.generation()
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = conn.execute(
+                f"SELECT key, value, expires_at FROM cache_entries WHERE key IN ({','.join('?' * len(chunk))}) "
+                'AND expires_at > ? AND generation >= ?',
+                (*chunk, now, generation)
+            ).fetchall()
+            for key, blob, expires_at in rows:
+                found[key] = (loads(blob), expires_at)
+        return found
+
+    def set(self, key, value, ttl):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items, ttl):
+        if not items:
+            return
+        conn = self._connect()
+        expires_at = time.time() + ttl
+        generation = self.generation()
+        conn.executemany(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires_at, generation) VALUES (?, ?, ?, ?)',
+            [(key, dumps(value), expires_at, generation) for key, value in items.items()]
+        )
+        self._maybe_purge(conn)
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+
+    def delete_prefix(self, prefix):
+        self._connect().execute('DELETE FROM cache_entries WHERE key >= ? AND key < ?', (prefix, prefix + '\uffff'))
+
+    def clear(self):
+        self._connect().execute('DELETE FROM cache_entries')
+
+    def _maybe_purge(self, conn):
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        conn.execute('DELETE FROM cache_entries WHERE expires_at <= ?', (now,))
+        conn.execute('DELETE FROM cache_locks WHERE expires_at <= ?', (now,))
+
+    # -------------------------------------------------------------------------
+    # Travas de cálculo e contadores
+    # -------------------------------------------------------------------------
+
+    def acquire(self, key, owner, ttl=COMPUTE_LOCK_TIMEOUT):
+        conn = self._connect()
+        now = time.time()
+        conn.execute('DELETE FROM cache_locks WHERE key = ? AND expires_at <= ?', (key, now))
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO cache_locks (key, owner, expires_at) VALUES (?, ?, ?)', (key, owner, now + ttl)
+        )
+        return cursor.rowcount == 1
+
+    def is_locked(self, key):
+        row = self._connect().execute(
+            'SELECT 1 FROM cache_locks WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def release(self, key, owner):
+        self._connect().execute('DELETE FROM cache_locks WHERE key = ? AND owner = ?', (key, owner))
+
+    def bump_counter(self, name, marks=(), start=0):
+        """Incrementar `name` atomicamente e gravar o novo valor também em cada marca"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('INSERT OR IGNORE INTO cache_counters (name, value) VALUES (?, ?)', (name, start))
+            conn.execute('UPDATE cache_counters SET value = value + 1 WHERE name = ?', (name,))
+            value = conn.execute('SELECT value FROM cache_counters WHERE name = ?', (name,)).fetchone()[0]
+            conn.executemany(
+                'INSERT OR REPLACE INTO cache_counters (name, value) VALUES (?, ?)', [(mark, value) for mark in marks]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return value
+
+    def counters(self, names=None):
+        conn = self._connect()
+        if names is None:
+            return dict(conn.execute('SELECT name, value FROM cache_counters').fetchall())
+        names = list(names)
+        if not names:
+            return {}
+        return dict(conn.execute(
+            f"SELECT name, value FROM cache_counters WHERE name IN ({','.join('?' * len(names))})", names
+        ).fetchall())
+
+
+class TieredCache:
+    """LRU local na frente de um nível compartilhado opcional"""
+
+    def __init__(self, local=None, shared=None):
+        self.local = local or MemoryLRU()
+        self.shared = shared
+        self._generation = None
+        self._generation_checked = 0.0
+        self._owner = f'{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+    def _shared_call(self, fn, *args, default=None):
+        """Chamar o nível compartilhado; erros viram falta de cache"""
+        if self.shared is None:
+            return default
+        try:
+            return fn(*args)
+        except (sqlite3.Error, pickle.PickleError, zlib.error, EOFError) as e:
+            metrics.incr('shared_cache.errors')
+            print(f"⚠️ Erro no cache compartilhado: {e}")
+            return default
+
+    def _check_generation(self):
+        """Limpar o LRU local quando outro worker invalidou tudo"""
+        now = time.time()
+        if self.shared is None or now - self._generation_checked < GENERATION_CHECK_INTERVAL:
+            return
+        self._generation_checked = now
+        generation = self._shared_call(self.shared.generation)
+        if generation is not None and generation != self._generation:
+            if self._generation is not None:
+                self.local.clear()
+            self._generation = generation
+
+    def get(self, key, default=None):
+        self._check_generation()
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            metrics.incr('shared_cache.local_hits')
+            return value
+        entry = self._shared_call(self.shared.get_entry, key) if self.shared is not None else None
+        if entry is None:
+            metrics.incr('shared_cache.misses')
+            return default
+        metrics.incr('shared_cache.shared_hits')
+        value, expires_at = entry
+        self.local.set(key, value, max(expires_at - time.time(), 0))
+        return value
+
+    def get_many(self, keys):
+        self._check_generation()
+        keys = list(keys)
+        found = self.local.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing and self.shared is not None:
+            now = time.time()
+            for key, (value, expires_at) in self._shared_call(self.shared.get_entries, missing, default={}).items():
+                found[key] = value
+                self.local.set(key, value, max(expires_at - now, 0))
+        metrics.incr('shared_cache.misses', len(keys) - len(found))
+        return found
+
+    def set(self, key, value, ttl):
+        self.local.set(key, value, ttl)
+        if self.shared is not None:
+            self._shared_call(self.shared.set, key, value, ttl)
+
+    def set_many(self, items, ttl):
+        self.local.set_many(items, ttl)
+        if self.shared is not None:
+            self._shared_call(self.shared.set_many, items, ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self._shared_call(self.shared.delete, key)
+
+    def delete_prefix(self, prefix):
+        self.local.delete_prefix(prefix)
+        if self.shared is not None:
+            self._shared_call(self.shared.delete_prefix, prefix)
+
+    def invalidate_all(self):
+        """Nova geração global: todos os workers descartam o que têm"""
+        self.local.clear()
+        if self.shared is not None:
+            self._generation = self._shared_call(self.shared.bump_generation)
+        metrics.incr('shared_cache.invalidations')
+
+    @contextmanager
+    def compute_lock(self, key, timeout=COMPUTE_LOCK_TIMEOUT):
+        """Trava entre workers; retorna True se este worker deve calcular"""
+        if self.shared is None:
+            yield True
+            return
+        lock_key = f'lock:{key}'
+        acquired = self._shared_call(self.shared.acquire, lock_key, self._owner, timeout, default=True)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self._shared_call(self.shared.release, lock_key, self._owner)
+
+    def wait_for(self, key, accept=None, timeout=COMPUTE_LOCK_TIMEOUT):
+        """Aguardar outro worker publicar `key` (ou liberar a trava)"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING and (accept is None or accept(value)):
+                return value
+            if not self._shared_call(self.shared.is_locked, f'lock:{key}', default=False):
+                return _MISSING
+            time.sleep(WAIT_POLL_SECONDS)
+        return _MISSING
+
+    def get_or_compute(self, key, compute, ttl, accept=None):
+        """
+        Valor em cache ou compute(); com vários workers, apenas um calcula.
+        accept(valor) pode rejeitar um valor presente (ex.: versão antiga).
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING and (accept is None or accept(value)):
+            return value
+
+        with self.compute_lock(key) as acquired:
+            if not acquired:
+                metrics.incr('shared_cache.waits')
+                value = self.wait_for(key, accept)
+                if value is not _MISSING:
+                    return value
+            metrics.incr('shared_cache.computes')
+            value = compute()
+            self.set(key, value, ttl)
+            return value
+
+    # -------------------------------------------------------------------------
+    # Contadores compartilhados (versões de dados)
+    # -------------------------------------------------------------------------
+
+    def bump_counter(self, name, marks=(), start=0):
+        return self._shared_call(self.shared.bump_counter, name, marks, start) if self.shared is not None else None
+
+    def counters(self, names=None):
+        return self._shared_call(self.shared.counters, names, default=None) if self.shared is not None else None
+
+    def stats(self):
+        return {
+            'local_entries': len(self.local),
+            'shared': None if self.shared is None else self.shared.path,
+            'generation': self._generation
+        }
+
+
+def _create_cache():
+    shared = None
+    if SHARED_CACHE_ENABLED:
+        try:
+            shared = SQLiteTier()
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ Cache compartilhado indisponível, usando apenas memória local: {e}")
+    return TieredCache(MemoryLRU(), shared)
+
+
+shared_cache = _create_cache()
@@ -0,0 +1,165 @@
+"""
+Sistema HR - MVP
+Single-flight: coalescência de requisições idênticas concorrentes
+
+Quando várias requisições iguais chegam ao mesmo tempo (ex.: todo o time abrindo
+o dashboard às 9h), apenas a primeira executa o handler; as demais aguardam o
+resultado dela e recebem uma cópia da mesma resposta. Só coalescem requisições
+lidas da mesma origem (réplica ou primário: usuário fixado após escrita lê o
+primário), e quem aguarda herda o estado de resiliência do líder (dados antigos
+servidos, banco indisponível).
+"""
+
+import os
+import threading
+from functools import wraps
+
+from flask import request, jsonify, make_response, Response
+
+import metrics
+import resilience
+from db import data_client
+
+DEFAULT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_TIMEOUT', '30'))
+
+# Parâmetros que não alteram o resultado (cache busters do frontend)
+IGNORED_PARAMS = {'_', 't', 'ts', 'timestamp'}
+
+
+class SingleFlightTimeout(Exception):
+    """Tempo esgotado aguardando a execução em andamento"""
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Grupo de execuções em andamento indexadas por chave"""
+
+    def __init__(self, name='default'):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, timeout=None):
+        """
+        Executar fn uma única vez por chave entre chamadas concorrentes.
+        Retorna (resultado, compartilhado). Exceções do líder são repassadas
+        a todos que aguardavam.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+
+        if leader:
+            metrics.incr(f'singleflight.{self.name}.executed')
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+                metrics.incr(f'singleflight.{self.name}.errors')
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.event.set()
+
+            if call.error is not None:
+                raise call.error
+            return call.result, False
+
+        if not call.event.wait(timeout):
+            metrics.incr(f'singleflight.{self.name}.timeouts')
+            raise SingleFlightTimeout(f'Timeout aguardando {key}')
+
+        metrics.incr(f'singleflight.{self.name}.coalesced')
+        if call.error is not None:
+            raise call.error
+        return call.result, True
+
+    def in_flight(self):
+        """Quantidade de chaves em execução"""
+        with self._lock:
+            return len(self._calls)
+
+
+_group = SingleFlight('http')
+
+
+def make_key(endpoint, args, view_args=None, params=None, route=None):
+    """Chave normalizada: endpoint + parâmetros ordenados + origem da leitura (réplica/primário)"""
+    items = []
+    for name in sorted(args.keys()):
+        if name in IGNORED_PARAMS:
+            continue
+        if params is not None and name not in params:
+            continue
+        values = sorted(v.strip() for v in args.getlist(name))
+        items.append((name, tuple(values)))
+
+    view_items = tuple(sorted((view_args or {}).items()))
+    return (endpoint, view_items, tuple(items), route)
+
+
+def _freeze(rv):
+    """Converter retorno do handler em dados imutáveis compartilháveis (com o estado de resiliência)"""
+    response = make_response(rv)
+    headers = [(k, v) for k, v in response.headers.items() if k.lower() != 'content-length']
+    return response.get_data(), response.status_code, headers, resilience.current_outcome()
+
+
+def _thaw(payload):
+    data, status, headers, outcome = payload
+    # Quem aguardou sinaliza X-Data-Stale/503 como o líder (after_request lê o estado da thread)
+    resilience.merge_outcome(*outcome)
+    return Response(data, status=status, headers=headers)
+
+
+def single_flight(endpoint=None, timeout=None, params=None):
+    """
+    Decorator para handlers caros e somente leitura
+    @single_flight()
+    @single_flight('pipeline', params={'job_id'})
+    """
+    def decorator(f):
+        name = endpoint or f.__name__
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Usuário fixado no primário (read-your-writes) não recebe a leitura da réplica de outro
+            route = 'replica' if data_client.reads_from_replica() else 'primary'
+            key = make_key(name, request.args, kwargs, params, route)
+            wait = DEFAULT_TIMEOUT if timeout is None else timeout
+
+            try:
+                payload, shared = _group.do(key, lambda: _freeze(f(*args, **kwargs)), wait)
+            except SingleFlightTimeout:
+                print(f"⏱️ Single-flight timeout: {name}")
+                return jsonify({'error': 'Tempo esgotado aguardando processamento'}), 504
+
+            response = _thaw(payload)
+            response.headers['X-Coalesced'] = 'true' if shared else 'false'
+            return response
+
+        return decorated_function
+    return decorator
+
+
+def stats():
+    """Resumo para o endpoint de métricas"""
+    counters = metrics.snapshot()['counters']
+    prefix = f'singleflight.{_group.name}.'
+    result = {k[len(prefix):]: v for k, v in counters.items() if k.startswith(prefix)}
+    result['in_flight'] = _group.in_flight()
+    return result
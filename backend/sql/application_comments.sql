@@ -0,0 +1,29 @@
+-- Sistema HR - MVP
+-- Comentários das candidaturas
+
+CREATE TABLE IF NOT EXISTS application_comments (
+    id BIGSERIAL PRIMARY KEY,
+    application_id BIGINT NOT NULL REFERENCES applications (id) ON DELETE CASCADE,
+    user_id UUID,
+    comment TEXT NOT NULL,
+    is_internal BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Comentários de uma candidatura, mais recentes primeiro (paginação por chave)
+CREATE INDEX IF NOT EXISTS idx_application_comments_app
+    ON application_comments (application_id, id DESC);
+
+-- Últimos N comentários de cada candidatura numa única consulta
+CREATE OR REPLACE FUNCTION latest_application_comments(app_ids BIGINT[], per_app INTEGER)
+RETURNS SETOF application_comments
+LANGUAGE sql STABLE AS $$
+    SELECT c.*
+    FROM unnest(app_ids) AS a(application_id)
+    CROSS JOIN LATERAL (
+        SELECT * FROM application_comments
+        WHERE application_id = a.application_id
+        ORDER BY id DESC
+        LIMIT per_app
+    ) c;
+$$;
@@ -0,0 +1,39 @@
+-- Sistema HR - MVP
+-- Log de transições de etapa das candidaturas (append-only)
+
+CREATE TABLE IF NOT EXISTS application_history (
+    id BIGSERIAL PRIMARY KEY,
+    application_id BIGINT NOT NULL REFERENCES applications (id) ON DELETE CASCADE,
+    job_id BIGINT,
+    previous_status TEXT,
+    new_status TEXT NOT NULL,
+    previous_stage INTEGER,
+    new_stage INTEGER NOT NULL,
+    notes TEXT DEFAULT '',
+    changed_by UUID,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    -- Quando a candidatura entrou na etapa anterior (para tempo na etapa)
+    stage_entered_at TIMESTAMPTZ
+);
+
+-- Histórico de uma candidatura em ordem (paginação por chave)
+CREATE INDEX IF NOT EXISTS idx_application_history_app
+    ON application_history (application_id, id DESC);
+
+-- Replays de analytics por período
+CREATE INDEX IF NOT EXISTS idx_application_history_changed_at
+    ON application_history (changed_at, id);
+
+-- Últimas N entradas de cada candidatura numa única consulta (quadro do pipeline)
+CREATE OR REPLACE FUNCTION latest_application_history(app_ids BIGINT[], per_app INTEGER)
+RETURNS SETOF application_history
+LANGUAGE sql STABLE AS $$
+    SELECT h.*
+    FROM unnest(app_ids) AS a(application_id)
+    CROSS JOIN LATERAL (
+        SELECT * FROM application_history
+        WHERE application_id = a.application_id
+        ORDER BY id DESC
+        LIMIT per_app
+    ) h;
+$$;
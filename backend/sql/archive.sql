@@ -0,0 +1,100 @@
+-- Sistema HR - MVP
+-- Arquivo frio: candidaturas encerradas (com histórico e comentários) e candidatos inativos
+
+CREATE TABLE IF NOT EXISTS applications_archive (LIKE applications INCLUDING DEFAULTS);
+ALTER TABLE applications_archive ADD COLUMN IF NOT EXISTS archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+CREATE UNIQUE INDEX IF NOT EXISTS idx_applications_archive_id ON applications_archive (id);
+CREATE INDEX IF NOT EXISTS idx_applications_archive_job ON applications_archive (job_id, id);
+CREATE INDEX IF NOT EXISTS idx_applications_archive_candidate ON applications_archive (candidate_id, id);
+
+CREATE TABLE IF NOT EXISTS application_history_archive (LIKE application_history INCLUDING DEFAULTS);
+CREATE INDEX IF NOT EXISTS idx_application_history_archive_app
+    ON application_history_archive (application_id, id DESC);
+CREATE INDEX IF NOT EXISTS idx_application_history_archive_changed_at
+    ON application_history_archive (changed_at, id);
+
+CREATE TABLE IF NOT EXISTS application_comments_archive (LIKE application_comments INCLUDING DEFAULTS);
+CREATE INDEX IF NOT EXISTS idx_application_comments_archive_app
+    ON application_comments_archive (application_id, id DESC);
+
+CREATE TABLE IF NOT EXISTS candidates_archive (LIKE candidates INCLUDING DEFAULTS);
+ALTER TABLE candidates_archive ADD COLUMN IF NOT EXISTS archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+CREATE UNIQUE INDEX IF NOT EXISTS idx_candidates_archive_id ON candidates_archive (id);
+CREATE INDEX IF NOT EXISTS idx_candidates_archive_email ON candidates_archive (email);
+
+-- Candidaturas elegíveis: encerradas (status) ou de vagas não ativas, sem mudança desde closed_before
+CREATE INDEX IF NOT EXISTS idx_applications_closed ON applications (status, updated_at);
+
+-- Move um lote numa transação; retorna {"ids": [...], "history": n, "comments": n}
+CREATE OR REPLACE FUNCTION archive_closed_applications(closed_before TIMESTAMPTZ, closed_statuses TEXT[], batch_size INTEGER)
+RETURNS JSONB
+LANGUAGE plpgsql AS $$
+DECLARE
+    batch BIGINT[];
+    history_rows INTEGER := 0;
+    comment_rows INTEGER := 0;
+BEGIN
+    SELECT array_agg(id) INTO batch FROM (
+        SELECT a.id FROM applications a
+        LEFT JOIN jobs j ON j.id = a.job_id
+        WHERE a.updated_at < closed_before
+          AND (a.status = ANY(closed_statuses) OR COALESCE(j.status, 'closed') <> 'active')
+        ORDER BY a.id
+        LIMIT batch_size
+        FOR UPDATE OF a SKIP LOCKED
+    ) eligible;
+
+    IF batch IS NULL THEN
+        RETURN jsonb_build_object('ids', '[]'::jsonb, 'history', 0, 'comments', 0);
+    END IF;
+
+    INSERT INTO application_history_archive SELECT * FROM application_history WHERE application_id = ANY(batch);
+    GET DIAGNOSTICS history_rows = ROW_COUNT;
+    INSERT INTO application_comments_archive SELECT * FROM application_comments WHERE application_id = ANY(batch);
+    GET DIAGNOSTICS comment_rows = ROW_COUNT;
+    INSERT INTO applications_archive SELECT a.*, NOW() FROM applications a WHERE a.id = ANY(batch);
+
+    DELETE FROM application_history WHERE application_id = ANY(batch);
+    DELETE FROM application_comments WHERE application_id = ANY(batch);
+    DELETE FROM applications WHERE id = ANY(batch);
+
+    RETURN jsonb_build_object('ids', to_jsonb(batch), 'history', history_rows, 'comments', comment_rows);
+END;
+$$;
+
+-- Candidatos inativos sem candidaturas ativas
+CREATE OR REPLACE FUNCTION archive_inactive_candidates(inactive_before TIMESTAMPTZ, batch_size INTEGER)
+RETURNS JSONB
+LANGUAGE plpgsql AS $$
+DECLARE
+    batch BIGINT[];
+BEGIN
+    SELECT array_agg(id) INTO batch FROM (
+        SELECT c.id FROM candidates c
+        WHERE c.status = 'inactive'
+          AND c.updated_at < inactive_before
+          AND NOT EXISTS (SELECT 1 FROM applications a WHERE a.candidate_id = c.id)
+        ORDER BY c.id
+        LIMIT batch_size
+        FOR UPDATE OF c SKIP LOCKED
+    ) eligible;
+
+    IF batch IS NULL THEN
+        RETURN jsonb_build_object('ids', '[]'::jsonb);
+    END IF;
+
+    INSERT INTO candidates_archive SELECT c.*, NOW() FROM candidates c WHERE c.id = ANY(batch);
+    DELETE FROM candidates WHERE id = ANY(batch);
+
+    RETURN jsonb_build_object('ids', to_jsonb(batch));
+END;
+$$;
+
+-- Contagens pré-agregadas do arquivo (somadas às do snapshot quente pelos contadores)
+CREATE OR REPLACE FUNCTION archived_application_totals()
+RETURNS TABLE (job_id BIGINT, stage INTEGER, status TEXT, applied_month TEXT, total BIGINT)
+LANGUAGE sql STABLE AS $$
+    SELECT job_id, stage, status, to_char(date_trunc('month', applied_at), 'YYYY-MM'), COUNT(*)
+    FROM applications_archive
+    GROUP BY 1, 2, 3, 4;
+$$;
@@ -0,0 +1,109 @@
+-- Sistema HR - MVP
+-- Auditoria particionada por mês com retenção: ações individuais (audit_logs)
+-- e leituras agregadas por minuto (audit_access_counters)
+
+-- Migração de uma audit_logs não particionada:
+--   ALTER TABLE audit_logs RENAME TO audit_logs_legacy;
+--   (criar as tabelas abaixo e as partições com create_audit_partitions)
+--   INSERT INTO audit_logs (user_id, action, resource, details, ip_address, user_agent, timestamp)
+--       SELECT user_id, action, resource, details, ip_address, user_agent, timestamp
+--       FROM audit_logs_legacy WHERE timestamp >= NOW() - INTERVAL '12 months';
+--   DROP TABLE audit_logs_legacy;
+
+CREATE TABLE IF NOT EXISTS audit_logs (
+    id BIGSERIAL,
+    user_id UUID,
+    action TEXT NOT NULL,
+    resource TEXT,
+    details TEXT,
+    ip_address TEXT,
+    user_agent TEXT,
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    -- A chave de partição precisa estar na chave primária
+    PRIMARY KEY (timestamp, id)
+) PARTITION BY RANGE (timestamp);
+
+-- Paginação por chave (id desc) com filtros por usuário/ação/recurso
+CREATE INDEX IF NOT EXISTS idx_audit_logs_id ON audit_logs (id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_user ON audit_logs (user_id, id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_action ON audit_logs (action, id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_logs_resource ON audit_logs (resource, id DESC);
+
+CREATE TABLE IF NOT EXISTS audit_access_counters (
+    id BIGSERIAL,
+    minute TIMESTAMPTZ NOT NULL,
+    user_id UUID,
+    endpoint TEXT NOT NULL,
+    method TEXT NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (minute, id),
+    UNIQUE (minute, user_id, endpoint, method)
+) PARTITION BY RANGE (minute);
+
+CREATE INDEX IF NOT EXISTS idx_audit_access_id ON audit_access_counters (id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_access_user ON audit_access_counters (user_id, id DESC);
+CREATE INDEX IF NOT EXISTS idx_audit_access_endpoint ON audit_access_counters (endpoint, id DESC);
+
+-- Soma um lote de contadores [{minute, user_id, endpoint, method, hits}] (vários workers)
+CREATE OR REPLACE FUNCTION increment_audit_access(entries JSONB)
+RETURNS VOID
+LANGUAGE sql AS $$
+    INSERT INTO audit_access_counters (minute, user_id, endpoint, method, hits)
+    SELECT (e->>'minute')::timestamptz, (e->>'user_id')::uuid, e->>'endpoint', e->>'method', (e->>'hits')::int
+    FROM jsonb_array_elements(entries) AS e
+    ON CONFLICT (minute, user_id, endpoint, method)
+    DO UPDATE SET hits = audit_access_counters.hits + EXCLUDED.hits;
+$$;
+
+-- Cria as partições mensais do mês atual até months_ahead meses à frente
+CREATE OR REPLACE FUNCTION create_audit_partitions(months_ahead INTEGER DEFAULT 2)
+RETURNS VOID
+LANGUAGE plpgsql AS $$
+DECLARE
+    month_start DATE;
+    parent TEXT;
+BEGIN
+    FOR i IN 0..months_ahead LOOP
+        month_start := (date_trunc('month', NOW()) + make_interval(months => i))::date;
+        FOREACH parent IN ARRAY ARRAY['audit_logs', 'audit_access_counters'] LOOP
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                parent || '_' || to_char(month_start, 'YYYY_MM'), parent,
+                month_start, (month_start + INTERVAL '1 month')::date
+            );
+        END LOOP;
+    END LOOP;
+END;
+$$;
+
+-- Retenção: remove partições inteiras (DROP, sem DELETE linha a linha)
+CREATE OR REPLACE FUNCTION drop_audit_partitions(retain_months INTEGER DEFAULT 12, retain_access_months INTEGER DEFAULT 3)
+RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    partition RECORD;
+    cutoff DATE;
+    dropped INTEGER := 0;
+BEGIN
+    FOR partition IN
+        SELECT child.relname AS name, parent.relname AS parent_name
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        WHERE parent.relname IN ('audit_logs', 'audit_access_counters')
+    LOOP
+        cutoff := (date_trunc('month', NOW()) - make_interval(months =>
+            CASE WHEN partition.parent_name = 'audit_logs' THEN retain_months ELSE retain_access_months END))::date;
+        IF to_date(right(partition.name, 7), 'YYYY_MM') < cutoff THEN
+            EXECUTE format('DROP TABLE IF EXISTS %I', partition.name);
+            dropped := dropped + 1;
+        END IF;
+    END LOOP;
+    RETURN dropped;
+END;
+$$;
+
+SELECT create_audit_partitions();
+
+-- Agendar mensalmente (pg_cron):
+-- SELECT cron.schedule('audit-partitions', '0 2 1 * *', $$SELECT create_audit_partitions(); SELECT drop_audit_partitions()$$);
@@ -0,0 +1,59 @@
+-- Sistema HR - MVP
+-- Exclusão em lote de candidatos/vagas com as candidaturas dependentes numa única transação
+
+-- p_mode 'cascade': remove as candidaturas junto (histórico e comentários pela FK);
+-- 'skip': registros com candidaturas ficam, com a contagem em "skipped".
+-- Retorna {"found": [...], "deleted": [...], "skipped": {"<id>": n},
+--          "applications": [{"id": ..., "parent": ...}]} com as candidaturas realmente removidas
+CREATE OR REPLACE FUNCTION bulk_delete_records(p_resource TEXT, p_ids BIGINT[], p_mode TEXT DEFAULT 'cascade')
+RETURNS JSONB
+LANGUAGE plpgsql AS $$
+DECLARE
+    link TEXT;
+    found BIGINT[];
+    targets BIGINT[];
+    skipped JSONB := '{}'::jsonb;
+    removed_applications JSONB;
+    deleted BIGINT[];
+BEGIN
+    IF p_resource = 'candidates' THEN
+        link := 'candidate_id';
+    ELSIF p_resource = 'jobs' THEN
+        link := 'job_id';
+    ELSE
+        RAISE EXCEPTION 'Recurso inválido: %', p_resource;
+    END IF;
+    IF p_mode NOT IN ('cascade', 'skip') THEN
+        RAISE EXCEPTION 'Modo inválido: %', p_mode;
+    END IF;
+
+    -- Trava os registros: candidaturas novas para eles esperam o fim da transação (checagem da FK)
+    EXECUTE format('SELECT array_agg(id) FROM (SELECT id FROM %I WHERE id = ANY($1) ORDER BY id FOR UPDATE) locked',
+                   p_resource)
+        INTO found USING p_ids;
+    found := COALESCE(found, '{}');
+
+    IF p_mode = 'skip' THEN
+        EXECUTE format('SELECT COALESCE(jsonb_object_agg(parent, n), ''{}''::jsonb) FROM ('
+                       'SELECT %1$I AS parent, count(*) AS n FROM applications WHERE %1$I = ANY($1) GROUP BY %1$I) d',
+                       link)
+            INTO skipped USING found;
+        SELECT COALESCE(array_agg(id), '{}') INTO targets
+        FROM unnest(found) AS id
+        WHERE NOT skipped ? id::text;
+    ELSE
+        targets := found;
+    END IF;
+
+    EXECUTE format('WITH removed AS (DELETE FROM applications WHERE %1$I = ANY($1) RETURNING id, %1$I AS parent) '
+                   'SELECT COALESCE(jsonb_agg(jsonb_build_object(''id'', id, ''parent'', parent)), ''[]''::jsonb) '
+                   'FROM removed', link)
+        INTO removed_applications USING targets;
+    EXECUTE format('WITH removed AS (DELETE FROM %I WHERE id = ANY($1) RETURNING id) '
+                   'SELECT COALESCE(array_agg(id), ''{}'') FROM removed', p_resource)
+        INTO deleted USING targets;
+
+    RETURN jsonb_build_object('found', to_jsonb(found), 'deleted', to_jsonb(deleted),
+                              'skipped', skipped, 'applications', removed_applications);
+END;
+$$;
@@ -0,0 +1,39 @@
+-- Sistema HR - MVP
+-- Log de mudanças append-only para sincronização por delta (/api/sync)
+
+CREATE TABLE IF NOT EXISTS change_log (
+    -- Versão da mudança: crescente, usada como cursor pelos clientes
+    version BIGSERIAL PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    row_id BIGINT NOT NULL,
+    op TEXT NOT NULL CHECK (op IN ('insert', 'update', 'delete')),
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Mudanças de um conjunto de tabelas a partir de uma versão
+CREATE INDEX IF NOT EXISTS idx_change_log_table_version
+    ON change_log (table_name, version);
+
+-- Janela de sobreposição do delta: entradas gravadas pouco antes do cursor
+-- (versão reservada antes, commit depois)
+CREATE INDEX IF NOT EXISTS idx_change_log_changed_at
+    ON change_log (changed_at);
+
+-- Retenção: remove entradas antigas, mas sempre mantém a mais recente para que
+-- a versão atual continue conhecida (clientes mais antigos recebem snapshot)
+CREATE OR REPLACE FUNCTION prune_change_log(keep INTERVAL DEFAULT INTERVAL '7 days')
+RETURNS BIGINT
+LANGUAGE plpgsql AS $$
+DECLARE
+    removed BIGINT;
+BEGIN
+    DELETE FROM change_log
+    WHERE changed_at < NOW() - keep
+      AND version < (SELECT MAX(version) FROM change_log);
+    GET DIAGNOSTICS removed = ROW_COUNT;
+    RETURN removed;
+END;
+$$;
+
+-- Agendar diariamente (pg_cron):
+-- SELECT cron.schedule('prune-change-log', '15 3 * * *', $$SELECT prune_change_log()$$);
@@ -0,0 +1,15 @@
+-- Sistema HR - MVP
+-- Semântica das etapas para o catálogo da API (stage_catalog.py):
+-- 'interview' conta em entrevistas pendentes, 'hired' é contratação e
+-- 'rejected' é reprovação; 'hired' e 'rejected' são terminais.
+-- Sem kind, o catálogo usa o nome (Entrevista/Interview) e a última etapa.
+
+ALTER TABLE recruitment_stages ADD COLUMN IF NOT EXISTS kind TEXT
+    CHECK (kind IN ('interview', 'hired', 'rejected'));
+
+UPDATE recruitment_stages SET kind = 'interview'
+WHERE kind IS NULL AND (name ILIKE '%entrevista%' OR name ILIKE '%interview%');
+
+UPDATE recruitment_stages SET kind = 'hired'
+WHERE kind IS NULL AND order_position = (SELECT MAX(order_position) FROM recruitment_stages WHERE is_active)
+  AND NOT EXISTS (SELECT 1 FROM recruitment_stages WHERE kind = 'hired');
@@ -0,0 +1,95 @@
+-- Sistema HR - MVP
+-- Transição de etapa atômica: leitura, cálculo da etapa e update numa única
+-- chamada (e numa única transação, com a linha travada), retornando a linha nova
+-- com candidato e vaga
+
+-- positions: etapas ativas em ordem (catálogo da API); hired_stages/rejected_stages:
+-- etapas de contratação/reprovação (terminais: 'next' não avança a partir delas).
+-- expected_updated_at (opcional): controle otimista, falha com 'conflict' se a
+-- candidatura mudou desde que o cliente a leu.
+-- candidate_columns/job_columns (opcionais): colunas do candidato e da vaga
+-- devolvidas (?fields= da API); NULL = todas.
+-- Retorno: {"outcome": "ok"|"not_found"|"invalid"|"conflict",
+--           "application": {..., "candidates": {...}, "jobs": {...}},
+--           "previous": {"stage", "status", "updated_at", "applied_at"}}
+-- Assinatura anterior (sem as colunas das relações)
+DROP FUNCTION IF EXISTS transition_application_stage(BIGINT, TEXT, INTEGER, INTEGER[], TEXT, TIMESTAMPTZ, INTEGER[], INTEGER[]);
+
+CREATE OR REPLACE FUNCTION transition_application_stage(
+    p_application_id BIGINT,
+    p_action TEXT,
+    p_target_stage INTEGER,
+    p_positions INTEGER[],
+    p_notes TEXT DEFAULT NULL,
+    p_expected_updated_at TIMESTAMPTZ DEFAULT NULL,
+    p_hired_stages INTEGER[] DEFAULT NULL,
+    p_rejected_stages INTEGER[] DEFAULT '{}',
+    p_candidate_columns TEXT[] DEFAULT NULL,
+    p_job_columns TEXT[] DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql AS $$
+DECLARE
+    current applications%ROWTYPE;
+    updated applications%ROWTYPE;
+    first_stage INTEGER := p_positions[1];
+    last_stage INTEGER := p_positions[array_length(p_positions, 1)];
+    hired_stages INTEGER[] := COALESCE(p_hired_stages, ARRAY[p_positions[array_length(p_positions, 1)]]);
+    new_stage INTEGER;
+BEGIN
+    SELECT * INTO current FROM applications WHERE id = p_application_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('outcome', 'not_found');
+    END IF;
+
+    IF p_expected_updated_at IS NOT NULL AND current.updated_at IS DISTINCT FROM p_expected_updated_at THEN
+        RETURN jsonb_build_object('outcome', 'conflict', 'application', to_jsonb(current));
+    END IF;
+
+    new_stage := CASE p_action
+        WHEN 'next' THEN CASE
+            WHEN current.stage = ANY(hired_stages || p_rejected_stages || last_stage) THEN current.stage
+            ELSE COALESCE(
+                (SELECT MIN(p) FROM unnest(p_positions) p WHERE p > COALESCE(current.stage, first_stage)), last_stage)
+        END
+        WHEN 'previous' THEN COALESCE(
+            (SELECT MAX(p) FROM unnest(p_positions) p WHERE p < COALESCE(current.stage, first_stage)), first_stage)
+        WHEN 'specific' THEN CASE WHEN p_target_stage = ANY(p_positions) THEN p_target_stage END
+    END;
+    IF new_stage IS NULL THEN
+        RETURN jsonb_build_object('outcome', 'invalid');
+    END IF;
+
+    UPDATE applications SET
+        stage = new_stage,
+        status = CASE
+            WHEN new_stage = ANY(hired_stages) THEN 'hired'
+            WHEN new_stage = ANY(p_rejected_stages) THEN 'rejected'
+            WHEN new_stage <> first_stage THEN 'in_progress'
+            ELSE 'applied'
+        END,
+        notes = COALESCE(NULLIF(p_notes, ''), notes),
+        updated_at = NOW()
+    WHERE id = p_application_id
+    RETURNING * INTO updated;
+
+    RETURN jsonb_build_object(
+        'outcome', 'ok',
+        'application', to_jsonb(updated)
+            || jsonb_build_object(
+                'candidates', (SELECT CASE WHEN p_candidate_columns IS NULL THEN to_jsonb(c)
+                                      ELSE (SELECT jsonb_object_agg(key, value) FROM jsonb_each(to_jsonb(c))
+                                            WHERE key = ANY(p_candidate_columns)) END
+                               FROM candidates c WHERE c.id = updated.candidate_id),
+                'jobs', (SELECT CASE WHEN p_job_columns IS NULL THEN to_jsonb(j)
+                                ELSE (SELECT jsonb_object_agg(key, value) FROM jsonb_each(to_jsonb(j))
+                                      WHERE key = ANY(p_job_columns)) END
+                         FROM jobs j WHERE j.id = updated.job_id)
+            ),
+        'previous', jsonb_build_object(
+            'stage', current.stage, 'status', current.status,
+            'updated_at', current.updated_at, 'applied_at', current.applied_at
+        )
+    );
+END;
+$$;
@@ -0,0 +1,169 @@
+"""
+Sistema HR - MVP
+Analytics incrementais de tempo na etapa e tempo até contratação
+
+Cada transição alimenta somas acumuladas e histogramas de faixas fixas
+(escala aproximadamente logarítmica, de 1 hora a 1 ano) por (vaga, etapa) e por
+vaga, além do agregado geral. Médias e percentis saem direto dos contadores,
+sem reprocessar o histórico a cada requisição; o histórico completo só é
+reprocessado na carga inicial do worker (e a cada ANALYTICS_REBUILD_TTL).
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_right
+
+import metrics
+
+REBUILD_TTL = float(os.getenv('ANALYTICS_REBUILD_TTL', '21600'))
+
+_HOUR = 3600
+_DAY = 24 * _HOUR
+# Limites superiores das faixas (segundos); a última faixa é aberta
+BUCKET_BOUNDS = [
+    1 * _HOUR, 2 * _HOUR, 4 * _HOUR, 8 * _HOUR, 12 * _HOUR,
+    1 * _DAY, 2 * _DAY, 3 * _DAY, 5 * _DAY, 7 * _DAY, 10 * _DAY, 14 * _DAY,
+    21 * _DAY, 30 * _DAY, 45 * _DAY, 60 * _DAY, 90 * _DAY, 120 * _DAY, 180 * _DAY, 365 * _DAY
+]
+
+
+class DurationStats:
+    """Contagem, soma, mínimo/máximo e histograma de faixas fixas"""
+
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def add(self, seconds):
+        seconds = max(seconds, 0)
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+        self.buckets[bisect_right(BUCKET_BOUNDS, seconds)] += 1
+
+    def percentile(self, fraction):
+        """Percentil aproximado: interpolação linear dentro da faixa"""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            if bucket_count and seen + bucket_count >= target:
+                lower = BUCKET_BOUNDS[index - 1] if index else 0
+                upper = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                lower, upper = max(lower, self.min), min(upper, self.max)
+                return lower + (upper - lower) * ((target - seen) / bucket_count)
+            seen += bucket_count
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {'count': 0, 'avg_days': None, 'p50_days': None, 'p90_days': None, 'max_days': None}
+        return {
+            'count': self.count,
+            'avg_days': round(self.total / self.count / _DAY, 1),
+            'p50_days': round(self.percentile(0.5) / _DAY, 1),
+            'p90_days': round(self.percentile(0.9) / _DAY, 1),
+            'max_days': round(self.max / _DAY, 1)
+        }
+
+
+class StageAnalytics:
+    """Tempo na etapa por (vaga, etapa) e tempo até contratação por vaga"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hired_stages = frozenset((9,))
+        self._reset()
+
+    def configure(self, hired_stages):
+        """Etapas de contratação do catálogo; se mudarem, o histórico é reprocessado"""
+        hired_stages = frozenset(hired_stages)
+        with self._lock:
+            if hired_stages != self.hired_stages:
+                self.hired_stages = hired_stages
+                self.loaded_at = None
+
+    def _reset(self):
+        self._in_stage = {}   # job_id | None -> {etapa: DurationStats}
+        self._to_hire = {}    # job_id | None -> DurationStats
+        self._hired = set()   # candidaturas já contadas no tempo até contratação
+        self.loaded_at = None
+
+    def is_stale(self):
+        return self.loaded_at is None or time.time() - self.loaded_at > REBUILD_TTL
+
+    def _stats(self, table, key):
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = DurationStats()
+        return stats
+
+    def _record_locked(self, application_id, job_id, previous_stage, new_stage, entered_at, changed_at, applied_at):
+        if previous_stage and entered_at and changed_at >= entered_at:
+            duration = changed_at - entered_at
+            self._stats(self._in_stage.setdefault(job_id, {}), previous_stage).add(duration)
+            self._stats(self._in_stage.setdefault(None, {}), previous_stage).add(duration)
+
+        if new_stage in self.hired_stages and applied_at and application_id not in self._hired:
+            self._hired.add(application_id)
+            duration = changed_at - applied_at
+            self._stats(self._to_hire, job_id).add(duration)
+            self._stats(self._to_hire, None).add(duration)
+
+    def record(self, application_id, job_id, previous_stage, new_stage, entered_at, changed_at, applied_at):
+        """Registrar uma transição (datas em epoch)"""
+        with self._lock:
+            self._record_locked(application_id, job_id, previous_stage, new_stage, entered_at, changed_at, applied_at)
+        metrics.incr('analytics.transitions')
+
+    def load(self, history, applications):
+        """
+        Reprocessar o histórico completo uma vez.
+        history: entradas (application_id, job_id, previous_stage, new_stage,
+                 changed_at, stage_entered_at) em ordem de gravação
+        applications: {application_id: (job_id, stage, applied_at, updated_at)}
+        Candidaturas contratadas sem histórico usam updated_at - applied_at.
+        """
+        started = time.time()
+        last_change = {}
+        with self._lock:
+            self._reset()
+            for application_id, job_id, previous_stage, new_stage, changed_at, stage_entered_at in history:
+                application = applications.get(application_id)
+                applied_at = application[2] if application else None
+                entered_at = stage_entered_at or last_change.get(application_id) or applied_at
+                self._record_locked(application_id, job_id, previous_stage, new_stage,
+                                    entered_at, changed_at, applied_at)
+                last_change[application_id] = changed_at
+
+            for application_id, (job_id, stage, applied_at, updated_at) in applications.items():
+                if stage in self.hired_stages and application_id not in self._hired and applied_at and updated_at:
+                    self._record_locked(application_id, job_id, None, stage, None, updated_at, applied_at)
+
+            self.loaded_at = time.time()
+
+        elapsed = time.time() - started
+        metrics.set_gauge('analytics.load_seconds', round(elapsed, 3))
+        return elapsed
+
+    def time_in_stage(self, job_id=None):
+        """{etapa: resumo} para uma vaga (ou todas)"""
+        with self._lock:
+            stages = self._in_stage.get(job_id, {})
+            return {stage: stages[stage].summary() for stage in sorted(stages)}
+
+    def time_to_hire(self, job_id=None):
+        with self._lock:
+            stats = self._to_hire.get(job_id)
+            return stats.summary() if stats else DurationStats().summary()
+
+
+stage_analytics = StageAnalytics()
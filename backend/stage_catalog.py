@@ -0,0 +1,224 @@
+"""
+Sistema HR - MVP
+Catálogo versionado das etapas de recrutamento
+
+Monta, a partir das linhas de recruitment_stages (ordenadas por order_position),
+as posições válidas de uma candidatura e a semântica de cada etapa, com
+consultas O(1): entrevista, contratação e terminal (contratação ou reprovação).
+A semântica vem da coluna kind (sql/recruitment_stages.sql); sem ela, etapas
+com "Entrevista"/"Interview" no nome são de entrevista e a última é a de
+contratação. Transições, distribuições e métricas derivam das etapas do
+catálogo em vez de nove etapas fixas. Sem etapas cadastradas vale o conjunto
+padrão (DEFAULT_STAGES).
+
+Cada worker mantém um catálogo carregado (catalog_service) e só o remonta
+quando a versão de recruitment_stages muda (escrita local ou feed de
+mudanças) ou após STAGE_CATALOG_TTL. A versão do catálogo é um hash do
+conteúdo, exposto aos clientes em /recruitment-stages.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import data_version
+import metrics
+
+CATALOG_TTL = float(os.getenv('STAGE_CATALOG_TTL', '300'))
+
+NEXT = 'next'
+PREVIOUS = 'previous'
+SPECIFIC = 'specific'
+ACTIONS = (NEXT, PREVIOUS, SPECIFIC)
+
+INTERVIEW = 'interview'
+HIRED = 'hired'
+REJECTED = 'rejected'
+KINDS = (INTERVIEW, HIRED, REJECTED)
+INTERVIEW_NAMES = ('entrevista', 'interview')
+
+# Etapas padrão quando recruitment_stages está vazia
+DEFAULT_STAGES = [
+    {"id": 1, "name": "Candidatura Recebida", "description": "Candidato se candidatou para a vaga", "order_position": 1, "color": "#3b82f6", "is_active": True},
+    {"id": 2, "name": "Triagem de Currículo", "description": "Análise inicial do perfil do candidato", "order_position": 2, "color": "#8b5cf6", "is_active": True},
+    {"id": 3, "name": "Validação Telefônica", "description": "Contato inicial por telefone", "order_position": 3, "color": "#06b6d4", "is_active": True},
+    {"id": 4, "name": "Teste Técnico", "description": "Aplicação de testes e avaliações", "order_position": 4, "color": "#f59e0b", "is_active": True},
+    {"id": 5, "name": "Entrevista RH", "description": "Entrevista com equipe de recursos humanos", "order_position": 5, "color": "#10b981", "is_active": True, "kind": "interview"},
+    {"id": 6, "name": "Entrevista Técnica", "description": "Entrevista técnica com gestores", "order_position": 6, "color": "#ef4444", "is_active": True, "kind": "interview"},
+    {"id": 7, "name": "Verificação de Referências", "description": "Checagem de referências profissionais", "order_position": 7, "color": "#84cc16", "is_active": True},
+    {"id": 8, "name": "Proposta Enviada", "description": "Proposta de trabalho enviada", "order_position": 8, "color": "#f97316", "is_active": True},
+    {"id": 9, "name": "Contratado", "description": "Candidato foi contratado", "order_position": 9, "color": "#22c55e", "is_active": True, "kind": "hired"}
+]
+
+
+def stage_kind(stage):
+    """Semântica de uma etapa: coluna kind ou, sem ela, pelo nome"""
+    kind = stage.get('kind')
+    if kind in KINDS:
+        return kind
+    name = (stage.get('name') or '').lower()
+    if any(word in name for word in INTERVIEW_NAMES):
+        return INTERVIEW
+    return None
+
+
+class StageCatalog:
+    """Etapas ativas em ordem com consultas O(1) por posição"""
+
+    def __init__(self, stages):
+        self.defaulted = not stages
+        self.stages = sorted(stages or DEFAULT_STAGES, key=lambda stage: stage['order_position'])
+        self.positions = tuple(stage['order_position'] for stage in self.stages)
+        self._index = {position: i for i, position in enumerate(self.positions)}
+        self._names = {stage['order_position']: stage.get('name') for stage in self.stages}
+        self.first = self.positions[0]
+        self.last = self.positions[-1]
+
+        kinds = {stage['order_position']: stage_kind(stage) for stage in self.stages}
+        self.interview_stages = frozenset(p for p, kind in kinds.items() if kind == INTERVIEW)
+        self.rejected_stages = frozenset(p for p, kind in kinds.items() if kind == REJECTED)
+        self.hired_stages = frozenset(p for p, kind in kinds.items() if kind == HIRED) or frozenset((self.last,))
+        self.terminal_stages = self.hired_stages | self.rejected_stages | {self.last}
+
+        content = [(stage['order_position'], stage.get('name'), kinds[stage['order_position']]) for stage in self.stages]
+        self.version = hashlib.sha1(json.dumps(content).encode('utf-8')).hexdigest()[:12]
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, position):
+        return position in self._index
+
+    def is_interview(self, position):
+        return position in self.interview_stages
+
+    def is_hired(self, position):
+        return position in self.hired_stages
+
+    def is_terminal(self, position):
+        return position in self.terminal_stages
+
+    def name(self, position):
+        return self._names.get(position, f'stage_{position}')
+
+    def next(self, position):
+        """Etapa seguinte (etapas terminais não avançam)"""
+        if position in self.terminal_stages:
+            return position
+        i = self._index.get(position)
+        if i is None:
+            return min((p for p in self.positions if p > position), default=self.last)
+        return self.positions[min(i + 1, len(self.positions) - 1)]
+
+    def previous(self, position):
+        """Etapa anterior (a primeira continua na primeira)"""
+        i = self._index.get(position)
+        if i is None:
+            return max((p for p in self.positions if p < position), default=self.first)
+        return self.positions[max(i - 1, 0)]
+
+    def resolve(self, current, action, target=None):
+        """Etapa de destino de uma ação, ou None se a ação/etapa for inválida"""
+        current = current if current is not None else self.first
+        if action == NEXT:
+            return self.next(current)
+        if action == PREVIOUS:
+            return self.previous(current)
+        if action == SPECIFIC and target in self:
+            return target
+        return None
+
+    def status_for(self, position):
+        """Status da candidatura numa etapa"""
+        if position in self.hired_stages:
+            return 'hired'
+        if position in self.rejected_stages:
+            return 'rejected'
+        if position != self.first:
+            return 'in_progress'
+        return 'applied'
+
+    # -------------------------------------------------------------------------
+    # Agregações: layout dos baldes derivado das etapas
+    # -------------------------------------------------------------------------
+
+    def total(self, counts, positions):
+        """Soma de {etapa: n} num conjunto de etapas (ex.: hired_stages)"""
+        return sum(counts.get(position, 0) for position in positions)
+
+    def buckets(self, counts=None):
+        """{'stage_N': n} para todas as etapas do catálogo, em ordem"""
+        counts = counts or {}
+        return {f'stage_{position}': counts.get(position, 0) for position in self.positions}
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'positions': list(self.positions),
+            'interview_stages': sorted(self.interview_stages),
+            'hired_stages': sorted(self.hired_stages),
+            'terminal_stages': sorted(self.terminal_stages)
+        }
+
+
+class StageCatalogService:
+    """Catálogo carregado uma vez por worker, remontado quando a versão muda"""
+
+    def __init__(self, ttl=CATALOG_TTL):
+        self.ttl = ttl
+        self.loader = None
+        self.listeners = []
+        self._catalog = None
+        self._data_version = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def configure(self, loader):
+        """loader() -> linhas ativas de recruitment_stages"""
+        self.loader = loader
+        self.invalidate()
+
+    def on_change(self, listener):
+        """listener(catalog) quando o conteúdo (versão) do catálogo muda"""
+        self.listeners.append(listener)
+
+    def invalidate(self):
+        with self._lock:
+            self._catalog = None
+
+    def _fresh(self, version):
+        return (self._catalog is not None and self._data_version == version
+                and time.time() - self._loaded_at < self.ttl)
+
+    def current(self):
+        version = data_version.current('recruitment_stages')
+        catalog = self._catalog
+        if catalog is not None and self._fresh(version):
+            return catalog
+        with self._lock:
+            if self._fresh(version):
+                return self._catalog
+            previous = self._catalog
+            catalog = StageCatalog(self.loader() if self.loader else [])
+            self._catalog, self._data_version, self._loaded_at = catalog, version, time.time()
+        metrics.incr('stage_catalog.loads')
+        if previous is None or previous.version != catalog.version:
+            print(f"🗂️ Catálogo de etapas {catalog.version}: {len(catalog)} etapas"
+                  f"{' (padrão)' if catalog.defaulted else ''}")
+            for listener in self.listeners:
+                listener(catalog)
+        return catalog
+
+    def stats(self):
+        catalog = self._catalog
+        return catalog.to_dict() if catalog is not None else {'version': None}
+
+
+catalog_service = StageCatalogService()
+
+
+def first_stage():
+    """Etapa inicial do catálogo atual: posição de candidaturas gravadas sem etapa"""
+    return catalog_service.current().first
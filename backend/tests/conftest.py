@@ -0,0 +1,74 @@
+"""
+Sistema HR - MVP
+Fixtures dos testes: aplicação com cliente Supabase em memória
+
+Rodar a partir de backend/:  python -m pytest -q
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Antes de importar a API: sem banco real, sem tarefas em segundo plano e com
+# caches em disco temporários
+_tmp = tempfile.mkdtemp(prefix='hr-tests-')
+os.environ.update({
+    'SUPABASE_URL': 'https://tests.supabase.co',
+    'SUPABASE_KEY': 'test-key',
+    'REALTIME_ENABLED': 'False',
+    'AGGREGATE_REFRESH_ENABLED': 'False',
+    'SHARED_CACHE_DB': os.path.join(_tmp, 'shared_cache.sqlite3'),
+    'ROLLUPS_DB': os.path.join(_tmp, 'rollups.sqlite3')
+})
+
+from fake_supabase import FakeSupabase  # noqa: E402
+
+STAGES = [
+    {'id': position, 'name': name, 'order_position': position, 'is_active': True, 'color': '#3B82F6'}
+    for position, name in enumerate(
+        ['Triagem', 'Entrevista RH', 'Teste Técnico', 'Entrevista Final', 'Contratado'], start=1)
+]
+
+
+def seed_tables():
+    candidates = [{'id': i, 'first_name': f'Pessoa{i}', 'last_name': 'Silva', 'email': f'pessoa{i}@empresa.com',
+                   'status': 'active', 'created_at': '2026-01-0%dT10:00:00' % i} for i in range(1, 4)]
+    jobs = [{'id': 1, 'title': 'Dev Python', 'company': 'ACME', 'status': 'active',
+             'created_at': '2026-01-01T09:00:00'}]
+    applications = [{'id': i, 'candidate_id': i, 'job_id': 1, 'stage': 1, 'status': 'pending', 'notes': '',
+                     'applied_at': '2026-02-0%dT10:00:00' % i, 'updated_at': '2026-02-0%dT10:00:00' % i}
+                    for i in range(1, 4)]
+    profiles = [{'id': 1, 'user_id': 'u1', 'full_name': 'Admin', 'role': 'admin'}]
+    return {'candidates': candidates, 'jobs': jobs, 'applications': applications,
+            'recruitment_stages': STAGES, 'profiles': profiles}
+
+
+@pytest.fixture
+def db():
+    return FakeSupabase(seed_tables())
+
+
+@pytest.fixture
+def app(db):
+    from app import create_app
+    return create_app({
+        'DATA_CLIENT_FACTORY': lambda url, key: db,
+        'WARMUP_ON_FIRST_REQUEST': False,
+        'STAGE_TRANSITION_MODE': 'local',
+        'TESTING': True
+    })
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers():
+    return {'Authorization': 'Bearer test-token'}
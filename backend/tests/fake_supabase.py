@@ -0,0 +1,240 @@
+"""
+Sistema HR - MVP
+Cliente Supabase em memória para os testes
+
+Implementa o subconjunto do query builder do postgrest usado pela API
+(select/insert/update/upsert/delete, filtros, order/limit/range, rpc e
+auth.get_user). Relações embutidas no select ('candidates(id, first_name)')
+são resolvidas pela coluna <relação no singular>_id. before_execute e
+after_execute recebem (tabela, operação) antes/depois de cada execute(), para
+injetar falhas ou simular outro escritor.
+"""
+
+import itertools
+import re
+import threading
+import types
+from datetime import datetime, timezone
+
+
+class Response:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _split_columns(columns):
+    parts, depth, current = [], 0, ''
+    for char in columns:
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+            continue
+        depth += (char == '(') - (char == ')')
+        current += char
+    parts.append(current.strip())
+    return [part for part in parts if part]
+
+
+def _project(row, columns, db):
+    if columns in ('*', None, ''):
+        return dict(row)
+    projected = {}
+    for column in _split_columns(columns):
+        embedded = re.match(r'(\w+)\((.*)\)$', column)
+        if embedded:
+            relation, inner = embedded.groups()
+            related = db.find(relation, row.get(relation.rstrip('s') + '_id'))
+            projected[relation] = _project(related, inner, db) if related else None
+        elif column == '*':
+            projected.update(row)
+        else:
+            projected[column] = row.get(column)
+    return projected
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.operation = None
+        self.columns = '*'
+        self.filters = []
+        self.ordering = []
+        self.max_rows = None
+        self.window = None
+        self.count = None
+        self.payload = None
+        self.on_conflict = ''
+
+    # Operações
+    def select(self, *columns, count=None):
+        self.operation, self.columns, self.count = 'select', ','.join(columns) or '*', count
+        return self
+
+    def insert(self, json, count=None, returning=None, upsert=False):
+        self.operation, self.payload = 'insert', json
+        return self
+
+    def upsert(self, json, count=None, returning=None, ignore_duplicates=False, on_conflict=''):
+        self.operation, self.payload, self.on_conflict = 'upsert', json, on_conflict
+        return self
+
+    def update(self, json, count=None):
+        self.operation, self.payload = 'update', json
+        return self
+
+    def delete(self, count=None):
+        self.operation = 'delete'
+        return self
+
+    # Filtros
+    def _where(self, predicate):
+        self.filters.append(predicate)
+        return self
+
+    def eq(self, column, value):
+        return self._where(lambda row: row.get(column) == value)
+
+    def neq(self, column, value):
+        return self._where(lambda row: row.get(column) != value)
+
+    def gt(self, column, value):
+        return self._where(lambda row: row.get(column) is not None and row.get(column) > value)
+
+    def gte(self, column, value):
+        return self._where(lambda row: row.get(column) is not None and row.get(column) >= value)
+
+    def lt(self, column, value):
+        return self._where(lambda row: row.get(column) is not None and row.get(column) < value)
+
+    def lte(self, column, value):
+        return self._where(lambda row: row.get(column) is not None and row.get(column) <= value)
+
+    def in_(self, column, values):
+        values = list(values)
+        return self._where(lambda row: row.get(column) in values)
+
+    def is_(self, column, value):
+        return self._where(lambda row: row.get(column) is None if value in ('null', None) else True)
+
+    def ilike(self, column, pattern):
+        needle = pattern.strip('%').lower()
+        return self._where(lambda row: needle in str(row.get(column) or '').lower())
+
+    def order(self, column, desc=False, nullsfirst=False):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, size):
+        self.max_rows = size
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end)
+        return self
+
+    def _matches(self, row):
+        return all(predicate(row) for predicate in self.filters)
+
+    def execute(self):
+        for hook in list(self.db.before_execute):
+            hook(self.table, self.operation)
+        with self.db.lock:
+            response = self._run(self.db.tables.setdefault(self.table, []))
+        for hook in list(self.db.after_execute):
+            hook(self.table, self.operation)
+        return response
+
+    def _run(self, rows):
+        if self.operation == 'select':
+            found = [row for row in rows if self._matches(row)]
+            for column, desc in reversed(self.ordering):
+                found.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+            total = len(found)
+            if self.window:
+                found = found[self.window[0]:self.window[1] + 1]
+            if self.max_rows is not None:
+                found = found[:self.max_rows]
+            return Response([_project(row, self.columns, self.db) for row in found], total if self.count else None)
+
+        if self.operation in ('insert', 'upsert'):
+            items = self.payload if isinstance(self.payload, list) else [self.payload]
+            keys = [key.strip() for key in self.on_conflict.split(',') if key.strip()]
+            written = []
+            for item in items:
+                item = dict(item)
+                existing = [row for row in rows if keys and all(row.get(k) == item.get(k) for k in keys)]
+                if self.operation == 'upsert' and existing:
+                    existing[0].update(item)
+                    written.append(dict(existing[0]))
+                    continue
+                if self.table == 'change_log':
+                    item.setdefault('version', self.db.next_id(self.table))
+                    item.setdefault('changed_at', datetime.now(timezone.utc).isoformat())
+                else:
+                    item.setdefault('id', self.db.next_id(self.table))
+                rows.append(item)
+                written.append(dict(item))
+            return Response(written)
+
+        if self.operation == 'update':
+            updated = []
+            for row in rows:
+                if self._matches(row):
+                    row.update(self.payload)
+                    updated.append(dict(row))
+            return Response(updated)
+
+        if self.operation == 'delete':
+            kept, removed = [], []
+            for row in rows:
+                (removed if self._matches(row) else kept).append(row)
+            rows[:] = kept
+            return Response([dict(row) for row in removed])
+
+        raise ValueError(f'Operação não suportada: {self.operation}')
+
+
+class FakeRpc:
+    def __init__(self, db, function, params):
+        self.db = db
+        self.function = function
+        self.params = params
+
+    def execute(self):
+        if self.function not in self.db.functions:
+            raise Exception(f"PGRST202: função {self.function} não encontrada")
+        return Response(self.db.functions[self.function](self.params))
+
+
+class FakeSupabase:
+    """Banco em memória: tables {tabela: [linhas]} e functions {nome: fn(params)}"""
+
+    def __init__(self, tables=None, user_id='u1', email='admin@empresa.com'):
+        self.tables = {name: [dict(row) for row in rows] for name, rows in (tables or {}).items()}
+        self.functions = {}
+        self.before_execute = []
+        self.after_execute = []
+        self.lock = threading.RLock()
+        self._ids = {}
+        user = types.SimpleNamespace(id=user_id, email=email)
+        self.auth = types.SimpleNamespace(get_user=lambda token: types.SimpleNamespace(user=user))
+
+    def next_id(self, table):
+        if table not in self._ids:
+            key = 'version' if table == 'change_log' else 'id'
+            start = max([row.get(key) for row in self.tables.get(table, []) if isinstance(row.get(key), int)] or [0])
+            self._ids[table] = itertools.count(start + 1)
+        return next(self._ids[table])
+
+    def find(self, table, row_id):
+        return next((row for row in self.tables.get(table, []) if row.get('id') == row_id), None)
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    from_ = table
+
+    def rpc(self, function, params):
+        return FakeRpc(self, function, params)
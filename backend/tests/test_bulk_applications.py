@@ -0,0 +1,20 @@
+"""
+Criação de candidaturas em lote: validação dos pares
+"""
+
+import pytest
+
+
+@pytest.mark.parametrize('body, error', [
+    ({'pairs': [1, 2]}, 'Par inválido'),
+    ({'pairs': [None]}, 'Par inválido'),
+    ({'pairs': [{'candidate_id': 1, 'job_id': 1}, 'x']}, 'Par inválido'),
+    ({'pairs': [{'candidate_id': 'a', 'job_id': 1}]}, 'Par inválido'),
+    ([{'candidate_id': 1, 'job_id': 1}], 'Corpo deve ser um objeto'),
+])
+def test_invalid_pairs_are_rejected(db, client, auth_headers, body, error):
+    response = client.post('/api/applications/bulk', headers=auth_headers, json=body)
+
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith(error)
+    assert len(db.tables['applications']) == 3
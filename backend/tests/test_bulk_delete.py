@@ -0,0 +1,144 @@
+"""
+Exclusão em lote de candidatos/vagas: transação (bulk_delete_records) e caminho sem a função
+"""
+
+import pytest
+
+import routes
+
+
+@pytest.fixture(autouse=True)
+def rpc_mode(monkeypatch):
+    # Cada teste começa tentando a função do banco
+    monkeypatch.setitem(routes.bulk_delete_mode, 'rpc', True)
+
+
+def bulk_delete_records(db):
+    """Mesma semântica de sql/bulk_delete.sql sobre as tabelas em memória"""
+    def run(params):
+        resource, ids, mode = params['p_resource'], params['p_ids'], params['p_mode']
+        link = routes.BULK_RESOURCES[resource]['link']
+        found = [row['id'] for row in db.tables[resource] if row['id'] in ids]
+        counts = {}
+        for row in db.tables['applications']:
+            if row[link] in found:
+                counts[row[link]] = counts.get(row[link], 0) + 1
+        skipped = {str(record_id): n for record_id, n in counts.items()} if mode == 'skip' else {}
+        targets = [record_id for record_id in found if str(record_id) not in skipped]
+        removed = [{'id': row['id'], 'parent': row[link]} for row in db.tables['applications'] if row[link] in targets]
+        db.tables['applications'] = [row for row in db.tables['applications'] if row[link] not in targets]
+        db.tables[resource] = [row for row in db.tables[resource] if row['id'] not in targets]
+        return {'found': found, 'deleted': targets, 'skipped': skipped, 'applications': removed}
+    return run
+
+
+def tombstones(db, table):
+    return sorted(entry['row_id'] for entry in db.tables.get('change_log', [])
+                  if entry['table_name'] == table and entry['op'] == 'delete')
+
+
+def test_rpc_deletes_records_and_applications(db, client, auth_headers):
+    db.functions['bulk_delete_records'] = bulk_delete_records(db)
+
+    response = client.post('/api/candidates/bulk/delete', headers=auth_headers, json={'ids': [1, 2, 99]})
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [result['ok'] for result in body['results']] == [True, True, False]
+    assert body['results'][0]['applications'] == 1
+    assert body['results'][2]['reason'] == 'not_found'
+    assert body['summary']['rows'] == 4
+    assert tombstones(db, 'candidates') == [1, 2]
+    assert tombstones(db, 'applications') == [1, 2]
+
+
+def test_rpc_skip_keeps_records_with_applications(db, client, auth_headers):
+    db.functions['bulk_delete_records'] = bulk_delete_records(db)
+    db.tables['candidates'].append({'id': 4, 'first_name': 'Sem', 'email': 'sem@empresa.com', 'status': 'inactive'})
+
+    response = client.post('/api/candidates/bulk/delete', headers=auth_headers,
+                           json={'ids': [1, 4], 'applications': 'skip'})
+
+    results = response.get_json()['results']
+    assert results[0] == {'id': 1, 'ok': False, 'reason': 'has_applications', 'error': 'Possui candidaturas',
+                          'applications': 1}
+    assert results[1]['ok']
+    assert db.find('applications', 1) is not None
+
+
+def test_rpc_error_deletes_nothing(db, client, auth_headers):
+    def failing(params):
+        raise Exception('deadlock detected')
+
+    db.functions['bulk_delete_records'] = failing
+
+    response = client.post('/api/candidates/bulk/delete', headers=auth_headers, json={'ids': [1]})
+
+    assert response.get_json()['results'][0]['reason'] == 'error'
+    assert db.find('candidates', 1) is not None
+    assert tombstones(db, 'applications') == []
+
+
+def test_local_fallback_tombstones_applications_when_parent_delete_fails(db, client, auth_headers):
+    def fail_candidates_delete(table, operation):
+        if table == 'candidates' and operation == 'delete':
+            raise Exception('violates foreign key constraint')
+
+    db.before_execute.append(fail_candidates_delete)
+
+    response = client.post('/api/candidates/bulk/delete', headers=auth_headers, json={'ids': [1]})
+
+    body = response.get_json()
+    assert routes.bulk_delete_mode['rpc'] is False
+    assert body['results'][0]['reason'] == 'error'
+    assert body['results'][0]['applications_removed'] == 1
+    assert db.find('applications', 1) is None
+    # A candidatura removida chega aos clientes de sync mesmo com a falha do candidato
+    assert tombstones(db, 'applications') == [1]
+    assert tombstones(db, 'candidates') == []
+
+
+def test_local_fallback_deletes_only_scanned_applications(db, client, auth_headers):
+    def late_application(table, operation):
+        # Candidatura criada entre a varredura dos dependentes e a exclusão
+        if table == 'applications' and operation == 'delete' and not db.find('applications', 50):
+            db.tables['applications'].append({'id': 50, 'candidate_id': 1, 'job_id': 1, 'stage': 1})
+
+    db.before_execute.append(late_application)
+
+    response = client.post('/api/candidates/bulk/delete', headers=auth_headers, json={'ids': [1]})
+
+    assert db.find('applications', 50) is not None
+    assert tombstones(db, 'applications') == [1]
+    # Sem a FK em memória o candidato sai; no banco a FK barraria e a candidatura 50 ficaria
+    assert response.get_json()['results'][0]['applications'] == 1
+
+
+def test_unit_delete_keeps_job_with_applications(db, client, auth_headers):
+    db.functions['bulk_delete_records'] = bulk_delete_records(db)
+
+    response = client.delete('/api/jobs/1', headers=auth_headers)
+
+    assert response.status_code == 409
+    assert response.get_json()['applications'] == 3
+    assert db.find('jobs', 1) is not None
+    assert len(db.tables['applications']) == 3
+
+
+def test_unit_delete_cascade_is_opt_in(db, client, auth_headers):
+    db.functions['bulk_delete_records'] = bulk_delete_records(db)
+
+    assert client.delete('/api/jobs/1?applications=remove', headers=auth_headers).status_code == 400
+    response = client.delete('/api/jobs/1?applications=cascade', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert db.find('jobs', 1) is None
+    assert tombstones(db, 'applications') == [1, 2, 3]
+
+
+def test_unit_delete_without_applications(db, client, auth_headers):
+    db.tables['candidates'].append({'id': 4, 'first_name': 'Sem', 'email': 'sem@empresa.com', 'status': 'inactive'})
+
+    assert client.delete('/api/candidates/4', headers=auth_headers).status_code == 204
+    assert client.delete('/api/candidates/4', headers=auth_headers).status_code == 404
+    assert client.delete('/api/candidates/1', headers=auth_headers).status_code == 409
@@ -0,0 +1,141 @@
+"""
+Feed de mudanças com o transporte local (LocalPublisher): entrega, reconexão e resync
+"""
+
+import time
+
+import pytest
+
+import change_feed
+from change_feed import ChangeFeed, LocalPublisher
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class Table:
+    """Estado do banco visto pelo probe e o que o feed entregou a este nó"""
+
+    def __init__(self, count):
+        self.count = count
+        self.updated_since = False
+        self.events = []
+        self.resyncs = 0
+
+    def probe(self, table, since):
+        return self.count, self.updated_since
+
+    def on_change(self, event):
+        self.events.append((event.type, event.row.get('id')))
+
+    def on_resync(self):
+        self.resyncs += 1
+
+
+@pytest.fixture
+def publisher():
+    return LocalPublisher()
+
+
+@pytest.fixture
+def table():
+    return Table(count=3)
+
+
+@pytest.fixture
+def feed(monkeypatch, publisher, table):
+    monkeypatch.setattr(change_feed, 'RECONNECT_BASE_DELAY', 0.01)
+    monkeypatch.setattr(change_feed, 'RECONNECT_MAX_DELAY', 0.05)
+    feed = ChangeFeed(tables=('applications',))
+    feed.configure(transport_factory=publisher.transport, probe=table.probe)
+    feed.register('applications', table.on_change, table.on_resync)
+    assert feed.start()
+    assert wait_for(lambda: feed.connected and 'applications' in feed._cursors)
+    yield feed
+    feed.stop()
+    publisher.disconnect_all()
+
+
+def reconnect(feed, publisher):
+    """Derrubar a conexão e esperar a reconexão terminar o resync da tabela"""
+    connections = feed.connections
+    cursor = feed._cursors.get('applications')
+    publisher.disconnect_all()
+    assert wait_for(lambda: feed.connections == connections + 1 and feed._cursors.get('applications') is not cursor)
+
+
+def test_delivers_events_and_tracks_count(feed, publisher, table):
+    publisher.publish('applications', 'INSERT', record={'id': 4})
+    publisher.publish('applications', 'DELETE', old_record={'id': 1})
+
+    assert wait_for(lambda: len(table.events) == 2)
+    assert table.events == [('INSERT', 4), ('DELETE', 1)]
+    assert feed.stats()['cursors']['applications']['count'] == 3
+    # Primeira conexão não tem versão anterior: nada a invalidar
+    assert table.resyncs == 0
+
+
+def test_reconnects_and_keeps_delivering(feed, publisher, table):
+    disconnects = change_feed.metrics.get('change_feed.disconnects')
+
+    reconnect(feed, publisher)
+
+    assert feed.connections == 2
+    assert feed.last_error
+    assert change_feed.metrics.get('change_feed.disconnects') == disconnects + 1
+    publisher.publish('applications', 'UPDATE', record={'id': 2})
+    assert wait_for(lambda: table.events == [('UPDATE', 2)])
+
+
+def test_reconnect_without_changes_skips_resync(feed, publisher, table):
+    publisher.publish('applications', 'INSERT', record={'id': 4})
+    assert wait_for(lambda: table.events)
+    table.count = 4  # o insert recebido já explica a contagem
+
+    reconnect(feed, publisher)
+
+    assert table.resyncs == 0
+
+
+def test_delete_during_outage_invalidates_on_reconnect(feed, publisher, table):
+    table.count = 2  # exclusão enquanto o feed estava fora: nenhum evento chegou
+
+    reconnect(feed, publisher)
+
+    assert table.resyncs == 1
+
+
+def test_update_during_outage_invalidates_on_reconnect(feed, publisher, table):
+    table.updated_since = True
+
+    reconnect(feed, publisher)
+
+    assert table.resyncs == 1
+
+
+def test_failed_probe_invalidates(feed, publisher, table):
+    def broken_probe(name, since):
+        raise ConnectionError('banco fora')
+
+    feed.configure(probe=broken_probe)
+    publisher.disconnect_all()
+
+    assert wait_for(lambda: table.resyncs == 1)
+    assert feed.connections == 2
+
+
+def test_handler_error_invalidates_table(feed, publisher, table):
+    def broken_handler(event):
+        raise KeyError('id')
+
+    feed.register('applications', broken_handler, table.on_resync)
+    publisher.publish('applications', 'UPDATE', record={'id': 2})
+
+    assert wait_for(lambda: table.resyncs == 1)
+    assert feed.connected
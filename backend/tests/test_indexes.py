@@ -0,0 +1,127 @@
+"""
+Índices em memória (compatibilidade e duplicados): catch-up pelo change_log e consulta pontual
+"""
+
+import pytest
+
+import data_version
+import metrics
+import routes
+
+
+@pytest.fixture(autouse=True)
+def fresh_indexes(app, db):
+    # Índices são globais do módulo: cada teste começa sem cópia local nem compartilhada
+    routes.match_engine._reset()
+    routes.shared_cache.delete(routes.MATCH_INDEX_KEY)
+    routes.dedup_index.loaded_at = None
+    routes.shared_cache.delete(routes.DEDUP_INDEX_KEY)
+    for candidate in db.tables['candidates']:
+        candidate['summary'] = 'Desenvolvedor Python backend'
+    db.find('jobs', 1)['description'] = 'Python backend'
+
+
+def written_elsewhere(db, table, row, op='insert'):
+    """Escrita de outro worker: linha no banco, entrada no change_log e data_version compartilhada"""
+    if op == 'delete':
+        db.tables[table] = [current for current in db.tables[table] if current['id'] != row['id']]
+    elif op == 'update':
+        db.find(table, row['id']).update(row)
+    else:
+        db.tables[table].append(row)
+    db.tables.setdefault('change_log', []).append(
+        {'version': db.next_id('change_log'), 'table_name': table, 'row_id': row['id'], 'op': op,
+         'changed_at': '2026-03-01T10:00:00+00:00'})
+    data_version.bump(table)
+
+
+def job_ids(response):
+    return [match['job_id'] for match in response.get_json()['matches']]
+
+
+def test_catch_up_applies_writes_from_other_workers(db, client, auth_headers):
+    assert job_ids(client.get('/api/candidates/1/matches', headers=auth_headers)) == [1]
+    entries = metrics.get('indexes.catch_up_entries')
+
+    written_elsewhere(db, 'jobs', {'id': 2, 'title': 'Dev Python Sênior', 'description': 'Python backend',
+                                   'status': 'active'})
+    written_elsewhere(db, 'candidates', {'id': 4, 'first_name': 'Nova', 'email': 'nova@empresa.com',
+                                         'summary': 'Python backend'})
+
+    assert sorted(job_ids(client.get('/api/candidates/1/matches', headers=auth_headers))) == [1, 2]
+    assert 4 in routes.match_engine.vectors[routes.CANDIDATE]
+    assert metrics.get('indexes.catch_up_entries') == entries + 2
+
+
+def test_catch_up_removes_closed_and_deleted_jobs(db, client, auth_headers):
+    client.get('/api/candidates/1/matches', headers=auth_headers)
+
+    written_elsewhere(db, 'jobs', {'id': 1, 'status': 'closed'}, op='update')
+
+    assert job_ids(client.get('/api/candidates/1/matches', headers=auth_headers)) == []
+    assert 1 not in routes.match_engine.vectors[routes.JOB]
+
+
+def test_rankings_skip_jobs_closed_before_catch_up(db, client, auth_headers):
+    client.get('/api/candidates/1/matches', headers=auth_headers)
+
+    # Sem entrada no change_log: a vaga ainda está no motor, mas sai da resposta
+    db.find('jobs', 1)['status'] = 'closed'
+
+    assert job_ids(client.get('/api/candidates/1/matches', headers=auth_headers)) == []
+
+
+def test_missing_entity_is_loaded_on_demand(db, client, auth_headers):
+    client.get('/api/candidates/1/matches', headers=auth_headers)
+
+    # Criado em outro worker, ainda sem data_version: consulta pontual em vez de 404
+    db.tables['candidates'].append({'id': 5, 'first_name': 'Recente', 'summary': 'Python'})
+
+    response = client.get('/api/candidates/5/matches', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert job_ids(response) == [1]
+    assert client.get('/api/candidates/99/matches', headers=auth_headers).status_code == 404
+
+
+def test_too_many_changes_rebuild(db, client, auth_headers, monkeypatch):
+    client.get('/api/candidates/1/matches', headers=auth_headers)
+    rebuilds = metrics.get('indexes.catch_up_rebuilds')
+    monkeypatch.setattr(routes.change_log, 'entries_since', lambda since, tables: ([], True))
+
+    written_elsewhere(db, 'jobs', {'id': 2, 'title': 'Dev Python', 'description': 'Python', 'status': 'active'})
+
+    assert sorted(job_ids(client.get('/api/candidates/1/matches', headers=auth_headers))) == [1, 2]
+    assert metrics.get('indexes.catch_up_rebuilds') == rebuilds + 1
+
+
+def duplicate_ids(response):
+    return [match['candidate_id'] for match in response.get_json()['duplicates']]
+
+
+def test_dedup_catch_up_and_shared_copy_kept(db, client, auth_headers):
+    assert duplicate_ids(client.get('/api/candidates/1/duplicates?threshold=0.95', headers=auth_headers)) == []
+    blob = routes.shared_cache.get(routes.DEDUP_INDEX_KEY)
+
+    written_elsewhere(db, 'candidates', {'id': 4, 'first_name': 'Pessoa1', 'last_name': 'Silva',
+                                         'email': 'pessoa1@empresa.com'})
+    written_elsewhere(db, 'candidates', {'id': 2}, op='delete')
+
+    assert duplicate_ids(client.get('/api/candidates/1/duplicates?threshold=0.95', headers=auth_headers)) == [4]
+    assert routes.dedup_index.get(2) is None
+    # Escritas locais não derrubam a cópia compartilhada (sem varredura completa)
+    assert client.put('/api/candidates/3', headers=auth_headers, json={'phone': '11999990000'}).status_code == 200
+    assert routes.shared_cache.get(routes.DEDUP_INDEX_KEY) == blob
+
+
+def test_dedup_missing_candidate_is_loaded_on_demand(db, client, auth_headers):
+    client.get('/api/candidates/1/duplicates?threshold=0.95', headers=auth_headers)
+
+    db.tables['candidates'].append({'id': 5, 'first_name': 'Pessoa1', 'last_name': 'Silva',
+                                    'email': 'pessoa1@empresa.com'})
+
+    response = client.get('/api/candidates/5/duplicates?threshold=0.95', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert duplicate_ids(response) == [1]
+    assert client.get('/api/candidates/99/duplicates?threshold=0.95', headers=auth_headers).status_code == 404
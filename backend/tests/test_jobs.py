@@ -0,0 +1,15 @@
+"""
+Listagem de vagas: campo calculado applications_count
+"""
+
+
+def test_applications_count_from_snapshot(db, client, auth_headers):
+    db.tables['jobs'].append({'id': 2, 'title': 'Dev Go', 'company': 'ACME', 'status': 'active',
+                              'created_at': '2026-01-02T09:00:00'})
+
+    response = client.get('/api/jobs?fields=title,applications_count', headers=auth_headers)
+
+    jobs = response.get_json()['jobs']
+    assert response.status_code == 200
+    assert jobs == [{'id': 2, 'title': 'Dev Go', 'applications_count': 0},
+                    {'id': 1, 'title': 'Dev Python', 'applications_count': 3}]
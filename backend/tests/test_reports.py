@@ -0,0 +1,107 @@
+"""
+Relatórios no servidor: retenção, jobs restritos ao dono e credenciais do pool
+"""
+
+import os
+import time
+
+import pytest
+
+import profile_cache
+import report_jobs
+import routes
+from report_jobs import ReportService
+
+SPEC = {'resource': 'candidates', 'format': 'csv', 'columns': ['first_name'], 'filters': {}, 'title': 'Candidatos'}
+
+
+@pytest.fixture
+def service(app, tmp_path, monkeypatch):
+    service = ReportService(queue_path=str(tmp_path / 'queue.sqlite3'), retention=3600)
+    monkeypatch.setattr(routes, 'report_service', service)
+    return service
+
+
+def finished_job(service, user_id, finished_at=None, extension='.csv'):
+    """Job concluído com arquivo em disco (sem passar pelo pool)"""
+    job_id = service.queue.create(SPEC, 'hash', 1, user_id)
+    path = os.path.join(os.path.dirname(service.queue_path), f'{job_id}{extension}')
+    with open(path, 'w') as f:
+        f.write('Nome\n')
+    service.queue.claim(job_id)
+    service.queue.complete(job_id, path, 1, os.path.getsize(path))
+    if finished_at is not None:
+        with service.queue._connect() as conn:
+            conn.execute('UPDATE report_jobs SET finished_at = ? WHERE id = ?', (finished_at, job_id))
+        os.utime(path, (finished_at, finished_at))
+    return job_id, path
+
+
+def test_sweep_removes_expired_jobs_and_orphan_files(service):
+    old_id, old_path = finished_job(service, 'u1', finished_at=time.time() - 7200)
+    new_id, new_path = finished_job(service, 'u1')
+    orphan = os.path.join(os.path.dirname(service.queue_path), 'interrompido.xlsx.part')
+    open(orphan, 'w').close()
+    os.utime(orphan, (time.time() - 7200, time.time() - 7200))
+
+    assert service.sweep() == 2
+
+    assert service.get(old_id) is None and not os.path.exists(old_path)
+    assert not os.path.exists(orphan)
+    assert service.get(new_id) is not None and os.path.exists(new_path)
+    assert os.path.exists(service.queue_path)
+
+
+def test_reuse_is_scoped_to_the_owner(service):
+    job_id, _ = finished_job(service, 'u2')
+
+    assert service.queue.find_reusable('hash', 1, 'u2')['id'] == job_id
+    assert service.queue.find_reusable('hash', 1, 'u1') is None
+
+
+def test_other_users_report_is_hidden_from_non_admins(db, client, auth_headers, service):
+    job_id, _ = finished_job(service, 'u2')
+
+    # Admin vê jobs de todos
+    assert client.get(f'/api/reports/{job_id}', headers=auth_headers).status_code == 200
+
+    db.find('profiles', 1)['role'] = 'recruiter'
+    profile_cache.profile_cache.invalidate()
+    try:
+        assert client.get(f'/api/reports/{job_id}', headers=auth_headers).status_code == 404
+        assert client.get(f'/api/reports/{job_id}/download', headers=auth_headers).status_code == 404
+        own_id, _ = finished_job(service, 'u1')
+        response = client.get(f'/api/reports/{own_id}/download', headers=auth_headers)
+        assert response.status_code == 200
+        assert response.data == b'Nome\n'
+        response.close()
+    finally:
+        profile_cache.profile_cache.invalidate()
+
+
+def test_worker_client_uses_initializer_credentials(monkeypatch):
+    import supabase
+    created = []
+    monkeypatch.setattr(supabase, 'create_client', lambda url, key: created.append((url, key)) or object())
+    monkeypatch.setenv('SUPABASE_URL', 'https://ambiente.supabase.co')
+
+    report_jobs._init_worker('https://configurado.supabase.co', 'chave')
+    try:
+        report_jobs._get_worker_client()
+        assert created == [('https://configurado.supabase.co', 'chave')]
+        report_jobs._init_worker(None, None)
+        with pytest.raises(RuntimeError):
+            report_jobs._get_worker_client()
+    finally:
+        report_jobs._init_worker(None, None)
+
+
+def test_service_passes_configured_credentials_to_pool(service, monkeypatch):
+    pools = []
+    monkeypatch.setattr(report_jobs, 'ProcessPoolExecutor', lambda **kwargs: pools.append(kwargs) or object())
+    service.configure('https://configurado.supabase.co', 'chave')
+
+    service._get_pool()
+
+    assert pools[0]['initializer'] is report_jobs._init_worker
+    assert pools[0]['initargs'] == ('https://configurado.supabase.co', 'chave')
@@ -0,0 +1,100 @@
+"""
+Single-flight: coalescência só entre requisições lidas da mesma origem, com o
+estado de resiliência do líder repassado a quem aguardou
+"""
+
+import threading
+import time
+
+import pytest
+from flask import Flask, jsonify, request
+
+import resilience
+import singleflight
+from singleflight import single_flight
+
+
+@pytest.fixture
+def flight(monkeypatch):
+    """App mínima com um handler lento; X-Pinned simula usuário fixado no primário"""
+    monkeypatch.setattr(singleflight.data_client, 'reads_from_replica', lambda: 'X-Pinned' not in request.headers)
+    release = threading.Event()
+    started = threading.Semaphore(0)
+    calls = []
+    app = Flask(__name__)
+
+    @app.before_request
+    def begin():
+        resilience.begin_request()
+
+    @app.after_request
+    def finish(response):
+        # Mesmo sinal de app.finish_deadline
+        served_stale, _ = resilience.end_request()
+        if served_stale:
+            response.headers['X-Data-Stale'] = 'true'
+        return response
+
+    @app.route('/lento')
+    @single_flight('lento')
+    def slow():
+        calls.append(request.headers.get('X-Pinned'))
+        if request.args.get('stale'):
+            resilience.merge_outcome(served_stale=True)
+        started.release()
+        release.wait(5)
+        return jsonify({'calls': len(calls)})
+
+    return app, release, started, calls
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def waiting():
+    with singleflight._group._lock:
+        return sum(call.waiters for call in singleflight._group._calls.values())
+
+
+def run_concurrently(app, headers_list, started, release, leaders, path='/lento'):
+    """Disparar as requisições juntas e liberar os líderes só com as seguidoras aguardando"""
+    responses = [None] * len(headers_list)
+
+    def get(index, headers):
+        responses[index] = app.test_client().get(path, headers=headers)
+
+    threads = [threading.Thread(target=get, args=(i, headers)) for i, headers in enumerate(headers_list)]
+    for thread in threads:
+        thread.start()
+    for _ in range(leaders):
+        assert started.acquire(timeout=5)
+    assert wait_for(lambda: waiting() == len(headers_list) - leaders)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return responses
+
+
+def test_pinned_request_is_not_coalesced_with_replica_reads(flight):
+    app, release, started, calls = flight
+
+    responses = run_concurrently(app, [{}, {'X-Pinned': '1'}, {}], started, release, leaders=2)
+
+    assert sorted(calls, key=str) == ['1', None]
+    coalesced = sorted(response.headers['X-Coalesced'] for response in responses)
+    assert coalesced == ['false', 'false', 'true']
+
+
+def test_waiters_inherit_stale_flag(flight):
+    app, release, started, calls = flight
+
+    responses = run_concurrently(app, [{}, {}, {}], started, release, leaders=1, path='/lento?stale=1')
+
+    assert len(calls) == 1
+    assert [response.headers.get('X-Data-Stale') for response in responses] == ['true'] * 3
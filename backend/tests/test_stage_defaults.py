@@ -0,0 +1,39 @@
+"""
+Candidaturas sem etapa ficam na etapa inicial do catálogo (não na posição 1 fixa)
+"""
+
+import pytest
+
+import routes
+from columnar import ApplicationsSnapshot
+from rollups import DailyRollupStore
+from stage_catalog import catalog_service
+
+
+@pytest.fixture
+def stages_from_ten(db):
+    # Catálogo cujas posições começam em 10
+    for stage in db.tables['recruitment_stages']:
+        stage['order_position'] += 9
+    routes.shared_cache.delete(routes.STAGES_CACHE_KEY)
+    catalog_service.invalidate()
+    yield
+    routes.shared_cache.delete(routes.STAGES_CACHE_KEY)
+    catalog_service.invalidate()
+
+
+def test_snapshot_uses_catalog_first_stage(app, stages_from_ten):
+    snapshot = ApplicationsSnapshot()
+
+    snapshot.build([{'id': 1, 'job_id': 1, 'stage': None, 'status': 'pending'}])
+
+    assert snapshot.group_count('stage') == {10: 1}
+
+
+def test_rollups_use_catalog_first_stage(app, stages_from_ten, tmp_path):
+    store = DailyRollupStore(str(tmp_path / 'rollups.sqlite3'))
+
+    store.record_arrivals([{'job_id': 1, 'stage': None, 'status': 'applied', 'applied_at': '2026-02-01T10:00:00'}])
+    store.record('2026-02-01', 1, None, 'applied', arrivals=1)
+
+    assert store.totals('2026-02-01', '2026-02-01') == [(10, 'applied', 2, 0)]
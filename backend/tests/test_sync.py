@@ -0,0 +1,55 @@
+"""
+Sync por delta (/api/sync): snapshot paginado por chave
+"""
+
+import pytest
+
+import routes
+
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    monkeypatch.setattr(routes, 'SYNC_SNAPSHOT_PAGE_SIZE', 2)
+
+
+def upsert_ids(body, table):
+    return [row['id'] for row in body['tables'][table]['upserts']]
+
+
+def test_snapshot_is_paged_with_keyset_cursor(client, auth_headers):
+    first = client.get('/api/sync?tables=candidates,jobs', headers=auth_headers).get_json()
+
+    assert first['full'] and first['has_more']
+    assert upsert_ids(first, 'candidates') == [1, 2]
+    assert upsert_ids(first, 'jobs') == []
+
+    second = client.get(f"/api/sync?tables=candidates,jobs&cursor={first['cursor']}", headers=auth_headers).get_json()
+
+    assert upsert_ids(second, 'candidates') == [3]
+    assert upsert_ids(second, 'jobs') == [1]
+    # Página cheia: só a próxima (vazia) confirma o fim da tabela
+    last = client.get(f"/api/sync?tables=candidates,jobs&cursor={second['cursor']}", headers=auth_headers).get_json()
+    assert upsert_ids(last, 'jobs') == []
+    assert not last['has_more'] and last['cursor'] is None
+    # Todas as páginas levam a versão do início: o delta seguinte parte dela
+    assert last['version'] == first['version']
+    delta = client.get(f"/api/sync?tables=candidates,jobs&since={last['version']}", headers=auth_headers).get_json()
+    assert not delta['full']
+
+
+def test_page_ending_at_table_boundary(db, client, auth_headers):
+    db.tables['candidates'] = db.tables['candidates'][:2]
+
+    first = client.get('/api/sync?tables=candidates,jobs', headers=auth_headers).get_json()
+    second = client.get(f"/api/sync?tables=candidates,jobs&cursor={first['cursor']}", headers=auth_headers).get_json()
+
+    assert upsert_ids(first, 'candidates') == [1, 2] and first['has_more']
+    assert upsert_ids(second, 'candidates') == [] and upsert_ids(second, 'jobs') == [1]
+    assert not second['has_more']
+
+
+@pytest.mark.parametrize('cursor', ['abc', '1.5.0', '1.0'])
+def test_invalid_cursor(client, auth_headers, cursor):
+    response = client.get(f'/api/sync?tables=candidates,jobs&cursor={cursor}', headers=auth_headers)
+
+    assert response.status_code == 400
@@ -0,0 +1,120 @@
+"""
+Transições de etapa pelo update condicional (LocalTransitionStore) e o 409 da API
+"""
+
+import pytest
+
+import metrics
+import transitions
+from conftest import STAGES
+from stage_catalog import StageCatalog
+from transitions import LocalTransitionStore, OK, CONFLICT, NOT_FOUND, INVALID
+
+
+@pytest.fixture
+def catalog():
+    return StageCatalog(STAGES)
+
+
+@pytest.fixture
+def store(app):
+    # app configura o data_client com o banco em memória
+    return LocalTransitionStore()
+
+
+def concurrent_writer(db, application_id, times=None):
+    """Outro escritor altera a candidatura logo depois de cada leitura (as primeiras `times`)"""
+    state = {'writes': 0}
+
+    def write(table, operation):
+        if table != 'applications' or operation != 'select':
+            return
+        if times is not None and state['writes'] >= times:
+            return
+        state['writes'] += 1
+        row = db.find('applications', application_id)
+        row['updated_at'] = f"2026-03-01T10:00:{state['writes']:02d}"
+
+    db.after_execute.append(write)
+    return state
+
+
+def test_move_next_advances_stage(db, store, catalog):
+    transition = store.move(1, catalog, 'next')
+
+    assert transition.outcome == OK
+    assert transition.application['stage'] == 2
+    assert transition.previous['stage'] == 1
+    assert transition.changed
+    assert db.find('applications', 1)['stage'] == 2
+
+
+def test_missing_application_and_invalid_target(store, catalog):
+    assert store.move(999, catalog, 'next').outcome == NOT_FOUND
+    assert store.move(1, catalog, 'specific', target_stage=42).outcome == INVALID
+
+
+def test_stale_expected_updated_at_is_conflict(db, store, catalog):
+    transition = store.move(1, catalog, 'next', expected_updated_at='2026-01-15T08:00:00')
+
+    assert transition.outcome == CONFLICT
+    # Devolve a linha atual para o cliente recarregar; nada é gravado
+    assert transition.application['updated_at'] == '2026-02-01T10:00:00'
+    assert db.find('applications', 1)['stage'] == 1
+
+
+def test_expected_updated_at_matches_across_formats(db, store, catalog):
+    db.find('applications', 1)['updated_at'] = '2026-02-01T10:00:00+00:00'
+
+    transition = store.move(1, catalog, 'next', expected_updated_at='2026-02-01T10:00:00.000Z')
+
+    assert transition.outcome == OK
+
+
+def test_cas_lost_once_is_retried(db, store, catalog):
+    retries = metrics.get('transitions.cas_retries')
+    concurrent_writer(db, 1, times=1)
+
+    transition = store.move(1, catalog, 'next')
+
+    assert transition.outcome == OK
+    assert transition.previous['updated_at'] == '2026-03-01T10:00:01'
+    assert metrics.get('transitions.cas_retries') == retries + 1
+
+
+def test_cas_lost_every_attempt_is_conflict(db, store, catalog):
+    writer = concurrent_writer(db, 1)
+
+    transition = store.move(1, catalog, 'next')
+
+    assert transition.outcome == CONFLICT
+    assert writer['writes'] == transitions.CAS_MAX_ATTEMPTS
+    assert db.find('applications', 1)['stage'] == 1
+
+
+def test_route_stale_expected_updated_at_returns_409(db, client, auth_headers):
+    response = client.put('/api/applications/2/stage', headers=auth_headers,
+                          json={'action': 'next', 'expected_updated_at': '2026-01-15T08:00:00'})
+
+    assert response.status_code == 409
+    assert response.get_json()['application']['updated_at'] == '2026-02-02T10:00:00'
+    assert db.find('applications', 2)['stage'] == 1
+
+
+def test_route_cas_conflict_returns_409(db, client, auth_headers):
+    concurrent_writer(db, 3)
+
+    response = client.put('/api/applications/3/stage', headers=auth_headers, json={'action': 'next'})
+
+    assert response.status_code == 409
+    assert db.find('applications', 3)['stage'] == 1
+
+
+def test_route_move_with_current_version(db, client, auth_headers):
+    response = client.put('/api/applications/2/stage', headers=auth_headers,
+                          json={'action': 'specific', 'target_stage': 3,
+                                'expected_updated_at': '2026-02-02T10:00:00'})
+
+    assert response.status_code == 200
+    assert response.get_json()['application']['stage'] == 3
+    assert db.find('applications', 2)['stage'] == 3
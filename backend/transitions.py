@@ -0,0 +1,180 @@
+"""
+Sistema HR - MVP
+Transições de etapa atômicas
+
+A etapa de destino é calculada a partir da etapa atual da própria linha, dentro
+de uma única operação, em vez de ler a candidatura, calcular em Python e
+gravar depois (duas movimentações concorrentes liam a mesma etapa e uma se
+perdia). Com a função transition_application_stage (sql/stage_transitions.sql)
+é uma única chamada: trava a linha, calcula a etapa pelo catálogo, grava e
+devolve a linha nova já com candidato e vaga.
+
+LocalTransitionStore faz o mesmo com update condicional (compare-and-swap em
+updated_at) pela API de tabelas: serve para testes com cliente em memória e
+para bancos ainda sem a função, para onde o modo 'rpc' cai sozinho se a função
+não existir.
+
+expected_updated_at (opcional) é o controle otimista do cliente: se a
+candidatura mudou desde que foi lida, a transição falha com 'conflict'.
+related ({'candidates': [...], 'jobs': [...]}, ver fieldsets.py) limita as
+colunas do candidato e da vaga devolvidas junto; sem ele vêm todas.
+"""
+
+import os
+from datetime import datetime
+
+import metrics
+from db import data_client
+
+TRANSITION_MODE = os.getenv('STAGE_TRANSITION_MODE', 'rpc')
+TRANSITION_FUNCTION = 'transition_application_stage'
+CAS_MAX_ATTEMPTS = int(os.getenv('STAGE_TRANSITION_MAX_ATTEMPTS', '5'))
+# PostgREST: função inexistente no schema cache / Postgres: undefined_function
+MISSING_FUNCTION_CODES = ('PGRST202', '42883')
+
+OK = 'ok'
+NOT_FOUND = 'not_found'
+INVALID = 'invalid'
+CONFLICT = 'conflict'
+
+
+class Transition:
+    """Resultado de uma transição: a linha nova e a etapa/status anteriores"""
+
+    def __init__(self, outcome, application=None, previous=None):
+        self.outcome = outcome
+        self.application = application
+        self.previous = previous or {}
+
+    @property
+    def ok(self):
+        return self.outcome == OK
+
+    @property
+    def changed(self):
+        return self.ok and (
+            self.application.get('stage') != self.previous.get('stage')
+            or self.application.get('status') != self.previous.get('status')
+        )
+
+
+def _instant(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return value
+
+
+def same_instant(a, b):
+    """Comparar timestamps ISO em formatos diferentes (Z, +00:00, microssegundos)"""
+    return _instant(a) == _instant(b)
+
+
+def is_missing_function(error):
+    code = getattr(error, 'code', None)
+    return code in MISSING_FUNCTION_CODES or any(c in str(error) for c in MISSING_FUNCTION_CODES)
+
+
+class RpcTransitionStore:
+    """Transição numa única chamada à função do banco"""
+
+    def move(self, application_id, catalog, action, target_stage=None, notes='', expected_updated_at=None,
+             related=None):
+        related = related or {}
+        result = data_client.rpc(TRANSITION_FUNCTION, {
+            'p_application_id': application_id,
+            'p_action': action,
+            'p_target_stage': target_stage,
+            'p_positions': list(catalog.positions),
+            'p_notes': notes or None,
+            'p_expected_updated_at': expected_updated_at,
+            'p_hired_stages': sorted(catalog.hired_stages),
+            'p_rejected_stages': sorted(catalog.rejected_stages),
+            'p_candidate_columns': related.get('candidates'),
+            'p_job_columns': related.get('jobs')
+        }).execute().data or {}
+        return Transition(result.get('outcome', NOT_FOUND), result.get('application'), result.get('previous'))
+
+
+class LocalTransitionStore:
+    """Transição por update condicional em updated_at (retenta se outra escrita venceu)"""
+
+    def _related(self, application, related):
+        for key, table, column in (('candidates', 'candidates', 'candidate_id'), ('jobs', 'jobs', 'job_id')):
+            if application.get(column):
+                columns = ', '.join(related[key]) if related.get(key) else '*'
+                rows = data_client.table(table).select(columns).eq('id', application[column]).execute().data
+                if rows:
+                    application[key] = rows[0]
+        return application
+
+    def move(self, application_id, catalog, action, target_stage=None, notes='', expected_updated_at=None,
+             related=None):
+        for _ in range(CAS_MAX_ATTEMPTS):
+            rows = data_client.table('applications').select('*').eq('id', application_id).execute().data
+            if not rows:
+                return Transition(NOT_FOUND)
+            current = rows[0]
+            if expected_updated_at and not same_instant(current.get('updated_at'), expected_updated_at):
+                return Transition(CONFLICT, current)
+
+            new_stage = catalog.resolve(current.get('stage'), action, target_stage)
+            if new_stage is None:
+                return Transition(INVALID)
+
+            update_data = {
+                'stage': new_stage,
+                'status': catalog.status_for(new_stage),
+                'updated_at': datetime.now().isoformat()
+            }
+            if notes:
+                update_data['notes'] = notes
+
+            query = data_client.table('applications').update(update_data).eq('id', application_id)
+            if current.get('updated_at'):
+                query = query.eq('updated_at', current['updated_at'])
+            else:
+                query = query.is_('updated_at', 'null')
+            response = query.execute()
+            if response.data:
+                previous = {key: current.get(key) for key in ('stage', 'status', 'updated_at', 'applied_at')}
+                return Transition(OK, self._related(response.data[0], related or {}), previous)
+            metrics.incr('transitions.cas_retries')
+        return Transition(CONFLICT)
+
+
+class StageTransitions:
+    """Escolhe a função do banco ('rpc') ou o update condicional ('local')"""
+
+    def __init__(self, mode=TRANSITION_MODE):
+        self.mode = mode
+        self.rpc = RpcTransitionStore()
+        self.local = LocalTransitionStore()
+
+    def configure(self, mode):
+        self.mode = mode
+
+    def move(self, application_id, catalog, action, target_stage=None, notes='', expected_updated_at=None,
+             related=None):
+        args = (application_id, catalog, action, target_stage, notes, expected_updated_at, related)
+        if self.mode == 'rpc':
+            try:
+                transition = self.rpc.move(*args)
+                metrics.incr(f'transitions.rpc.{transition.outcome}')
+                return transition
+            except Exception as e:
+                if not is_missing_function(e):
+                    raise
+                print(f"⚠️ Função {TRANSITION_FUNCTION} ausente - usando update condicional: {e}")
+                self.mode = 'local'
+        transition = self.local.move(*args)
+        metrics.incr(f'transitions.local.{transition.outcome}')
+        return transition
+
+    def stats(self):
+        return {'mode': self.mode}
+
+
+stage_transitions = StageTransitions()
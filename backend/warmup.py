@@ -0,0 +1,106 @@
+"""
+Sistema HR - MVP
+Aquecimento de caches após o fork e métricas de inicialização
+
+Hooks registrados (etapas, roles, índice de vagas...) rodam uma vez por
+processo numa thread própria, disparados pelo post_fork do servidor ou pela
+primeira requisição do worker. O tempo de create_app(), de cada hook e da
+primeira requisição (e se ela encontrou os caches quentes) ficam nas métricas.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+WARMUP_TIMEOUT = float(os.getenv('WARMUP_TIMEOUT', '60'))
+
+
+class WarmupRegistry:
+    """Hooks de aquecimento executados uma vez por processo"""
+
+    def __init__(self):
+        self._hooks = OrderedDict()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._done = threading.Event()
+        self.results = {}
+        self.startup = {}
+
+    def register(self, name, fn):
+        self._hooks[name] = fn
+
+    @property
+    def names(self):
+        return list(self._hooks)
+
+    def start(self, names=None, background=True):
+        """Rodar os hooks (uma vez por pid); retorna False se já iniciado"""
+        pid = os.getpid()
+        with self._lock:
+            if self._pid == pid:
+                return False
+            self._pid = pid
+            self._done = threading.Event()
+            self.results = {}
+        selected = [name for name in (names if names is not None else self._hooks) if name in self._hooks]
+        if background:
+            threading.Thread(target=self._run, args=(selected,), name='warmup', daemon=True).start()
+        else:
+            self._run(selected)
+        return True
+
+    def _run(self, names):
+        started = time.time()
+        for name in names:
+            hook_started = time.time()
+            try:
+                self._hooks[name]()
+                self.results[name] = {'status': 'ok'}
+                metrics.incr(f'warmup.{name}.ok')
+            except Exception as e:
+                self.results[name] = {'status': 'error', 'error': str(e)}
+                metrics.incr(f'warmup.{name}.errors')
+                print(f"⚠️ Aquecimento '{name}' falhou: {e}")
+            seconds = round(time.time() - hook_started, 4)
+            self.results[name]['seconds'] = seconds
+            metrics.set_gauge(f'warmup.{name}.seconds', seconds)
+        metrics.set_gauge('warmup.total_seconds', round(time.time() - started, 4))
+        self._done.set()
+
+    def is_complete(self):
+        return self._pid == os.getpid() and self._done.is_set()
+
+    def wait(self, timeout=WARMUP_TIMEOUT):
+        return self._done.wait(timeout)
+
+    # -------------------------------------------------------------------------
+    # Métricas de inicialização
+    # -------------------------------------------------------------------------
+
+    def record_startup(self, name, seconds):
+        self.startup[name] = round(seconds, 4)
+        metrics.set_gauge(f'startup.{name}_seconds', round(seconds, 4))
+
+    def record_first_request(self, path, seconds, status_code):
+        self.startup['first_request'] = {
+            'pid': os.getpid(),
+            'path': path,
+            'seconds': round(seconds, 4),
+            'status_code': status_code,
+            'warm': self.is_complete()
+        }
+        metrics.set_gauge('startup.first_request_seconds', round(seconds, 4))
+
+    def stats(self):
+        return {
+            'pid': self._pid,
+            'complete': self.is_complete(),
+            'hooks': dict(self.results),
+            'startup': dict(self.startup)
+        }
+
+
+warmup = WarmupRegistry()
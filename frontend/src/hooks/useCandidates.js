@@ -1,18 +1,47 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { candidatesApi } from '../services/candidatesApi';
 
 export const useCandidates = () => {
   const [candidates, setCandidates] = useState([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  // Versão do change_log já aplicada à lista local (null: sem réplica local)
+  const versionRef = useRef(null);
+
+  const byNewest = (a, b) => new Date(b.created_at).getTime() - new Date(a.created_at).getTime();
+
+  // Aplicar mudanças desde a última versão (snapshot completo na primeira vez)
+  const syncCandidates = async () => {
+    const changes = await candidatesApi.sync(versionRef.current ?? undefined);
+    versionRef.current = changes.version;
+    if (changes.full) {
+      setCandidates([...changes.upserts].sort(byNewest));
+      return;
+    }
+    if (!changes.upserts.length && !changes.deleted.length) return;
+    setCandidates((current) => {
+      const removed = new Set([...changes.deleted, ...changes.upserts.map((c) => c.id)]);
+      return [...current.filter((c) => !removed.has(c.id)), ...changes.upserts].sort(byNewest);
+    });
+  };
+
+  // Após uma escrita: falha no sync não desfaz a operação, só força snapshot no próximo
+  const refreshAfterWrite = async () => {
+    try {
+      await syncCandidates();
+    } catch (err) {
+      versionRef.current = null;
+      console.error(err);
+    }
+  };
 
   // Carregar todos candidatos
   const loadCandidates = async () => {
     setLoading(true);
     setError(null);
     try {
-      const data = await candidatesApi.getAll();
-      setCandidates(data);
+      versionRef.current = null;
+      await syncCandidates();
     } catch (err) {
       setError('Erro ao carregar candidatos');
       console.error(err);
@@ -27,6 +56,8 @@ export const useCandidates = () => {
     setError(null);
     try {
       const data = await candidatesApi.search(query, status);
+      // Resultado filtrado não é réplica da tabela: o próximo sync recarrega tudo
+      versionRef.current = null;
       setCandidates(data);
     } catch (err) {
       setError('Erro ao buscar candidatos');
@@ -40,7 +71,7 @@ export const useCandidates = () => {
   const createCandidate = async (candidateData) => {
     try {
       await candidatesApi.create(candidateData);
-      await loadCandidates(); // Recarregar lista
+      await refreshAfterWrite(); // Só o que mudou desde a última versão
       return true;
     } catch (err) {
       setError('Erro ao criar candidato');
@@ -53,7 +84,7 @@ export const useCandidates = () => {
   const updateCandidate = async (id, candidateData) => {
     try {
       await candidatesApi.update(id, candidateData);
-      await loadCandidates(); // Recarregar lista
+      await refreshAfterWrite(); // Só o que mudou desde a última versão
       return true;
     } catch (err) {
       setError('Erro ao atualizar candidato');
@@ -66,7 +97,7 @@ export const useCandidates = () => {
   const deleteCandidate = async (id) => {
     try {
       await candidatesApi.delete(id);
-      await loadCandidates(); // Recarregar lista
+      await refreshAfterWrite(); // Só o que mudou desde a última versão
       return true;
     } catch (err) {
       setError('Erro ao deletar candidato');
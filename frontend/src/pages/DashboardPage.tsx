@@ -71,6 +71,21 @@ interface DashboardMetrics {
     status: string;
     applied_at: string;
   }>;
+  period_metrics?: {
+    period: string;
+    start_date: string;
+    end_date: string;
+    applications: number;
+    transitions: number;
+    hired: number;
+    conversion_rate: number;
+    transitions_by_status: Record<string, number>;
+    transitions_by_stage: Record<string, number>;
+    daily_applications: Array<{
+      date: string;
+      count: number;
+    }>;
+  };
   last_updated: string;
   total_applications: number;
 }
@@ -80,8 +95,11 @@ interface DashboardMetrics {
 // ============================================================================
 
 const dashboardApi = {
-  getMetrics: async (): Promise<DashboardMetrics> => {
-    const response = await api.get('/api/dashboard/metrics');
+  getMetrics: async (filter?: { value: string; customRange?: { start: string; end: string } }): Promise<DashboardMetrics> => {
+    const params = filter?.value === 'custom' && filter.customRange
+      ? { start_date: filter.customRange.start, end_date: filter.customRange.end }
+      : { period: filter?.value };
+    const response = await api.get('/api/dashboard/metrics', { params });
     return response.data;
   }
 };
@@ -176,7 +194,7 @@ const DashboardPage: React.FC = () => {
     
     try {
       console.log('📊 Carregando métricas do dashboard...');
-      const data = await dashboardApi.getMetrics();
+      const data = await dashboardApi.getMetrics(periodFilter);
       setMetrics(data);
       
       setMetricsCache({
@@ -209,6 +227,16 @@ const DashboardPage: React.FC = () => {
     loadMetrics();
   }, []);
 
+  // 📅 RECARREGAR AO TROCAR O PERÍODO
+  const isFirstPeriod = React.useRef(true);
+  useEffect(() => {
+    if (isFirstPeriod.current) {
+      isFirstPeriod.current = false;
+      return;
+    }
+    loadMetrics(true);
+  }, [periodFilter]);
+
   // 🔄 FUNÇÕES PARA COMPONENTES
   const handlePeriodChange = (period: string, customRange?: { start: string; end: string }) => {
     setPeriodFilter({ value: period, customRange });
@@ -451,7 +479,16 @@ const DashboardPage: React.FC = () => {
       </div>
 
       {/* Cards Secundários */}
-      <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
+      <div className="grid grid-cols-1 md:grid-cols-4 gap-4">
+        <MetricCard
+          title="Candidaturas no Período"
+          value={metrics.period_metrics?.applications ?? 0}
+          icon={<TrendingUp className="h-6 w-6" />}
+          color="text-purple-700"
+          change={metrics.period_metrics ? `${metrics.period_metrics.hired} contratações` : undefined}
+          changeType="neutral"
+        />
+        
         <MetricCard
           title="Contratados"
           value={metrics.hired_count}
@@ -103,21 +103,23 @@ interface PipelineStats {
 }
 
 interface MovementHistory {
-  id: number;
+  id: number | null;
   application_id: number;
-  from_stage: number;
-  to_stage: number;
-  moved_by: string;
-  moved_at: string;
+  previous_stage: number | null;
+  new_stage: number;
+  changed_by: string;
+  changed_at: string;
   notes?: string;
+  profiles?: { full_name: string } | null;
 }
 
 interface Comment {
   id: number;
   application_id: number;
-  content: string;
-  created_by: string;
+  comment: string;
+  user_id: string;
   created_at: string;
+  profiles?: { full_name: string } | null;
 }
 
 // ============================================================================
@@ -226,7 +228,7 @@ const pipelineApi = {
   addComment: async (applicationId: number, content: string): Promise<Comment> => {
     try {
       const response = await api.post(`/api/applications/${applicationId}/comments`, {
-        content
+        comment: content
       });
       return response.data.comment;
     } catch (error: any) {
@@ -238,7 +240,7 @@ const pipelineApi = {
   // Buscar vagas para filtro
   getJobs: async (): Promise<Job[]> => {
     try {
-      const response = await api.get('/api/jobs?per_page=50');
+      const response = await api.get('/api/jobs?per_page=50&view=options');
       return response.data.jobs || [];
     } catch (error: any) {
       console.error('❌ Erro ao carregar vagas:', error);
@@ -474,7 +476,7 @@ const PipelinePage: React.FC = () => {
     try {
       setIsAddingComment(true);
       const comment = await pipelineApi.addComment(selectedApplication.id, newComment.trim());
-      setComments([...comments, comment]);
+      setComments([comment, ...comments]);
       setNewComment('');
       console.log('✅ Comentário adicionado');
     } catch (err: any) {
@@ -632,7 +634,7 @@ const PipelinePage: React.FC = () => {
           
           <button
             onClick={() => handleMoveCandidate(application.id, 'next')}
-            disabled={application.stage === 9}
+            disabled={application.stage === stages[stages.length - 1]?.order_position}
             className="p-1 text-gray-400 hover:text-gray-600 disabled:opacity-30 disabled:cursor-not-allowed"
             title="Próxima etapa"
           >
@@ -920,18 +922,20 @@ const PipelinePage: React.FC = () => {
             <div className="p-6 overflow-y-auto max-h-[60vh]">
               {movementHistory.length > 0 ? (
                 <div className="space-y-4">
-                  {movementHistory.map((movement) => (
-                    <div key={movement.id} className="border border-gray-200 rounded-lg p-4">
+                  {movementHistory.map((movement, index) => (
+                    <div key={movement.id ?? `pending-${index}`} className="border border-gray-200 rounded-lg p-4">
                       <div className="flex items-center justify-between">
                         <div>
                           <p className="font-medium text-gray-900">
-                            Etapa {movement.from_stage} → Etapa {movement.to_stage}
+                            {movement.previous_stage
+                              ? `Etapa ${movement.previous_stage} → Etapa ${movement.new_stage}`
+                              : `Candidatura criada na etapa ${movement.new_stage}`}
                           </p>
                           <p className="text-sm text-gray-600">
-                            Movido por: {movement.moved_by}
+                            Movido por: {movement.profiles?.full_name || movement.changed_by}
                           </p>
                           <p className="text-xs text-gray-500">
-                            {formatDate(movement.moved_at)}
+                            {formatDate(movement.changed_at)}
                           </p>
                         </div>
                       </div>
@@ -997,10 +1001,10 @@ const PipelinePage: React.FC = () => {
                   {comments.map((comment) => (
                     <div key={comment.id} className="border border-gray-200 rounded-lg p-4">
                       <div className="flex items-center justify-between mb-2">
-                        <p className="font-medium text-gray-900">{comment.created_by}</p>
+                        <p className="font-medium text-gray-900">{comment.profiles?.full_name || comment.user_id}</p>
                         <p className="text-xs text-gray-500">{formatDate(comment.created_at)}</p>
                       </div>
-                      <p className="text-gray-700">{comment.content}</p>
+                      <p className="text-gray-700">{comment.comment}</p>
                     </div>
                   ))}
                 </div>
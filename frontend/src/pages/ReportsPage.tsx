@@ -36,6 +36,7 @@ import {
   AreaChart
 } from 'recharts';
 import ExportButton from '../components/Reports/ExportButton';
+import { reportService } from '../services/reportService';
 import api from '../lib/api';
 import { format, subDays, subMonths, startOfMonth, endOfMonth } from 'date-fns';
 import { ptBR } from 'date-fns/locale';
@@ -85,6 +86,24 @@ const ReportsPage: React.FC = () => {
     dateRange: 'month',
   });
   const [selectedReport, setSelectedReport] = useState<string>('overview');
+  const [serverExporting, setServerExporting] = useState(false);
+
+  // Base completa gerada no servidor (fila assíncrona): sem limite de linhas do navegador
+  const handleServerExport = async () => {
+    const resource = selectedReport === 'candidates' ? 'candidates'
+      : selectedReport === 'jobs' ? 'jobs' : 'applications';
+    const titles = { candidates: 'Candidatos', jobs: 'Vagas', applications: 'Candidaturas' };
+
+    try {
+      setServerExporting(true);
+      await reportService.exportOnServer({ resource, format: 'xlsx', title: `Base completa - ${titles[resource]}` });
+    } catch (error: any) {
+      console.error('❌ Erro na exportação pelo servidor:', error);
+      alert(`Erro ao gerar relatório no servidor: ${error.response?.data?.error || error.message}`);
+    } finally {
+      setServerExporting(false);
+    }
+  };
 
   // Cores para gráficos
   const COLORS = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#06b6d4'];
@@ -131,7 +150,7 @@ const ReportsPage: React.FC = () => {
       }, {});
 
       // Calcular taxa de conversão
-      const hiredCount = applicationsData.filter((app: any) => app.stage === 9).length;
+      const hiredCount = applicationsData.filter((app: any) => app.status === 'hired').length;
       const conversionRate = applicationsData.length > 0 ? (hiredCount / applicationsData.length) * 100 : 0;
 
       // Dados do dashboard
@@ -318,6 +337,16 @@ const ReportsPage: React.FC = () => {
             <span>Atualizar</span>
           </button>
 
+          {/* Base completa da aba atual, gerada no servidor */}
+          <button
+            onClick={handleServerExport}
+            disabled={serverExporting}
+            className="flex items-center space-x-2 px-4 py-2 border border-gray-300 text-gray-700 bg-white rounded-lg hover:bg-gray-50 transition-colors disabled:opacity-50"
+          >
+            <Download className={`h-4 w-4 ${serverExporting ? 'animate-pulse' : ''}`} />
+            <span>{serverExporting ? 'Gerando...' : 'Base completa (XLSX)'}</span>
+          </button>
+
           {/* Export completo */}
           <ExportButton
             data={[
@@ -41,7 +41,7 @@ export interface RecruitmentStage {
 }
 
 export interface ApplicationHistory {
-  id: number;
+  id: number | null;
   application_id: number;
   previous_status: string | null;
   new_status: string;
@@ -125,8 +125,18 @@ export interface PipelineStats {
   status_count: Record<string, number>;
   stage_count: Record<number, number>;
   conversion_rate: number;
-  avg_time_to_hire_days: number;
+  avg_time_to_hire_days: number | null;
   hired_count: number;
+  time_to_hire?: DurationSummary;
+  time_in_stage?: Record<number, DurationSummary>;
+}
+
+export interface DurationSummary {
+  count: number;
+  avg_days: number | null;
+  p50_days: number | null;
+  p90_days: number | null;
+  max_days: number | null;
 }
 
 export interface StageUpdateData {
@@ -141,6 +151,18 @@ export interface BatchStageUpdate {
   notes?: string;
 }
 
+export interface ActivityPage<T> {
+  items: T[];
+  next_cursor: number | null;
+  has_more: boolean;
+}
+
+export interface LatestActivity {
+  n: number;
+  history?: Record<number, ApplicationHistory[]>;
+  comments?: Record<number, ApplicationComment[]>;
+}
+
 export interface CommentData {
   comment: string;
   is_internal?: boolean;
@@ -242,6 +264,26 @@ class ApplicationsApi {
     return response.data.comment;
   }
 
+  // Página de histórico (mais recentes primeiro; cursor = next_cursor da página anterior)
+  async getApplicationHistory(applicationId: number, cursor?: number, limit = 20): Promise<ActivityPage<ApplicationHistory>> {
+    const response = await api.get(`/applications/${applicationId}/history`, { params: { cursor, limit } });
+    return { items: response.data.history, next_cursor: response.data.next_cursor, has_more: response.data.has_more };
+  }
+
+  // Página de comentários
+  async getApplicationCommentsPage(applicationId: number, cursor?: number, limit = 20): Promise<ActivityPage<ApplicationComment>> {
+    const response = await api.get(`/applications/${applicationId}/comments`, { params: { cursor, limit } });
+    return { items: response.data.comments, next_cursor: response.data.next_cursor, has_more: response.data.has_more };
+  }
+
+  // Últimas N entradas de várias candidaturas numa única requisição (quadro do pipeline)
+  async getLatestActivity(applicationIds: number[], n = 3): Promise<LatestActivity> {
+    const response = await api.get('/applications/activity/latest', {
+      params: { ids: applicationIds.join(','), n }
+    });
+    return response.data;
+  }
+
   // Operações em lote - mover múltiplas candidaturas
   async batchMoveApplications(batchData: BatchStageUpdate): Promise<{ updated_count: number; message: string }> {
     const response = await api.put('/applications/batch/stage', batchData);
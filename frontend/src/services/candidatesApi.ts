@@ -16,6 +16,14 @@ interface CandidateBackend {
   updated_at: string;
 }
 
+// Resultado de /api/sync para candidatos (full: substituir a lista local)
+export interface CandidatesSync {
+  version: number;
+  full: boolean;
+  upserts: Candidate[];
+  deleted: string[];
+}
+
 // Funções de conversão
 const backendToFrontend = (candidate: CandidateBackend): Candidate => {
   const fullName = `${candidate.first_name || ''} ${candidate.last_name || ''}`.trim();
@@ -252,6 +260,43 @@ export const candidatesApi = {
     }
   },
 
+  // Mudanças desde uma versão (sem versão: snapshot completo)
+  sync: async (since?: number): Promise<CandidatesSync> => {
+    try {
+      let version = since;
+      let cursor: string | null = null;
+      let full = false;
+      let hasMore = true;
+      const upserts: Candidate[] = [];
+      const deleted: string[] = [];
+      
+      // has_more: continuar de onde o lote anterior parou (snapshot paginado: pelo cursor)
+      while (hasMore) {
+        const params = new URLSearchParams({ tables: 'candidates' });
+        if (cursor) {
+          params.append('cursor', cursor);
+        } else if (version !== undefined) {
+          params.append('since', String(version));
+        }
+        const response = await api.get(`/api/sync?${params}`);
+        const changes = response.data.tables.candidates;
+        full = full || response.data.full;
+        upserts.push(...changes.upserts.map(backendToFrontend));
+        deleted.push(...changes.deleted.map((id: number) => id.toString()));
+        version = response.data.version;
+        cursor = response.data.cursor || null;
+        hasMore = response.data.has_more;
+      }
+      
+      console.log(`🔄 Sync de candidatos: versão ${version}, ${upserts.length} alterados, ${deleted.length} removidos`);
+      return { version: version ?? 0, full, upserts, deleted };
+    } catch (error: any) {
+      console.error('Erro ao sincronizar candidatos:', error);
+      const errorMessage = error.response?.data?.error || error.message || 'Erro ao sincronizar candidatos';
+      throw new Error(errorMessage);
+    }
+  },
+
   // Obter estatísticas dos candidatos
   getStats: async (): Promise<any> => {
     try {
@@ -8,6 +8,7 @@ import { saveAs } from 'file-saver';
 import html2canvas from 'html2canvas';
 import { format } from 'date-fns';
 import { ptBR } from 'date-fns/locale';
+import api from '../lib/api';
 
 // Interfaces
 interface ReportData {
@@ -20,6 +21,27 @@ interface ReportData {
   author?: string;
 }
 
+interface ServerReportSpec {
+  resource: 'candidates' | 'jobs' | 'applications';
+  format: 'csv' | 'xlsx' | 'pdf';
+  columns?: string[];
+  filters?: Record<string, string | number>;
+  title?: string;
+}
+
+interface ServerReportJob {
+  id: string;
+  status: 'queued' | 'running' | 'done' | 'failed';
+  resource: string;
+  format: string;
+  title: string;
+  rows: number | null;
+  size: number | null;
+  error: string | null;
+  reused: boolean;
+  download_url: string | null;
+}
+
 interface ChartExportOptions {
   elementId: string;
   filename: string;
@@ -203,6 +225,47 @@ class ReportService {
     }
   }
 
+  // ===============================================================
+  // RELATÓRIOS GERADOS NO SERVIDOR
+  // ===============================================================
+
+  /**
+   * Gerar relatório no backend (fila assíncrona) e baixar o arquivo pronto
+   */
+  async exportOnServer(spec: ServerReportSpec, options?: {
+    pollIntervalMs?: number;
+    timeoutMs?: number;
+  }): Promise<void> {
+    console.log('🖨️ Solicitando relatório ao servidor:', spec);
+
+    const { data } = await api.post('/api/reports', spec);
+    let job: ServerReportJob = data.job;
+
+    const interval = options?.pollIntervalMs || 1500;
+    const deadline = Date.now() + (options?.timeoutMs || 5 * 60 * 1000);
+
+    while (job.status === 'queued' || job.status === 'running') {
+      if (Date.now() > deadline) {
+        throw new Error('Tempo esgotado aguardando o relatório');
+      }
+      await new Promise((resolve) => setTimeout(resolve, interval));
+      const response = await api.get(`/api/reports/${job.id}`);
+      job = response.data.job;
+    }
+
+    if (job.status !== 'done' || !job.download_url) {
+      throw new Error(job.error || 'Erro ao gerar relatório no servidor');
+    }
+
+    const file = await api.get(job.download_url, { responseType: 'blob', timeout: 0 });
+    const disposition: string = file.headers['content-disposition'] || '';
+    const match = disposition.match(/filename="?([^";]+)"?/);
+    const filename = match ? match[1] : `${this.sanitizeFilename(job.title)}.${job.format}`;
+    saveAs(file.data, filename);
+
+    console.log('✅ Relatório do servidor baixado:', filename, job.reused ? '(reaproveitado)' : '');
+  }
+
   // ===============================================================
   // EXPORTAÇÃO DE IMAGENS
   // ===============================================================